@@ -37,4 +37,28 @@ TEST_CONNECTION_CONFIG = {
     'max_overflow': 0,
     'pool_timeout': 10,
     'pool_recycle': 300
-} 
\ No newline at end of file
+}
+
+# 批量导入配置
+BULK_INSERT_CONFIG = {
+    'chunk_size': 5000        # 每个事务提交的行数
+}
+
+# 原生批量导入配置（import_mode=bulk时使用）
+BULK_LOAD_CONFIG = {
+    'spool_dir': None,              # 临时数据文件目录，None使用系统临时目录；SQL Server需为数据库服务器可访问的路径
+    'mysql_local_infile': False,    # MySQL是否使用LOAD DATA LOCAL INFILE，仅在批量导入专用连接上启用；关闭时回退为批量插入
+    'oracle_array_size': 10000      # Oracle数组DML每次提交的行数
+}
+
+# 后台导入任务配置
+IMPORT_JOB_CONFIG = {
+    'job_retention_seconds': 3600   # 已结束任务在内存中保留的时间(秒)
+}
+
+# 多文件批量导入配置
+BATCH_IMPORT_CONFIG = {
+    'parse_workers': None,      # 解析Excel的进程数，None使用CPU核数
+    'writer_connections': 4,    # 并发写入数据库的连接数
+    'queue_size': 16            # 解析与写入之间缓冲的行数据块数量
+}
@@ -0,0 +1,43 @@
+"""
+Excel读取配置
+
+本模块定义了Excel解析结果缓存、列式副本、读取引擎、行偏移索引和CSV/TSV读取的参数
+"""
+
+# 工作表解析结果缓存配置
+EXCEL_CACHE_CONFIG = {
+    'enabled': True,
+    'max_memory_mb': 256,     # 缓存占用内存上限(MB)，超出时按最近最少使用淘汰
+    'max_entries': 32         # 最多缓存的工作表数量
+}
+
+# 列式副本配置：上传Excel后在后台将每个工作表转换为列式存储（NumPy .npy文件 + JSON清单），
+# 存放在上传文件旁的"<文件名>.sidecar"目录中；源文件未修改时读取直接内存映射副本，无需重新解析
+EXCEL_SIDECAR_CONFIG = {
+    'enabled': True,
+    'convert_on_upload': True,  # 上传.xlsx/.xls后自动提交后台转换任务
+    'max_file_mb': 200          # 超过此大小的文件不转换
+}
+
+# 流式读取配置
+EXCEL_READER_CONFIG = {
+    # .xlsx默认读取引擎：openpyxl（只读模式）或iterparse（直接解析工作表XML，见utils.xlsx_stream_reader），
+    # 调用方可在read_excel_data/iter_excel_data中通过engine参数按次指定
+    'xlsx_engine': 'openpyxl'
+}
+
+# xlsx行偏移索引配置：记录每隔interval行的<row>元素在工作表XML中的偏移，
+# 分页预览靠后的页面时从最近的检查点开始解析（见utils.excel_row_index）；只在iterparse引擎读取时使用，分页预览固定使用iterparse引擎
+EXCEL_ROW_INDEX_CONFIG = {
+    'enabled': True,
+    'interval': 1000          # 检查点间隔行数
+}
+
+# CSV/TSV读取配置（见utils.csv_reader）
+CSV_READER_CONFIG = {
+    'sample_bytes': 64 * 1024,        # 识别编码和分隔符时读取的文件头部字节数
+    'sniff_lines': 50,                # 识别分隔符时使用的最大行数
+    'delimiters': ',\t;|',            # 候选分隔符
+    'buffer_bytes': 1024 * 1024,      # 读取文件的缓冲区大小
+    'max_field_size': 16 * 1024 * 1024  # 单个字段的最大字符数
+}
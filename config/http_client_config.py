@@ -0,0 +1,45 @@
+"""
+大模型服务HTTP客户端与响应缓存配置
+
+每个服务提供商使用独立的Session连接池并保持长连接，
+连接失败、429和5xx等临时错误按指数退避重试。
+"""
+
+# 默认配置，所有服务提供商共用
+HTTP_CLIENT_CONFIG = {
+    "pool_maxsize": 10,             # 每个提供商每个主机保持的最大连接数
+    "connect_timeout": 5,           # 建立连接超时（秒）
+    "read_timeout": 60,             # 读取响应超时（秒），流式响应为两次数据之间的最大间隔
+    "max_retries": 3,               # 临时错误的最大重试次数
+    "read_retries": 0,              # 读取超时后的重试次数，生成内容耗时较长，默认不重试
+    "backoff_factor": 0.5,          # 退避系数，第n次重试前等待 backoff_factor * 2^(n-1) 秒
+    "max_concurrency": 4,           # 同时发往该提供商的最大请求数，超出的请求排队等待
+    "interactive_reserved": 1,      # 为交互式请求保留的并发名额，批量任务最多占用max_concurrency减去此值（至少1个）
+    "queue_timeout": 30,            # 交互式请求等待并发名额的最长时间（秒），超时报错而不是一直阻塞
+    "batch_queue_timeout": 600,     # 批量请求等待并发名额的最长时间（秒）
+    "retry_status_codes": (429, 500, 502, 503, 504)  # 需要重试的HTTP状态码
+}
+
+# 按服务提供商覆盖的配置，未列出的项使用默认配置
+HTTP_CLIENT_PROVIDER_CONFIG = {
+    "ollama": {
+        "read_timeout": 60,
+        "max_concurrency": 2        # 本地模型并行推理能力有限
+    },
+    "dify": {
+        "read_timeout": 180
+    }
+}
+
+# 大模型响应缓存配置，调用方按需启用（如生成SQL的接口），相同请求直接返回缓存的结果
+LLM_RESPONSE_CACHE_CONFIG = {
+    "enabled": True,                                        # 总开关，关闭后所有调用都直接请求模型
+    "db_path": "file/llm_cache/llm_response_cache.db",      # 缓存文件路径（SQLite）
+    "ttl_seconds": 7 * 24 * 3600,                           # 缓存有效期（秒）
+    "max_entries": 5000                                     # 最多缓存的响应数，超出时淘汰最久未使用的记录
+}
+
+# 大模型批量生成配置，批量任务在后台执行，进度通过任务ID查询
+LLM_BATCH_CONFIG = {
+    "max_items": 5000                                       # 单个批量任务最多的生成项数
+}
@@ -13,6 +13,7 @@ from service.database.database_service import DatabaseService
 from service.prompt_templates.index_prompt_templates_service import PromptTemplateService
 from sqlalchemy import text
 from service.exception import AppException
+from utils.sse_util import sse_event, sse_response
 
 # 从通用数据库API模块导入相关函数
 from routes.common.common_database_api import get_fields as common_get_fields
@@ -96,6 +97,93 @@ def add_template():
     # 此处添加添加SQL模板的逻辑
     return jsonify({"message": "添加SQL模板成功", "template_id": ""})
 
+def build_sql_generation_messages(template_id, tables, db_type, date_compare_type, model_id, model_name):
+    """根据提示词模板和选择的表、字段构建生成SQL的消息
+    
+    Returns:
+        list: 发送给模型的消息列表
+        
+    Raises:
+        AppException: 模板不存在(404)或读取模板失败(500)
+    """
+    # 获取提示词模板
+    system_prompt = ""
+    user_prompt_template = ""
+    
+    if template_id:
+        try:
+            # 使用模板服务获取模板内容
+            template = template_service.load_template_from_file(template_id)
+            
+            if not template:
+                error_msg = f"未找到ID为 {template_id} 的模板"
+                app_logger.error(error_msg)
+                raise AppException(error_msg, code=404)
+            
+            # 解析模板内容
+            template_content = json.loads(template.get('content', '{}'))
+            
+            system_prompt = template_content.get('system', '')
+            user_prompt_template = template_content.get('user', '')
+            
+            # 如果模板中没有包含必要的提示词，则使用默认提示词
+            if not user_prompt_template:
+                app_logger.warning("所选模板未包含用户提示词，使用默认提示词")
+                user_prompt_template = """请基于下面提供的表和字段信息生成SQL查询语句。
+
+请仅返回SQL语句，不要包含任何其他文字说明。
+                        """
+                
+        except AppException:
+            raise
+        except Exception as e:
+            error_msg = f"获取提示词模板失败: {str(e)}"
+            app_logger.error(error_msg)
+            raise AppException(error_msg, code=500)
+    
+    # 构建提示词中的表和字段信息
+    tables_info = []
+    for i, table in enumerate(tables):
+        table_name = table.get('name', '')
+        fields = table.get('fields', [])
+        
+        if table_name and fields:
+            fields_info = []
+            for field in fields:
+                field_name = field.get('name', '')
+                field_type = field.get('type', '').lower()
+                field_comment = field.get('comment', '')
+                
+                if field_name:
+                    # 包含字段名、类型和注释信息
+                    field_info = f"{field_name} ({field_type})"
+                    if field_comment:
+                        field_info += f" - {field_comment}"
+                    fields_info.append(field_info)
+            
+            tables_info.append(f"表{i+1}: {table_name}\n字段: {', '.join(fields_info)}")
+    
+    tables_info_text = "\n".join(tables_info)
+    
+    # 组装用户提示词
+    base_prompt = f"{user_prompt_template}\n\n数据库类型: {db_type}\n日期对比方式: {date_compare_type}\n\n选择的表和字段:\n{tables_info_text}"
+    
+    # 判断是否为Qwen3模型，如果是则添加/no_think
+    if 'qwen3' in model_id.lower() or 'qwen3' in model_name:
+        user_prompt = f"{base_prompt} /no_think"
+        app_logger.info("检测到Qwen3模型，添加/no_think指令")
+    else:
+        user_prompt = base_prompt
+        app_logger.info(f"非Qwen3模型({model_id})，不添加/no_think指令")
+    
+    # 准备消息格式
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+    
+    return messages
+
 @index_analysis_bp.route('/generate_sql', methods=['POST'])
 def generate_sql():
     """生成SQL查询语句"""
@@ -107,6 +195,7 @@ def generate_sql():
         template_id = data.get('template_id')
         tables = data.get('tables', [])
         date_compare_type = data.get('date_compare_type', 'year')  # 获取日期对比方式，默认为'year'
+        use_cache = data.get('use_cache', False)  # 显式启用时相同模板、表字段、数据库类型和日期对比方式直接返回缓存的SQL
         
         # 参数验证
         if not template_id:
@@ -141,80 +230,12 @@ def generate_sql():
             
             app_logger.info(f"使用默认模型生成分析SQL: 提供商 {provider_id}, 模型 {model_id}")
             
-            # 获取提示词模板
-            system_prompt = ""
-            user_prompt_template = ""
-            
-            if template_id:
-                try:
-                    # 使用模板服务获取模板内容
-                    template = template_service.load_template_from_file(template_id)
-                    
-                    if not template:
-                        error_msg = f"未找到ID为 {template_id} 的模板"
-                        app_logger.error(error_msg)
-                        return jsonify({"success": False, "message": error_msg}), 404
-                    
-                    # 解析模板内容
-                    import json
-                    template_content = json.loads(template.get('content', '{}'))
-                    
-                    system_prompt = template_content.get('system', '')
-                    user_prompt_template = template_content.get('user', '')
-                    
-                    # 如果模板中没有包含必要的提示词，则使用默认提示词
-                    if not user_prompt_template:
-                        app_logger.warning("所选模板未包含用户提示词，使用默认提示词")
-                        user_prompt_template = """请基于下面提供的表和字段信息生成SQL查询语句。
-
-请仅返回SQL语句，不要包含任何其他文字说明。
-                        """
-                        
-                except Exception as e:
-                    error_msg = f"获取提示词模板失败: {str(e)}"
-                    app_logger.error(error_msg)
-                    return jsonify({"success": False, "message": error_msg}), 500
-            
-            # 构建提示词中的表和字段信息
-            tables_info = []
-            for i, table in enumerate(tables):
-                table_name = table.get('name', '')
-                fields = table.get('fields', [])
-                
-                if table_name and fields:
-                    fields_info = []
-                    for field in fields:
-                        field_name = field.get('name', '')
-                        field_type = field.get('type', '').lower()
-                        field_comment = field.get('comment', '')
-                        
-                        if field_name:
-                            # 包含字段名、类型和注释信息
-                            field_info = f"{field_name} ({field_type})"
-                            if field_comment:
-                                field_info += f" - {field_comment}"
-                            fields_info.append(field_info)
-                    
-                    tables_info.append(f"表{i+1}: {table_name}\n字段: {', '.join(fields_info)}")
-            
-            tables_info_text = "\n".join(tables_info)
-            
-            # 组装用户提示词
-            base_prompt = f"{user_prompt_template}\n\n数据库类型: {db_type}\n日期对比方式: {date_compare_type}\n\n选择的表和字段:\n{tables_info_text}"
-            
-            # 判断是否为Qwen3模型，如果是则添加/no_think
-            if 'qwen3' in model_id.lower() or 'qwen3' in model_name:
-                user_prompt = f"{base_prompt} /no_think"
-                app_logger.info("检测到Qwen3模型，添加/no_think指令")
-            else:
-                user_prompt = base_prompt
-                app_logger.info(f"非Qwen3模型({model_id})，不添加/no_think指令")
-            
-            # 准备消息格式
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ]
+            # 构建提示词（模板不存在或读取失败时直接返回错误）
+            try:
+                messages = build_sql_generation_messages(template_id, tables, db_type, date_compare_type,
+                                                         model_id, model_name)
+            except AppException as e:
+                return jsonify({"success": False, "message": e.message}), e.code
             
             # 参数
             options = {
@@ -222,7 +243,7 @@ def generate_sql():
             }
             
             # 调用模型
-            result = model_service.chat_completion(provider_id, model_id, messages, options)
+            result = model_service.chat_completion(provider_id, model_id, messages, options, use_cache=use_cache)
             
             # 检查是否有错误
             if "error" in result:
@@ -238,7 +259,8 @@ def generate_sql():
                     "success": True,
                     "message": "SQL生成成功",
                     "sql": generated_sql,
-                    "from_llm": True
+                    "from_llm": True,
+                    "cached": result.get("cached", False)
                 })
             else:
                 app_logger.error("模型返回的SQL内容为空")
@@ -280,6 +302,91 @@ def generate_sql():
             "message": f"生成SQL失败: {str(e)}"
         }), 500
 
+@index_analysis_bp.route('/generate_sql/stream', methods=['POST'])
+def generate_sql_stream():
+    """生成SQL查询语句，以Server-Sent Events逐段返回模型输出
+
+    请求参数与 /generate_sql 相同
+
+    事件:
+    - token: {"content": 增量SQL文本}
+    - done: {"from_llm": 是否由模型生成}
+    - error: {"message": 错误信息}
+    模型在输出第一段内容前失败时，改用备用方式生成SQL，以一个token事件返回
+    """
+    app_logger.info("请求流式生成SQL查询语句")
+
+    data = request.json or {}
+    template_id = data.get('template_id')
+    tables = data.get('tables', [])
+    date_compare_type = data.get('date_compare_type', 'year')
+
+    # 参数验证
+    if not template_id:
+        return jsonify({"success": False, "message": "模板ID不能为空"}), 400
+
+    if not tables or len(tables) == 0:
+        return jsonify({"success": False, "message": "至少需要选择一个表和字段"}), 400
+
+    try:
+        db_type = DatabaseConfigUtil.get_default_db_type()
+        db_config = DatabaseConfigUtil.get_database_config(db_type)
+        if not db_config:
+            return jsonify({"success": False, "message": f"获取{db_type}数据库配置失败"}), 500
+
+        from service.common.model_common_service import model_service
+        default_model = model_service.get_default_model()
+        messages = None
+        if default_model:
+            provider_id = default_model.get('provider_id')
+            model_id = default_model.get('id')
+            model_name = default_model.get('name', '').lower()
+            app_logger.info(f"使用默认模型流式生成分析SQL: 提供商 {provider_id}, 模型 {model_id}")
+            messages = build_sql_generation_messages(template_id, tables, db_type, date_compare_type,
+                                                     model_id, model_name)
+        else:
+            app_logger.error("没有找到默认模型配置，使用备用方式生成SQL")
+    except AppException as e:
+        return jsonify({"success": False, "message": e.message}), e.code
+    except Exception as e:
+        app_logger.error(f"生成SQL失败: {str(e)}")
+        return jsonify({"success": False, "message": f"生成SQL失败: {str(e)}"}), 500
+
+    def generate():
+        emitted = False
+        if messages is not None:
+            try:
+                for chunk in model_service.stream_chat_completion(provider_id, model_id, messages,
+                                                                  {"temperature": 0.2}):
+                    emitted = True
+                    yield sse_event('token', {'content': chunk})
+                if emitted:
+                    yield sse_event('done', {'from_llm': True})
+                    return
+                app_logger.error("模型返回的SQL内容为空")
+            except Exception as e:
+                app_logger.error(f"流式调用默认模型生成SQL失败: {str(e)}")
+                if emitted:
+                    yield sse_event('error', {'message': f"模型生成SQL失败: {str(e)}"})
+                    return
+
+        # 模型不可用或未输出任何内容，使用备用方式生成SQL
+        app_logger.info("使用备用方式生成SQL")
+        template_info = template_service.load_template_from_file(template_id)
+        if not template_info:
+            yield sse_event('error', {'message': "获取模板信息失败"})
+            return
+        sql = generate_sample_sql({
+            "database_type": db_type,
+            "tables": tables,
+            "date_compare_type": date_compare_type,
+            "template": template_info
+        })
+        yield sse_event('token', {'content': sql})
+        yield sse_event('done', {'from_llm': False})
+
+    return sse_response(generate())
+
 @index_analysis_bp.route('/execute_sql', methods=['POST'])
 def execute_sql():
     """执行SQL查询"""
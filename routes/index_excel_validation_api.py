@@ -8,7 +8,7 @@ import os
 import json
 from flask import Blueprint, request, jsonify, current_app
 from service.log.logger import app_logger
-from utils.excel_util import ExcelUtil
+from utils.excel_util import ExcelUtil, SUPPORTED_EXTENSIONS
 
 # 创建蓝图
 excel_validation_bp = Blueprint('excel_validation', __name__)
@@ -39,10 +39,10 @@ def get_sheets():
         
         # 检查文件扩展名
         file_ext = os.path.splitext(file_path)[1].lower()
-        if file_ext not in ['.xlsx', '.xls']:
+        if file_ext not in SUPPORTED_EXTENSIONS:
             return jsonify({
                 "success": False,
-                "message": "不支持的文件类型，请选择.xlsx或.xls文件"
+                "message": "不支持的文件类型，请选择.xlsx、.xls、.csv或.tsv文件"
             }), 400
         
         # 使用ExcelUtil获取工作表信息
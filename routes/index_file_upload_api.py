@@ -8,9 +8,12 @@ import os
 import time
 import json
 import re
+import shutil
 from datetime import datetime
 from flask import Blueprint, request, jsonify, current_app, url_for, send_from_directory
 from werkzeug.utils import secure_filename
+from service.log.logger import app_logger
+from utils import excel_sidecar
 
 # 创建蓝图
 file_upload_bp = Blueprint('file_upload', __name__)
@@ -112,6 +115,13 @@ def upload_file():
         # 保存文件
         file.save(save_path)
         
+        # Excel文件在后台生成列式副本，后续预览、校验和导入直接读取副本
+        try:
+            sidecar_scheduled = excel_sidecar.schedule_conversion(save_path)
+        except Exception as e:
+            app_logger.error(f"提交Excel列式副本转换任务失败: {save_path}, 错误: {str(e)}")
+            sidecar_scheduled = False
+        
         # 获取文件URL
         file_url = get_file_url(os.path.basename(date_dir), final_filename)
         
@@ -119,7 +129,8 @@ def upload_file():
         uploaded_files.append({
             'name': final_filename,
             'path': save_path,
-            'url': file_url
+            'url': file_url,
+            'sidecar_scheduled': sidecar_scheduled
         })
     
     return jsonify({
@@ -194,8 +205,9 @@ def delete_file():
         return jsonify({'success': False, 'message': '文件不存在'}), 404
     
     try:
-        # 删除文件
+        # 删除文件及其列式副本
         os.remove(file_path)
+        excel_sidecar.remove_sidecar(file_path)
         return jsonify({'success': True, 'message': '文件已成功删除'})
     except Exception as e:
         return jsonify({'success': False, 'message': f'删除文件失败: {str(e)}'}), 500
@@ -222,8 +234,10 @@ def delete_all_files():
             for filename in os.listdir(date_path):
                 file_path = os.path.join(date_path, filename)
                 
-                # 跳过目录
+                # 列式副本目录随源文件一起删除，跳过其他目录
                 if not os.path.isfile(file_path):
+                    if filename.endswith(excel_sidecar.SIDECAR_SUFFIX):
+                        shutil.rmtree(file_path, ignore_errors=True)
                     continue
                 
                 # 删除文件
@@ -12,6 +12,12 @@ from utils.file_util import is_safe_file_path, ensure_export_directory
 from config.global_config import get_project_root, get_export_dir
 from service.database.database_service import DatabaseService
 from service.database.db_pool_manager import DatabasePoolManager
+from service.import_job import ImportJobService, ImportJobCancelled, BatchImportService
+from service.import_job.import_rows import (
+    ImportRowSource,
+    prepare_supplements,
+    build_import_row_builder
+)
 from service.log.logger import app_logger
 from service.exception import AppException
 from sqlalchemy import text
@@ -27,6 +33,10 @@ import_api_bp = Blueprint('import_api', __name__)
 # 数据库服务实例
 db_service = DatabaseService()
 
+# 后台导入任务服务实例
+import_job_service = ImportJobService.get_instance()
+batch_import_service = BatchImportService.get_instance()
+
 @import_api_bp.route('/api/import/db_types', methods=['GET'])
 def get_db_types():
     """获取所有可用的数据库类型
@@ -275,22 +285,15 @@ def preview_excel_data():
         total_rows = None
         if get_total_rows:
             try:
-                # 获取所有行，但忽略空行
-                all_rows = ExcelUtil.read_excel_data(
+                # 直接扫描工作表结构获取最后一个有效行，不解析单元格数据
+                total_rows = ExcelUtil.get_sheet_total_rows(
                     file_path=file_path, 
                     sheet_name=sheet_name, 
                     sheet_index=sheet_index,
-                    start_row=0,  # 从第一行开始
-                    row_limit=None,  # 读取所有行
-                    ignore_empty_rows=True  # 忽略空行
+                    ignore_empty_rows=True  # 忽略末尾空行
                 )
                 
-                # 计算非空行的数量
-                total_rows = len(all_rows)
-                if total_rows is not None:
-                    total_rows = int(total_rows)  # 确保是Python原生int类型
-                
-                app_logger.info(f"获取到Excel工作表实际总行数(排除空行): {total_rows}")
+                app_logger.info(f"获取到Excel工作表实际总行数(排除末尾空行): {total_rows}")
             except Exception as e:
                 app_logger.error(f"获取工作表总行数失败: {str(e)}")
                 # 失败时不返回错误，只是不提供总行数信息
@@ -504,6 +507,357 @@ def download_export_file(filename):
             "message": f"下载文件失败: {str(e)}"
         }), 500
 
+def _normalize_positive_int(data, key, label):
+    """将可选的整数参数转换为int并限制为不小于1，写回请求数据
+    
+    Args:
+        data: 请求数据
+        key: 参数名
+        label: 参数说明，用于错误信息
+        
+    Returns:
+        tuple: 参数有效或未提供时返回None，否则返回(错误响应字典, 状态码)
+    """
+    value = data.get(key)
+    if value is None or value == '':
+        data.pop(key, None)
+        return None
+    try:
+        if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+            raise ValueError(value)
+        data[key] = max(1, int(value))
+    except (TypeError, ValueError):
+        return {"success": False, "message": f"无效的{label}: {value}"}, 400
+    return None
+
+def _validate_import_request(data):
+    """校验Excel导入请求参数
+    
+    Args:
+        data: 请求数据
+        
+    Returns:
+        tuple: 参数有效时返回None，否则返回(错误响应字典, 状态码)
+    """
+    # 提取必要参数
+    file_path = data.get('file_path')
+    sheet_id = data.get('sheet_id')
+    database_id = data.get('database_id')
+    table_id = data.get('table_id')
+    
+    # 验证必要参数
+    if not file_path:
+        return {"success": False, "message": "未指定Excel文件路径"}, 400
+    
+    if not sheet_id:
+        return {"success": False, "message": "未指定工作表ID"}, 400
+    
+    if not database_id:
+        return {"success": False, "message": "未指定数据库ID"}, 400
+    
+    if not table_id:
+        return {"success": False, "message": "未指定表ID"}, 400
+    
+    # 验证Excel文件路径
+    if not ExcelUtil.validate_excel_path(file_path):
+        return {"success": False, "message": f"无效的Excel文件路径: {file_path}"}, 400
+    
+    # 解析sheet_id获取sheet名称和索引
+    try:
+        ExcelUtil.parse_sheet_id(sheet_id)
+    except Exception as e:
+        app_logger.error(f"解析sheet_id失败: {str(e)}")
+        return {"success": False, "message": f"无效的工作表ID: {sheet_id}"}, 400
+    
+    batch_size_error = _normalize_positive_int(data, 'batch_size', '每批提交行数')
+    if batch_size_error:
+        return batch_size_error
+    
+    # 获取数据库配置
+    if not DatabaseConfigUtil.get_database_config(database_id):
+        return {"success": False, "message": f"找不到数据库类型 '{database_id}' 的配置"}, 404
+    
+    return None
+
+def _execute_excel_import(data, job=None):
+    """执行Excel导入：读取、筛选并写入数据库
+    
+    同步导入接口和后台导入任务共用此函数。传入job时，日志直接写入任务日志列表，
+    读取和写入过程中更新任务进度，并在检查点响应取消请求。
+    
+    Args:
+        data: 已校验的导入请求参数
+        job: 可选的后台导入任务(ImportJob)
+        
+    Returns:
+        tuple: (响应字典, HTTP状态码)
+    """
+    file_path = data.get('file_path')
+    sheet_id = data.get('sheet_id')
+    database_id = data.get('database_id')
+    table_id = data.get('table_id')
+    start_row = data.get('start_row', 2)
+    condition = data.get('condition')
+    supplements = data.get('supplements', [])
+    
+    sheet_name, sheet_index = ExcelUtil.parse_sheet_id(sheet_id)
+    db_config = DatabaseConfigUtil.get_database_config(database_id)
+    
+    # 开始执行导入过程
+    start_time = time.time()
+    
+    app_logger.info(f"开始导入Excel数据到数据库，文件: {file_path}, 表: {table_id}")
+    addLog = job.logs if job is not None else []  # 用于存储导入过程中的日志
+    
+    # 添加日志记录
+    addLog.append({"type": "info", "message": f"开始读取Excel文件: {os.path.basename(file_path)}"})
+    
+    # 行数据边读取边筛选边写入，不在内存中保留整个工作表
+    source = ImportRowSource(file_path, sheet_name, start_row, condition)
+    
+    # 先读取第一行满足条件的数据，确定插入字段并检查是否有数据
+    try:
+        if job is not None:
+            job.set_stage('reading')
+        first_row = source.first_row()
+    except Exception as e:
+        app_logger.error(f"读取Excel数据失败: {str(e)}", exc_info=True)
+        return {
+            "success": False,
+            "message": "读取Excel数据失败",
+            "error": {
+                "message": str(e)
+            }
+        }, 500
+    
+    # 如果没有数据，返回错误
+    if source.total_rows == 0:
+        return {
+            "success": False,
+            "message": "Excel文件中没有数据",
+            "total_rows": 0
+        }, 400
+    
+    # 获取表结构信息
+    try:
+        table_fields = db_service.get_table_field_info(database_id, db_config, table_id)
+        addLog.append({"type": "info", "message": f"获取表 {table_id} 的字段信息，共{len(table_fields)}个字段"})
+    except Exception as e:
+        app_logger.error(f"获取表结构信息失败: {str(e)}", exc_info=True)
+        return {
+            "success": False,
+            "message": "获取表结构信息失败",
+            "error": {
+                "message": str(e)
+            }
+        }, 500
+    
+    try:
+        # 条件筛选在读取时完成，筛选后的行数在写入结束后记录
+        if source.condition_type is not None:
+            addLog.append({"type": "info", "message": f"应用筛选条件: {condition.get('column_name')} {condition.get('type_name')}"})
+        else:
+            addLog.append({"type": "info", "message": "未设置筛选条件，使用所有数据"})
+        
+        # 记录数据处理信息
+        app_logger.info("开始处理数据，将对字符串类型的数据去除前后空白字符")
+        addLog.append({"type": "info", "message": "对字符串类型的数据自动去除前后空白字符"})
+        
+        # 准备补充字段
+        prepared_supplements = prepare_supplements(supplements, table_fields)
+        
+        # 构建插入字段列表: Excel列按顺序映射到表字段，补充字段覆盖或追加。
+        # 读取的行已按工作表声明的列数补齐，插入字段按第一行满足条件的数据确定
+        row_width = len(first_row) if first_row is not None else 0
+        columns, row_builder = build_import_row_builder(table_fields, row_width, prepared_supplements)
+        
+        # 开始导入数据
+        addLog.append({"type": "info", "message": f"开始导入数据到表 {table_id}"})
+        
+        success_count = 0
+        error_count = 0
+        failed_row = None
+        error_message = None
+        cancelled = False
+        # 写入前不知道筛选后的行数，按工作表有效行数估算进度
+        try:
+            total_rows = max(ExcelUtil.get_sheet_total_rows(file_path, sheet_name, sheet_index) - (start_row - 1), 0)
+        except Exception as e:
+            app_logger.warning(f"获取工作表行数失败，导入进度不显示百分比: {str(e)}")
+            total_rows = 0
+        if job is not None:
+            job.set_stage('importing', total_rows)
+        progress = {'inserted_rows': 0}
+        
+        def log_progress(inserted_rows):
+            # 记录进度
+            progress['inserted_rows'] = inserted_rows
+            if total_rows:
+                progress_percent = min(int((inserted_rows / total_rows) * 100), 100)
+                addLog.append({"type": "info", "message": f"已批量导入至第 {inserted_rows} 行 ({progress_percent}%)"})
+                app_logger.info(f"导入进度: {progress_percent}%, 已处理{inserted_rows}行")
+            else:
+                addLog.append({"type": "info", "message": f"已批量导入至第 {inserted_rows} 行"})
+            if job is not None:
+                job.update_progress(inserted_rows)
+        
+        # 遍历时直接生成插入值，原生批量导入回退时重新读取文件
+        source.row_builder = row_builder
+        
+        try:
+            if first_row is None:
+                # 没有满足筛选条件的数据
+                result = {'inserted_rows': 0}
+            elif data.get('import_mode') == 'bulk':
+                # 数据库原生批量导入，不可用时服务内部回退为批量插入
+                result = db_service.bulk_load(
+                    db_type=database_id,
+                    config=db_config,
+                    table_name=table_id,
+                    columns=columns,
+                    rows=source,
+                    chunk_size=data.get('batch_size'),
+                    progress_callback=log_progress
+                )
+                addLog.append({"type": "info", "message": f"导入方式: {result['mode']}"})
+            else:
+                # 使用绑定参数的executemany批量插入，同一连接内每块一个事务
+                result = db_service.bulk_insert(
+                    db_type=database_id,
+                    config=db_config,
+                    table_name=table_id,
+                    columns=columns,
+                    rows=source,
+                    chunk_size=data.get('batch_size'),
+                    progress_callback=log_progress
+                )
+            success_count = result['inserted_rows']
+            addLog.append({"type": "info", "message": f"共读取{source.total_rows}行（已忽略空行），筛选后{source.filtered_rows}行"})
+            if source.row_width > row_width and row_width < len(table_fields):
+                addLog.append({"type": "warning", "message": f"部分行的列数({source.row_width})多于第一行({row_width})，"
+                                                             f"超出的列未导入"})
+            
+            # 记录完成信息
+            app_logger.info(f"数据导入成功，共{success_count}行")
+            
+        except ImportJobCancelled as e:
+            # 已提交的批次保留，后续批次不再写入
+            cancelled = True
+            success_count = e.details.get('inserted_rows', 0)
+            error_message = e.message
+            app_logger.info(f"导入任务已取消，已导入{success_count}行")
+            addLog.append({"type": "warning", "message": f"导入任务已取消，已提交的{success_count}行数据保留"})
+        except AppException as e:
+            # 批量插入失败，出错的块已回滚，之前的块已提交
+            success_count = e.details.get('inserted_rows', 0)
+            failed_row = e.details.get('failed_row_offset')
+            error_count = e.details.get('failed_chunk_size', 1)
+            error_message = e.message
+            if failed_row is not None:
+                end_index = failed_row + error_count
+                app_logger.error(f"导入批次 {failed_row}-{end_index} 失败: {error_message}", exc_info=True)
+                addLog.append({"type": "error", "message": f"导入第 {failed_row+1}-{end_index} 行数据失败: {error_message}"})
+            else:
+                app_logger.error(f"导入过程中发生未处理的异常: {error_message}", exc_info=True)
+                addLog.append({"type": "error", "message": f"导入过程中发生未处理的异常: {error_message}"})
+        except Exception as e:
+            # 如果不是已处理的错误（如读取到无法解析的行），记录为未处理的异常，已提交的块保留
+            app_logger.error(f"导入过程中发生未处理的异常: {str(e)}", exc_info=True)
+            addLog.append({"type": "error", "message": f"导入过程中发生未处理的异常: {str(e)}"})
+            success_count = progress['inserted_rows']
+            error_count = 1
+            error_message = str(e)
+            
+        # 计算总耗时
+        duration = round(time.time() - start_time, 2)
+        
+        # 处理导入结果
+        if cancelled:
+            return {
+                "success": False,
+                "message": "导入任务已取消",
+                "success_count": success_count,
+                "error_count": 0,
+                "total_rows": source.filtered_rows,
+                "details": {
+                    "duration": duration
+                },
+                "logs": addLog
+            }, 499
+        elif error_count == 0:
+            # 添加一个验证查询，确认数据确实已经写入
+            try:
+                # 构建简单查询以验证数据
+                verify_sql = text(f"SELECT COUNT(*) FROM {table_id}")
+                verify_result = db_service.execute_sql(
+                    db_type=database_id,
+                    config=db_config,
+                    sql=verify_sql
+                )
+                
+                # 提取记录数
+                count_row = next(iter(verify_result['rows']), None)
+                record_count = count_row[0] if count_row else 0
+                
+                addLog.append({"type": "info", "message": f"验证查询: 表 {table_id} 中共有 {record_count} 条记录"})
+                app_logger.info(f"导入后验证查询: 表 {table_id} 中共有 {record_count} 条记录")
+                
+            except Exception as e:
+                app_logger.error(f"验证查询失败: {str(e)}", exc_info=True)
+                addLog.append({"type": "warning", "message": f"无法验证数据是否成功写入: {str(e)}"})
+            
+            # 导入完成后的记录
+            addLog.append({"type": "info", "message": f"导入完成，共导入{success_count}行数据，耗时{duration}秒"})
+            app_logger.info(f"Excel导入完成，成功:{success_count}, 失败:{error_count}, 耗时:{duration}秒")
+            
+            # 返回成功响应
+            return {
+                "success": True,
+                "message": "数据导入成功",
+                "success_count": success_count,
+                "error_count": error_count,
+                "total_rows": source.filtered_rows,
+                "details": {
+                    "duration": duration
+                },
+                "logs": addLog
+            }, 200
+        else:
+            # 处理导入失败的情况
+            current_row = failed_row + start_row if failed_row is not None else None
+            
+            addLog.append({"type": "error", "message": f"导入数据过程中出错: {error_message}"})
+            if current_row is not None:
+                addLog.append({"type": "error", "message": f"错误发生在第 {current_row} 行"})
+            
+            return {
+                "success": False,
+                "message": "导入数据过程中出错",
+                "error": {
+                    "row": current_row,
+                    "message": error_message
+                },
+                "processed_rows": failed_row,
+                "success_count": success_count,
+                "error_count": error_count,
+                "total_rows": source.filtered_rows,
+                "logs": addLog
+            }, 500
+    except Exception as e:
+        error_msg = str(e)
+        app_logger.error(f"Excel导入过程中发生未处理的异常: {error_msg}", exc_info=True)
+        addLog.append({"type": "error", "message": f"导入过程中发生异常: {error_msg}"})
+        
+        return {
+            "success": False,
+            "message": "导入过程中发生异常",
+            "error": {
+                "message": error_msg
+            },
+            "total_rows": source.filtered_rows,
+            "logs": addLog
+        }, 500
+
 @import_api_bp.route('/api/import/excel/import', methods=['POST'])
 def import_excel_data():
     """导入Excel数据到数据库表
@@ -516,6 +870,8 @@ def import_excel_data():
         start_row: 开始导入行
         condition: 可选的导入条件
         supplements: 可选的补充字段列表
+        batch_size: 可选，每个事务提交的行数
+        import_mode: 可选，batch(默认，批量插入)或bulk(数据库原生批量导入，不可用时回退为batch)
         
     Returns:
         JSON: 包含导入结果的JSON对象
@@ -535,360 +891,197 @@ def import_excel_data():
         # 记录请求内容
         app_logger.info(f"Excel导入请求参数: {data}")
         
-        # 提取必要参数
-        file_path = data.get('file_path')
-        sheet_id = data.get('sheet_id')
-        database_id = data.get('database_id')
-        table_id = data.get('table_id')
-        start_row = data.get('start_row', 2)
-        condition = data.get('condition')
-        supplements = data.get('supplements', [])
+        validation_error = _validate_import_request(data)
+        if validation_error:
+            return jsonify(validation_error[0]), validation_error[1]
         
-        # 验证必要参数
-        if not file_path:
-            return jsonify({"success": False, "message": "未指定Excel文件路径"}), 400
+        result, status_code = _execute_excel_import(data)
+        return jsonify(result), status_code
+    
+    except Exception as e:
+        error_msg = str(e)
+        app_logger.error(f"Excel导入API异常: {error_msg}", exc_info=True)
         
-        if not sheet_id:
-            return jsonify({"success": False, "message": "未指定工作表ID"}), 400
+        return jsonify({
+            "success": False,
+            "message": "导入过程中发生异常",
+            "error": {
+                "message": error_msg
+            }
+        }), 500
+
+@import_api_bp.route('/api/import/excel/import/jobs', methods=['POST'])
+def submit_import_job():
+    """提交后台Excel导入任务
+    
+    请求参数与/api/import/excel/import相同，任务在普通业务线程池中执行，立即返回任务ID
+    
+    Returns:
+        JSON: 包含job_id的JSON对象
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({
+                "success": False,
+                "message": "未提供请求数据"
+            }), 400
         
-        if not database_id:
-            return jsonify({"success": False, "message": "未指定数据库ID"}), 400
+        app_logger.info(f"提交Excel导入任务，参数: {data}")
         
-        if not table_id:
-            return jsonify({"success": False, "message": "未指定表ID"}), 400
+        validation_error = _validate_import_request(data)
+        if validation_error:
+            return jsonify(validation_error[0]), validation_error[1]
         
-        # 验证Excel文件路径
-        if not ExcelUtil.validate_excel_path(file_path):
-            return jsonify({"success": False, "message": f"无效的Excel文件路径: {file_path}"}), 400
+        job = import_job_service.submit(data, _execute_excel_import)
+        return jsonify({
+            "success": True,
+            "message": "导入任务已提交",
+            "job_id": job.job_id,
+            "status": job.status
+        }), 202
+    
+    except Exception as e:
+        app_logger.error(f"提交导入任务失败: {str(e)}", exc_info=True)
+        return jsonify({
+            "success": False,
+            "message": f"提交导入任务失败: {str(e)}"
+        }), 500
+
+@import_api_bp.route('/api/import/excel/import/jobs', methods=['GET'])
+def list_import_jobs():
+    """获取后台导入任务列表
+    
+    Returns:
+        JSON: 任务概要列表，不包含日志
+    """
+    try:
+        return jsonify({
+            "success": True,
+            "jobs": import_job_service.list_jobs()
+        })
+    except Exception as e:
+        app_logger.error(f"获取导入任务列表失败: {str(e)}", exc_info=True)
+        return jsonify({
+            "success": False,
+            "message": f"获取导入任务列表失败: {str(e)}"
+        }), 500
+
+@import_api_bp.route('/api/import/excel/import/jobs/<job_id>', methods=['GET'])
+def get_import_job(job_id):
+    """查询后台导入任务进度
+    
+    Query Parameters:
+        log_offset: 可选，已读取的日志条数，只返回之后新增的日志
         
-        # 解析sheet_id获取sheet名称和索引
-        try:
-            sheet_name, sheet_index = ExcelUtil.parse_sheet_id(sheet_id)
-        except Exception as e:
-            app_logger.error(f"解析sheet_id失败: {str(e)}")
-            return jsonify({"success": False, "message": f"无效的工作表ID: {sheet_id}"}), 400
+    Returns:
+        JSON: 任务状态、阶段、进度、每秒行数、增量日志；任务结束后result为最终导入结果
+    """
+    try:
+        log_offset = request.args.get('log_offset', 0, type=int)
+        job = import_job_service.get_job(job_id)
+        return jsonify({
+            "success": True,
+            **job.to_dict(log_offset=max(log_offset, 0))
+        })
+    except AppException as e:
+        return jsonify({"success": False, "message": e.message}), e.code
+    except Exception as e:
+        app_logger.error(f"查询导入任务失败: {str(e)}", exc_info=True)
+        return jsonify({
+            "success": False,
+            "message": f"查询导入任务失败: {str(e)}"
+        }), 500
+
+@import_api_bp.route('/api/import/excel/import/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_import_job(job_id):
+    """取消后台导入任务
+    
+    正在写入的批次完成后停止，已提交的批次不会回滚
+    
+    Returns:
+        JSON: 任务当前状态
+    """
+    try:
+        job = import_job_service.cancel(job_id)
+        return jsonify({
+            "success": True,
+            "message": "导入任务已结束" if job.finished else "已请求取消导入任务",
+            "job_id": job.job_id,
+            "status": job.status
+        })
+    except AppException as e:
+        return jsonify({"success": False, "message": e.message}), e.code
+    except Exception as e:
+        app_logger.error(f"取消导入任务失败: {str(e)}", exc_info=True)
+        return jsonify({
+            "success": False,
+            "message": f"取消导入任务失败: {str(e)}"
+        }), 500
+
+@import_api_bp.route('/api/import/excel/batch-import', methods=['POST'])
+def submit_batch_import_job():
+    """提交多文件批量导入任务
+    
+    多个Excel文件在进程池中并行解析，解析结果由多个数据库连接并发写入同一张表。
+    任务进度和每个文件的导入结果通过/api/import/excel/import/jobs/<job_id>查询。
+    
+    Request Body:
+        database_id: 数据库ID
+        table_id: 表ID
+        files: 文件列表，每项为文件路径，或包含file_path及可选sheet_id、start_row、condition、supplements的对象
+        sheet_id: 可选，文件未指定时使用的工作表ID
+        start_row: 可选，文件未指定时使用的开始导入行
+        condition: 可选，文件未指定时使用的导入条件
+        supplements: 可选，文件未指定时使用的补充字段列表
+        batch_size: 可选，每个事务提交的行数
+        parse_workers: 可选，解析进程数
+        writer_connections: 可选，并发写入连接数
         
-        # 获取数据库配置
-        db_config = DatabaseConfigUtil.get_database_config(database_id)
-        if not db_config:
-            return jsonify({"success": False, "message": f"找不到数据库类型 '{database_id}' 的配置"}), 404
+    Returns:
+        JSON: 包含job_id的JSON对象
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({
+                "success": False,
+                "message": "未提供请求数据"
+            }), 400
         
-        # 开始执行导入过程
-        start_time = time.time()
+        app_logger.info(f"提交批量导入任务，表: {data.get('table_id')}, 文件数: {len(data.get('files') or [])}")
         
-        app_logger.info(f"开始导入Excel数据到数据库，文件: {file_path}, 表: {table_id}")
-        addLog = []  # 用于存储导入过程中的日志
+        if not data.get('database_id'):
+            return jsonify({"success": False, "message": "未指定数据库ID"}), 400
         
-        # 添加日志记录
-        addLog.append({"type": "info", "message": f"开始读取Excel文件: {os.path.basename(file_path)}"})
+        if not data.get('table_id'):
+            return jsonify({"success": False, "message": "未指定表ID"}), 400
         
-        # 读取Excel数据
-        try:
-            excel_data = ExcelUtil.read_excel_data(
-                file_path=file_path, 
-                sheet_name=sheet_name, 
-                start_row=start_row-1, 
-                row_limit=None,
-                ignore_empty_rows=True  # 添加参数，忽略全空行
-            )
-            total_rows = len(excel_data)
-            addLog.append({"type": "info", "message": f"成功读取Excel数据，共{total_rows}行（已忽略空行）"})
-        except Exception as e:
-            app_logger.error(f"读取Excel数据失败: {str(e)}", exc_info=True)
-            return jsonify({
-                "success": False,
-                "message": "读取Excel数据失败",
-                "error": {
-                    "message": str(e)
-                }
-            }), 500
+        if not DatabaseConfigUtil.get_database_config(data.get('database_id')):
+            return jsonify({"success": False, "message": f"找不到数据库类型 '{data.get('database_id')}' 的配置"}), 404
         
-        # 如果没有数据，返回错误
-        if not excel_data or len(excel_data) == 0:
-            return jsonify({
-                "success": False,
-                "message": "Excel文件中没有数据",
-                "total_rows": 0
-            }), 400
+        for key, label in (('batch_size', '每批提交行数'), ('parse_workers', '解析进程数'),
+                           ('writer_connections', '写入连接数')):
+            param_error = _normalize_positive_int(data, key, label)
+            if param_error:
+                return jsonify(param_error[0]), param_error[1]
         
-        # 获取表结构信息
-        try:
-            table_fields = db_service.get_table_field_info(database_id, db_config, table_id)
-            addLog.append({"type": "info", "message": f"获取表 {table_id} 的字段信息，共{len(table_fields)}个字段"})
-        except Exception as e:
-            app_logger.error(f"获取表结构信息失败: {str(e)}", exc_info=True)
-            return jsonify({
-                "success": False,
-                "message": "获取表结构信息失败",
-                "error": {
-                    "message": str(e)
-                }
-            }), 500
+        # 提交前校验文件列表，避免任务启动后才发现参数错误
+        batch_import_service.normalize_file_tasks(data)
         
-        try:
-            # 应用条件筛选
-            filtered_data = []
-            if condition and condition.get('column') is not None and condition.get('type'):
-                column_index = int(condition['column'])
-                condition_type = condition['type']
-                
-                addLog.append({"type": "info", "message": f"应用筛选条件: {condition.get('column_name')} {condition.get('type_name')}"})
-                
-                for row in excel_data:
-                    # 确保行数据长度足够
-                    if len(row) > column_index:
-                        cell_value = row[column_index]
-                        
-                        # 应用条件
-                        if condition_type == 'empty' and (cell_value is None or cell_value == ''):
-                            filtered_data.append(row)
-                        elif condition_type == 'not_empty' and (cell_value is not None and cell_value != ''):
-                            filtered_data.append(row)
-                        # 可以根据需要添加更多条件类型
-                    else:
-                        # 如果行数据不够长，忽略这一行
-                        continue
-                
-                addLog.append({"type": "info", "message": f"筛选后保留{len(filtered_data)}行数据"})
-            else:
-                # 没有条件，使用所有数据
-                filtered_data = excel_data
-                addLog.append({"type": "info", "message": f"未设置筛选条件，使用所有{len(filtered_data)}行数据"})
-            
-            # 记录数据处理信息
-            app_logger.info("开始处理数据，将对字符串类型的数据去除前后空白字符")
-            addLog.append({"type": "info", "message": "对字符串类型的数据自动去除前后空白字符"})
-            
-            # 准备导入数据
-            prepared_data = []
-            
-            # 转换数据格式: 从行列表转为字段映射字典
-            for row_data in filtered_data:
-                row_dict = {}
-                # 将Excel列数据映射到表字段
-                for col_index, field in enumerate(table_fields):
-                    if col_index < len(row_data):
-                        # 获取单元格值
-                        cell_value = row_data[col_index]
-                        # 处理字符串类型的值：去除前后多余的空白
-                        if isinstance(cell_value, str):
-                            cell_value = cell_value.strip()
-                        row_dict[field['name']] = cell_value
-                prepared_data.append(row_dict)
-            
-            # 准备补充字段
-            prepared_supplements = []
-            for supplement in supplements:
-                if supplement.get('enabled') and supplement.get('column') is not None and 'value' in supplement:
-                    column_index = int(supplement['column'])
-                    if column_index < len(table_fields):
-                        field_name = table_fields[column_index]['name']
-                        prepared_supplements.append({
-                            'enabled': True,
-                            'name': field_name,
-                            'column_name': supplement.get('column_name', f"列{column_index}"),
-                            'value': supplement['value']
-                        })
-            
-            # 开始导入数据
-            addLog.append({"type": "info", "message": f"开始导入数据到表 {table_id}"})
-            
-            # 使用数据库服务的execute_sql方法执行数据导入
-            success_count = 0
-            error_count = 0
-            failed_row = None
-            error_message = None
-            
-            try:
-                # 分批处理数据，每批200条
-                batch_size = 200
-                total_rows = len(prepared_data)
-                
-                for batch_index in range(0, total_rows, batch_size):
-                    try:
-                        # 获取当前批次的数据
-                        end_index = min(batch_index + batch_size, total_rows)
-                        current_batch = prepared_data[batch_index:end_index]
-                        
-                        if not current_batch:
-                            continue
-                            
-                        # 处理补充字段
-                        if prepared_supplements:
-                            for row_data in current_batch:
-                                for supplement in prepared_supplements:
-                                    if supplement.get('enabled') and 'value' in supplement:
-                                        field_name = supplement.get('name')
-                                        value = supplement['value']
-                                        # 处理字符串类型的补充字段值：去除前后多余的空白
-                                        if isinstance(value, str):
-                                            value = value.strip()
-                                        if field_name:
-                                            row_data[field_name] = value
-                        
-                        # 获取字段列表（从第一行获取）
-                        fields = list(current_batch[0].keys())
-                        fields_str = ', '.join([f"`{key}`" for key in fields])
-                        
-                        # 构建批量插入的VALUES部分
-                        values_list = []
-                        
-                        for row_data in current_batch:
-                            # 格式化每一行的值
-                            row_values = []
-                            for field in fields:
-                                val = row_data.get(field)
-                                if val is None:
-                                    row_values.append("NULL")
-                                elif isinstance(val, (int, float)):
-                                    row_values.append(str(val))
-                                else:
-                                    escaped_val = str(val).replace("'", "''")
-                                    row_values.append(f"'{escaped_val}'")
-                            
-                            # 添加当前行的值
-                            values_list.append(f"({', '.join(row_values)})")
-                        
-                        # 构建批量插入SQL
-                        insert_sql = f"INSERT INTO {table_id} ({fields_str}) VALUES {', '.join(values_list)}"
-                        
-                        # 执行批量插入
-                        result = db_service.execute_sql(
-                            db_type=database_id,
-                            config=db_config,
-                            sql=text(insert_sql),
-                            params=()
-                        )
-                        
-                        # 更新成功计数
-                        success_count += len(current_batch)
-                        
-                        # 记录进度
-                        progress_percent = int((end_index / total_rows) * 100)
-                        addLog.append({"type": "info", "message": f"已批量导入至第 {end_index} 行 ({progress_percent}%)"})
-                        app_logger.info(f"导入进度: {progress_percent}%, 已处理{end_index}行")
-                        
-                        # 尝试执行显式提交
-                        try:
-                            commit_sql = text("COMMIT")
-                            db_service.execute_sql(
-                                db_type=database_id,
-                                config=db_config,
-                                sql=commit_sql,
-                                params=()
-                            )
-                            app_logger.debug(f"在批次 {batch_index}-{end_index} 后执行了显式COMMIT")
-                        except Exception as commit_error:
-                            app_logger.warning(f"显式提交可能失败: {str(commit_error)}")
-                            
-                    except Exception as e:
-                        # 记录错误信息
-                        error_count += (end_index - batch_index)
-                        failed_row = batch_index
-                        error_message = str(e)
-                        app_logger.error(f"导入批次 {batch_index}-{end_index} 失败: {error_message}", exc_info=True)
-                        addLog.append({"type": "error", "message": f"导入第 {batch_index+1}-{end_index} 行数据失败: {error_message}"})
-                        
-                        # 出错时停止后续导入
-                        raise
-                
-                # 记录完成信息
-                app_logger.info(f"数据导入成功，共{success_count}行")
-                
-            except Exception as e:
-                # 如果不是已处理的错误，记录为未处理的异常
-                if failed_row is None:
-                    app_logger.error(f"导入过程中发生未处理的异常: {str(e)}", exc_info=True)
-                    addLog.append({"type": "error", "message": f"导入过程中发生未处理的异常: {str(e)}"})
-                    error_count = 1
-                    error_message = str(e)
-                
-            # 计算总耗时
-            duration = round(time.time() - start_time, 2)
-            
-            # 处理导入结果
-            if error_count == 0:
-                # 添加一个验证查询，确认数据确实已经写入
-                try:
-                    # 构建简单查询以验证数据
-                    verify_sql = text(f"SELECT COUNT(*) FROM {table_id}")
-                    verify_result = db_service.execute_sql(
-                        db_type=database_id,
-                        config=db_config,
-                        sql=verify_sql
-                    )
-                    
-                    # 提取记录数
-                    count_row = next(iter(verify_result['rows']), None)
-                    record_count = count_row[0] if count_row else 0
-                    
-                    addLog.append({"type": "info", "message": f"验证查询: 表 {table_id} 中共有 {record_count} 条记录"})
-                    app_logger.info(f"导入后验证查询: 表 {table_id} 中共有 {record_count} 条记录")
-                    
-                except Exception as e:
-                    app_logger.error(f"验证查询失败: {str(e)}", exc_info=True)
-                    addLog.append({"type": "warning", "message": f"无法验证数据是否成功写入: {str(e)}"})
-                
-                # 导入完成后的记录
-                addLog.append({"type": "info", "message": f"导入完成，共导入{success_count}行数据，耗时{duration}秒"})
-                app_logger.info(f"Excel导入完成，成功:{success_count}, 失败:{error_count}, 耗时:{duration}秒")
-                
-                # 返回成功响应
-                return jsonify({
-                    "success": True,
-                    "message": "数据导入成功",
-                    "success_count": success_count,
-                    "error_count": error_count,
-                    "total_rows": len(filtered_data),
-                    "details": {
-                        "duration": duration
-                    },
-                    "logs": addLog
-                })
-            else:
-                # 处理导入失败的情况
-                current_row = failed_row + start_row if failed_row is not None else None
-                
-                addLog.append({"type": "error", "message": f"导入数据过程中出错: {error_message}"})
-                if current_row is not None:
-                    addLog.append({"type": "error", "message": f"错误发生在第 {current_row} 行"})
-                
-                return jsonify({
-                    "success": False,
-                    "message": "导入数据过程中出错",
-                    "error": {
-                        "row": current_row,
-                        "message": error_message
-                    },
-                    "processed_rows": failed_row,
-                    "success_count": success_count,
-                    "error_count": error_count,
-                    "total_rows": len(filtered_data),
-                    "logs": addLog
-                }), 500
-        except Exception as e:
-            error_msg = str(e)
-            app_logger.error(f"Excel导入过程中发生未处理的异常: {error_msg}", exc_info=True)
-            addLog.append({"type": "error", "message": f"导入过程中发生异常: {error_msg}"})
-            
-            return jsonify({
-                "success": False,
-                "message": "导入过程中发生异常",
-                "error": {
-                    "message": error_msg
-                },
-                "total_rows": len(filtered_data),
-                "logs": addLog
-            }), 500
+        job = import_job_service.submit(data, batch_import_service.run)
+        return jsonify({
+            "success": True,
+            "message": "批量导入任务已提交",
+            "job_id": job.job_id,
+            "status": job.status
+        }), 202
     
+    except AppException as e:
+        return jsonify({"success": False, "message": e.message}), e.code
     except Exception as e:
-        error_msg = str(e)
-        app_logger.error(f"Excel导入API异常: {error_msg}", exc_info=True)
-        
+        app_logger.error(f"提交批量导入任务失败: {str(e)}", exc_info=True)
         return jsonify({
             "success": False,
-            "message": "导入过程中发生异常",
-            "error": {
-                "message": error_msg
-            }
-        }), 500 
\ No newline at end of file
+            "message": f"提交批量导入任务失败: {str(e)}"
+        }), 500
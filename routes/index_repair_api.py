@@ -45,6 +45,7 @@ def generate_sql():
     - target_field: 目标字段 (可选)
     - operation_type: 操作类型 (可选)
     - template_id: 模板ID (不再需要)
+    - use_cache: 是否使用响应缓存 (可选，默认false)，相同参数直接返回缓存的SQL
     """
     try:
         # 获取请求参数
@@ -86,7 +87,7 @@ def generate_sql():
             if data.get('use_api', True):  # 默认使用API方式
                 # 使用API方式生成SQL
                 app_logger.info("使用API方式生成SQL")
-                result = dify_service.generate_repair_sql_via_api(dify_params)
+                result = dify_service.generate_repair_sql_via_api(dify_params, use_cache=data.get('use_cache', False))
                 
                 # API调用失败时直接返回错误，不使用本地生成作为备选
                 if not result.get('success'):
@@ -116,7 +117,8 @@ def generate_sql():
                     "success": True,
                     "message": "生成SQL成功",
                     "sql": generated_sql,
-                    "from_llm": False  # 不再是从大模型生成
+                    "from_llm": False,  # 不再是从大模型生成
+                    "cached": result.get('cached', False)
                 })
             else:
                 app_logger.error("dify服务返回的SQL内容为空")
@@ -136,6 +138,115 @@ def generate_sql():
         app_logger.error(f"生成数据修复SQL失败: {e}")
         return jsonify({'success': False, 'message': f'生成SQL失败: {str(e)}'}), 500
 
+@index_repair_bp.route('/generate_sql/batch', methods=['POST'])
+def generate_sql_batch():
+    """
+    批量生成数据修复SQL
+    请求体参数:
+    - items: 任务列表，每项参数同单个生成接口 (table_name、reference_field、target_field、operation_type、target_comment)
+    - use_cache: 是否使用响应缓存 (可选，默认false)
+
+    提交后台批量任务并立即返回job_id（202），每项并发调用dify API，单项失败不影响其他项；
+    进度和已完成项的结果通过/api/repair/generate_sql/batch/jobs/<job_id>查询，结果按提交顺序返回
+    """
+    from service.exception import AppException
+    try:
+        data = request.json
+        items = data.get('items') or []
+        use_cache = data.get('use_cache', False)
+        app_logger.info(f"接收到批量数据修复SQL生成请求，任务数: {len(items)}")
+
+        if not items:
+            return jsonify({'success': False, 'message': '生成任务不能为空'}), 400
+
+        db_type = DatabaseConfigUtil.get_default_db_type()
+
+        def generate_item(item):
+            table_name = item.get('table_name')
+            reference_field = item.get('reference_field')
+            if not table_name or not reference_field:
+                return {'success': False, 'message': '表名和参考字段不能为空', 'table_name': table_name,
+                        'reference_field': reference_field}
+
+            dify_params = {
+                'operation_type': item.get('operation_type', ''),
+                'table_name': table_name,
+                'reference_field': reference_field,
+                'target_field': item.get('target_field', ''),
+                'database_type': db_type,
+                'target_field_remark': item.get('target_comment', '')
+            }
+            result = dify_service.generate_repair_sql_via_api(dify_params, use_cache=use_cache)
+            if result.get('success') and not result.get('sql'):
+                result = {'success': False, 'message': '生成的SQL内容为空'}
+            item_result = {
+                'success': bool(result.get('success')),
+                'message': '生成SQL成功' if result.get('success') else f"生成SQL失败: {result.get('message')}",
+                'table_name': table_name,
+                'reference_field': reference_field,
+                'target_field': dify_params['target_field']
+            }
+            if result.get('success'):
+                item_result['sql'] = result['sql']
+                item_result['cached'] = result.get('cached', False)
+            return item_result
+
+        from service.common.llm_batch_service import submit_batch
+        job = submit_batch('dify', items, generate_item, "批量生成数据修复SQL")
+
+        return jsonify({
+            'success': True,
+            'message': f"已提交批量生成任务，共{len(items)}条",
+            'job_id': job.job_id,
+            'total': len(items)
+        }), 202
+
+    except AppException as e:
+        return jsonify({'success': False, 'message': e.message}), e.code
+    except Exception as e:
+        app_logger.error(f"批量生成数据修复SQL失败: {e}")
+        return jsonify({'success': False, 'message': f'批量生成SQL失败: {str(e)}'}), 500
+
+@index_repair_bp.route('/generate_sql/batch/jobs/<job_id>', methods=['GET'])
+def get_generate_sql_batch_job(job_id):
+    """
+    查询批量生成数据修复SQL任务进度
+    查询参数:
+    - log_offset: 已读取的日志条数 (可选)，只返回之后新增的日志
+
+    details为每项的状态(pending/completed/failed)和结果，任务结束后result为汇总结果
+    """
+    from service.exception import AppException
+    from service.common.llm_batch_service import batch_jobs
+    try:
+        log_offset = request.args.get('log_offset', 0, type=int)
+        job = batch_jobs.get_job(job_id)
+        return jsonify({'success': True, **job.to_dict(log_offset=max(log_offset, 0))})
+    except AppException as e:
+        return jsonify({'success': False, 'message': e.message}), e.code
+    except Exception as e:
+        app_logger.error(f"查询批量生成任务失败: {e}")
+        return jsonify({'success': False, 'message': f'查询批量生成任务失败: {str(e)}'}), 500
+
+@index_repair_bp.route('/generate_sql/batch/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_generate_sql_batch_job(job_id):
+    """取消批量生成数据修复SQL任务，已开始的项会执行完"""
+    from service.exception import AppException
+    from service.common.llm_batch_service import batch_jobs
+    try:
+        job = batch_jobs.cancel(job_id)
+        return jsonify({
+            'success': True,
+            'message': '批量生成任务已结束' if job.finished else '已请求取消批量生成任务',
+            'job_id': job.job_id,
+            'status': job.status
+        })
+    except AppException as e:
+        return jsonify({'success': False, 'message': e.message}), e.code
+    except Exception as e:
+        app_logger.error(f"取消批量生成任务失败: {e}")
+        return jsonify({'success': False, 'message': f'取消批量生成任务失败: {str(e)}'}), 500
+
 @index_repair_bp.route('/execute_sql', methods=['POST'])
 def execute_sql():
     """
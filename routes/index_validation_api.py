@@ -4,12 +4,16 @@
 负责处理与数据校验相关的API请求
 """
 
+import json
 from flask import Blueprint, request, jsonify
 from service.log.logger import app_logger
 from service.prompt_templates.index_prompt_templates_service import PromptTemplateService
 from utils.database_config_util import DatabaseConfigUtil
 from sqlalchemy import text
 from service.database.database_service import DatabaseService
+from service.exception import AppException
+from service.validation.rule_engine import VALIDATION_RULES, build_invalid_rows_sql, list_rules
+from service.validation.rule_validation_service import RuleValidationService
 
 # 创建蓝图
 index_validation_bp = Blueprint('index_validation_api', __name__, url_prefix='/api/validation')
@@ -20,20 +24,23 @@ template_service = PromptTemplateService()
 # 创建数据库服务实例
 db_service = DatabaseService()
 
+# 创建规则校验服务实例
+rule_validation_service = RuleValidationService(db_service)
+
 @index_validation_bp.route('/tables', methods=['GET'])
 def get_tables():
     """获取表列表"""
     app_logger.info("获取表列表")
     
     try:
-        # 此处应该添加连接数据库并查询表列表的逻辑
-        # 实际项目中，这里会查询数据库获取真实的表列表
-        # 以下为模拟数据
-        tables = [
-            {"name": "table1", "comment": "用户表"},
-            {"name": "table2", "comment": "订单表"},
-            {"name": "table3", "comment": "产品表"}
-        ]
+        # 获取当前数据库连接信息
+        db_type = DatabaseConfigUtil.get_default_db_type()
+        db_config = DatabaseConfigUtil.get_database_config(db_type)
+        
+        if not db_config:
+            return jsonify({"message": "获取数据库配置失败", "success": False, "tables": []}), 500
+        
+        tables = db_service.get_database_tables(db_type, db_config)
         
         return jsonify({"message": "获取表列表成功", "success": True, "tables": tables})
     except Exception as e:
@@ -46,41 +53,186 @@ def get_fields(table_name):
     app_logger.info(f"获取表 {table_name} 的字段")
     
     try:
-        # 此处应该添加连接数据库并查询表字段的逻辑
-        # 实际项目中，这里会查询数据库获取真实的字段列表
-        # 以下为模拟数据
-        fields = []
-        
-        if table_name == "table1":
-            fields = [
-                {"name": "id", "type": "int", "comment": "ID"},
-                {"name": "name", "type": "varchar", "comment": "姓名"},
-                {"name": "id_card", "type": "varchar", "comment": "身份证号"},
-                {"name": "birth_date", "type": "date", "comment": "出生日期"},
-                {"name": "create_time", "type": "datetime", "comment": "创建时间"}
-            ]
-        elif table_name == "table2":
-            fields = [
-                {"name": "order_id", "type": "varchar", "comment": "订单ID"},
-                {"name": "customer_id", "type": "int", "comment": "客户ID"},
-                {"name": "order_date", "type": "date", "comment": "下单日期"},
-                {"name": "ship_date", "type": "date", "comment": "发货日期"},
-                {"name": "status", "type": "varchar", "comment": "订单状态"}
-            ]
-        elif table_name == "table3":
-            fields = [
-                {"name": "product_id", "type": "varchar", "comment": "产品ID"},
-                {"name": "product_name", "type": "varchar", "comment": "产品名称"},
-                {"name": "launch_date", "type": "date", "comment": "上市日期"},
-                {"name": "producer_code", "type": "varchar", "comment": "生产商代码"},
-                {"name": "price", "type": "decimal", "comment": "价格"}
-            ]
+        # 获取当前数据库连接信息
+        db_type = DatabaseConfigUtil.get_default_db_type()
+        db_config = DatabaseConfigUtil.get_database_config(db_type)
+        
+        if not db_config:
+            return jsonify({"message": "获取数据库配置失败", "success": False, "fields": []}), 500
+        
+        fields = db_service.get_table_field_info(db_type, db_config, table_name)
         
         return jsonify({"message": f"获取表 {table_name} 字段成功", "success": True, "fields": fields})
     except Exception as e:
         app_logger.error(f"获取表 {table_name} 字段失败: {str(e)}")
         return jsonify({"message": f"获取表 {table_name} 字段失败: {str(e)}", "success": False, "fields": []}), 500
 
+@index_validation_bp.route('/rules', methods=['GET'])
+def get_rules():
+    """获取内置校验规则列表"""
+    return jsonify({"message": "获取校验规则成功", "success": True, "rules": list_rules()})
+
+@index_validation_bp.route('/rule_check', methods=['POST'])
+def rule_check():
+    """按内置规则校验表数据，不调用大模型
+    
+    请求体参数:
+    - tableName: 表名
+    - checks: 校验项列表，每项包含fieldName、rule和可选的params（如日期的formats、金额的scale）
+    - sampleSize: 每条规则返回的不合规示例数 (可选，默认5)
+    
+    同一张表的所有规则在一条聚合SQL中完成统计，只对有不合规数据的规则查询示例
+    """
+    app_logger.info("规则校验请求")
+    
+    try:
+        data = request.json
+        table_name = data.get('tableName')
+        checks = [{"field": check.get('fieldName'), "rule": check.get('rule'), "params": check.get('params')}
+                  for check in data.get('checks') or []]
+        sample_size = int(data.get('sampleSize', 5))
+        
+        db_type = DatabaseConfigUtil.get_default_db_type()
+        db_config = DatabaseConfigUtil.get_database_config(db_type)
+        
+        if not db_config:
+            return jsonify({"success": False, "message": "获取数据库配置失败"}), 500
+        
+        result = rule_validation_service.validate_table(db_type, db_config, table_name, checks, sample_size)
+        
+        return jsonify({"success": True, "message": "规则校验完成", "results": result})
+    except AppException as e:
+        app_logger.error(f"规则校验失败: {e.message}")
+        return jsonify({"success": False, "message": e.message, "details": e.details}), e.code
+    except Exception as e:
+        app_logger.error(f"规则校验失败: {str(e)}")
+        return jsonify({"success": False, "message": f"规则校验失败: {str(e)}"}), 500
+
+def generate_validation_sql(table_name, field_name, validation_type, template_id, db_type, use_cache=False,
+                            rule_fallback=True):
+    """调用默认模型生成单个字段的校验SQL，模型不可用时使用规则引擎生成的SQL
+    
+    批量生成时rule_fallback为False：模型调用失败（包括排队超时）直接返回失败，
+    避免未经模型生成的项也被计为成功。
+    
+    Returns:
+        tuple: (结果字典, HTTP状态码)
+    """
+    try:
+        # 导入模型服务
+        from service.common.model_common_service import model_service
+        
+        # 获取默认模型信息
+        default_model = model_service.get_default_model()
+        if not default_model:
+            app_logger.error("没有找到默认模型配置")
+            raise Exception("没有找到默认模型配置，请先设置默认模型")
+        
+        # 获取模型服务提供商ID和模型ID
+        provider_id = default_model.get('provider_id')
+        model_id = default_model.get('id')
+        model_name = default_model.get('name', '').lower()
+        
+        app_logger.info(f"使用默认模型生成校验SQL: 提供商 {provider_id}, 模型 {model_id}")
+        
+        # 3. 获取提示词模板
+        system_prompt = ""
+        user_prompt_template = ""
+        
+        if template_id:
+            try:
+                # 使用模板服务获取模板内容
+                template = template_service.load_template_from_file(template_id)
+                
+                if not template:
+                    error_msg = f"未找到ID为 {template_id} 的模板"
+                    app_logger.error(error_msg)
+                    return {"success": False, "message": error_msg}, 404
+                
+                # 解析模板内容
+                template_content = json.loads(template.get('content', '{}'))
+                
+                system_prompt = template_content.get('system', '')
+                user_prompt_template = template_content.get('user', '')
+                
+            except Exception as e:
+                error_msg = f"获取提示词模板失败: {str(e)}"
+                app_logger.error(error_msg)
+                return {"success": False, "message": error_msg}, 500
+        
+        # 组装新的用户提示词
+        base_prompt = f"{user_prompt_template}\n\n表名：{table_name}\n字段名：{field_name}\n校验类型：{validation_type}\n数据库类型：{db_type}"
+        
+        # 判断是否为Qwen3模型，如果是则添加/no_think
+        if 'qwen3' in model_id.lower() or 'qwen3' in model_name:
+            user_prompt = f"{base_prompt} /no_think"
+            app_logger.info("检测到Qwen3模型，添加/no_think指令")
+        else:
+            user_prompt = base_prompt
+            app_logger.info(f"非Qwen3模型({model_id})，不添加/no_think指令")
+        
+        # 如果系统提示词为空，使用默认系统提示词
+        if not system_prompt:
+            system_prompt = "你是一位专业的数据库专家，精通各种数据库系统（MySQL、SQL Server、Oracle等）的SQL语法。你的任务是生成用于数据校验的SQL查询语句，以识别出不符合要求的数据记录。请仅返回SQL代码，不要包含任何多余的解释。"
+        
+        # 准备消息格式
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+        
+        # 参数
+        options = {
+            "temperature": 0.1
+        }
+        
+        # 调用模型
+        result = model_service.chat_completion(provider_id, model_id, messages, options, use_cache=use_cache)
+        
+        # 检查是否有错误
+        if "error" in result:
+            app_logger.error(f"模型生成SQL失败: {result.get('error')}")
+            raise Exception(f"模型生成SQL失败: {result.get('error')}")
+        
+        # 提取生成的内容
+        generated_sql = result.get("choices", [{}])[0].get("message", {}).get("content", "")
+        
+        if generated_sql:
+            return {
+                "success": True,
+                "message": "生成SQL成功",
+                "sql": generated_sql,
+                "from_llm": True,
+                "cached": result.get("cached", False)
+            }, 200
+        else:
+            app_logger.error("模型返回的SQL内容为空")
+            raise Exception("模型返回的SQL内容为空")
+            
+    except Exception as e:
+        app_logger.error(f"调用默认模型失败: {str(e)}")
+        
+        if not rule_fallback:
+            return {"success": False, "message": f"调用默认模型失败: {str(e)}", "from_llm": False}, 502
+        
+        # 使用规则引擎按当前数据库方言生成SQL作为后备方案
+        app_logger.info("使用规则引擎生成的SQL作为后备方案")
+        
+        if validation_type not in VALIDATION_RULES:
+            return {"success": False, "message": "不支持的校验类型"}, 400
+        
+        try:
+            sql = build_invalid_rows_sql(db_type, table_name, field_name, validation_type)
+        except AppException as rule_error:
+            return {"success": False, "message": rule_error.message}, rule_error.code
+        
+        return {
+            "success": True,
+            "message": "生成SQL成功 (使用规则引擎)",
+            "sql": sql,
+            "from_llm": False
+        }, 200
+
 @index_validation_bp.route('/generate_sql', methods=['POST'])
 def generate_sql():
     """生成校验SQL"""
@@ -93,6 +245,7 @@ def generate_sql():
         field_name = data.get('fieldName')
         validation_type = data.get('validationType')
         template_id = data.get('templateId')
+        use_cache = data.get('useCache', False)  # 显式启用时相同表、字段、校验类型和模板直接返回缓存的SQL
         
         # 验证基本参数
         if not table_name:
@@ -112,144 +265,126 @@ def generate_sql():
         db_type = DatabaseConfigUtil.get_default_db_type()
         
         # 调用默认模型服务生成SQL
-        try:
-            # 导入模型服务
-            from service.common.model_common_service import model_service
-            
-            # 获取默认模型信息
-            default_model = model_service.get_default_model()
-            if not default_model:
-                app_logger.error("没有找到默认模型配置")
-                raise Exception("没有找到默认模型配置，请先设置默认模型")
-            
-            # 获取模型服务提供商ID和模型ID
-            provider_id = default_model.get('provider_id')
-            model_id = default_model.get('id')
-            model_name = default_model.get('name', '').lower()
-            
-            app_logger.info(f"使用默认模型生成校验SQL: 提供商 {provider_id}, 模型 {model_id}")
-            
-            # 3. 获取提示词模板
-            system_prompt = ""
-            user_prompt_template = ""
-            
-            if template_id:
-                try:
-                    # 使用模板服务获取模板内容
-                    template = template_service.load_template_from_file(template_id)
-                    
-                    if not template:
-                        error_msg = f"未找到ID为 {template_id} 的模板"
-                        app_logger.error(error_msg)
-                        return jsonify({"success": False, "message": error_msg}), 404
-                    
-                    # 解析模板内容
-                    import json
-                    template_content = json.loads(template.get('content', '{}'))
-                    
-                    system_prompt = template_content.get('system', '')
-                    user_prompt_template = template_content.get('user', '')
-                    
-                except Exception as e:
-                    error_msg = f"获取提示词模板失败: {str(e)}"
-                    app_logger.error(error_msg)
-                    return jsonify({"success": False, "message": error_msg}), 500
-            
-            # 组装新的用户提示词
-            base_prompt = f"{user_prompt_template}\n\n表名：{table_name}\n字段名：{field_name}\n校验类型：{validation_type}\n数据库类型：{db_type}"
-            
-            # 判断是否为Qwen3模型，如果是则添加/no_think
-            if 'qwen3' in model_id.lower() or 'qwen3' in model_name:
-                user_prompt = f"{base_prompt} /no_think"
-                app_logger.info("检测到Qwen3模型，添加/no_think指令")
-            else:
-                user_prompt = base_prompt
-                app_logger.info(f"非Qwen3模型({model_id})，不添加/no_think指令")
-            
-            # 如果系统提示词为空，使用默认系统提示词
-            if not system_prompt:
-                system_prompt = "你是一位专业的数据库专家，精通各种数据库系统（MySQL、SQL Server、Oracle等）的SQL语法。你的任务是生成用于数据校验的SQL查询语句，以识别出不符合要求的数据记录。请仅返回SQL代码，不要包含任何多余的解释。"
-            
-            # 准备消息格式
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ]
-            
-            # 参数
-            options = {
-                "temperature": 0.1
-            }
-            
-            # 调用模型
-            result = model_service.chat_completion(provider_id, model_id, messages, options)
-            
-            # 检查是否有错误
-            if "error" in result:
-                app_logger.error(f"模型生成SQL失败: {result.get('error')}")
-                raise Exception(f"模型生成SQL失败: {result.get('error')}")
-            
-            # 提取生成的内容
-            generated_sql = result.get("choices", [{}])[0].get("message", {}).get("content", "")
-            
-            if generated_sql:
-                return jsonify({
-                    "success": True,
-                    "message": "生成SQL成功",
-                    "sql": generated_sql,
-                    "from_llm": True
-                })
-            else:
-                app_logger.error("模型返回的SQL内容为空")
-                raise Exception("模型返回的SQL内容为空")
-                
-        except Exception as e:
-            app_logger.error(f"调用默认模型失败: {str(e)}")
-            
-            # 尝试使用预定义的SQL作为后备方案
-            app_logger.info("使用预定义SQL作为后备方案")
-            
-            # 根据校验类型生成SQL
-            sql = ""
-            
-            if validation_type == "idcard":
-                sql = f"""-- 身份证号码校验SQL
-SELECT * FROM {table_name} WHERE {field_name} IS NOT NULL AND (
-  -- 长度不是15位或18位
-  LENGTH({field_name}) NOT IN (15, 18)
-  -- 或者18位身份证格式不正确（最后一位校验码错误）
-  OR (LENGTH({field_name}) = 18 AND 
-      NOT REGEXP_LIKE({field_name}, '^[1-9]\\d{{5}}(19|20)\\d{{2}}(0[1-9]|1[0-2])(0[1-9]|[12]\\d|3[01])\\d{{3}}[0-9X]$')
-     )
-  -- 或者15位身份证格式不正确
-  OR (LENGTH({field_name}) = 15 AND 
-      NOT REGEXP_LIKE({field_name}, '^[1-9]\\d{{5}}\\d{{2}}(0[1-9]|1[0-2])(0[1-9]|[12]\\d|3[01])\\d{{3}}$')
-     )
-);"""
-            elif validation_type == "date":
-                sql = f"""-- 日期格式校验SQL
-SELECT * FROM {table_name} WHERE {field_name} IS NOT NULL AND (
-  -- 不符合YYYY-MM-DD格式
-  NOT REGEXP_LIKE({field_name}, '^\\d{{4}}-(0[1-9]|1[0-2])-(0[1-9]|[12]\\d|3[01])$')
-  -- 或者不符合YYYY/MM/DD格式
-  AND NOT REGEXP_LIKE({field_name}, '^\\d{{4}}/(0[1-9]|1[0-2])/(0[1-9]|[12]\\d|3[01])$')
-  -- 或者不符合YYYYMMDD格式
-  AND NOT REGEXP_LIKE({field_name}, '^\\d{{4}}(0[1-9]|1[0-2])(0[1-9]|[12]\\d|3[01])$')
-);"""
-            else:
-                return jsonify({"success": False, "message": "不支持的校验类型"}), 400
-            
-            return jsonify({
-                "success": True,
-                "message": "生成SQL成功 (使用预定义SQL)",
-                "sql": sql,
-                "from_llm": False
-            })
+        result, status_code = generate_validation_sql(table_name, field_name, validation_type, template_id,
+                                                      db_type, use_cache)
+        return jsonify(result), status_code
             
     except Exception as e:
         app_logger.error(f"生成校验SQL失败: {str(e)}")
         return jsonify({"success": False, "message": f"生成校验SQL失败: {str(e)}"}), 500
 
+@index_validation_bp.route('/generate_sql/batch', methods=['POST'])
+def generate_sql_batch():
+    """批量生成校验SQL
+
+    请求体参数:
+    - items: 任务列表，每项包含tableName、fieldName、validationType
+    - tables: 与items二选一，按矩阵展开，每项包含tableName、fieldNames列表、validationTypes列表
+    - templateId: 提示词模板ID
+    - useCache: 是否使用响应缓存 (可选，默认false)
+
+    提交后台批量任务并立即返回job_id（202），每项并发调用默认模型，单项失败不影响其他项；
+    模型调用失败的项记为失败，不使用规则引擎生成的SQL代替；
+    进度和已完成项的结果通过/api/validation/generate_sql/batch/jobs/<job_id>查询，结果按提交顺序返回
+    """
+    app_logger.info("批量生成校验SQL请求")
+
+    try:
+        data = request.json
+        template_id = data.get('templateId')
+        use_cache = data.get('useCache', False)
+
+        if not template_id:
+            return jsonify({"success": False, "message": "提示词模板不能为空"}), 400
+
+        items = list(data.get('items') or [])
+        for table in data.get('tables') or []:
+            for field_name in table.get('fieldNames') or []:
+                for validation_type in table.get('validationTypes') or []:
+                    items.append({
+                        "tableName": table.get('tableName'),
+                        "fieldName": field_name,
+                        "validationType": validation_type
+                    })
+
+        if not items:
+            return jsonify({"success": False, "message": "生成任务不能为空"}), 400
+
+        db_type = DatabaseConfigUtil.get_default_db_type()
+
+        from service.common.model_common_service import model_service
+        from service.common.llm_batch_service import submit_batch
+        default_model = model_service.get_default_model()
+        if not default_model:
+            return jsonify({"success": False, "message": "没有找到默认模型配置，请先设置默认模型"}), 400
+        provider_id = default_model.get('provider_id')
+
+        def generate_item(item):
+            table_name = item.get('tableName')
+            field_name = item.get('fieldName')
+            validation_type = item.get('validationType')
+            if not table_name or not field_name or not validation_type:
+                result = {"success": False, "message": "表名、字段名和校验类型不能为空"}
+            else:
+                result, _ = generate_validation_sql(table_name, field_name, validation_type, template_id,
+                                                    db_type, use_cache, rule_fallback=False)
+            result.update({"tableName": table_name, "fieldName": field_name, "validationType": validation_type})
+            return result
+
+        job = submit_batch(provider_id, items, generate_item, "批量生成校验SQL")
+
+        return jsonify({
+            "success": True,
+            "message": f"已提交批量生成任务，共{len(items)}条",
+            "job_id": job.job_id,
+            "total": len(items)
+        }), 202
+
+    except AppException as e:
+        return jsonify({"success": False, "message": e.message}), e.code
+    except Exception as e:
+        app_logger.error(f"批量生成校验SQL失败: {str(e)}")
+        return jsonify({"success": False, "message": f"批量生成校验SQL失败: {str(e)}"}), 500
+
+@index_validation_bp.route('/generate_sql/batch/jobs/<job_id>', methods=['GET'])
+def get_generate_sql_batch_job(job_id):
+    """查询批量生成校验SQL任务进度
+
+    Query Parameters:
+        log_offset: 可选，已读取的日志条数，只返回之后新增的日志
+
+    Returns:
+        JSON: 任务状态和进度，details为每项的状态(pending/completed/failed)和结果；任务结束后result为汇总结果
+    """
+    try:
+        from service.common.llm_batch_service import batch_jobs
+        log_offset = request.args.get('log_offset', 0, type=int)
+        job = batch_jobs.get_job(job_id)
+        return jsonify({"success": True, **job.to_dict(log_offset=max(log_offset, 0))})
+    except AppException as e:
+        return jsonify({"success": False, "message": e.message}), e.code
+    except Exception as e:
+        app_logger.error(f"查询批量生成任务失败: {str(e)}")
+        return jsonify({"success": False, "message": f"查询批量生成任务失败: {str(e)}"}), 500
+
+@index_validation_bp.route('/generate_sql/batch/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_generate_sql_batch_job(job_id):
+    """取消批量生成校验SQL任务，已开始的项会执行完"""
+    try:
+        from service.common.llm_batch_service import batch_jobs
+        job = batch_jobs.cancel(job_id)
+        return jsonify({
+            "success": True,
+            "message": "批量生成任务已结束" if job.finished else "已请求取消批量生成任务",
+            "job_id": job.job_id,
+            "status": job.status
+        })
+    except AppException as e:
+        return jsonify({"success": False, "message": e.message}), e.code
+    except Exception as e:
+        app_logger.error(f"取消批量生成任务失败: {str(e)}")
+        return jsonify({"success": False, "message": f"取消批量生成任务失败: {str(e)}"}), 500
+
 @index_validation_bp.route('/execute_sql', methods=['POST'])
 def execute_sql():
     """执行校验SQL"""
@@ -22,8 +22,12 @@ from service.knowledge_base.kb_service import (
     get_knowledge_item_by_id,
     detect_document_type, extract_text_from_document
 )
+from service.knowledge_base.kb_config import SEARCH_TYPES
+from service.knowledge_base.ingest_service import KBIngestService
+from service.exception import AppException
 from werkzeug.utils import secure_filename
 from service.common.model_common_service import ModelService
+from utils.sse_util import sse_event, sse_response
 
 # 创建知识库API蓝图
 knowledge_base_api = Blueprint('knowledge_base_api', __name__)
@@ -58,7 +62,11 @@ def allowed_file(filename):
 
 @knowledge_base_api.route('/api/knowledge_base/upload', methods=['POST'])
 def upload_files():
-    """文件上传到知识库接口"""
+    """文件上传到知识库接口
+    
+    保存文件后提交后台入库任务并立即返回job_id（202），
+    处理进度通过/api/knowledge_base/upload/jobs/<job_id>查询
+    """
     try:
         # 检查是否有文件
         if 'files[]' not in request.files:
@@ -85,72 +93,65 @@ def upload_files():
         else:
             custom_chunk_size = None
         
-        processed_files = []
-        
+        # 先检查全部文件类型，避免部分文件已入库后才发现不支持的文件
         for file in files:
-            if file and allowed_file(file.filename):
-                # 安全地获取文件名
-                original_filename = secure_filename(file.filename)
-                file_id = str(uuid.uuid4())
-                
-                # 确保文件扩展名被正确保留
-                name, ext = os.path.splitext(original_filename)
-                if not ext and '.' in original_filename:
-                    # 如果secure_filename处理后丢失了扩展名，尝试从原始文件名获取
-                    ext = os.path.splitext(file.filename)[1].lower()
-                
-                # 如果仍然没有扩展名，检查文件类型并添加适当的扩展名
-                if not ext:
-                    content_type = file.content_type
-                    print(f"[DEBUG] 文件内容类型: {content_type}")
-                    if 'word' in content_type:
-                        ext = '.docx'
-                    elif 'text/plain' in content_type:
-                        ext = '.txt'
-                
-                # 构建保存路径
-                saved_filename = f"{file_id}{ext}"
-                file_path = os.path.join('file/knowledge_base/documents', saved_filename)
-                
-                # 保存文件
-                file.save(file_path)
-                app_logger.info(f"文件保存成功: {file_path}")
-                print(f"[DEBUG] 文件已保存: {file_path}, 原始文件名: {original_filename}, 扩展名: {ext}")
-                
-                # 处理文件并添加到知识库
-                result = process_document(
-                    file_path, 
-                    chunking_strategy=chunking_strategy,
-                    custom_chunk_size=custom_chunk_size
-                )
-                
-                if result['success']:
-                    processed_files.append({
-                        'filename': original_filename,
-                        'id': file_id,
-                        'document_type': result['document_type'],
-                        'chunks_count': result['chunks_count']
-                    })
-                else:
-                    # 处理失败，删除已上传的文件
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
-                    
-                    return jsonify({
-                        'success': False,
-                        'message': f"处理文件 {original_filename} 失败: {result['message']}"
-                    }), 500
-            else:
+            if not file or not allowed_file(file.filename):
                 return jsonify({
                     'success': False,
                     'message': f"不支持的文件类型: {file.filename}"
                 }), 400
         
+        documents = []
+        
+        for file in files:
+            # 安全地获取文件名
+            original_filename = secure_filename(file.filename)
+            file_id = str(uuid.uuid4())
+            
+            # 确保文件扩展名被正确保留
+            name, ext = os.path.splitext(original_filename)
+            if not ext and '.' in original_filename:
+                # 如果secure_filename处理后丢失了扩展名，尝试从原始文件名获取
+                ext = os.path.splitext(file.filename)[1].lower()
+            
+            # 如果仍然没有扩展名，检查文件类型并添加适当的扩展名
+            if not ext:
+                content_type = file.content_type
+                print(f"[DEBUG] 文件内容类型: {content_type}")
+                if 'word' in content_type:
+                    ext = '.docx'
+                elif 'text/plain' in content_type:
+                    ext = '.txt'
+            
+            # 构建保存路径
+            saved_filename = f"{file_id}{ext}"
+            file_path = os.path.join('file/knowledge_base/documents', saved_filename)
+            
+            # 保存文件
+            file.save(file_path)
+            app_logger.info(f"文件保存成功: {file_path}")
+            print(f"[DEBUG] 文件已保存: {file_path}, 原始文件名: {original_filename}, 扩展名: {ext}")
+            
+            documents.append({
+                'id': file_id,
+                'filename': original_filename,
+                'file_path': file_path
+            })
+        
+        # 提交后台入库任务，提取、分块、嵌入和写入在流水线中并行完成
+        job = KBIngestService.get_instance().submit(
+            documents,
+            chunking_strategy=chunking_strategy,
+            custom_chunk_size=custom_chunk_size
+        )
+        
         return jsonify({
             'success': True,
-            'message': f"成功处理 {len(processed_files)} 个文件",
-            'files': processed_files
-        })
+            'message': f"已接收 {len(documents)} 个文件，正在后台处理",
+            'job_id': job.job_id,
+            'files': [{'filename': document['filename'], 'id': document['id'], 'status': 'queued'}
+                      for document in documents]
+        }), 202
     
     except Exception as e:
         app_logger.error(f"文件上传处理异常: {str(e)}")
@@ -160,6 +161,53 @@ def upload_files():
             'message': f"处理上传文件时发生错误: {str(e)}"
         }), 500
 
+@knowledge_base_api.route('/api/knowledge_base/upload/jobs/<job_id>', methods=['GET'])
+def get_upload_job(job_id):
+    """查询文档入库任务进度
+    
+    Query Parameters:
+        log_offset: 可选，已读取的日志条数，只返回之后新增的日志
+        
+    Returns:
+        JSON: 任务状态和进度，details为每个文档的状态(extracting/embedding/inserting/completed/failed/cancelled)、
+        文档类型和块数；任务结束后result为最终结果
+    """
+    try:
+        log_offset = request.args.get('log_offset', 0, type=int)
+        job = KBIngestService.get_instance().jobs.get_job(job_id)
+        return jsonify({
+            'success': True,
+            **job.to_dict(log_offset=max(log_offset, 0))
+        })
+    except AppException as e:
+        return jsonify({'success': False, 'message': e.message}), e.code
+    except Exception as e:
+        app_logger.error(f"查询文档入库任务失败: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f"查询文档入库任务失败: {str(e)}"
+        }), 500
+
+@knowledge_base_api.route('/api/knowledge_base/upload/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_upload_job(job_id):
+    """取消文档入库任务，已写入知识库的文档不会回滚"""
+    try:
+        job = KBIngestService.get_instance().jobs.cancel(job_id)
+        return jsonify({
+            'success': True,
+            'message': "入库任务已结束" if job.finished else "已请求取消入库任务",
+            'job_id': job.job_id,
+            'status': job.status
+        })
+    except AppException as e:
+        return jsonify({'success': False, 'message': e.message}), e.code
+    except Exception as e:
+        app_logger.error(f"取消文档入库任务失败: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f"取消文档入库任务失败: {str(e)}"
+        }), 500
+
 @knowledge_base_api.route('/api/knowledge_base/text', methods=['POST'])
 def add_text():
     """添加文本到知识库接口"""
@@ -217,6 +265,7 @@ def search():
     try:
         query = request.args.get('query', '').strip()
         filter_type = request.args.get('type', 'all')
+        search_type = request.args.get('search_type', 'semantic')
         limit = request.args.get('limit', 10)
         
         # 尝试将limit转换为整数
@@ -232,8 +281,14 @@ def search():
                 'message': '搜索查询不能为空'
             }), 400
         
+        if search_type not in SEARCH_TYPES:
+            return jsonify({
+                'success': False,
+                'message': f"不支持的搜索类型: {search_type}，可选值: {', '.join(SEARCH_TYPES)}"
+            }), 400
+        
         # 搜索知识库
-        results = search_knowledge_base(query, filter_type, limit)
+        results = search_knowledge_base(query, filter_type, limit, search_type)
         
         return jsonify({
             'success': True,
@@ -331,63 +386,61 @@ def delete_item(item_id):
             'message': f"删除知识库项目时发生错误: {str(e)}"
         }), 500
 
-@knowledge_base_api.route('/api/knowledge_base/chat', methods=['POST'])
-def knowledge_base_chat():
-    """
-    使用大模型结合知识库回答用户问题
-    请求参数:
-    - message: 用户消息
-    - history: 历史对话记录 (可选)
-    - search_type: 搜索类型，可选 'semantic'(默认) 或 'keyword'
-    - top_k: 检索的相关文档数量 (默认5)
-    - max_tokens: 响应的最大token数 (默认1000)
-    """
-    try:
-        # 获取并验证请求参数
-        data = request.get_json()
-        if not data or 'message' not in data:
-            return jsonify({'success': False, 'message': '缺少必要的参数: message'}), 400
-        
-        message = data.get('message').strip()
-        history = data.get('history', [])
-        search_type = data.get('search_type', 'semantic')  # 仍然保留这个参数，但不传给search_knowledge_base
-        top_k = int(data.get('top_k', 5))
-        max_tokens = int(data.get('max_tokens', 1000))
-        
-        # 记录日志
-        logger.info(f"知识库聊天请求: message={message}, search_type={search_type}, top_k={top_k}")
-        
-        if not message:
-            return jsonify({'success': False, 'message': '消息不能为空'}), 400
-        
-        # 在知识库中搜索相关内容 - 移除search_type参数
-        search_results = search_knowledge_base(message, limit=top_k)
-        
-        # 构建上下文信息
-        context_docs = []
-        sources = []
-        
-        for result in search_results:
-            content = result.get('content', '')
-            title = result.get('title', '')
-            item_id = result.get('item_id', '')
-            source_type = result.get('source_type', '')
-            
-            # 添加到上下文
-            context_docs.append(content)
-            
-            # 准备来源信息
-            source_info = {
-                'id': item_id,
-                'title': title,
-                'source_type': source_type,
-                'text': content[:200] + ('...' if len(content) > 200 else '')  # 限制长度
-            }
-            sources.append(source_info)
+def _prepare_kb_chat(data):
+    """校验知识库聊天请求，检索知识库并构建发送给模型的消息
+    
+    Returns:
+        dict: chat_messages(消息列表)、sources(来源信息)、provider_id、model_id、options
         
-        # 构建提示
-        context_text = "\n\n".join(context_docs)
-        system_prompt = f"""你是一个专业的审计和法律助手，基于给定的知识库内容回答用户问题。
+    Raises:
+        AppException: 参数错误(400)或没有默认模型配置(500)
+    """
+    if not data or 'message' not in data:
+        raise AppException('缺少必要的参数: message', code=400)
+    
+    message = data.get('message').strip()
+    history = data.get('history', [])
+    search_type = data.get('search_type', 'semantic')
+    top_k = int(data.get('top_k', 5))
+    max_tokens = int(data.get('max_tokens', 1000))
+    
+    # 记录日志
+    logger.info(f"知识库聊天请求: message={message}, search_type={search_type}, top_k={top_k}")
+    
+    if not message:
+        raise AppException('消息不能为空', code=400)
+    
+    if search_type not in SEARCH_TYPES:
+        raise AppException(f"不支持的搜索类型: {search_type}，可选值: {', '.join(SEARCH_TYPES)}", code=400)
+    
+    # 在知识库中搜索相关内容
+    search_results = search_knowledge_base(message, limit=top_k, search_type=search_type)
+    
+    # 构建上下文信息
+    context_docs = []
+    sources = []
+    
+    for result in search_results:
+        content = result.get('content', '')
+        title = result.get('title', '')
+        item_id = result.get('item_id', '')
+        source_type = result.get('source_type', '')
+        
+        # 添加到上下文
+        context_docs.append(content)
+        
+        # 准备来源信息
+        source_info = {
+            'id': item_id,
+            'title': title,
+            'source_type': source_type,
+            'text': content[:200] + ('...' if len(content) > 200 else '')  # 限制长度
+        }
+        sources.append(source_info)
+    
+    # 构建提示
+    context_text = "\n\n".join(context_docs)
+    system_prompt = f"""你是一个专业的审计和法律助手，基于给定的知识库内容回答用户问题。
 遵循以下规则：
 1. 只基于提供的知识库内容回答问题，不要编造信息
 2. 如果知识库内容不足以回答问题，坦诚告知用户
@@ -400,75 +453,93 @@ def knowledge_base_chat():
 {context_text}
 
 如果知识库中没有足够的信息，请明确告知用户"根据当前知识库内容，无法完整回答您的问题"，并建议用户如何调整问题或提供更多信息。"""
-        
-        # 准备对话历史
-        chat_messages = [{"role": "system", "content": system_prompt}]
-        
-        # 添加历史对话（除系统消息外）
-        if history and len(history) > 0:
-            # 跳过第一条系统消息，因为我们已经添加了自定义的系统消息
-            user_assistant_messages = []
-            for msg in history[1:] if history[0].get('role') == 'system' else history:
-                role = msg.get('role')
-                content = msg.get('content')
-                
-                # 只添加user和assistant角色的消息
-                if role in ['user', 'assistant'] and content:
-                    user_assistant_messages.append({"role": role, "content": content})
-            
-            # 限制历史消息数量，保留最近的消息
-            MAX_HISTORY_MESSAGES = 10  # 最多保留10轮对话
-            if len(user_assistant_messages) > MAX_HISTORY_MESSAGES:
-                # 保留最近的消息
-                app_logger.info(f"历史消息过多，裁剪为最近的{MAX_HISTORY_MESSAGES}条")
-                user_assistant_messages = user_assistant_messages[-MAX_HISTORY_MESSAGES:]
+    
+    # 准备对话历史
+    chat_messages = [{"role": "system", "content": system_prompt}]
+    
+    # 添加历史对话（除系统消息外）
+    if history and len(history) > 0:
+        # 跳过第一条系统消息，因为我们已经添加了自定义的系统消息
+        user_assistant_messages = []
+        for msg in history[1:] if history[0].get('role') == 'system' else history:
+            role = msg.get('role')
+            content = msg.get('content')
             
-            # 将保留的消息添加到chat_messages
-            chat_messages.extend(user_assistant_messages)
-        
-        # 添加当前用户消息
-        # 如果历史中已包含当前消息则不重复添加
-        if not history or history[-1].get('content') != message:
-            chat_messages.append({"role": "user", "content": message})
+            # 只添加user和assistant角色的消息
+            if role in ['user', 'assistant'] and content:
+                user_assistant_messages.append({"role": role, "content": content})
+        
+        # 限制历史消息数量，保留最近的消息
+        MAX_HISTORY_MESSAGES = 10  # 最多保留10轮对话
+        if len(user_assistant_messages) > MAX_HISTORY_MESSAGES:
+            # 保留最近的消息
+            app_logger.info(f"历史消息过多，裁剪为最近的{MAX_HISTORY_MESSAGES}条")
+            user_assistant_messages = user_assistant_messages[-MAX_HISTORY_MESSAGES:]
+        
+        # 将保留的消息添加到chat_messages
+        chat_messages.extend(user_assistant_messages)
+    
+    # 添加当前用户消息
+    # 如果历史中已包含当前消息则不重复添加
+    if not history or history[-1].get('content') != message:
+        chat_messages.append({"role": "user", "content": message})
+    
+    # 获取默认模型信息
+    default_model = model_service.get_default_model()
+    if not default_model:
+        app_logger.error("没有找到默认模型配置")
+        raise AppException('没有找到默认模型配置，请先设置默认模型', code=500)
+    
+    # 获取模型服务提供商ID和模型ID
+    provider_id = default_model.get('provider_id')
+    model_id = default_model.get('id')
+    model_name = default_model.get('name', '').lower()
+    
+    app_logger.info(f"使用默认模型回答知识库问题: 提供商 {provider_id}, 模型 {model_id}")
+    
+    options = {
+        "temperature": 0.7,
+        "top_p": 0.95,
+        "max_tokens": max_tokens
+    }
+    
+    # 判断是否为Qwen3模型，如果是则添加/no_think指令
+    if 'qwen3' in model_id.lower() or 'qwen3' in model_name:
+        app_logger.info("检测到Qwen3模型，添加/no_think指令")
+        # 修改最后一条用户消息
+        if chat_messages[-1]['role'] == 'user':
+            chat_messages[-1]['content'] += " /no_think"
+    
+    return {
+        'chat_messages': chat_messages,
+        'sources': sources,
+        'provider_id': provider_id,
+        'model_id': model_id,
+        'options': options
+    }
+
+@knowledge_base_api.route('/api/knowledge_base/chat', methods=['POST'])
+def knowledge_base_chat():
+    """
+    使用大模型结合知识库回答用户问题
+    请求参数:
+    - message: 用户消息
+    - history: 历史对话记录 (可选)
+    - search_type: 搜索类型，可选 'semantic'(默认)、'keyword' 或 'hybrid'(向量与关键词融合)
+    - top_k: 检索的相关文档数量 (默认5)
+    - max_tokens: 响应的最大token数 (默认1000)
+    """
+    try:
+        # 获取并验证请求参数，检索知识库并构建消息
+        chat = _prepare_kb_chat(request.get_json())
         
         # 调用模型生成回复
         try:
-            # 获取默认模型信息
-            default_model = model_service.get_default_model()
-            if not default_model:
-                app_logger.error("没有找到默认模型配置")
-                return jsonify({
-                    'success': False,
-                    'message': '没有找到默认模型配置，请先设置默认模型'
-                }), 500
-            
-            # 获取模型服务提供商ID和模型ID
-            provider_id = default_model.get('provider_id')
-            model_id = default_model.get('id')
-            model_name = default_model.get('name', '').lower()
-            
-            app_logger.info(f"使用默认模型回答知识库问题: 提供商 {provider_id}, 模型 {model_id}")
-            
-            # 判断是否为Qwen3模型，如果是则调整参数
-            options = {
-                "temperature": 0.7,
-                "top_p": 0.95,
-                "max_tokens": max_tokens
-            }
-            
-            # 判断是否为Qwen3模型，如果是则添加/no_think指令
-            if 'qwen3' in model_id.lower() or 'qwen3' in model_name:
-                app_logger.info("检测到Qwen3模型，添加/no_think指令")
-                # 修改最后一条用户消息
-                if chat_messages[-1]['role'] == 'user':
-                    chat_messages[-1]['content'] += " /no_think"
-            
-            # 调用模型生成回复
             response = model_service.chat_completion(
-                provider_id,
-                model_id,
-                chat_messages,
-                options
+                chat['provider_id'],
+                chat['model_id'],
+                chat['chat_messages'],
+                chat['options']
             )
             
             # 检查是否有错误
@@ -493,7 +564,7 @@ def knowledge_base_chat():
                 'success': True,
                 'data': {
                     'reply': reply,
-                    'sources': sources
+                    'sources': chat['sources']
                 }
             })
             
@@ -505,6 +576,32 @@ def knowledge_base_chat():
                 'message': f'调用模型服务失败: {str(e)}'
             }), 500
     
+    except AppException as e:
+        return jsonify({'success': False, 'message': e.message}), e.code
+    except Exception as e:
+        logger.error(f"知识库聊天处理异常: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            'success': False,
+            'message': f'处理请求时发生错误: {str(e)}'
+        }), 500
+
+@knowledge_base_api.route('/api/knowledge_base/chat/stream', methods=['POST'])
+def knowledge_base_chat_stream():
+    """
+    使用大模型结合知识库回答用户问题，以Server-Sent Events逐段返回回复
+    请求参数与 /api/knowledge_base/chat 相同
+    
+    事件:
+    - sources: 检索到的来源信息，在模型开始生成前发送
+    - token: {"content": 增量文本}
+    - done: {"length": 回复总字符数}
+    - error: {"message": 错误信息}
+    """
+    try:
+        chat = _prepare_kb_chat(request.get_json())
+    except AppException as e:
+        return jsonify({'success': False, 'message': e.message}), e.code
     except Exception as e:
         logger.error(f"知识库聊天处理异常: {str(e)}")
         logger.error(traceback.format_exc())
@@ -512,6 +609,29 @@ def knowledge_base_chat():
             'success': False,
             'message': f'处理请求时发生错误: {str(e)}'
         }), 500
+    
+    def generate():
+        yield sse_event('sources', chat['sources'])
+        length = 0
+        try:
+            for chunk in model_service.stream_chat_completion(
+                chat['provider_id'],
+                chat['model_id'],
+                chat['chat_messages'],
+                chat['options']
+            ):
+                length += len(chunk)
+                yield sse_event('token', {'content': chunk})
+        except Exception as e:
+            logger.error(f"流式调用模型服务失败: {str(e)}")
+            yield sse_event('error', {'message': f'调用模型服务失败: {str(e)}'})
+            return
+        if length == 0:
+            yield sse_event('error', {'message': '模型未返回有效回复'})
+            return
+        yield sse_event('done', {'length': length})
+    
+    return sse_response(generate())
 
 @knowledge_base_api.route('/api/knowledge_base/check_model', methods=['GET'])
 def check_model_status():
@@ -3,6 +3,8 @@
 
 from flask import Blueprint, request, jsonify
 from service.common.model_common_service import model_service
+from service.common.http_client import get_http_client
+from service.common.llm_response_cache import get_llm_response_cache
 import logging
 import os
 import json
@@ -25,6 +27,36 @@ def get_providers():
         logger.error(f"获取服务提供商列表时发生错误: {str(e)}")
         return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
 
+@model_settings_api.route('/api/settings/model/http_stats', methods=['GET'])
+def get_http_stats():
+    """获取各服务提供商的HTTP连接统计信息，用于观察连接复用和重试情况"""
+    try:
+        return jsonify({"success": True, "providers": get_http_client().get_stats()})
+    except Exception as e:
+        logger.error(f"获取HTTP连接统计信息时发生错误: {str(e)}")
+        return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
+
+@model_settings_api.route('/api/settings/model/response_cache', methods=['GET'])
+def get_response_cache_stats():
+    """获取大模型响应缓存统计信息"""
+    try:
+        cache = get_llm_response_cache()
+        return jsonify({"success": True, "enabled": cache is not None, "stats": cache.stats() if cache else None})
+    except Exception as e:
+        logger.error(f"获取响应缓存统计信息时发生错误: {str(e)}")
+        return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
+
+@model_settings_api.route('/api/settings/model/response_cache', methods=['DELETE'])
+def clear_response_cache():
+    """清空大模型响应缓存，提示词模板或模型更新后可强制重新生成"""
+    try:
+        cache = get_llm_response_cache()
+        cleared = cache.clear() if cache else 0
+        return jsonify({"success": True, "message": f"已清除{cleared}条缓存记录", "cleared": cleared})
+    except Exception as e:
+        logger.error(f"清空响应缓存时发生错误: {str(e)}")
+        return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
+
 @model_settings_api.route('/api/settings/model/providers/<provider_id>', methods=['GET'])
 def get_provider(provider_id):
     """获取指定服务提供商信息"""
@@ -6,7 +6,7 @@
 
 from flask import Blueprint, jsonify, request
 from service.settings.database.settings_database_service import db_service
-from service.database import DatabaseService
+from service.database import DatabaseService, DatabasePoolManager
 from service.exception import AppException
 from service.log.logger import app_logger
 from service.log.tools import log_with_context, handle_exceptions
@@ -32,6 +32,8 @@ def save_database_settings():
     try:
         data = request.get_json()
         if db_service.save_database_settings(data):
+            # 数据库配置已变更，关闭现有连接池，下次使用时按新配置重建
+            DatabasePoolManager.get_instance().shutdown()
             return jsonify({"status": "success", "message": "保存数据库设置成功"})
         else:
             return jsonify({"status": "error", "message": "保存数据库设置失败"}), 500
@@ -83,6 +85,16 @@ def test_database_connection():
         app_logger.exception("测试数据库连接时发生错误")
         return jsonify({"success": False, "message": f"系统错误: {str(e)}"})
 
+@settings_database_bp.route('/api/settings/database/pool_stats', methods=['GET'])
+def get_pool_stats():
+    """获取数据库连接池统计信息接口，用于评估连接池大小配置"""
+    try:
+        stats = DatabasePoolManager.get_instance().get_pool_stats()
+        return jsonify({"success": True, "pools": stats})
+    except Exception as e:
+        app_logger.exception("获取连接池统计信息时发生错误")
+        return jsonify({"success": False, "message": str(e)}), 500
+
 # 注册路由函数已不再需要，因为使用了蓝图方式
 # 保留空函数以维持兼容性，避免其他地方调用时出错
 def register_routes(app):
@@ -8,6 +8,8 @@ import logging
 import datetime
 from typing import Dict, List, Optional, Any, Union
 from service.log.logger import app_logger
+from service.common.http_client import get_http_client
+from service.common.llm_response_cache import get_llm_response_cache, make_cache_key
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -86,17 +88,32 @@ class DifyService:
         except Exception as e:
             app_logger.error(f"记录Dify调用日志失败: {str(e)}")
     
-    def call_dify_api(self, operation_type: str, inputs: Dict) -> Dict:
+    def call_dify_api(self, operation_type: str, inputs: Dict, use_cache: bool = False) -> Dict:
         """
         调用Dify API
         
         Args:
             operation_type: 操作类型(repair_date/repair_idcard)
             inputs: API输入参数
+            use_cache: 是否使用响应缓存，相同操作类型和输入参数直接返回缓存的成功结果
             
         Returns:
             Dict: API响应结果
         """
+        cache = get_llm_response_cache() if use_cache else None
+        if cache is not None:
+            # Dify工作流的提示词在服务端，输入参数即决定了结果
+            cache_key = make_cache_key('dify', operation_type, [], inputs)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                app_logger.info(f"Dify响应缓存命中: {operation_type}")
+                cached["cached"] = True
+                return cached
+            result = self.call_dify_api(operation_type, inputs)
+            if result.get("success"):
+                cache.put(cache_key, 'dify', operation_type, result)
+            return result
+        
         try:
             # 获取API密钥
             api_key = self.OPERATION_KEYS.get(operation_type)
@@ -132,11 +149,11 @@ class DifyService:
             
             # 调用API
             app_logger.info(f"正在调用Dify API: {operation_type}")
-            response = requests.post(
+            response = get_http_client().post(
+                'dify',
                 self.BASE_URL,
                 headers=headers,
-                json=payload,
-                timeout=180  # 120秒超时
+                json=payload
             )
             
             # 解析响应
@@ -265,7 +282,7 @@ class DifyService:
                 "sql": ""
             }
     
-    def generate_repair_sql_via_api(self, params: Dict) -> Dict:
+    def generate_repair_sql_via_api(self, params: Dict, use_cache: bool = False) -> Dict:
         """
         通过调用Dify API生成修复SQL语句
         
@@ -277,9 +294,10 @@ class DifyService:
                 target_field: 目标字段
                 database_type: 数据库类型
                 target_field_remark: 目标字段备注信息
+            use_cache: 是否使用响应缓存
                 
         Returns:
-            Dict: 包含生成的SQL语句和状态信息
+            Dict: 包含生成的SQL语句和状态信息，命中缓存时cached为True
         """
         try:
             # 获取操作类型
@@ -321,7 +339,7 @@ class DifyService:
             }
             
             # 调用Dify API
-            api_result = self.call_dify_api(operation_type, api_inputs)
+            api_result = self.call_dify_api(operation_type, api_inputs, use_cache=use_cache)
             
             # 处理API响应
             if api_result.get('success'):
@@ -348,7 +366,8 @@ class DifyService:
                     return {
                         "success": True,
                         "message": "通过API生成SQL成功",
-                        "sql": sql
+                        "sql": sql,
+                        "cached": api_result.get('cached', False)
                     }
                 else:
                     app_logger.error(f"Dify API响应格式不正确，找不到outputs.output字段: {api_data}")
@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+大模型服务提供商HTTP客户端
+
+每个服务提供商一个requests.Session，挂载带连接池和重试策略的HTTPAdapter，
+同一提供商的请求复用TCP/TLS长连接；连接失败和429/5xx响应按指数退避自动重试。
+每个提供商的并发请求数受信号量限制，超出的请求排队等待，避免批量调用压垮模型服务。
+批量任务的请求（在batch_requests()上下文中发出）还要先取得批量信号量，最多占用
+max_concurrency - interactive_reserved个名额，其余名额留给页面上的交互式请求；
+排队等待超过queue_timeout/batch_queue_timeout时抛出requests.exceptions.Timeout，不会无限期阻塞。
+同时统计每个提供商的请求数、新建连接数、连接复用率、重试次数和响应耗时。
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config.http_client_config import HTTP_CLIENT_CONFIG, HTTP_CLIENT_PROVIDER_CONFIG
+from service.log.logger import app_logger
+
+# 标记当前线程发出的请求属于批量任务
+_request_context = threading.local()
+
+
+@contextmanager
+def batch_requests():
+    """在此上下文中当前线程发出的请求按批量请求限流，不占用为交互式请求保留的并发名额"""
+    previous = getattr(_request_context, "batch", False)
+    _request_context.batch = True
+    try:
+        yield
+    finally:
+        _request_context.batch = previous
+
+
+class ProviderHttpClient:
+    """按服务提供商复用连接的HTTP客户端"""
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @staticmethod
+    def get_instance():
+        """获取单例实例"""
+        if ProviderHttpClient._instance is None:
+            with ProviderHttpClient._instance_lock:
+                if ProviderHttpClient._instance is None:
+                    ProviderHttpClient._instance = ProviderHttpClient()
+        return ProviderHttpClient._instance
+
+    def __init__(self):
+        """初始化客户端"""
+        self._sessions: Dict[str, requests.Session] = {}
+        self._adapters: Dict[str, HTTPAdapter] = {}
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._batch_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_config(provider_id: str) -> Dict[str, Any]:
+        """获取服务提供商的客户端配置（默认配置合并提供商覆盖项）"""
+        config = dict(HTTP_CLIENT_CONFIG)
+        config.update(HTTP_CLIENT_PROVIDER_CONFIG.get(provider_id, {}))
+        return config
+
+    @staticmethod
+    def get_batch_concurrency(provider_id: str) -> int:
+        """批量请求可以同时占用的并发名额，至少为1（max_concurrency为1时无法为交互式请求保留名额）"""
+        config = ProviderHttpClient.get_config(provider_id)
+        return max(1, config["max_concurrency"] - config["interactive_reserved"])
+
+    def _create_session(self, provider_id: str):
+        config = self.get_config(provider_id)
+        retry = Retry(
+            total=config["max_retries"],
+            connect=config["max_retries"],
+            read=config["read_retries"],
+            status=config["max_retries"],
+            backoff_factor=config["backoff_factor"],
+            status_forcelist=config["retry_status_codes"],
+            # 大模型接口都是POST，请求失败时服务端没有副作用，允许对所有方法重试
+            allowed_methods=None,
+            # 重试用尽后返回最后一次响应，由调用方按状态码处理
+            raise_on_status=False,
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=config["pool_maxsize"], max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session, adapter
+
+    def get_session(self, provider_id: str) -> requests.Session:
+        """获取服务提供商的Session，首次使用时创建"""
+        session = self._sessions.get(provider_id)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(provider_id)
+                if session is None:
+                    session, adapter = self._create_session(provider_id)
+                    self._sessions[provider_id] = session
+                    self._adapters[provider_id] = adapter
+                    self._semaphores[provider_id] = threading.BoundedSemaphore(
+                        self.get_config(provider_id)["max_concurrency"])
+                    self._batch_semaphores[provider_id] = threading.BoundedSemaphore(
+                        self.get_batch_concurrency(provider_id))
+                    self._stats[provider_id] = {
+                        "requests": 0,
+                        "errors": 0,
+                        "retries": 0,
+                        "queue_timeouts": 0,
+                        "total_seconds": 0.0,
+                        "max_seconds": 0.0,
+                        "wait_seconds": 0.0
+                    }
+                    app_logger.info(f"已创建HTTP连接池 - 提供商: {provider_id}, 配置: {self.get_config(provider_id)}")
+        return session
+
+    def request(self, provider_id: str, method: str, url: str, timeout: Optional[Any] = None,
+                **kwargs) -> requests.Response:
+        """发送请求
+
+        Args:
+            provider_id: 服务提供商ID，决定使用哪个连接池和重试策略
+            method: HTTP方法
+            url: 请求地址
+            timeout: 超时设置，不传时使用配置中的(连接超时, 读取超时)
+            **kwargs: 传给requests.Session.request的其他参数（json、headers、stream等）
+
+        Returns:
+            requests.Response: 响应对象；stream=True时调用方负责读取完或关闭响应，连接才会归还连接池
+
+        并发数限制只覆盖到收到响应为止：非流式请求即整个生成过程，流式请求为首个数据到达前。
+        等待并发名额超时时抛出requests.exceptions.Timeout。
+        """
+        session = self.get_session(provider_id)
+        config = self.get_config(provider_id)
+        if timeout is None:
+            timeout = (config["connect_timeout"], config["read_timeout"])
+
+        wait_start = time.perf_counter()
+        with self._acquire_slot(provider_id, config, getattr(_request_context, "batch", False)):
+            start_time = time.perf_counter()
+            try:
+                response = session.request(method, url, timeout=timeout, **kwargs)
+            except Exception:
+                self._record(provider_id, time.perf_counter() - start_time, error=True,
+                             wait_seconds=start_time - wait_start)
+                raise
+        retries = getattr(response.raw, "retries", None)
+        retry_count = len(retries.history) if retries is not None else 0
+        self._record(provider_id, time.perf_counter() - start_time, retries=retry_count,
+                     wait_seconds=start_time - wait_start)
+        return response
+
+    @contextmanager
+    def _acquire_slot(self, provider_id: str, config: Dict[str, Any], batch: bool):
+        """取得并发名额：批量请求先取得批量信号量再取得提供商信号量，两者共用一个等待时限"""
+        queue_timeout = config["batch_queue_timeout"] if batch else config["queue_timeout"]
+        deadline = time.perf_counter() + queue_timeout
+        semaphores = [self._semaphores[provider_id]]
+        if batch:
+            semaphores.insert(0, self._batch_semaphores[provider_id])
+        acquired = []
+        try:
+            for semaphore in semaphores:
+                if not semaphore.acquire(timeout=max(0.0, deadline - time.perf_counter())):
+                    with self._lock:
+                        self._stats[provider_id]["queue_timeouts"] += 1
+                    kind = "批量" if batch else "交互式"
+                    app_logger.warning(f"等待并发名额超时 - 提供商: {provider_id}, 类型: {kind}, 时限: {queue_timeout}秒")
+                    raise requests.exceptions.Timeout(
+                        f"服务提供商{provider_id}繁忙，{kind}请求等待{queue_timeout}秒仍未获得并发名额")
+                acquired.append(semaphore)
+            yield
+        finally:
+            for semaphore in reversed(acquired):
+                semaphore.release()
+
+    def post(self, provider_id: str, url: str, **kwargs) -> requests.Response:
+        """发送POST请求"""
+        return self.request(provider_id, 'POST', url, **kwargs)
+
+    def get(self, provider_id: str, url: str, **kwargs) -> requests.Response:
+        """发送GET请求"""
+        return self.request(provider_id, 'GET', url, **kwargs)
+
+    def _record(self, provider_id: str, seconds: float, error: bool = False, retries: int = 0,
+                wait_seconds: float = 0.0):
+        with self._lock:
+            stats = self._stats[provider_id]
+            stats["requests"] += 1
+            stats["wait_seconds"] += wait_seconds
+            stats["retries"] += retries
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            if error:
+                stats["errors"] += 1
+
+    def get_stats(self):
+        """获取每个服务提供商的连接统计信息
+
+        Returns:
+            list: 请求数、新建连接数、连接复用率、重试次数、错误数、响应耗时（到收到响应头为止）、
+                  因并发数限制排队的平均等待时间和排队超时次数
+        """
+        stats = []
+        with self._lock:
+            for provider_id, adapter in self._adapters.items():
+                provider_stats = self._stats[provider_id]
+                # urllib3连接池记录了新建连接数和经过的请求数（含重试）
+                pools = list(adapter.poolmanager.pools._container.values())
+                connections = sum(pool.num_connections for pool in pools)
+                pool_requests = sum(pool.num_requests for pool in pools)
+                count = provider_stats["requests"]
+                stats.append({
+                    "provider_id": provider_id,
+                    "requests": count,
+                    "connections_created": connections,
+                    "connection_reuse_rate": round(1 - connections / pool_requests, 4) if pool_requests else 0.0,
+                    "retries": provider_stats["retries"],
+                    "errors": provider_stats["errors"],
+                    "avg_ms": round(provider_stats["total_seconds"] / count * 1000, 1) if count else 0.0,
+                    "max_ms": round(provider_stats["max_seconds"] * 1000, 1),
+                    "max_concurrency": self.get_config(provider_id)["max_concurrency"],
+                    "batch_concurrency": self.get_batch_concurrency(provider_id),
+                    "avg_wait_ms": round(provider_stats["wait_seconds"] / count * 1000, 1) if count else 0.0,
+                    "queue_timeouts": provider_stats["queue_timeouts"]
+                })
+        return stats
+
+    def close(self):
+        """关闭所有Session"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            self._adapters.clear()
+            self._semaphores.clear()
+            self._batch_semaphores.clear()
+            self._stats.clear()
+
+
+def get_http_client() -> ProviderHttpClient:
+    """获取进程级大模型HTTP客户端"""
+    return ProviderHttpClient.get_instance()
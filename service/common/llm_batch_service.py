@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+大模型批量调用
+
+将多个相互独立的生成任务（如多个表、字段、校验规则的SQL）并发提交给同一服务提供商，
+并发数取该提供商留给批量请求的并发名额（max_concurrency减去为交互式请求保留的名额）；每项单独调用、单独缓存、单独解析结果，
+某一项失败只影响该项，结果按提交顺序返回。
+批量任务通过submit_batch作为后台任务执行，调用方按任务ID查询进度和已完成项的结果，也可以取消任务。
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from config.http_client_config import LLM_BATCH_CONFIG
+from service.common.http_client import ProviderHttpClient, batch_requests
+from service.exception import AppException
+from service.import_job.import_job_service import ImportJobService, ImportJob, ImportJobCancelled
+from service.log.logger import app_logger
+
+# 批量生成任务登记表，与Excel导入任务相互独立
+batch_jobs = ImportJobService()
+
+
+def run_batch(provider_id: str, items: List[Any], worker: Callable[[Any], Dict[str, Any]],
+              job: Optional[ImportJob] = None) -> Dict[str, Any]:
+    """并发执行批量生成任务
+
+    Args:
+        provider_id: 服务提供商ID，决定并发数
+        items: 任务参数列表
+        worker: 处理单个任务的函数，返回包含success字段的结果字典
+        job: 可选的后台任务，每完成一项更新进度和该项的明细；请求取消后未开始的项不再执行
+
+    Returns:
+        dict: results为与items一一对应的结果列表，以及成功数、失败数和总耗时
+    """
+    if not items:
+        return {"results": [], "succeeded": 0, "failed": 0, "elapsed_ms": 0.0}
+
+    def run_item(index, item):
+        if job is not None and job.cancel_requested:
+            result = {"success": False, "cancelled": True, "message": "批量任务已取消"}
+        else:
+            try:
+                with batch_requests():
+                    result = worker(item)
+            except Exception as e:
+                app_logger.error(f"批量生成任务失败: {item}, 错误: {str(e)}")
+                result = {"success": False, "message": str(e)}
+        if job is not None:
+            job.update_detail(index, status='completed' if result.get("success") else 'failed', result=result)
+            try:
+                job.advance_progress(1)
+            except ImportJobCancelled:
+                # 取消后剩余的项在开始前检查并跳过
+                pass
+        return result
+
+    max_workers = min(ProviderHttpClient.get_batch_concurrency(provider_id), len(items))
+    start_time = time.perf_counter()
+    # 每次批量调用使用独立的线程池，执行完即释放；实际发往提供商的并发数由HTTP客户端统一限制
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"llm-batch-{provider_id}") as executor:
+        results = list(executor.map(run_item, range(len(items)), items))
+    elapsed_ms = round((time.perf_counter() - start_time) * 1000, 1)
+
+    succeeded = sum(1 for result in results if result.get("success"))
+    app_logger.info(f"批量生成完成 - 提供商: {provider_id}, 任务数: {len(items)}, 成功: {succeeded}, "
+                    f"失败: {len(items) - succeeded}, 并发数: {max_workers}, 耗时: {elapsed_ms}ms")
+    return {
+        "results": results,
+        "succeeded": succeeded,
+        "failed": len(items) - succeeded,
+        "elapsed_ms": elapsed_ms
+    }
+
+
+def submit_batch(provider_id: str, items: List[Any], worker: Callable[[Any], Dict[str, Any]],
+                 description: str) -> ImportJob:
+    """提交后台批量生成任务
+
+    Args:
+        provider_id: 服务提供商ID
+        items: 任务参数列表，不超过LLM_BATCH_CONFIG['max_items']项
+        worker: 处理单个任务的函数
+        description: 任务说明，写入任务日志
+
+    Returns:
+        ImportJob: 新建的任务，details为每项的状态和结果，结束后result中包含全部结果
+
+    Raises:
+        AppException: 任务项超过上限时抛出(400)
+    """
+    max_items = LLM_BATCH_CONFIG['max_items']
+    if len(items) > max_items:
+        raise AppException(f"单次最多生成{max_items}条SQL", code=400)
+
+    def runner(params, job):
+        job.set_details([{"status": "pending", "result": None} for _ in items])
+        job.set_stage('generating', len(items))
+        job.logs.append({"type": "info", "message": f"开始{description}，共{len(items)}项"})
+        batch = run_batch(provider_id, items, worker, job)
+        cancelled = job.cancel_requested
+        message = f"{description}完成，成功{batch['succeeded']}条，失败{batch['failed']}条"
+        if cancelled:
+            message = f"{description}已取消，成功{batch['succeeded']}条"
+        job.logs.append({"type": "warning" if cancelled else "info", "message": message})
+        # 单项失败记录在明细和failed计数中，不影响任务整体状态；取消后任务状态为cancelled
+        return {
+            "success": not cancelled,
+            "message": message,
+            **batch
+        }, 200
+
+    return batch_jobs.submit({"provider_id": provider_id, "item_count": len(items)}, runner)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+大模型响应缓存
+
+以(服务提供商, 模型, 规范化后的消息, 调用参数)的sha256为键，将成功的响应以JSON存入本地SQLite。
+相同的模板、表字段、数据库类型等生成的提示词相同，再次请求时直接返回缓存的响应。
+记录超过有效期后失效，记录数超过上限时淘汰最久未使用的记录。
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from config.http_client_config import LLM_RESPONSE_CACHE_CONFIG
+from service.log.logger import app_logger
+
+# 连续空白（含换行）视为一个空格，提示词的缩进和换行差异不影响缓存键
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize_messages(messages: List[Dict]) -> List[List[str]]:
+    """规范化消息列表：只保留角色和内容，内容去除首尾空白并合并连续空白"""
+    return [[message.get('role', ''), _WHITESPACE_PATTERN.sub(' ', str(message.get('content', ''))).strip()]
+            for message in messages]
+
+
+def make_cache_key(provider_id: str, model_id: str, messages: List[Dict], options: Optional[Dict] = None) -> str:
+    """计算缓存键"""
+    payload = json.dumps([provider_id, model_id, normalize_messages(messages), options or {}],
+                         ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """基于SQLite的大模型响应缓存"""
+
+    def __init__(self, db_path: str, ttl_seconds: int, max_entries: int):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "cache_key TEXT PRIMARY KEY, provider_id TEXT, model_id TEXT, response TEXT NOT NULL, "
+            "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        app_logger.info(f"大模型响应缓存已打开: {db_path}, 记录数: {self._count}")
+
+    def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """查询缓存，未命中或已过期时返回None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE cache_key = ?", (cache_key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE cache_key = ?", (cache_key,))
+                self._conn.commit()
+                self._count -= 1
+                row = None
+            if row is None:
+                self._misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE cache_key = ?", (now, cache_key))
+            self._conn.commit()
+            self._hits += 1
+        return json.loads(row[0])
+
+    def put(self, cache_key: str, provider_id: str, model_id: str, response: Dict[str, Any]):
+        """写入缓存，超出记录数上限时淘汰最久未使用的记录"""
+        now = time.time()
+        with self._lock:
+            replaced = self._conn.execute(
+                "SELECT COUNT(*) FROM responses WHERE cache_key = ?", (cache_key,)).fetchone()[0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (cache_key, provider_id, model_id, response, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (cache_key, provider_id, model_id, json.dumps(response, ensure_ascii=False), now, now)
+            )
+            self._count += 1 - replaced
+            if self._count > self.max_entries:
+                # 淘汰到上限的90%，避免每次写入都触发淘汰
+                evict_count = self._count - int(self.max_entries * 0.9)
+                self._conn.execute(
+                    "DELETE FROM responses WHERE cache_key IN "
+                    "(SELECT cache_key FROM responses ORDER BY last_used LIMIT ?)", (evict_count,))
+                self._count -= evict_count
+                app_logger.info(f"大模型响应缓存淘汰{evict_count}条记录")
+            self._conn.commit()
+
+    def clear(self) -> int:
+        """清空缓存，返回清除的记录数"""
+        with self._lock:
+            cleared = self._conn.execute("DELETE FROM responses").rowcount
+            self._conn.commit()
+            self._count = 0
+        return cleared
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'entries': self._count,
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / total, 4) if total else 0.0
+            }
+
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_response_cache() -> Optional[LLMResponseCache]:
+    """获取进程级大模型响应缓存，配置中关闭时返回None"""
+    global _cache
+    if not LLM_RESPONSE_CACHE_CONFIG['enabled']:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMResponseCache(LLM_RESPONSE_CACHE_CONFIG['db_path'],
+                                          LLM_RESPONSE_CACHE_CONFIG['ttl_seconds'],
+                                          LLM_RESPONSE_CACHE_CONFIG['max_entries'])
+    return _cache
@@ -6,9 +6,12 @@ import json
 import requests
 import logging
 import datetime
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, Iterator, List, Optional, Any, Union
 from utils.encryption_util import encrypt_api_key, decrypt_api_key, is_encrypted
 from service.log.logger import app_logger  # 导入app_logger
+from service.common.http_client import get_http_client
+from service.common.llm_response_cache import get_llm_response_cache, make_cache_key
+from service.exception import AppException
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -344,12 +347,12 @@ class ModelService:
             if provider_id == 'ollama':
                 # Ollama使用List models API
                 url = f"{api_url}/api/tags"
-                response = requests.get(url, timeout=5)
+                response = get_http_client().get(provider_id, url, timeout=5)
             else:
                 # 通用测试方法，尝试获取模型列表或简单的验证接口
                 url = f"{api_url}/{api_version}/models"
                 headers = {"Authorization": f"Bearer {api_key}"}
-                response = requests.get(url, headers=headers, timeout=5)
+                response = get_http_client().get(provider_id, url, headers=headers, timeout=5)
             
             # 检查响应
             if response.status_code == 200:
@@ -432,8 +435,27 @@ class ModelService:
         """切换模型的可见性"""
         return self.update_model(provider_id, model_id, {'visible': visible})
     
-    def chat_completion(self, provider_id: str, model_id: str, messages: List[Dict], options: Dict = None) -> Dict:
-        """调用大模型进行对话"""
+    def chat_completion(self, provider_id: str, model_id: str, messages: List[Dict], options: Dict = None,
+                        use_cache: bool = False) -> Dict:
+        """调用大模型进行对话
+        
+        Args:
+            use_cache: 是否使用响应缓存。启用时相同的(提供商, 模型, 消息, 参数)直接返回缓存的成功响应，
+                       返回结果中cached为True；未命中时调用模型并缓存成功的响应
+        """
+        cache = get_llm_response_cache() if use_cache else None
+        if cache is not None:
+            cache_key = make_cache_key(provider_id, model_id, messages, options)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                app_logger.info(f"大模型响应缓存命中 - 提供商: {provider_id}, 模型: {model_id}")
+                cached["cached"] = True
+                return cached
+            result = self.chat_completion(provider_id, model_id, messages, options)
+            if "error" not in result:
+                cache.put(cache_key, provider_id, model_id, result)
+            return result
+        
         # 记录传递的参数
         app_logger.info(f"开始调用大模型 - 提供商: {provider_id}, 模型: {model_id}")
         app_logger.info(f"系统提示词: {messages[0]['content'] if messages and messages[0]['role'] == 'system' else '无'}")
@@ -513,7 +535,7 @@ class ModelService:
             url = f"{api_url}/{api_version}/chat/completions"
             app_logger.debug(f"发送API请求到 {url}")
             
-            response = requests.post(url, headers=headers, json=request_body, timeout=60)
+            response = get_http_client().post(provider_id, url, headers=headers, json=request_body)
             
             if response.status_code == 200:
                 result = response.json()
@@ -561,7 +583,7 @@ class ModelService:
                 app_logger.debug(f"使用流式模式，发送Ollama请求到 {url}")
                 
                 # 发送流式请求
-                response = requests.post(url, json=request_body, stream=True, timeout=60)
+                response = get_http_client().post('ollama', url, json=request_body, stream=True)
                 
                 # 记录响应状态码
                 app_logger.debug(f"Ollama响应状态码: {response.status_code}")
@@ -588,10 +610,9 @@ class ModelService:
                                     # 保存最后一个完整响应
                                     last_response = data
                                     
-                                    # 如果响应完成，记录日志
+                                    # 如果响应完成，记录日志；不提前退出循环，读取到响应结束后连接才会归还连接池复用
                                     if data.get('done', False):
                                         app_logger.debug("流式响应完成")
-                                        break
                                         
                                 except json.JSONDecodeError as je:
                                     app_logger.error(f"解析流式JSON失败: {str(je)}")
@@ -629,6 +650,8 @@ class ModelService:
                         import traceback
                         app_logger.error(f"异常堆栈: {traceback.format_exc()}")
                         return {"error": error_msg}
+                    finally:
+                        response.close()
                 else:
                     error_msg = f"Ollama API调用失败，状态码: {response.status_code}"
                     app_logger.error(f"Ollama调用失败 - {error_msg}")
@@ -678,7 +701,7 @@ class ModelService:
                 app_logger.debug(f"非流式请求体: {json.dumps(generate_body, ensure_ascii=False)}")
                 
                 # 发送非流式请求
-                response = requests.post(url, json=generate_body, timeout=60)
+                response = get_http_client().post('ollama', url, json=generate_body)
                 
                 # 记录原始响应
                 app_logger.debug(f"Ollama响应状态码: {response.status_code}")
@@ -731,6 +754,89 @@ class ModelService:
             app_logger.error(f"异常堆栈: {traceback.format_exc()}")
             return {"error": error_msg}
     
+    def stream_chat_completion(self, provider_id: str, model_id: str, messages: List[Dict],
+                               options: Dict = None) -> Iterator[str]:
+        """流式调用大模型，逐段返回生成的文本
+
+        生成器每收到一段内容就立即返回，不在内存中累积完整回复；
+        调用方停止迭代（如客户端断开）时关闭上游连接。
+
+        Yields:
+            str: 增量生成的文本片段
+
+        Raises:
+            AppException: 提供商或模型配置错误、API返回错误状态码时抛出
+        """
+        app_logger.info(f"开始流式调用大模型 - 提供商: {provider_id}, 模型: {model_id}")
+        self._log_model_call(provider_id, model_id, messages)
+
+        provider = self.config.get('providers', {}).get(provider_id)
+        if not provider:
+            raise AppException("未找到指定的服务提供商", code=400)
+        if not any(model['id'] == model_id for model in provider.get('models', [])):
+            raise AppException("未找到指定的模型", code=400)
+
+        api_key = provider.get('apiKey', '')
+        if api_key and is_encrypted(api_key):
+            api_key = decrypt_api_key(api_key)
+        api_url = provider.get('apiUrl', '')
+        api_version = provider.get('apiVersion', 'v1')
+        if not api_url:
+            raise AppException("API地址不能为空", code=400)
+
+        request_body = {"model": model_id, "messages": messages}
+        if options:
+            request_body.update(options)
+        request_body["stream"] = True
+
+        if provider_id == 'ollama':
+            # Ollama每行一个JSON对象，done为true时结束
+            url = f"{api_url}/api/chat"
+            headers = None
+        else:
+            # OpenAI兼容格式：SSE事件，data为JSON，以[DONE]结束
+            url = f"{api_url}/{api_version}/chat/completions"
+            headers = {"Content-Type": "application/json"}
+            if api_key:
+                headers["Authorization"] = f"Bearer {api_key}"
+
+        start_time = import_time()
+        first_chunk_time = None
+        content_length = 0
+        with get_http_client().post(provider_id, url, headers=headers, json=request_body, stream=True) as response:
+            if response.status_code != 200:
+                error_msg = f"API调用失败，状态码: {response.status_code}, 响应: {response.text}"
+                app_logger.error(f"大模型流式调用失败 - {error_msg}")
+                raise AppException(error_msg, code=502)
+
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                line = line.decode('utf-8')
+                if provider_id == 'ollama':
+                    data = json.loads(line)
+                    if 'error' in data:
+                        raise AppException(f"Ollama返回错误: {data['error']}", code=502)
+                    chunk = data.get('message', {}).get('content', '')
+                else:
+                    if not line.startswith('data:'):
+                        continue
+                    payload = line[5:].strip()
+                    if payload == '[DONE]':
+                        break
+                    choices = json.loads(payload).get('choices') or [{}]
+                    chunk = choices[0].get('delta', {}).get('content') or ''
+
+                if chunk:
+                    if first_chunk_time is None:
+                        first_chunk_time = import_time()
+                        app_logger.info(f"大模型流式首个片段耗时: {first_chunk_time - start_time:.2f}秒")
+                    content_length += len(chunk)
+                    yield chunk
+
+        app_logger.info(f"大模型流式调用完成 - 提供商: {provider_id}, 模型: {model_id}, "
+                        f"生成{content_length}个字符, 耗时{import_time() - start_time:.2f}秒")
+
     def get_all_visible_models(self) -> List[Dict]:
         """获取所有服务提供商中可见的模型"""
         all_visible_models = []
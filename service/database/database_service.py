@@ -4,12 +4,26 @@
 提供数据库操作的服务，包括测试连接、执行查询等
 """
 
-from .db_pool_manager import DatabasePoolManager
+import csv
+import os
+import tempfile
+from itertools import islice
+from .db_pool_manager import DatabasePoolManager, DB_DRIVERS
+from config.database_config import BULK_INSERT_CONFIG, BULK_LOAD_CONFIG
 from service.exception import AppException
 from service.log.logger import app_logger
 from service.log.tools import safe_db_operation, handle_exceptions
 from sqlalchemy import text
 
+# LOAD DATA默认转义规则：反斜杠、制表符、换行和NUL需要转义
+MYSQL_TSV_ESCAPES = str.maketrans({
+    '\\': '\\\\',
+    '\t': '\\t',
+    '\n': '\\n',
+    '\r': '\\r',
+    '\0': '\\0'
+})
+
 class DatabaseService:
     """数据库服务类"""
     
@@ -116,6 +130,338 @@ class DatabaseService:
             if 'connection' in locals() and connection:
                 connection.close()
     
+    def bulk_insert(self, db_type, config, table_name, columns, rows, chunk_size=None, progress_callback=None):
+        """使用绑定参数批量插入数据
+        
+        在同一个连接上按块执行驱动级executemany，每块一个事务：pymysql会将
+        INSERT ... VALUES改写为多行插入，pyodbc启用fast_executemany，cx_Oracle使用数组绑定。
+        所有值都通过绑定参数传递，不需要手工拼接和转义SQL。
+        
+        Args:
+            db_type: 数据库类型
+            config: 数据库配置
+            table_name: 表名
+            columns: 字段名列表
+            rows: 行数据的可迭代对象，每行是与columns顺序一致的值序列
+            chunk_size: 每个事务提交的行数，默认使用BULK_INSERT_CONFIG中的配置
+            progress_callback: 每提交一块后调用，参数为累计插入行数，抛出异常可中止后续插入
+            
+        Returns:
+            dict: 包含inserted_rows(插入行数)和chunks(提交块数)
+            
+        Raises:
+            AppException: 插入失败时抛出，details中包含已插入行数和失败块的起始行偏移
+        """
+        chunk_size = chunk_size or BULK_INSERT_CONFIG['chunk_size']
+        insert_statement = self.build_insert_statement(db_type, config, table_name, columns)
+        
+        inserted_rows = 0
+        chunks = 0
+        connection = self.pool_manager.get_connection(db_type, config)
+        try:
+            iterator = iter(rows)
+            while True:
+                chunk = list(islice(iterator, chunk_size))
+                if not chunk:
+                    break
+                
+                try:
+                    self.insert_chunk(connection, insert_statement, chunk)
+                except Exception as e:
+                    app_logger.error(f"批量插入失败，表: {table_name}, 起始行偏移: {inserted_rows}, 错误: {str(e)}")
+                    raise AppException(f"批量插入失败: {str(e)}", code=500, details={
+                        "db_type": db_type,
+                        "table": table_name,
+                        "inserted_rows": inserted_rows,
+                        "failed_row_offset": inserted_rows,
+                        "failed_chunk_size": len(chunk)
+                    })
+                
+                inserted_rows += len(chunk)
+                chunks += 1
+                app_logger.debug(f"批量插入已提交第{chunks}块，累计{inserted_rows}行")
+                if progress_callback:
+                    progress_callback(inserted_rows)
+        finally:
+            connection.close()
+        
+        app_logger.info(f"批量插入完成，表: {table_name}, 共{inserted_rows}行, {chunks}个事务")
+        return {
+            'inserted_rows': inserted_rows,
+            'chunks': chunks
+        }
+    
+    def build_insert_statement(self, db_type, config, table_name, columns):
+        """构建使用绑定参数的INSERT语句
+        
+        字段名按数据库方言加引号，参数名使用p0、p1...，避免中文或特殊字符字段名影响参数绑定
+        
+        Args:
+            db_type: 数据库类型
+            config: 数据库配置
+            table_name: 表名
+            columns: 字段名列表
+            
+        Returns:
+            tuple: (INSERT语句text对象, 参数名列表)
+        """
+        preparer = self.pool_manager.get_pool(db_type, config).dialect.identifier_preparer
+        param_names = [f"p{i}" for i in range(len(columns))]
+        fields_str = ', '.join(preparer.quote(column) for column in columns)
+        values_str = ', '.join(f":{name}" for name in param_names)
+        insert_sql = text(f"INSERT INTO {table_name} ({fields_str}) VALUES ({values_str})")
+        return insert_sql, param_names
+    
+    @staticmethod
+    def insert_chunk(connection, insert_statement, chunk):
+        """在指定连接上以一个事务executemany插入一块数据
+        
+        Args:
+            connection: 数据库连接
+            insert_statement: build_insert_statement返回的(INSERT语句, 参数名列表)
+            chunk: 行数据列表
+        """
+        insert_sql, param_names = insert_statement
+        params = [dict(zip(param_names, row)) for row in chunk]
+        with connection.begin():
+            connection.execute(insert_sql, params)
+    
+    def bulk_load(self, db_type, config, table_name, columns, rows, chunk_size=None, progress_callback=None):
+        """使用数据库原生批量导入通道加载数据
+        
+        根据DB_DRIVERS中配置的bulk_loader选择导入方式：MySQL使用LOAD DATA LOCAL INFILE，
+        SQL Server使用BULK INSERT加载到临时表后再写入目标表，Oracle使用APPEND_VALUES直接路径数组DML。
+        MySQL和SQL Server先将数据落地为临时文件再交给数据库加载。
+        原生导入不可用（服务器禁用、文件不可访问等）且尚未写入任何数据时，回退到bulk_insert。
+        
+        Args:
+            db_type: 数据库类型
+            config: 数据库配置
+            table_name: 表名
+            columns: 字段名列表
+            rows: 可重复遍历的行数据（列表或每次遍历重新读取的可迭代对象），每行是与columns顺序一致的值序列，回退时会重新遍历
+            chunk_size: 回退到bulk_insert时每个事务提交的行数
+            progress_callback: 写入数据后调用，参数为累计插入行数，其抛出的异常原样向上传递
+            
+        Returns:
+            dict: 包含inserted_rows(插入行数)、chunks(提交次数)和mode(实际使用的导入方式)
+            
+        Raises:
+            AppException: 导入失败时抛出，details中包含已插入行数和失败块的起始行偏移
+        """
+        driver_info = DB_DRIVERS.get(db_type) or {}
+        loader = driver_info.get('bulk_loader')
+        if loader:
+            loaded = {'rows': 0, 'callback_error': None}
+            
+            def track_progress(inserted_rows):
+                loaded['rows'] = inserted_rows
+                if progress_callback:
+                    try:
+                        progress_callback(inserted_rows)
+                    except Exception as e:
+                        loaded['callback_error'] = e
+                        raise
+            
+            try:
+                load_method = getattr(self, f"_bulk_load_{loader}")
+                result = load_method(db_type, config, table_name, columns, rows, track_progress)
+                result['mode'] = loader
+                app_logger.info(f"原生批量导入完成，表: {table_name}, 方式: {loader}, 共{result['inserted_rows']}行")
+                return result
+            except Exception as e:
+                # 进度回调抛出的异常（如取消导入）原样向上传递
+                if e is loaded['callback_error']:
+                    raise
+                # 已经有数据提交时不能回退，否则会重复写入
+                if loaded['rows'] > 0:
+                    app_logger.error(f"原生批量导入失败，表: {table_name}, 已插入{loaded['rows']}行, 错误: {str(e)}")
+                    raise AppException(f"原生批量导入失败: {str(e)}", code=500, details={
+                        "db_type": db_type,
+                        "table": table_name,
+                        "inserted_rows": loaded['rows'],
+                        "failed_row_offset": loaded['rows'],
+                        "failed_chunk_size": len(rows) - loaded['rows'] if hasattr(rows, '__len__') else 1
+                    })
+                app_logger.warning(f"原生批量导入不可用，回退到批量插入，表: {table_name}, 方式: {loader}, 原因: {str(e)}")
+        else:
+            app_logger.warning(f"{db_type}未配置原生批量导入方式，使用批量插入")
+        
+        result = self.bulk_insert(db_type, config, table_name, columns, rows,
+                                  chunk_size=chunk_size, progress_callback=progress_callback)
+        result['mode'] = 'executemany'
+        return result
+    
+    def _bulk_load_load_data_infile(self, db_type, config, table_name, columns, rows, progress_callback):
+        """MySQL: 写入制表符分隔的临时文件后执行LOAD DATA LOCAL INFILE
+        
+        需要在BULK_LOAD_CONFIG中开启mysql_local_infile，只有执行导入的连接允许读取本地文件
+        """
+        if not BULK_LOAD_CONFIG.get('mysql_local_infile'):
+            raise AppException("未开启mysql_local_infile，不使用LOAD DATA LOCAL INFILE", code=400)
+        preparer = self.pool_manager.get_pool(db_type, config).dialect.identifier_preparer
+        fields_str = ', '.join(preparer.quote(column) for column in columns)
+        spool_path, row_count = self._spool_rows(rows, '.tsv', self._format_mysql_tsv_row)
+        try:
+            load_sql = text(
+                f"LOAD DATA LOCAL INFILE :path INTO TABLE {table_name} "
+                f"CHARACTER SET utf8mb4 FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+                f"LINES TERMINATED BY '\\n' ({fields_str})"
+            )
+            connection = self.pool_manager.get_bulk_load_connection(db_type, config)
+            try:
+                with connection.begin():
+                    connection.execute(load_sql, {'path': spool_path})
+            finally:
+                connection.close()
+        finally:
+            self._remove_spool_file(spool_path)
+        
+        progress_callback(row_count)
+        return {'inserted_rows': row_count, 'chunks': 1}
+    
+    def _bulk_load_bulk_insert(self, db_type, config, table_name, columns, rows, progress_callback):
+        """SQL Server: 写入CSV临时文件，BULK INSERT到会话临时表后整体写入目标表
+        
+        BULK INSERT按表字段顺序映射文件列，先用SELECT TOP 0 ... INTO按导入字段建临时表，
+        再INSERT ... SELECT到目标表，这样导入字段可以是目标表字段的子集。
+        临时文件必须位于数据库服务器可以访问的路径（见BULK_LOAD_CONFIG['spool_dir']）。
+        """
+        preparer = self.pool_manager.get_pool(db_type, config).dialect.identifier_preparer
+        fields_str = ', '.join(preparer.quote(column) for column in columns)
+        spool_path, row_count = self._spool_rows(rows, '.csv', None)
+        try:
+            file_literal = spool_path.replace("'", "''")
+            connection = self.pool_manager.get_connection(db_type, config)
+            try:
+                with connection.begin():
+                    connection.execute(text(f"SELECT TOP 0 {fields_str} INTO #bulk_stage FROM {table_name}"))
+                    connection.execute(text(
+                        f"BULK INSERT #bulk_stage FROM '{file_literal}' WITH ("
+                        f"FORMAT = 'CSV', FIELDTERMINATOR = ',', ROWTERMINATOR = '0x0a', "
+                        f"CODEPAGE = '65001', KEEPNULLS, TABLOCK)"
+                    ))
+                    connection.execute(text(
+                        f"INSERT INTO {table_name} WITH (TABLOCK) ({fields_str}) SELECT {fields_str} FROM #bulk_stage"
+                    ))
+                    connection.execute(text("DROP TABLE #bulk_stage"))
+            finally:
+                connection.close()
+        finally:
+            self._remove_spool_file(spool_path)
+        
+        progress_callback(row_count)
+        return {'inserted_rows': row_count, 'chunks': 1}
+    
+    def _bulk_load_array_dml(self, db_type, config, table_name, columns, rows, progress_callback):
+        """Oracle: 使用APPEND_VALUES提示的直接路径数组DML
+        
+        直接路径插入后同一事务内不能再次写入该表，因此每个数组块单独提交。
+        """
+        preparer = self.pool_manager.get_pool(db_type, config).dialect.identifier_preparer
+        fields_str = ', '.join(preparer.quote(column) for column in columns)
+        values_str = ', '.join(f":{i + 1}" for i in range(len(columns)))
+        insert_sql = f"INSERT /*+ APPEND_VALUES */ INTO {table_name} ({fields_str}) VALUES ({values_str})"
+        array_size = BULK_LOAD_CONFIG['oracle_array_size']
+        
+        inserted_rows = 0
+        chunks = 0
+        connection = self.pool_manager.get_connection(db_type, config)
+        try:
+            # 直接使用驱动游标，按位置绑定整块数组
+            raw_connection = connection.connection
+            cursor = raw_connection.cursor()
+            try:
+                iterator = iter(rows)
+                while True:
+                    chunk = [tuple(row) for row in islice(iterator, array_size)]
+                    if not chunk:
+                        break
+                    try:
+                        cursor.executemany(insert_sql, chunk)
+                        raw_connection.commit()
+                    except Exception:
+                        raw_connection.rollback()
+                        raise
+                    inserted_rows += len(chunk)
+                    chunks += 1
+                    progress_callback(inserted_rows)
+            finally:
+                cursor.close()
+        finally:
+            connection.close()
+        
+        return {'inserted_rows': inserted_rows, 'chunks': chunks}
+    
+    def _spool_rows(self, rows, suffix, row_formatter):
+        """将行数据写入临时文件
+        
+        Args:
+            rows: 行数据可迭代对象
+            suffix: 临时文件后缀
+            row_formatter: 行格式化函数，返回不含换行符的一行文本；为None时按CSV格式写入
+            
+        Returns:
+            tuple: (临时文件路径, 写入行数)
+        """
+        spool_dir = BULK_LOAD_CONFIG.get('spool_dir') or None
+        if spool_dir:
+            os.makedirs(spool_dir, exist_ok=True)
+        
+        row_count = 0
+        spool_file = tempfile.NamedTemporaryFile(mode='w', encoding='utf-8', newline='',
+                                                 suffix=suffix, prefix='bulk_load_',
+                                                 dir=spool_dir, delete=False)
+        try:
+            with spool_file:
+                if row_formatter is None:
+                    writer = csv.writer(spool_file, lineterminator='\n')
+                    for row in rows:
+                        writer.writerow(self._format_csv_value(value) for value in row)
+                        row_count += 1
+                else:
+                    for row in rows:
+                        spool_file.write(row_formatter(row))
+                        spool_file.write('\n')
+                        row_count += 1
+        except Exception:
+            self._remove_spool_file(spool_file.name)
+            raise
+        
+        app_logger.debug(f"批量导入数据已写入临时文件: {spool_file.name}, 共{row_count}行")
+        return os.path.abspath(spool_file.name), row_count
+    
+    @staticmethod
+    def _format_csv_value(value):
+        """格式化CSV字段值，None写为空字段（配合KEEPNULLS导入为NULL）"""
+        if value is None:
+            return None
+        if isinstance(value, bool):
+            return 1 if value else 0
+        return value
+    
+    @staticmethod
+    def _format_mysql_tsv_row(row):
+        """按LOAD DATA默认转义规则格式化一行，None写为\\N"""
+        fields = []
+        for value in row:
+            if value is None:
+                fields.append('\\N')
+                continue
+            if isinstance(value, bool):
+                value = 1 if value else 0
+            fields.append(str(value).translate(MYSQL_TSV_ESCAPES))
+        return '\t'.join(fields)
+    
+    @staticmethod
+    def _remove_spool_file(path):
+        """删除临时数据文件"""
+        try:
+            if path and os.path.exists(path):
+                os.remove(path)
+        except OSError as e:
+            app_logger.warning(f"删除批量导入临时文件失败: {path}, 错误: {str(e)}")
+    
     @safe_db_operation
     def get_database_tables(self, db_type, db_config):
         """获取数据库表列表，包含表名和表备注信息
@@ -6,9 +6,10 @@
 
 import sys
 import importlib
+import threading
 import time
 from sqlalchemy import create_engine, text
-from sqlalchemy.pool import QueuePool
+from sqlalchemy.pool import QueuePool, NullPool
 from config.database_config import DEFAULT_POOL_CONFIG, TEST_CONNECTION_CONFIG
 from urllib.parse import quote_plus
 from service.exception import AppException
@@ -19,15 +20,18 @@ from service.log.tools import safe_db_operation
 DB_DRIVERS = {
     'mysql': {
         'module': 'pymysql',
-        'connection_prefix': 'mysql+pymysql'
+        'connection_prefix': 'mysql+pymysql',
+        'bulk_loader': 'load_data_infile'
     },
     'sqlserver': {
         'module': 'pyodbc',
-        'connection_prefix': 'mssql+pyodbc'
+        'connection_prefix': 'mssql+pyodbc',
+        'bulk_loader': 'bulk_insert'
     },
     'oracle': {
         'module': 'cx_Oracle',
-        'connection_prefix': 'oracle+cx_oracle'
+        'connection_prefix': 'oracle+cx_oracle',
+        'bulk_loader': 'array_dml'
     }
 }
 
@@ -35,6 +39,7 @@ class DatabasePoolManager:
     """数据库连接池管理器"""
     
     _instance = None  # 单例实例
+    _instance_lock = threading.Lock()  # 单例创建锁
     _pools = {}       # 连接池字典
     _drivers_loaded = {}  # 已加载的驱动
     
@@ -42,7 +47,9 @@ class DatabasePoolManager:
     def get_instance():
         """获取单例实例"""
         if DatabasePoolManager._instance is None:
-            DatabasePoolManager._instance = DatabasePoolManager()
+            with DatabasePoolManager._instance_lock:
+                if DatabasePoolManager._instance is None:
+                    DatabasePoolManager._instance = DatabasePoolManager()
         return DatabasePoolManager._instance
     
     def __init__(self):
@@ -52,6 +59,10 @@ class DatabasePoolManager:
             'sqlserver': False,
             'oracle': False
         }
+        # 连接池在进程生命周期内常驻，创建和销毁时加锁，避免并发请求重复创建
+        self._pools_lock = threading.RLock()
+        # 每个连接池获取连接的耗时统计
+        self._wait_stats = {}
     
     def _load_driver(self, db_type):
         """加载特定数据库的驱动
@@ -87,23 +98,92 @@ class DatabasePoolManager:
         
         pool_key = self._generate_pool_key(db_type, config)
         
-        if pool_key not in self._pools:
-            # 创建新连接池
-            engine = self._create_engine(db_type, config)
-            self._pools[pool_key] = engine
-            app_logger.info(f"已创建新的{db_type}数据库连接池")
+        engine = self._pools.get(pool_key)
+        if engine is None:
+            with self._pools_lock:
+                engine = self._pools.get(pool_key)
+                if engine is None:
+                    # 创建新连接池
+                    engine = self._create_engine(db_type, config)
+                    self._pools[pool_key] = engine
+                    self._wait_stats[pool_key] = {
+                        'count': 0,
+                        'total_wait': 0.0,
+                        'max_wait': 0.0
+                    }
+                    app_logger.info(f"已创建新的{db_type}数据库连接池: {pool_key}")
         
-        return self._pools[pool_key]
+        return engine
     
     @safe_db_operation
     def get_connection(self, db_type, config):
         """获取数据库连接"""
         pool = self.get_pool(db_type, config)
+        pool_key = self._generate_pool_key(db_type, config)
+        start_time = time.perf_counter()
         try:
-            return pool.connect()
+            connection = pool.connect()
         except Exception as e:
             app_logger.error(f"获取{db_type}数据库连接失败: {str(e)}")
             raise AppException(f"获取数据库连接失败: {str(e)}", code=500)
+        
+        self._record_wait(pool_key, time.perf_counter() - start_time)
+        return connection
+    
+    @safe_db_operation
+    def get_bulk_load_connection(self, db_type, config):
+        """获取原生批量导入专用的数据库连接
+        
+        MySQL的LOAD DATA LOCAL INFILE需要客户端允许读取本地文件，只在这个连接上启用，
+        连接池中的普通连接不启用。连接不经过连接池，关闭时直接断开。
+        """
+        self._load_driver(db_type)
+        engine = self._create_engine(db_type, config, for_bulk_load=True)
+        try:
+            return engine.connect()
+        except Exception as e:
+            app_logger.error(f"获取{db_type}批量导入连接失败: {str(e)}")
+            raise AppException(f"获取数据库连接失败: {str(e)}", code=500)
+    
+    def _record_wait(self, pool_key, elapsed):
+        """记录一次获取连接的耗时
+        
+        Args:
+            pool_key: 连接池键名
+            elapsed: 获取连接耗时(秒)
+        """
+        with self._pools_lock:
+            stats = self._wait_stats.get(pool_key)
+            if stats is None:
+                return
+            stats['count'] += 1
+            stats['total_wait'] += elapsed
+            stats['max_wait'] = max(stats['max_wait'], elapsed)
+    
+    def get_pool_stats(self):
+        """获取所有连接池的统计信息
+        
+        Returns:
+            list: 每个连接池的统计信息，包括连接池大小、已签出连接数、溢出连接数和获取连接耗时
+        """
+        stats = []
+        with self._pools_lock:
+            for key, engine in self._pools.items():
+                pool = engine.pool
+                wait_stats = self._wait_stats.get(key, {})
+                count = wait_stats.get('count', 0)
+                stats.append({
+                    'pool_key': key,
+                    'pool_size': pool.size(),
+                    'checked_in': pool.checkedin(),
+                    'checked_out': pool.checkedout(),
+                    'overflow': pool.overflow(),
+                    'max_overflow': getattr(pool, '_max_overflow', None),
+                    'checkout_count': count,
+                    'avg_wait_ms': round(wait_stats.get('total_wait', 0.0) / count * 1000, 3) if count else 0.0,
+                    'max_wait_ms': round(wait_stats.get('max_wait', 0.0) * 1000, 3)
+                })
+        return stats
     
     @safe_db_operation
     def test_connection(self, config):
@@ -162,34 +242,48 @@ class DatabasePoolManager:
             raise AppException(f"不支持的数据库类型: {db_type}", code=400)
     
     @safe_db_operation
-    def _create_engine(self, db_type, config, for_test=False):
-        """创建数据库引擎"""
+    def _create_engine(self, db_type, config, for_test=False, for_bulk_load=False):
+        """创建数据库引擎，for_bulk_load为True时创建不使用连接池的原生批量导入引擎"""
         # 构建连接字符串
         connection_string = self._build_connection_string(db_type, config)
         
         # 配置连接池参数
-        pool_options = TEST_CONNECTION_CONFIG.copy() if for_test else {
-            'pool_size': config.get('pool_size', DEFAULT_POOL_CONFIG['pool_size']),
-            'max_overflow': config.get('max_overflow', DEFAULT_POOL_CONFIG['max_overflow']),
-            'pool_timeout': config.get('pool_timeout', DEFAULT_POOL_CONFIG['pool_timeout']),
-            'pool_recycle': config.get('pool_recycle', DEFAULT_POOL_CONFIG['pool_recycle']),
-            'pool_pre_ping': True
-        }
+        poolclass = QueuePool
+        if for_bulk_load:
+            poolclass = NullPool
+            pool_options = {}
+        elif for_test:
+            pool_options = TEST_CONNECTION_CONFIG.copy()
+        else:
+            pool_options = {
+                'pool_size': config.get('pool_size', DEFAULT_POOL_CONFIG['pool_size']),
+                'max_overflow': config.get('max_overflow', DEFAULT_POOL_CONFIG['max_overflow']),
+                'pool_timeout': config.get('pool_timeout', DEFAULT_POOL_CONFIG['pool_timeout']),
+                'pool_recycle': config.get('pool_recycle', DEFAULT_POOL_CONFIG['pool_recycle']),
+                'pool_pre_ping': True
+            }
         
         # 添加数据库特定参数
         connect_args = {}
         if db_type == 'mysql' and 'mysql' in DEFAULT_POOL_CONFIG:
             connect_args.update(DEFAULT_POOL_CONFIG['mysql'])
+            # 原生批量导入需要客户端允许LOAD DATA LOCAL INFILE，只在批量导入专用连接上启用
+            if for_bulk_load:
+                connect_args['local_infile'] = True
         elif db_type == 'sqlserver' and 'sqlserver' in DEFAULT_POOL_CONFIG:
             connect_args.update(DEFAULT_POOL_CONFIG['sqlserver'])
         elif db_type == 'oracle' and 'oracle' in DEFAULT_POOL_CONFIG:
             connect_args.update(DEFAULT_POOL_CONFIG['oracle'])
         
+        # SQL Server启用pyodbc的fast_executemany，批量插入时使用参数数组一次性发送
+        if db_type == 'sqlserver':
+            pool_options['fast_executemany'] = True
+        
         try:
             # 创建引擎
             return create_engine(
                 connection_string,
-                poolclass=QueuePool,
+                poolclass=poolclass,
                 connect_args=connect_args,
                 **pool_options
             )
@@ -329,12 +423,17 @@ class DatabasePoolManager:
             raise AppException(f"生成连接池键名失败: {str(e)}", code=500)
     
     def shutdown(self):
-        """关闭所有连接池"""
-        for key, engine in list(self._pools.items()):
-            try:
-                app_logger.info(f"正在关闭连接池: {key}")
-                engine.dispose()
-                self._pools.pop(key, None)
-            except Exception as e:
-                app_logger.error(f"关闭连接池 {key} 失败: {str(e)}")
-        self._pools.clear()
\ No newline at end of file
+        """关闭所有连接池
+        
+        连接池在进程生命周期内复用，只应在进程退出或数据库配置变更时调用
+        """
+        with self._pools_lock:
+            for key, engine in list(self._pools.items()):
+                try:
+                    app_logger.info(f"正在关闭连接池: {key}")
+                    engine.dispose()
+                    self._pools.pop(key, None)
+                except Exception as e:
+                    app_logger.error(f"关闭连接池 {key} 失败: {str(e)}")
+            self._pools.clear()
+            self._wait_stats.clear()
\ No newline at end of file
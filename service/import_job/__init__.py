@@ -0,0 +1,8 @@
+"""
+导入任务服务包
+
+提供后台Excel导入任务的提交、进度查询和取消，以及多文件并行批量导入
+"""
+
+from .import_job_service import ImportJobService, ImportJob, ImportJobCancelled
+from .batch_import_service import BatchImportService
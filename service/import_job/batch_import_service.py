@@ -0,0 +1,294 @@
+"""
+多文件批量导入服务
+
+Excel解析是CPU密集型操作，受GIL限制，因此在进程池中并行解析各文件；
+解析结果按块放入有界队列，由多个写入线程各自持有连接池中的一个连接并发写入。
+同时在途的解析任务不超过解析进程数，队列满时分发阻塞，下一个文件也随之推迟提交，
+因此内存中最多保留解析进程数个文件的解析结果。
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from config.database_config import BATCH_IMPORT_CONFIG, BULK_INSERT_CONFIG
+from service.database.database_service import DatabaseService
+from service.exception import AppException
+from service.log.logger import app_logger
+from utils.database_config_util import DatabaseConfigUtil
+from utils.excel_util import ExcelUtil
+from .import_job_service import ImportJobCancelled
+from .import_rows import read_import_rows, prepare_supplements, build_import_row_builder
+
+
+class BatchImportService:
+    """多文件批量导入服务"""
+    
+    _instance = None
+    _instance_lock = threading.Lock()
+    
+    @staticmethod
+    def get_instance():
+        """获取单例实例"""
+        if BatchImportService._instance is None:
+            with BatchImportService._instance_lock:
+                if BatchImportService._instance is None:
+                    BatchImportService._instance = BatchImportService()
+        return BatchImportService._instance
+    
+    def __init__(self):
+        """初始化批量导入服务"""
+        self.db_service = DatabaseService()
+    
+    @staticmethod
+    def normalize_file_tasks(data):
+        """整理请求中的文件列表，文件未指定的参数使用请求级默认值
+        
+        Args:
+            data: 请求数据，files中每项可以是文件路径字符串或包含file_path的字典
+            
+        Returns:
+            list: 文件任务列表
+            
+        Raises:
+            AppException: 文件列表为空或参数无效时抛出
+        """
+        files = data.get('files')
+        if not isinstance(files, list) or len(files) == 0:
+            raise AppException("文件列表为空或格式错误", code=400)
+        
+        tasks = []
+        for item in files:
+            if isinstance(item, str):
+                item = {'file_path': item}
+            file_path = item.get('file_path')
+            sheet_id = item.get('sheet_id', data.get('sheet_id'))
+            if not file_path or not ExcelUtil.validate_excel_path(file_path):
+                raise AppException(f"无效的Excel文件路径: {file_path}", code=400)
+            if not sheet_id:
+                raise AppException(f"未指定工作表ID: {file_path}", code=400)
+            try:
+                sheet_name, _ = ExcelUtil.parse_sheet_id(sheet_id)
+            except Exception:
+                raise AppException(f"无效的工作表ID: {sheet_id}", code=400)
+            
+            tasks.append({
+                'file_path': file_path,
+                'sheet_id': sheet_id,
+                'sheet_name': sheet_name,
+                'start_row': item.get('start_row', data.get('start_row', 2)),
+                'condition': item.get('condition', data.get('condition')),
+                'supplements': item.get('supplements', data.get('supplements', []))
+            })
+        return tasks
+    
+    def run(self, data, job):
+        """执行多文件批量导入，作为后台导入任务的执行函数
+        
+        Args:
+            data: 请求数据，包含database_id、table_id、files及可选的默认sheet_id、start_row、
+                condition、supplements、batch_size、parse_workers、writer_connections
+            job: 后台导入任务(ImportJob)
+            
+        Returns:
+            tuple: (结果字典, HTTP状态码)
+        """
+        database_id = data.get('database_id')
+        table_id = data.get('table_id')
+        db_config = DatabaseConfigUtil.get_database_config(database_id)
+        tasks = self.normalize_file_tasks(data)
+        batch_size = data.get('batch_size') or BULK_INSERT_CONFIG['chunk_size']
+        parse_workers = min(data.get('parse_workers') or BATCH_IMPORT_CONFIG['parse_workers'] or os.cpu_count() or 1,
+                            len(tasks))
+        writer_count = max(1, data.get('writer_connections') or BATCH_IMPORT_CONFIG['writer_connections'])
+        addLog = job.logs
+        start_time = time.time()
+        
+        table_fields = self.db_service.get_table_field_info(database_id, db_config, table_id)
+        addLog.append({"type": "info", "message": f"开始批量导入{len(tasks)}个文件到表 {table_id}，"
+                                                  f"解析进程{parse_workers}个，写入连接{writer_count}个"})
+        job.set_stage('importing', 0)
+        
+        results = [{
+            "file_path": task['file_path'],
+            "sheet_id": task['sheet_id'],
+            "status": "pending",
+            "total_rows": 0,
+            "filtered_rows": 0,
+            "success_count": 0,
+            "error_count": 0,
+            "errors": []
+        } for task in tasks]
+        pending_chunks = [0] * len(tasks)
+        results_lock = threading.Lock()
+        batch_queue = queue.Queue(maxsize=BATCH_IMPORT_CONFIG['queue_size'])
+        
+        def finish_file(index):
+            # 文件的所有块写入完成后确定最终状态
+            result = results[index]
+            result['status'] = 'failed' if result['error_count'] else 'completed'
+            addLog.append({"type": "error" if result['error_count'] else "info",
+                           "message": f"文件 {os.path.basename(result['file_path'])} 导入结束，"
+                                      f"成功{result['success_count']}行，失败{result['error_count']}行"})
+        
+        def writer_loop():
+            connection = None
+            statements = {}
+            try:
+                while True:
+                    item = batch_queue.get()
+                    if item is None:
+                        break
+                    index, columns, chunk = item
+                    if job.cancel_requested:
+                        # 已取消：丢弃队列中剩余的数据块
+                        with results_lock:
+                            pending_chunks[index] -= 1
+                        continue
+                    
+                    error = None
+                    try:
+                        if connection is None:
+                            connection = self.db_service.pool_manager.get_connection(database_id, db_config)
+                        key = tuple(columns)
+                        if key not in statements:
+                            statements[key] = self.db_service.build_insert_statement(
+                                database_id, db_config, table_id, columns)
+                        self.db_service.insert_chunk(connection, statements[key], chunk)
+                    except Exception as e:
+                        error = str(e)
+                        app_logger.error(f"批量导入写入失败，文件: {results[index]['file_path']}, 错误: {error}")
+                    
+                    with results_lock:
+                        result = results[index]
+                        if error is None:
+                            result['success_count'] += len(chunk)
+                        else:
+                            result['error_count'] += len(chunk)
+                            result['errors'].append(error)
+                        pending_chunks[index] -= 1
+                        if pending_chunks[index] == 0 and result['status'] == 'writing':
+                            finish_file(index)
+                    if error is None:
+                        try:
+                            job.advance_progress(len(chunk))
+                        except ImportJobCancelled:
+                            # 取消由分发线程统一处理，写入线程继续消费队列直到收到结束标记
+                            pass
+            finally:
+                if connection is not None:
+                    connection.close()
+        
+        writers = [threading.Thread(target=writer_loop, name=f"batch-import-writer-{i}", daemon=True)
+                   for i in range(writer_count)]
+        for writer in writers:
+            writer.start()
+        
+        cancelled = False
+        executor = ProcessPoolExecutor(max_workers=parse_workers)
+        try:
+            pending_tasks = iter(enumerate(tasks))
+            futures = {}
+            while True:
+                # 同时在途的解析任务不超过解析进程数：上一个文件的数据块全部放入队列后才提交下一个文件，
+                # 避免解析进程持续产出、已完成的整文件解析结果在分发阻塞时于主进程中堆积
+                while len(futures) < parse_workers:
+                    next_task = next(pending_tasks, None)
+                    if next_task is None:
+                        break
+                    index, task = next_task
+                    futures[executor.submit(read_import_rows, task['file_path'], task['sheet_name'],
+                                            task['start_row'], task['condition'])] = index
+                if not futures:
+                    break
+                
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                future = done.pop()
+                del done
+                # 取出后不再引用已完成的future，避免其持有的整个文件解析结果在分发完成后无法释放
+                index = futures.pop(future)
+                task = tasks[index]
+                result = results[index]
+                job.check_cancelled()
+                
+                try:
+                    rows, total_rows = future.result()
+                    del future
+                except Exception as e:
+                    app_logger.error(f"批量导入解析文件失败: {task['file_path']}, 错误: {str(e)}")
+                    with results_lock:
+                        result['status'] = 'failed'
+                        result['errors'].append(f"读取Excel数据失败: {str(e)}")
+                    addLog.append({"type": "error", "message": f"读取文件 {os.path.basename(task['file_path'])} 失败: {str(e)}"})
+                    continue
+                
+                result['total_rows'] = total_rows
+                result['filtered_rows'] = len(rows)
+                addLog.append({"type": "info", "message": f"已解析文件 {os.path.basename(task['file_path'])}，"
+                                                          f"共{total_rows}行，筛选后{len(rows)}行"})
+                if not rows:
+                    with results_lock:
+                        finish_file(index)
+                    continue
+                
+                job.add_total_rows(len(rows))
+                row_width = max(len(row) for row in rows)
+                columns, row_builder = build_import_row_builder(
+                    table_fields, row_width, prepare_supplements(task['supplements'], table_fields))
+                
+                chunk_count = (len(rows) + batch_size - 1) // batch_size
+                with results_lock:
+                    pending_chunks[index] = chunk_count
+                    result['status'] = 'writing'
+                for offset in range(0, len(rows), batch_size):
+                    chunk = [row_builder(row) for row in rows[offset:offset + batch_size]]
+                    # 队列满时阻塞，等待写入线程消费
+                    batch_queue.put((index, columns, chunk))
+                    job.check_cancelled()
+                # 数据块已全部放入队列，释放本文件的解析结果
+                del rows
+        except ImportJobCancelled:
+            cancelled = True
+            addLog.append({"type": "warning", "message": "批量导入任务已取消，未开始的文件将被跳过"})
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            for _ in writers:
+                batch_queue.put(None)
+            for writer in writers:
+                writer.join()
+        
+        # 分发完成后才请求取消时，写入线程会丢弃剩余数据块
+        cancelled = cancelled or job.cancel_requested
+        success_count = sum(result['success_count'] for result in results)
+        error_count = sum(result['error_count'] for result in results)
+        failed_files = sum(1 for result in results if result['status'] == 'failed')
+        duration = round(time.time() - start_time, 2)
+        for result in results:
+            if result['status'] in ('pending', 'writing'):
+                result['status'] = 'cancelled'
+        
+        addLog.append({"type": "info", "message": f"批量导入结束，共导入{success_count}行数据，"
+                                                  f"失败文件{failed_files}个，耗时{duration}秒"})
+        app_logger.info(f"批量导入结束，表: {table_id}, 成功:{success_count}, 失败:{error_count}, 耗时:{duration}秒")
+        
+        success = not cancelled and failed_files == 0
+        if cancelled:
+            message = "批量导入任务已取消"
+        elif success:
+            message = "批量导入成功"
+        else:
+            message = "部分文件导入失败"
+        return {
+            "success": success,
+            "message": message,
+            "success_count": success_count,
+            "error_count": error_count,
+            "total_rows": job.total_rows,
+            "files": results,
+            "details": {
+                "duration": duration,
+                "parse_workers": parse_workers,
+                "writer_connections": writer_count
+            }
+        }, 200 if success else (499 if cancelled else 500)
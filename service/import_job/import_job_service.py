@@ -0,0 +1,264 @@
+"""
+导入任务服务
+
+在普通业务线程池中执行Excel导入，记录任务状态、进度、速率和批次日志，支持取消
+"""
+
+import threading
+import time
+import uuid
+from config.database_config import IMPORT_JOB_CONFIG
+from service.exception import AppException
+from service.log.logger import app_logger
+from service.thread.thread_pool import get_normal_business_pool
+
+# 任务状态
+JOB_STATUS_PENDING = 'pending'
+JOB_STATUS_RUNNING = 'running'
+JOB_STATUS_COMPLETED = 'completed'
+JOB_STATUS_FAILED = 'failed'
+JOB_STATUS_CANCELLED = 'cancelled'
+
+FINISHED_STATUSES = (JOB_STATUS_COMPLETED, JOB_STATUS_FAILED, JOB_STATUS_CANCELLED)
+
+
+class ImportJobCancelled(AppException):
+    """导入任务被取消时抛出的异常，details中包含已插入行数"""
+    
+    def __init__(self, inserted_rows=0):
+        super().__init__("导入任务已取消", code=499, details={"inserted_rows": inserted_rows})
+
+
+class ImportJob:
+    """单个导入任务的状态
+    
+    日志列表直接作为导入过程的addLog使用，工作线程只追加，查询方按偏移量增量读取
+    """
+    
+    def __init__(self, job_id, params):
+        self.job_id = job_id
+        self.params = params
+        self.status = JOB_STATUS_PENDING
+        self.stage = 'pending'
+        self.total_rows = 0
+        self.processed_rows = 0
+        self.logs = []
+        self.details = None
+        self.result = None
+        self.status_code = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.stage_started_at = None
+        self.finished_at = None
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+    
+    @property
+    def cancel_requested(self):
+        """是否已请求取消"""
+        return self._cancel_event.is_set()
+    
+    def request_cancel(self):
+        """请求取消任务，工作线程在下一个检查点停止"""
+        self._cancel_event.set()
+    
+    def check_cancelled(self):
+        """检查点：已请求取消时抛出ImportJobCancelled"""
+        if self._cancel_event.is_set():
+            raise ImportJobCancelled(self.processed_rows if self.stage == 'importing' else 0)
+    
+    def set_stage(self, stage, total_rows=None):
+        """切换任务阶段，阶段切换时重置已处理行数"""
+        with self._lock:
+            self.stage = stage
+            self.stage_started_at = time.time()
+            self.processed_rows = 0
+            if total_rows is not None:
+                self.total_rows = total_rows
+    
+    def update_progress(self, processed_rows):
+        """更新当前阶段的已处理行数，同时作为取消检查点"""
+        with self._lock:
+            self.processed_rows = processed_rows
+        self.check_cancelled()
+    
+    def add_total_rows(self, count):
+        """增加当前阶段的总行数，批量导入在每个文件解析完成后调用"""
+        with self._lock:
+            self.total_rows += count
+    
+    def advance_progress(self, count):
+        """累加已处理行数，供多个写入线程并发调用，同时作为取消检查点"""
+        with self._lock:
+            self.processed_rows += count
+        self.check_cancelled()
+    
+    def set_details(self, details):
+        """设置任务明细（如批量任务中每个文件的状态列表），查询任务时一并返回"""
+        with self._lock:
+            self.details = details
+    
+    def update_detail(self, index, **fields):
+        """更新任务明细中的一项，供多个工作线程并发调用"""
+        with self._lock:
+            self.details[index].update(fields)
+    
+    def mark_running(self):
+        """标记任务开始执行"""
+        with self._lock:
+            self.status = JOB_STATUS_RUNNING
+            self.started_at = time.time()
+    
+    def mark_finished(self, status, result=None, status_code=None):
+        """标记任务结束"""
+        with self._lock:
+            self.status = status
+            self.result = result
+            self.status_code = status_code
+            self.finished_at = time.time()
+    
+    @property
+    def finished(self):
+        """任务是否已结束"""
+        return self.status in FINISHED_STATUSES
+    
+    def to_dict(self, log_offset=0):
+        """转换为字典，日志只返回log_offset之后的部分，速率按当前阶段计算
+        
+        Args:
+            log_offset: 调用方已读取的日志条数
+            
+        Returns:
+            dict: 任务状态信息
+        """
+        with self._lock:
+            end_time = self.finished_at or time.time()
+            elapsed = round(end_time - self.started_at, 2) if self.started_at else 0
+            stage_elapsed = end_time - self.stage_started_at if self.stage_started_at else 0
+            rows_per_sec = round(self.processed_rows / stage_elapsed, 1) if stage_elapsed > 0 else 0
+            progress = int(self.processed_rows * 100 / self.total_rows) if self.total_rows else 0
+            logs = self.logs[log_offset:]
+            info = {
+                "job_id": self.job_id,
+                "status": self.status,
+                "stage": self.stage,
+                "total_rows": self.total_rows,
+                "processed_rows": self.processed_rows,
+                "progress": progress,
+                "rows_per_sec": rows_per_sec,
+                "elapsed": elapsed,
+                "cancel_requested": self.cancel_requested,
+                "logs": logs,
+                "log_offset": log_offset + len(logs),
+                "result": self.result
+            }
+            if self.details is not None:
+                info["details"] = [dict(detail) for detail in self.details]
+            return info
+
+
+class ImportJobService:
+    """导入任务服务"""
+    
+    _instance = None
+    _instance_lock = threading.Lock()
+    
+    @staticmethod
+    def get_instance():
+        """获取单例实例"""
+        if ImportJobService._instance is None:
+            with ImportJobService._instance_lock:
+                if ImportJobService._instance is None:
+                    ImportJobService._instance = ImportJobService()
+        return ImportJobService._instance
+    
+    def __init__(self):
+        """初始化导入任务服务"""
+        self._jobs = {}
+        self._jobs_lock = threading.Lock()
+    
+    def submit(self, params, runner):
+        """提交导入任务到普通业务线程池
+        
+        Args:
+            params: 导入请求参数
+            runner: 执行函数，签名为runner(params, job)，返回(结果字典, 状态码)
+            
+        Returns:
+            ImportJob: 新建的任务
+        """
+        self._cleanup_finished_jobs()
+        
+        job = ImportJob(uuid.uuid4().hex, params)
+        with self._jobs_lock:
+            self._jobs[job.job_id] = job
+        
+        get_normal_business_pool().submit(self._run_job, job, runner)
+        app_logger.info(f"已提交导入任务: {job.job_id}, 表: {params.get('table_id')}")
+        return job
+    
+    def get_job(self, job_id):
+        """获取任务
+        
+        Raises:
+            AppException: 任务不存在时抛出
+        """
+        with self._jobs_lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise AppException(f"导入任务不存在: {job_id}", code=404)
+        return job
+    
+    def cancel(self, job_id):
+        """请求取消任务
+        
+        Returns:
+            ImportJob: 对应的任务
+        """
+        job = self.get_job(job_id)
+        if not job.finished:
+            job.request_cancel()
+            job.logs.append({"type": "warning", "message": "已请求取消导入任务"})
+            app_logger.info(f"已请求取消导入任务: {job_id}")
+        return job
+    
+    def list_jobs(self):
+        """列出所有任务的概要信息"""
+        with self._jobs_lock:
+            jobs = list(self._jobs.values())
+        summaries = []
+        for job in sorted(jobs, key=lambda item: item.created_at, reverse=True):
+            summary = job.to_dict(log_offset=len(job.logs))
+            summary.pop('logs')
+            summary['table_id'] = job.params.get('table_id')
+            summaries.append(summary)
+        return summaries
+    
+    def _run_job(self, job, runner):
+        """在线程池中执行任务"""
+        if job.cancel_requested:
+            job.mark_finished(JOB_STATUS_CANCELLED, {"success": False, "message": "导入任务已取消"})
+            return
+        
+        job.mark_running()
+        try:
+            result, status_code = runner(job.params, job)
+            if job.cancel_requested and not result.get('success'):
+                status = JOB_STATUS_CANCELLED
+            else:
+                status = JOB_STATUS_COMPLETED if result.get('success') else JOB_STATUS_FAILED
+            job.mark_finished(status, result, status_code)
+        except Exception as e:
+            app_logger.error(f"导入任务执行异常: {job.job_id}, 错误: {str(e)}", exc_info=True)
+            job.logs.append({"type": "error", "message": f"导入过程中发生异常: {str(e)}"})
+            job.mark_finished(JOB_STATUS_FAILED, {"success": False, "message": str(e)}, 500)
+        app_logger.info(f"导入任务结束: {job.job_id}, 状态: {job.status}")
+    
+    def _cleanup_finished_jobs(self):
+        """清理超过保留时间的已结束任务"""
+        expire_before = time.time() - IMPORT_JOB_CONFIG['job_retention_seconds']
+        with self._jobs_lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished_at and job.finished_at < expire_before]
+            for job_id in expired:
+                del self._jobs[job_id]
@@ -0,0 +1,189 @@
+"""
+导入行数据处理
+
+Excel导入的条件筛选、补充字段和插入值构建，单文件导入和批量导入共用。
+read_import_rows为模块级函数，可以在进程池中执行；单文件导入使用ImportRowSource边读取边写入。
+"""
+
+from utils.excel_util import ExcelUtil
+
+
+def parse_import_condition(condition):
+    """解析导入筛选条件
+    
+    Args:
+        condition: 请求中的条件字典，包含column和type
+        
+    Returns:
+        tuple: (条件列索引, 条件类型)，未设置条件时为(None, None)
+    """
+    if condition and condition.get('column') is not None and condition.get('type'):
+        return int(condition['column']), condition['type']
+    return None, None
+
+
+def match_import_condition(row, column_index, condition_type):
+    """判断Excel行数据是否满足导入筛选条件
+    
+    Args:
+        row: 行数据列表
+        column_index: 条件列索引
+        condition_type: 条件类型（empty/not_empty）
+        
+    Returns:
+        bool: 是否保留该行
+    """
+    # 如果行数据不够长，忽略这一行
+    if len(row) <= column_index:
+        return False
+    
+    cell_value = row[column_index]
+    if condition_type == 'empty':
+        return cell_value is None or cell_value == ''
+    if condition_type == 'not_empty':
+        return cell_value is not None and cell_value != ''
+    # 可以根据需要添加更多条件类型
+    return False
+
+
+class ImportRowSource:
+    """按导入筛选条件流式读取Excel行数据的可迭代对象
+    
+    内存中不保留行数据，可以直接交给DatabaseService.bulk_insert/bulk_load逐块写入。
+    每次遍历都从文件重新读取，原生批量导入回退为批量插入时可以再次遍历。
+    遍历过程中累计读取的总行数、筛选后的行数和筛选后行数据的最大列数。
+    设置row_builder后遍历生成的是转换后的插入值列表。
+    """
+    
+    def __init__(self, file_path, sheet_name, start_row, condition=None):
+        """
+        Args:
+            file_path: Excel文件路径
+            sheet_name: 工作表名称
+            start_row: 开始导入行（从1开始）
+            condition: 可选的导入条件
+        """
+        self.file_path = file_path
+        self.sheet_name = sheet_name
+        self.start_row = start_row
+        self.column_index, self.condition_type = parse_import_condition(condition)
+        self.row_builder = None
+        self.total_rows = 0
+        self.filtered_rows = 0
+        self.row_width = 0
+    
+    def __iter__(self):
+        self.total_rows = 0
+        self.filtered_rows = 0
+        for row in ExcelUtil.iter_excel_data(
+            file_path=self.file_path,
+            sheet_name=self.sheet_name,
+            start_row=self.start_row - 1,
+            row_limit=None,
+            ignore_empty_rows=True
+        ):
+            self.total_rows += 1
+            if self.condition_type is None or match_import_condition(row, self.column_index, self.condition_type):
+                self.filtered_rows += 1
+                if len(row) > self.row_width:
+                    self.row_width = len(row)
+                yield self.row_builder(row) if self.row_builder is not None else row
+    
+    def first_row(self):
+        """读取第一行满足条件的数据，没有时返回None，用于在写入前确定插入字段"""
+        rows = iter(self)
+        try:
+            return next(rows, None)
+        finally:
+            rows.close()
+
+
+def read_import_rows(file_path, sheet_name, start_row, condition=None):
+    """读取Excel工作表并应用导入筛选条件
+    
+    批量导入时在子进程中执行，返回值需要可序列化。
+    
+    Args:
+        file_path: Excel文件路径
+        sheet_name: 工作表名称
+        start_row: 开始导入行（从1开始）
+        condition: 可选的导入条件
+        
+    Returns:
+        tuple: (筛选后的行数据列表, 读取的总行数)
+    """
+    source = ImportRowSource(file_path, sheet_name, start_row, condition)
+    filtered_data = list(source)
+    return filtered_data, source.total_rows
+
+
+def prepare_supplements(supplements, table_fields):
+    """整理已启用的补充字段，将字段序号转换为字段名
+    
+    Args:
+        supplements: 请求中的补充字段列表
+        table_fields: 表字段信息列表
+        
+    Returns:
+        list: 补充字段列表，每项包含name、column_name和value
+    """
+    prepared_supplements = []
+    for supplement in supplements or []:
+        if supplement.get('enabled') and supplement.get('column') is not None and 'value' in supplement:
+            column_index = int(supplement['column'])
+            if column_index < len(table_fields):
+                field_name = table_fields[column_index]['name']
+                prepared_supplements.append({
+                    'enabled': True,
+                    'name': field_name,
+                    'column_name': supplement.get('column_name', f"列{column_index}"),
+                    'value': supplement['value']
+                })
+    return prepared_supplements
+
+
+def build_import_row_builder(table_fields, row_width, prepared_supplements):
+    """构建导入字段列表和行转换函数
+    
+    Excel第i列映射到表的第i个字段，字符串值去除前后空白；
+    补充字段的值会覆盖同名字段，或追加为新的插入字段。
+    
+    Args:
+        table_fields: 表字段信息列表
+        row_width: Excel行数据的列数
+        prepared_supplements: 已启用的补充字段列表
+        
+    Returns:
+        tuple: (字段名列表, 将Excel行转换为插入值列表的函数)
+    """
+    columns = [field['name'] for field in table_fields[:row_width]]
+    mapped_count = len(columns)
+    
+    # 补充字段位置和值：已映射的字段直接覆盖，否则追加到字段列表末尾
+    supplement_values = {}
+    for supplement in prepared_supplements:
+        field_name = supplement.get('name')
+        if not field_name:
+            continue
+        value = supplement['value']
+        # 处理字符串类型的补充字段值：去除前后多余的空白
+        if isinstance(value, str):
+            value = value.strip()
+        if field_name not in columns:
+            columns.append(field_name)
+        supplement_values[columns.index(field_name)] = value
+    
+    def build_row(row_data):
+        values = []
+        for col_index in range(mapped_count):
+            cell_value = row_data[col_index] if col_index < len(row_data) else None
+            # 处理字符串类型的值：去除前后多余的空白
+            if isinstance(cell_value, str):
+                cell_value = cell_value.strip()
+            values.append(cell_value)
+        values.extend([None] * (len(columns) - mapped_count))
+        for position, value in supplement_values.items():
+            values[position] = value
+        return values
+    
+    return columns, build_row
@@ -23,25 +23,33 @@ def init_knowledge_base():
             app_logger.info(f"创建知识库目录: {directory}")
             print(f"[DEBUG] 创建知识库目录: {directory}")
     
-    # 初始化元数据文件
-    if not os.path.exists(KB_METADATA_PATH):
-        from service.knowledge_base.kb_service import init_kb_metadata
-        init_kb_metadata()
-        print("[DEBUG] 初始化知识库元数据文件")
+    # 初始化元数据存储
+    from service.knowledge_base.kb_service import init_kb_metadata
+    init_kb_metadata()
+    print("[DEBUG] 初始化知识库元数据存储")
     
-    # 尝试连接到Milvus
+    # 尝试连接到向量库
     try:
-        from service.knowledge_base.kb_service import ensure_milvus_collection
-        print(f"[DEBUG] 尝试连接到Milvus服务 {MILVUS_HOST}:{MILVUS_PORT}")
-        if ensure_milvus_collection():
-            app_logger.info("成功连接到Milvus向量数据库")
-            print("[DEBUG] 成功连接到Milvus向量数据库")
+        from service.knowledge_base.vector_store import get_vector_store
+        from service.knowledge_base.kb_config import VECTOR_STORE_BACKEND
+        print(f"[DEBUG] 尝试连接到向量库，配置: {VECTOR_STORE_BACKEND}, Milvus服务 {MILVUS_HOST}:{MILVUS_PORT}")
+        vector_store = get_vector_store()
+        if vector_store.ensure_ready():
+            app_logger.info(f"成功连接到向量库: {vector_store.name}")
+            print(f"[DEBUG] 成功连接到向量库: {vector_store.name}")
+            
+            # 关键词索引为空而知识库已有内容时（例如升级前导入的数据），从向量库重建
+            from service.knowledge_base.kb_service import get_kb_stats, rebuild_keyword_index
+            from service.knowledge_base.keyword_index import get_keyword_index
+            if get_keyword_index().doc_count == 0 and get_kb_stats()["total_chunks"] > 0:
+                print("[DEBUG] 关键词索引为空，开始从向量库重建")
+                rebuild_keyword_index()
         else:
-            app_logger.warning("无法连接到Milvus向量数据库，部分知识库功能可能不可用")
-            print("[DEBUG] 警告: 无法连接到Milvus向量数据库，部分知识库功能可能不可用")
+            app_logger.warning(f"无法连接到向量库: {vector_store.name}，部分知识库功能可能不可用")
+            print(f"[DEBUG] 警告: 无法连接到向量库: {vector_store.name}，部分知识库功能可能不可用")
     except Exception as e:
-        app_logger.error(f"初始化Milvus连接时发生错误: {str(e)}")
-        print(f"[DEBUG] 错误: 初始化Milvus连接时发生错误: {str(e)}")
+        app_logger.error(f"初始化向量库连接时发生错误: {str(e)}")
+        print(f"[DEBUG] 错误: 初始化向量库连接时发生错误: {str(e)}")
         
     # 尝试测试Ollama嵌入模型
     try:
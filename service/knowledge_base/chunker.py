@@ -0,0 +1,196 @@
+"""
+文档分块
+
+每种文档类型用一个预编译的正则一次扫描全文，得到条款、章节、表格、摘要和段落分隔的位置，
+各类文档再按这些位置直接切片，整体耗时与文档长度成线性关系，不再对每个条款做惰性匹配和前瞻回溯。
+切出的块再按MAX_CHUNK_SIZE拆分过长的块（相邻窗口重叠CHUNK_OVERLAP个字符），并把过短的块与后一块合并。
+"""
+
+import bisect
+import re
+from typing import Dict, List, Optional, Tuple
+from service.knowledge_base.kb_config import DEFAULT_CHUNK_SIZE, MAX_CHUNK_SIZE, MIN_CHUNK_SIZE, CHUNK_OVERLAP
+
+# 法律文档的条款边界，以字面量“第”开头，正则引擎可以直接跳到候选位置
+_LEGAL_BOUNDARY_PATTERN = re.compile(r'(?P<article>第[一二三四五六七八九十百千]+条)')
+# 审计报告的章节、表格标题、摘要标题和段落分隔，开头的前瞻字符集让引擎跳过不可能匹配的位置
+_AUDIT_BOUNDARY_PATTERN = re.compile(
+    r'(?=[一二三四五六七八九十表摘概总E\n])(?:'
+    r'(?P<chapter>[一二三四五六七八九十]、)'
+    r'|(?P<table>表\d+[：:])'
+    r'|(?P<summary>摘要|概述|总结|Executive Summary)'
+    r'|(?P<paragraph>\n\n))'
+)
+_BOUNDARY_PATTERNS = {
+    'legal': _LEGAL_BOUNDARY_PATTERN,
+    'audit': _AUDIT_BOUNDARY_PATTERN
+}
+# 拆分过长的块时优先在这些字符之后断开
+_SPLIT_CHARS = '\n。！？；!?;'
+# 摘要最长截取的字符数（摘要后没有空行时）
+_SUMMARY_MAX_LENGTH = 2000
+# 表格块的最小长度，过短的匹配视为正文中的引用
+_TABLE_MIN_LENGTH = 50
+
+
+def scan_boundaries(content: str, doc_type: str) -> Dict[str, List[int]]:
+    """一次扫描全文，返回该文档类型各类边界的起始位置（升序）"""
+    pattern = _BOUNDARY_PATTERNS[doc_type]
+    boundaries = {name: [] for name in pattern.groupindex}
+    for match in pattern.finditer(content):
+        boundaries[match.lastgroup].append(match.start())
+    return boundaries
+
+
+def _slices_between(content: str, starts: List[int]) -> List[str]:
+    """以每个起始位置切到下一个起始位置（最后一个切到文末）"""
+    chunks = []
+    for index, start in enumerate(starts):
+        end = starts[index + 1] if index + 1 < len(starts) else len(content)
+        text = content[start:end].strip()
+        if text:
+            chunks.append(text)
+    return chunks
+
+
+def _next_paragraph_break(paragraphs: List[int], position: int) -> int:
+    """position之后第一个段落分隔的位置，没有时返回-1"""
+    index = bisect.bisect_left(paragraphs, position)
+    return paragraphs[index] if index < len(paragraphs) else -1
+
+
+def chunk_legal(content: str, boundaries: Dict[str, List[int]]) -> List[str]:
+    """法律文档按条款分块，第一条之前的内容作为单独的块"""
+    articles = boundaries['article']
+    if not articles:
+        return []
+    chunks = []
+    intro = content[:articles[0]].strip()
+    if intro:
+        chunks.append(intro)
+    chunks.extend(_slices_between(content, articles))
+    return chunks
+
+
+def chunk_audit(content: str, boundaries: Dict[str, List[int]]) -> List[str]:
+    """审计报告三层分级切割：全文摘要、章节、表格"""
+    chunks = []
+    paragraphs = boundaries['paragraph']
+
+    # 1. 全文摘要：第一个摘要标题到其后的第一个空行
+    if boundaries['summary']:
+        summary_start = boundaries['summary'][0]
+        summary_end = _next_paragraph_break(paragraphs, summary_start)
+        if summary_end == -1:
+            summary_end = min(summary_start + _SUMMARY_MAX_LENGTH, len(content))
+        summary = content[summary_start:summary_end].strip()
+        if summary:
+            chunks.append(summary)
+
+    # 2. 按章节切割
+    chunks.extend(_slices_between(content, boundaries['chapter']))
+
+    # 3. 表格：表格标题到其后的第一个空行
+    for table_start in boundaries['table']:
+        table_end = _next_paragraph_break(paragraphs, table_start)
+        if table_end == -1:
+            continue
+        table_text = content[table_start:table_end].strip()
+        if len(table_text) > _TABLE_MIN_LENGTH:
+            chunks.append(table_text)
+    return chunks
+
+
+def chunk_paragraphs(content: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[str]:
+    """按段落分块，合并短段落"""
+    chunks = []
+    current_parts: List[str] = []
+    current_length = 0
+    for para in content.split('\n\n'):
+        para = para.strip()
+        if not para:
+            continue
+        # 如果当前段落加上新段落不超过块大小，则合并
+        if current_length + len(para) < chunk_size:
+            current_length += len(para) + (1 if current_parts else 0)
+            current_parts.append(para)
+        else:
+            if current_parts:
+                chunks.append("\n".join(current_parts))
+            current_parts = [para]
+            current_length = len(para)
+    if current_parts:
+        chunks.append("\n".join(current_parts))
+    return chunks
+
+
+def split_long_chunk(text: str, max_size: int = MAX_CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """将超过max_size的块拆成重叠窗口，尽量在句末或换行处断开"""
+    if len(text) <= max_size:
+        return [text]
+    overlap = max(0, min(overlap, max_size // 2))
+    pieces = []
+    start = 0
+    while start < len(text):
+        end = min(start + max_size, len(text))
+        if end < len(text):
+            # 只在窗口后半段寻找断点，避免切出过短的块
+            split_at = max(text.rfind(char, start + max_size // 2, end) for char in _SPLIT_CHARS)
+            if split_at != -1:
+                end = split_at + 1
+        piece = text[start:end].strip()
+        if piece:
+            pieces.append(piece)
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return pieces
+
+
+def enforce_chunk_size(chunks: List[str], max_size: int = MAX_CHUNK_SIZE, min_size: int = MIN_CHUNK_SIZE,
+                       overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """拆分过长的块，并把短于min_size的块与后一块合并（合并后不超过max_size）"""
+    sized = []
+    for chunk in chunks:
+        sized.extend(split_long_chunk(chunk, max_size, overlap))
+
+    merged: List[str] = []
+    pending: Optional[str] = None
+    for chunk in sized:
+        if pending is not None:
+            if len(pending) + 1 + len(chunk) <= max_size:
+                chunk = pending + "\n" + chunk
+            else:
+                merged.append(pending)
+            pending = None
+        if len(chunk) < min_size:
+            pending = chunk
+        else:
+            merged.append(chunk)
+    if pending is not None:
+        # 最后一个短块并入前一块，放不下时单独保留
+        if merged and len(merged[-1]) + 1 + len(pending) <= max_size:
+            merged[-1] = merged[-1] + "\n" + pending
+        else:
+            merged.append(pending)
+    return merged
+
+
+def split_fixed_size(content: str, chunk_size: int) -> List[str]:
+    """按固定字符数分块，跳过空白块"""
+    chunks = []
+    for i in range(0, len(content), chunk_size):
+        chunk = content[i:i + chunk_size]
+        if chunk.strip():
+            chunks.append(chunk)
+    return chunks
+
+
+def chunk_by_structure(content: str, doc_type: str) -> Tuple[List[str], Dict[str, List[int]]]:
+    """按文档类型的结构分块（未做大小调整），同时返回扫描到的边界"""
+    if doc_type in _BOUNDARY_PATTERNS:
+        boundaries = scan_boundaries(content, doc_type)
+        if doc_type == 'legal':
+            return chunk_legal(content, boundaries), boundaries
+        return chunk_audit(content, boundaries), boundaries
+    return chunk_paragraphs(content), {}
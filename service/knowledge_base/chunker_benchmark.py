@@ -0,0 +1,78 @@
+"""
+文档分块性能测试
+
+生成大型合成法规和审计报告，测量按结构分块与完整分块（含大小调整）的耗时。
+用法: python -m service.knowledge_base.chunker_benchmark [条款数]
+"""
+
+import random
+import sys
+import time
+from service.knowledge_base.chunker import chunk_by_structure, enforce_chunk_size
+
+_DIGITS = '一二三四五六七八九'
+_SENTENCES = [
+    '当事人应当按照约定全面履行自己的义务。',
+    '违反本条规定的，由有关主管部门责令改正，给予警告，没收违法所得。',
+    '前款规定的期限届满后，当事人可以依照本法第十条的规定申请复议；',
+    '法律、行政法规另有规定的，依照其规定。\n'
+]
+
+
+def chinese_number(number: int) -> str:
+    """将1-9999的整数转换为中文数字（用于条款编号）"""
+    text = ''
+    for digit, unit in ((number // 1000, '千'), (number // 100 % 10, '百'), (number // 10 % 10, '十')):
+        if digit:
+            text += _DIGITS[digit - 1] + unit
+    if number % 10:
+        text += _DIGITS[number % 10 - 1]
+    return text
+
+
+def build_statute(article_count: int, seed: int = 0) -> str:
+    """生成合成法规文本，条款长度随机，偶尔出现超长条款"""
+    rng = random.Random(seed)
+    parts = ['中华人民共和国合成法\n\n第一章 总则\n\n']
+    for number in range(1, article_count + 1):
+        repeat = rng.randint(1, 12) if rng.random() > 0.01 else rng.randint(200, 400)
+        body = ''.join(rng.choice(_SENTENCES) for _ in range(repeat))
+        parts.append(f'第{chinese_number(number % 10000 or 1)}条 {body}\n')
+    return ''.join(parts)
+
+
+def build_audit_report(chapter_count: int, seed: int = 0) -> str:
+    """生成合成审计报告，包含摘要、章节和表格"""
+    rng = random.Random(seed)
+    parts = ['审计报告\n\n摘要：本次审计共发现问题若干，详见各章节。\n\n']
+    for number in range(chapter_count):
+        parts.append(f'{_DIGITS[number % 9]}、审计发现\n' + '经审计，该单位存在资金管理不规范的问题。' * rng.randint(5, 60))
+        parts.append(f'\n表{number + 1}：' + '项目,金额,比例;' * rng.randint(5, 20) + '\n\n')
+    return ''.join(parts)
+
+
+def run_benchmark(content: str, doc_type: str, rounds: int = 3):
+    """测量分块耗时，返回(按结构分块秒数, 完整分块秒数, 块数, 字符数)"""
+    structure_seconds = full_seconds = float('inf')
+    chunks = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        chunks, _ = chunk_by_structure(content, doc_type)
+        structure_seconds = min(structure_seconds, time.perf_counter() - start)
+        start = time.perf_counter()
+        chunks = enforce_chunk_size(chunk_by_structure(content, doc_type)[0])
+        full_seconds = min(full_seconds, time.perf_counter() - start)
+    return structure_seconds, full_seconds, len(chunks), len(content)
+
+
+if __name__ == '__main__':
+    article_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    documents = [
+        ('legal', build_statute(article_count)),
+        ('audit', build_audit_report(max(article_count // 10, 1)))
+    ]
+    for doc_type, content in documents:
+        structure_seconds, full_seconds, chunk_count, char_count = run_benchmark(content, doc_type)
+        print(f"{doc_type}: {char_count / 1e6:.1f}M字符, {chunk_count}块, "
+              f"结构分块 {structure_seconds * 1000:.1f}ms, 完整分块 {full_seconds * 1000:.1f}ms, "
+              f"{char_count / 1e6 / full_seconds:.1f}M字符/秒")
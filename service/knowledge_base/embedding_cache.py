@@ -0,0 +1,158 @@
+"""
+嵌入向量缓存
+
+以(模型名, 文本sha256)为键，将嵌入向量以float32二进制存入本地SQLite。
+文本内容不变时直接复用向量，不再请求嵌入服务；向量总大小超过上限时淘汰最久未使用的记录。
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+import numpy as np
+from service.log.logger import app_logger
+from service.knowledge_base.kb_config import EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_MB
+
+# SQLite单条语句的参数数量限制
+_SQL_BATCH_SIZE = 500
+
+
+def text_hash(text: str) -> str:
+    """计算文本的sha256摘要"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """基于SQLite的嵌入向量缓存"""
+    
+    def __init__(self, db_path: str, max_bytes: int):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "last_used REAL NOT NULL, PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+        app_logger.info(f"嵌入向量缓存已打开: {db_path}, 当前大小: {self._total_bytes // 1024}KB")
+    
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        """批量查询缓存
+        
+        Args:
+            model: 模型名
+            hashes: 文本摘要列表
+            
+        Returns:
+            dict: 命中的摘要 -> 向量
+        """
+        unique_hashes = list(dict.fromkeys(hashes))
+        found = {}
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(unique_hashes), _SQL_BATCH_SIZE):
+                batch = unique_hashes[start:start + _SQL_BATCH_SIZE]
+                placeholders = ','.join('?' * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model] + batch
+                ).fetchall()
+                for hash_value, blob in rows:
+                    found[hash_value] = np.frombuffer(blob, dtype=np.float32).tolist()
+                if rows:
+                    hit_hashes = [row[0] for row in rows]
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash IN ({','.join('?' * len(hit_hashes))})",
+                        [now, model] + hit_hashes
+                    )
+            self._conn.commit()
+        return found
+    
+    def put_many(self, model: str, items: Dict[str, List[float]]):
+        """批量写入缓存，写入后超出大小上限时淘汰最久未使用的向量
+        
+        Args:
+            model: 模型名
+            items: 文本摘要 -> 向量
+        """
+        if not items:
+            return
+        now = time.time()
+        records = [(model, hash_value, np.asarray(vector, dtype=np.float32).tobytes(), now)
+                   for hash_value, vector in items.items()]
+        with self._lock:
+            hashes = list(items.keys())
+            replaced_bytes = 0
+            for start in range(0, len(hashes), _SQL_BATCH_SIZE):
+                batch = hashes[start:start + _SQL_BATCH_SIZE]
+                replaced_bytes += self._conn.execute(
+                    f"SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings "
+                    f"WHERE model = ? AND text_hash IN ({','.join('?' * len(batch))})",
+                    [model] + batch
+                ).fetchone()[0]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                records
+            )
+            self._total_bytes += sum(len(record[2]) for record in records) - replaced_bytes
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+    
+    def _evict(self):
+        """淘汰最久未使用的向量，直到缓存大小降到上限的90%以下"""
+        target_bytes = int(self.max_bytes * 0.9)
+        evicted = 0
+        while self._total_bytes > target_bytes:
+            rows = self._conn.execute(
+                "SELECT rowid, LENGTH(vector) FROM embeddings ORDER BY last_used LIMIT ?", (_SQL_BATCH_SIZE,)
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                break
+            selected = []
+            for rowid, size in rows:
+                selected.append(rowid)
+                self._total_bytes -= size
+                if self._total_bytes <= target_bytes:
+                    break
+            self._conn.execute(f"DELETE FROM embeddings WHERE rowid IN ({','.join('?' * len(selected))})", selected)
+            evicted += len(selected)
+        app_logger.info(f"嵌入向量缓存淘汰{evicted}条记录，当前大小: {self._total_bytes // 1024}KB")
+    
+    def stats(self) -> Dict[str, int]:
+        """获取缓存统计信息"""
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {
+            'entries': count,
+            'size_bytes': self._total_bytes,
+            'max_bytes': self.max_bytes
+        }
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """获取进程级嵌入向量缓存"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache(EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_MB * 1024 * 1024)
+    return _cache
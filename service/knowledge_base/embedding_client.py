@@ -0,0 +1,194 @@
+"""
+嵌入向量客户端
+
+在进程内调用嵌入服务：复用HTTP长连接，按批发送文本，并限制同时进行的请求数量。
+嵌入后端可插拔，默认使用Ollama的/api/embed批量接口。
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from service.log.logger import app_logger
+from service.knowledge_base.kb_config import (
+    OLLAMA_HOST, OLLAMA_PORT, OLLAMA_EMBED_MODEL,
+    EMBEDDING_BACKEND, EMBEDDING_BASE_URL, EMBEDDING_BATCH_SIZE,
+    EMBEDDING_MAX_CONCURRENCY, EMBEDDING_TIMEOUT
+)
+
+
+class EmbeddingBackend:
+    """嵌入后端接口
+    
+    子类实现embed方法，对一批文本返回等长的向量列表；失败时抛出异常。
+    model为后端实际使用的模型名称，嵌入向量缓存以其区分不同模型生成的向量。
+    """
+    
+    name = "base"
+    model = ""
+    
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        raise NotImplementedError
+    
+    def close(self):
+        """释放后端持有的资源"""
+        pass
+
+
+class OllamaEmbeddingBackend(EmbeddingBackend):
+    """Ollama嵌入后端
+    
+    使用/api/embed的input数组一次请求多个文本；旧版Ollama不支持该接口(返回404)时，
+    回退到逐条调用/api/embeddings。所有请求共用一个带连接池的Session，保持长连接。
+    """
+    
+    name = "ollama"
+    
+    def __init__(self, base_url: str, model: str, timeout: int, pool_size: int):
+        self.base_url = base_url.rstrip('/')
+        self.model = model
+        self.timeout = timeout
+        self._batch_api_supported = True
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+    
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        if self._batch_api_supported:
+            response = self.session.post(
+                f"{self.base_url}/api/embed",
+                json={"model": self.model, "input": texts},
+                timeout=self.timeout
+            )
+            if response.status_code != 404:
+                response.raise_for_status()
+                embeddings = response.json().get("embeddings")
+                if not embeddings or len(embeddings) != len(texts):
+                    raise ValueError(f"Ollama返回的向量数量与输入不一致: {len(embeddings or [])}/{len(texts)}")
+                return embeddings
+            app_logger.warning("Ollama不支持/api/embed批量接口，回退到/api/embeddings逐条请求")
+            self._batch_api_supported = False
+        
+        embeddings = []
+        for text in texts:
+            response = self.session.post(
+                f"{self.base_url}/api/embeddings",
+                json={"model": self.model, "prompt": text},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            embedding = response.json().get("embedding")
+            if not embedding:
+                raise ValueError(f"Ollama返回异常，未包含embedding字段")
+            embeddings.append(embedding)
+        return embeddings
+    
+    def close(self):
+        self.session.close()
+
+
+# 已注册的嵌入后端：名称 -> 工厂函数
+_backend_factories: Dict[str, Callable[[], EmbeddingBackend]] = {}
+
+
+def register_embedding_backend(name: str, factory: Callable[[], EmbeddingBackend]):
+    """注册嵌入后端
+    
+    Args:
+        name: 后端名称，与kb_config.EMBEDDING_BACKEND对应
+        factory: 无参工厂函数，返回EmbeddingBackend实例
+    """
+    _backend_factories[name] = factory
+
+
+register_embedding_backend("ollama", lambda: OllamaEmbeddingBackend(
+    base_url=EMBEDDING_BASE_URL or f"http://{OLLAMA_HOST}:{OLLAMA_PORT}",
+    model=OLLAMA_EMBED_MODEL,
+    timeout=EMBEDDING_TIMEOUT,
+    pool_size=EMBEDDING_MAX_CONCURRENCY
+))
+
+
+class EmbeddingClient:
+    """嵌入向量客户端
+    
+    将文本按batch_size分批，使用最多max_concurrency个线程并发请求后端，
+    结果按输入顺序返回；某一批失败时该批文本对应的结果为None。
+    使用独立的线程池而不是普通业务线程池，避免在业务线程中提交并等待子任务时占满业务线程池。
+    """
+    
+    def __init__(self, backend: EmbeddingBackend, batch_size: int = EMBEDDING_BATCH_SIZE,
+                 max_concurrency: int = EMBEDDING_MAX_CONCURRENCY):
+        self.backend = backend
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                            thread_name_prefix="embedding_worker")
+    
+    def embed_texts(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """批量生成嵌入向量
+        
+        Args:
+            texts: 文本列表
+            
+        Returns:
+            list: 与texts等长的向量列表，失败的文本对应None
+        """
+        if not texts:
+            return []
+        
+        batches = [texts[start:start + self.batch_size] for start in range(0, len(texts), self.batch_size)]
+        if len(batches) == 1:
+            batch_results = [self._embed_batch(batches[0])]
+        else:
+            batch_results = list(self._executor.map(self._embed_batch, batches))
+        
+        embeddings = []
+        for batch, result in zip(batches, batch_results):
+            embeddings.extend(result if result is not None else [None] * len(batch))
+        return embeddings
+    
+    def embed_text(self, text: str) -> Optional[List[float]]:
+        """生成单个文本的嵌入向量，失败时返回None"""
+        return self.embed_texts([text])[0]
+    
+    def _embed_batch(self, batch: List[str]) -> Optional[List[List[float]]]:
+        try:
+            return self.backend.embed(batch)
+        except Exception as e:
+            app_logger.error(f"嵌入后端{self.backend.name}处理{len(batch)}条文本失败: {str(e)}")
+            return None
+    
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.backend.close()
+
+
+_client: Optional[EmbeddingClient] = None
+_client_lock = threading.Lock()
+
+
+def get_embedding_client() -> EmbeddingClient:
+    """获取进程级嵌入客户端，首次调用时按kb_config中的后端配置创建"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                factory = _backend_factories.get(EMBEDDING_BACKEND)
+                if factory is None:
+                    raise ValueError(f"未注册的嵌入后端: {EMBEDDING_BACKEND}")
+                _client = EmbeddingClient(factory())
+                app_logger.info(f"初始化嵌入客户端，后端: {EMBEDDING_BACKEND}, 批大小: {EMBEDDING_BATCH_SIZE}, "
+                                f"并发数: {EMBEDDING_MAX_CONCURRENCY}")
+    return _client
+
+
+def set_embedding_client(client: Optional[EmbeddingClient]):
+    """替换进程级嵌入客户端，例如在测试中接入桩后端；传入None时下次调用重新按配置创建"""
+    global _client
+    with _client_lock:
+        previous, _client = _client, client
+    if previous is not None and previous is not client:
+        previous.close()
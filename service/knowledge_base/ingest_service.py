@@ -0,0 +1,278 @@
+"""
+知识库文档入库流水线
+
+上传接口保存文件后立即返回，文档在后台按阶段流水线处理：
+1. 文本提取与分块：CPU密集，在进程池中并行执行
+2. 生成嵌入向量：I/O密集，多个文档同时请求嵌入服务
+3. 写入向量库：单个写入线程合并多个文档的文档块批量写入，随后登记元数据和关键词索引
+阶段之间使用有界队列，下游处理不过来时上游等待，内存中只保留有限数量的文档。
+任务状态与每个文档的进度通过ImportJob查询，任务登记表与Excel导入任务相互独立。
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+from service.import_job import ImportJobService, ImportJobCancelled
+from service.log.logger import app_logger
+from service.knowledge_base.kb_config import (
+    KB_INGEST_EXTRACT_WORKERS, KB_INGEST_EMBED_WORKERS, KB_INGEST_QUEUE_SIZE, KB_INGEST_INSERT_BATCH
+)
+from service.knowledge_base.kb_service import (
+    extract_and_chunk_document, build_chunk_records, register_document_item, add_chunks_to_keyword_index
+)
+from service.knowledge_base.vector_store import get_vector_store
+
+
+class KBIngestService:
+    """知识库文档入库服务"""
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @staticmethod
+    def get_instance():
+        """获取单例实例"""
+        if KBIngestService._instance is None:
+            with KBIngestService._instance_lock:
+                if KBIngestService._instance is None:
+                    KBIngestService._instance = KBIngestService()
+        return KBIngestService._instance
+
+    def __init__(self):
+        """初始化入库服务"""
+        self.jobs = ImportJobService()
+
+    def submit(self, documents: List[Dict[str, Any]], chunking_strategy: str = 'auto',
+               custom_chunk_size: Optional[int] = None):
+        """提交入库任务
+
+        Args:
+            documents: 已保存的文档列表，每项包含id(知识项目ID)、filename(原始文件名)、file_path
+            chunking_strategy: 分块策略
+            custom_chunk_size: 自定义分块大小
+
+        Returns:
+            ImportJob: 新建的任务
+        """
+        params = {
+            'documents': documents,
+            'chunking_strategy': chunking_strategy,
+            'custom_chunk_size': custom_chunk_size
+        }
+        return self.jobs.submit(params, self.run)
+
+    def run(self, params, job):
+        """执行入库流水线，作为后台任务的执行函数
+
+        Returns:
+            tuple: (结果字典, HTTP状态码)
+        """
+        documents = params['documents']
+        chunking_strategy = params.get('chunking_strategy', 'auto')
+        custom_chunk_size = params.get('custom_chunk_size')
+        addLog = job.logs
+        start_time = time.time()
+
+        job.set_details([{
+            'id': document['id'],
+            'filename': document['filename'],
+            'status': 'queued',
+            'document_type': None,
+            'chunks_count': 0,
+            'message': None
+        } for document in documents])
+
+        vector_store = get_vector_store()
+        if not vector_store.ensure_ready():
+            for index, document in enumerate(documents):
+                self._remove_file(document['file_path'])
+                job.update_detail(index, status='failed', message=vector_store.unavailable_message)
+            addLog.append({"type": "error", "message": vector_store.unavailable_message})
+            return {"success": False, "message": vector_store.unavailable_message,
+                    "documents": job.to_dict()['details']}, 500
+
+        extract_workers = min(KB_INGEST_EXTRACT_WORKERS or os.cpu_count() or 1, len(documents))
+        embed_workers = max(1, min(KB_INGEST_EMBED_WORKERS, len(documents)))
+        addLog.append({"type": "info", "message": f"开始处理{len(documents)}个文档，"
+                                                  f"提取进程{extract_workers}个，嵌入线程{embed_workers}个"})
+        job.set_stage('ingesting', len(documents))
+
+        embed_queue = queue.Queue(maxsize=KB_INGEST_QUEUE_SIZE)
+        insert_queue = queue.Queue(maxsize=KB_INGEST_QUEUE_SIZE)
+
+        def finish_document(index, status, **fields):
+            document = documents[index]
+            if status != 'completed':
+                self._remove_file(document['file_path'])
+            job.update_detail(index, status=status, **fields)
+            if status == 'failed':
+                addLog.append({"type": "error",
+                               "message": f"文档 {document['filename']} 处理失败: {fields.get('message')}"})
+            try:
+                job.advance_progress(1)
+            except ImportJobCancelled:
+                # 取消由分发线程统一处理
+                pass
+
+        def embed_loop():
+            while True:
+                item = embed_queue.get()
+                if item is None:
+                    break
+                index, extracted = item
+                if job.cancel_requested:
+                    finish_document(index, 'cancelled')
+                    continue
+                document = documents[index]
+                job.update_detail(index, status='embedding')
+                try:
+                    records = build_chunk_records(document['id'], os.path.basename(document['file_path']),
+                                                  extracted['document_type'], extracted['chunks'])
+                except Exception as e:
+                    app_logger.error(f"生成文档嵌入向量失败: {document['file_path']}, 错误: {str(e)}")
+                    finish_document(index, 'failed', message=f"生成嵌入向量失败: {str(e)}")
+                    continue
+                if not records:
+                    finish_document(index, 'failed', message="所有文档块生成嵌入向量失败")
+                    continue
+                job.update_detail(index, status='inserting')
+                # 队列满时阻塞，等待写入线程消费
+                insert_queue.put((index, extracted['document_type'], records))
+
+        def insert_loop():
+            finished = False
+            while not finished:
+                # 阻塞等待第一个文档，然后尽量合并已就绪的文档批量写入
+                batch = [insert_queue.get()]
+                chunk_total = len(batch[0][2]) if batch[0] is not None else 0
+                while batch[-1] is not None and chunk_total < KB_INGEST_INSERT_BATCH:
+                    try:
+                        item = insert_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    batch.append(item)
+                    if item is not None:
+                        chunk_total += len(item[2])
+                if batch[-1] is None:
+                    finished = True
+                    batch.pop()
+                if not batch:
+                    continue
+
+                if job.cancel_requested:
+                    for index, _, _ in batch:
+                        finish_document(index, 'cancelled')
+                    continue
+                try:
+                    vector_store.insert([record for _, _, records in batch for record in records])
+                except Exception as e:
+                    app_logger.error(f"文档块写入向量库失败: {str(e)}")
+                    for index, _, _ in batch:
+                        finish_document(index, 'failed', message=f"写入向量库失败: {str(e)}")
+                    continue
+
+                for index, doc_type, records in batch:
+                    document = documents[index]
+                    add_chunks_to_keyword_index(records)
+                    try:
+                        register_document_item(document['id'], os.path.basename(document['file_path']),
+                                               doc_type, document['file_path'], len(records))
+                    except Exception as e:
+                        app_logger.error(f"登记知识项目失败: {document['file_path']}, 错误: {str(e)}")
+                        try:
+                            vector_store.delete_item(document['id'])
+                        except Exception:
+                            pass
+                        finish_document(index, 'failed', message=f"登记知识项目失败: {str(e)}")
+                        continue
+                    finish_document(index, 'completed', document_type=doc_type, chunks_count=len(records),
+                                    message=f"成功处理文档 {document['filename']}")
+                app_logger.info(f"知识库入库批量写入 {chunk_total} 个文档块，文档 {len(batch)} 个")
+
+        embedders = [threading.Thread(target=embed_loop, name=f"kb-ingest-embed-{i}", daemon=True)
+                     for i in range(embed_workers)]
+        inserter = threading.Thread(target=insert_loop, name="kb-ingest-insert", daemon=True)
+        for thread in embedders + [inserter]:
+            thread.start()
+
+        cancelled = False
+        dispatched = set()
+        # 子进程只导入kb_service执行提取分块；spawn方式启动时重新导入的主模块不再构建应用和初始化知识库（见main.create_app）
+        executor = ProcessPoolExecutor(max_workers=extract_workers)
+        try:
+            futures = {
+                executor.submit(extract_and_chunk_document, document['file_path'],
+                                chunking_strategy, custom_chunk_size): index
+                for index, document in enumerate(documents)
+            }
+            for index in futures.values():
+                job.update_detail(index, status='extracting')
+            for future in as_completed(futures):
+                # 已完成的future持有整个文档的分块结果，取出后不再引用
+                index = futures.pop(future)
+                job.check_cancelled()
+                dispatched.add(index)
+                try:
+                    extracted = future.result()
+                except Exception as e:
+                    extracted = {'success': False, 'message': f"提取文档内容失败: {str(e)}"}
+                if not extracted['success']:
+                    finish_document(index, 'failed', message=extracted['message'])
+                    continue
+                job.update_detail(index, status='queued_for_embedding', document_type=extracted['document_type'])
+                embed_queue.put((index, extracted))
+        except ImportJobCancelled:
+            cancelled = True
+            addLog.append({"type": "warning", "message": "入库任务已取消，未完成的文档将被跳过"})
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            for _ in embedders:
+                embed_queue.put(None)
+            for thread in embedders:
+                thread.join()
+            insert_queue.put(None)
+            inserter.join()
+
+        for index, document in enumerate(documents):
+            if index not in dispatched:
+                finish_document(index, 'cancelled')
+
+        cancelled = cancelled or job.cancel_requested
+        details = job.to_dict()['details']
+        completed = sum(1 for detail in details if detail['status'] == 'completed')
+        failed = sum(1 for detail in details if detail['status'] == 'failed')
+        duration = round(time.time() - start_time, 2)
+        addLog.append({"type": "info", "message": f"文档入库结束，成功{completed}个，失败{failed}个，耗时{duration}秒"})
+        app_logger.info(f"知识库文档入库结束，成功:{completed}, 失败:{failed}, 耗时:{duration}秒")
+
+        success = not cancelled and failed == 0
+        if cancelled:
+            message = "入库任务已取消"
+        elif success:
+            message = f"成功处理 {completed} 个文件"
+        else:
+            message = f"{failed} 个文件处理失败"
+        return {
+            "success": success,
+            "message": message,
+            "completed_count": completed,
+            "failed_count": failed,
+            "documents": details,
+            "details": {
+                "duration": duration,
+                "extract_workers": extract_workers,
+                "embed_workers": embed_workers
+            }
+        }, 200 if success else (499 if cancelled else 500)
+
+    @staticmethod
+    def _remove_file(file_path):
+        """删除处理失败或取消的文档文件"""
+        try:
+            if file_path and os.path.exists(file_path):
+                os.remove(file_path)
+        except OSError as e:
+            app_logger.warning(f"删除文件失败: {file_path}, 错误: {str(e)}")
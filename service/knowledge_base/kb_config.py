@@ -19,12 +19,47 @@ VECTOR_DIMENSION = 768
 
 # 知识库文件目录
 KB_DOCUMENTS_DIR = "file/knowledge_base/documents"
-KB_METADATA_PATH = "file/knowledge_base/kb_metadata.json"
+KB_METADATA_PATH = "file/knowledge_base/kb_metadata.json"      # 旧版JSON元数据，仅用于首次启动时导入
+KB_METADATA_DB_PATH = "file/knowledge_base/kb_metadata.db"
 
 # 分块设置
 DEFAULT_CHUNK_SIZE = 1000  # 默认分块大小（字符数）
 MAX_CHUNK_SIZE = 3000      # 最大分块大小
 MIN_CHUNK_SIZE = 200       # 最小分块大小
+CHUNK_OVERLAP = 100        # 拆分超长块时相邻窗口重叠的字符数
 
 # 搜索设置
-DEFAULT_SEARCH_LIMIT = 10  # 默认搜索结果数量限制 
\ No newline at end of file
+DEFAULT_SEARCH_LIMIT = 10  # 默认搜索结果数量限制 
+# 嵌入向量客户端设置
+EMBEDDING_BACKEND = "ollama"       # 嵌入后端名称，可通过register_embedding_backend注册其他后端
+EMBEDDING_BASE_URL = None          # 后端服务地址，None时使用OLLAMA_HOST和OLLAMA_PORT；测试时可指向本地桩服务
+EMBEDDING_BATCH_SIZE = 32          # 每次请求发送的文本数量
+EMBEDDING_MAX_CONCURRENCY = 4      # 同时进行的嵌入请求数量
+EMBEDDING_TIMEOUT = 120            # 单次请求超时时间（秒）
+
+# 嵌入向量缓存设置
+EMBEDDING_CACHE_ENABLED = True
+EMBEDDING_CACHE_PATH = "file/knowledge_base/embedding_cache.db"
+EMBEDDING_CACHE_MAX_MB = 512       # 缓存向量数据上限（MB），超出时淘汰最久未使用的向量
+
+# 向量库设置
+VECTOR_STORE_BACKEND = "milvus"    # milvus / local / auto；auto时首次使用先尝试Milvus，不可用则改用本地向量库
+LOCAL_VECTOR_STORE_DIR = "file/knowledge_base/vector_store"
+LOCAL_VECTOR_INDEX = "flat"        # flat：精确搜索；ivf：数据量达到LOCAL_IVF_MIN_ROWS后使用IVF近似索引
+LOCAL_IVF_NLIST = 0                # IVF聚类中心数量，0时按sqrt(向量数)自动确定
+LOCAL_IVF_NPROBE = 16              # 搜索时探查的聚类数量，越大召回越高、速度越慢
+LOCAL_IVF_MIN_ROWS = 100000        # 向量数低于该值时始终精确搜索
+
+# 关键词检索与混合检索设置
+KEYWORD_INDEX_PATH = "file/knowledge_base/keyword_index.db"
+BM25_K1 = 1.5
+BM25_B = 0.75
+SEARCH_TYPES = ('semantic', 'keyword', 'hybrid')
+HYBRID_RRF_K = 60                  # 倒数排名融合常数，得分为各路结果的 1 / (HYBRID_RRF_K + 排名) 之和
+HYBRID_CANDIDATE_FACTOR = 4        # 混合检索时每一路召回 limit * 该倍数 条候选
+
+# 文档入库流水线设置
+KB_INGEST_EXTRACT_WORKERS = None   # 文本提取与分块的进程数，None时使用CPU核数
+KB_INGEST_EMBED_WORKERS = 2        # 同时生成嵌入向量的文档数，每个文档内部仍按EMBEDDING_BATCH_SIZE分批并发请求
+KB_INGEST_QUEUE_SIZE = 8           # 阶段之间队列的容量（文档数），队列满时上游阶段等待
+KB_INGEST_INSERT_BATCH = 512       # 单次写入向量库的最大文档块数
@@ -9,120 +9,36 @@ import uuid
 import json
 import glob
 import shutil
-import subprocess
 import tempfile
 from datetime import datetime
 from typing import List, Dict, Any, Tuple, Optional, Union
 import re
 
 import numpy as np
-from pymilvus import connections, Collection, utility
 from service.log.logger import app_logger
 from service.knowledge_base.kb_config import *
+from service.knowledge_base.embedding_client import get_embedding_client
+from service.knowledge_base.embedding_cache import get_embedding_cache, text_hash
+from service.knowledge_base.vector_store import get_vector_store
+from service.knowledge_base.keyword_index import get_keyword_index
+from service.knowledge_base.metadata_store import get_metadata_store
+from service.knowledge_base.chunker import chunk_by_structure, enforce_chunk_size, split_fixed_size
 
-# Ollama 嵌入模型
-OLLAMA_EMBED_MODEL = "nomic-embed-text:latest"
-
-# 向量维度 (nomic-embed-text 模型的输出维度)
-VECTOR_DIMENSION = 768
-
-# 知识库元数据文件路径
-KB_METADATA_PATH = "file/knowledge_base/kb_metadata.json"
-
-# 默认分块大小
-DEFAULT_CHUNK_SIZE = 1000
-
-# 确保Milvus集合存在
-def ensure_milvus_collection():
-    """确保Milvus集合存在"""
-    try:
-        # 连接到Milvus
-        connections.connect(
-            alias="default", 
-            host=MILVUS_HOST, 
-            port=MILVUS_PORT
-        )
-        
-        # 检查集合是否存在
-        if not utility.has_collection(MILVUS_COLLECTION):
-            app_logger.info(f"创建Milvus集合: {MILVUS_COLLECTION}")
-            
-            # 定义集合结构
-            from pymilvus import CollectionSchema, FieldSchema, DataType
-            
-            fields = [
-                FieldSchema(name="id", dtype=DataType.VARCHAR, is_primary=True, max_length=36),
-                FieldSchema(name="content", dtype=DataType.VARCHAR, max_length=65535),
-                FieldSchema(name="item_id", dtype=DataType.VARCHAR, max_length=36),
-                FieldSchema(name="title", dtype=DataType.VARCHAR, max_length=255),
-                FieldSchema(name="source_type", dtype=DataType.VARCHAR, max_length=20),
-                FieldSchema(name="chunk_index", dtype=DataType.INT64),
-                FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=VECTOR_DIMENSION)
-            ]
-            
-            schema = CollectionSchema(fields=fields)
-            collection = Collection(name=MILVUS_COLLECTION, schema=schema)
-            
-            # 创建索引
-            index_params = {
-                "metric_type": "COSINE",
-                "index_type": "HNSW",
-                "params": {"M": 8, "efConstruction": 64}
-            }
-            
-            collection.create_index(field_name="embedding", index_params=index_params)
-            collection.load()
-            
-            app_logger.info(f"成功创建并索引Milvus集合: {MILVUS_COLLECTION}")
-        else:
-            app_logger.info(f"Milvus集合已存在: {MILVUS_COLLECTION}")
-            
-            # 加载集合
-            collection = Collection(name=MILVUS_COLLECTION)
-            collection.load()
-        
-        return True
-    
-    except Exception as e:
-        app_logger.error(f"确保Milvus集合存在时发生错误: {str(e)}")
-        return False
+# 确保向量库可用
+def ensure_vector_store() -> bool:
+    """确保向量库可用（Milvus或本地向量库，由VECTOR_STORE_BACKEND决定）"""
+    return get_vector_store().ensure_ready()
 
 # 初始化知识库元数据
 def init_kb_metadata():
-    """初始化知识库元数据"""
-    if not os.path.exists(KB_METADATA_PATH):
-        metadata = {
-            "items": [],
-            "total_chunks": 0,
-            "last_updated": datetime.now().isoformat()
-        }
-        
-        os.makedirs(os.path.dirname(KB_METADATA_PATH), exist_ok=True)
-        
-        with open(KB_METADATA_PATH, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
-        
-        app_logger.info(f"初始化知识库元数据文件: {KB_METADATA_PATH}")
-    
-    else:
-        app_logger.info(f"知识库元数据文件已存在: {KB_METADATA_PATH}")
-
-# 获取知识库元数据
-def get_kb_metadata():
-    """获取知识库元数据"""
-    if not os.path.exists(KB_METADATA_PATH):
-        init_kb_metadata()
-    
-    with open(KB_METADATA_PATH, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    """初始化知识库元数据存储（首次打开时导入旧版JSON元数据）"""
+    stats = get_metadata_store().get_stats()
+    app_logger.info(f"知识库元数据存储已就绪: {KB_METADATA_DB_PATH}, 项目数: {stats['total_items']}")
 
-# 保存知识库元数据
-def save_kb_metadata(metadata):
-    """保存知识库元数据"""
-    metadata["last_updated"] = datetime.now().isoformat()
-    
-    with open(KB_METADATA_PATH, 'w', encoding='utf-8') as f:
-        json.dump(metadata, f, ensure_ascii=False, indent=2)
+# 获取知识库统计信息
+def get_kb_stats() -> Dict[str, Any]:
+    """获取知识库项目数、总块数和最后更新时间"""
+    return get_metadata_store().get_stats()
 
 # 检测文档类型
 def detect_document_type(file_path: str) -> str:
@@ -218,106 +134,25 @@ def detect_document_type(file_path: str) -> str:
 
 # 根据文档类型和策略分块
 def chunk_document(content: str, doc_type: str, chunking_strategy: str = 'auto', custom_chunk_size: Optional[int] = None) -> List[str]:
-    """根据文档类型和策略分块"""
-    chunks = []
+    """根据文档类型和策略分块
     
+    自动策略先按文档结构（法律条款、审计章节/表格、段落）切片，
+    再拆分超过MAX_CHUNK_SIZE的块（窗口重叠CHUNK_OVERLAP）并合并短于MIN_CHUNK_SIZE的块
+    """
     # 自定义分块大小
     if chunking_strategy == 'custom' and custom_chunk_size and custom_chunk_size > 0:
         # 简单按字符数分块
-        for i in range(0, len(content), custom_chunk_size):
-            chunk = content[i:i + custom_chunk_size]
-            if chunk.strip():  # 确保不添加空块
-                chunks.append(chunk)
-        return chunks
+        return split_fixed_size(content, custom_chunk_size)
     
     # 根据文档类型自动选择分块策略
-    if doc_type == 'legal':
-        # 法律文档按条款分块
-        legal_pattern = r'第[一二三四五六七八九十百千]+条([\s\S]*?)(?=第[一二三四五六七八九十百千]+条|$)'
-        matches = re.finditer(legal_pattern, content)
-        
-        # 提取匹配的条款
-        for match in matches:
-            article = match.group(0).strip()
-            if article:
-                chunks.append(article)
-        
-        # 处理前导内容（第一条之前的内容）
-        first_article_pos = content.find('第')
-        if first_article_pos > 0:
-            intro = content[:first_article_pos].strip()
-            if intro:
-                chunks.insert(0, intro)
-    
-    elif doc_type == 'audit':
-        # 审计报告使用三层分级切割
-        
-        # 1. 提取全文摘要（通常在报告开头）
-        summary_match = re.search(r'摘要|概述|总结|Executive Summary', content)
-        if summary_match:
-            summary_start = summary_match.start()
-            summary_end = content.find('\n\n', summary_start)
-            if summary_end == -1:
-                summary_end = min(summary_start + 2000, len(content))
-            
-            summary = content[summary_start:summary_end].strip()
-            if summary:
-                chunks.append(summary)
-        
-        # 2. 按章节切割
-        chapter_pattern = r'([一二三四五六七八九十]、[\s\S]*?)(?=[一二三四五六七八九十]、|$)'
-        chapters = re.finditer(chapter_pattern, content)
-        
-        for chapter in chapters:
-            chapter_text = chapter.group(0).strip()
-            if chapter_text:
-                chunks.append(chapter_text)
-        
-        # 3. 提取表格和关键段落（简化模拟）
-        # 在实际应用中，这需要更复杂的表格提取逻辑
-        table_pattern = r'表\d+[：:]([\s\S]*?)(?=\n\n)'
-        tables = re.finditer(table_pattern, content)
-        
-        for table in tables:
-            table_text = table.group(0).strip()
-            if table_text and len(table_text) > 50:  # 排除过短的匹配
-                chunks.append(table_text)
-    
-    else:  # doc, txt 或其他类型
-        # 默认按段落分块，合并短段落
-        paragraphs = content.split('\n\n')
-        current_chunk = ""
-        
-        for para in paragraphs:
-            para = para.strip()
-            if not para:
-                continue
-                
-            # 如果当前段落加上新段落不超过最大块大小，则合并
-            if len(current_chunk) + len(para) < DEFAULT_CHUNK_SIZE:
-                current_chunk += ("\n" if current_chunk else "") + para
-            else:
-                # 当前块已足够大，保存并开始新块
-                if current_chunk:
-                    chunks.append(current_chunk)
-                current_chunk = para
-        
-        # 添加最后一个块
-        if current_chunk:
-            chunks.append(current_chunk)
+    chunks, _ = chunk_by_structure(content, doc_type)
     
     # 如果没有成功分块，退回到简单分块
     if not chunks:
         app_logger.warning(f"未能按{doc_type}文档类型成功分块，使用默认分块方法")
-        
-        # 默认分块方法
-        chunk_size = custom_chunk_size or DEFAULT_CHUNK_SIZE
-        for i in range(0, len(content), chunk_size):
-            chunk = content[i:i + chunk_size]
-            if chunk.strip():
-                chunks.append(chunk)
+        return split_fixed_size(content, custom_chunk_size or DEFAULT_CHUNK_SIZE)
     
-    return chunks
+    return enforce_chunk_size(chunks, MAX_CHUNK_SIZE, MIN_CHUNK_SIZE, CHUNK_OVERLAP)
 
 # 从文档中提取文本内容
 def extract_text_from_document(file_path: str) -> Tuple[bool, str, str]:
@@ -429,99 +264,134 @@ def extract_text_from_document(file_path: str) -> Tuple[bool, str, str]:
         app_logger.error(f"提取文档内容时发生错误: {str(e)}")
         return False, "", f"提取文档内容失败: {str(e)}"
 
+# 提取文档文本并分块
+def extract_and_chunk_document(file_path: str, chunking_strategy: str = 'auto', custom_chunk_size: Optional[int] = None) -> Dict[str, Any]:
+    """提取文档文本并分块
+    
+    不访问向量库和嵌入服务，可在进程池中执行
+    
+    Returns:
+        dict: success, message, 成功时包含document_type和chunks
+    """
+    # 确保文件存在
+    if not os.path.exists(file_path):
+        print(f"[DEBUG] 文件不存在: {file_path}")
+        return {
+            'success': False,
+            'message': f"文件不存在: {file_path}"
+        }
+    
+    # 检测文档类型
+    doc_type = detect_document_type(file_path)
+    print(f"[DEBUG] 检测到文档类型: {doc_type}")
+    
+    # 提取文本内容
+    print("[DEBUG] 开始提取文本内容")
+    success, content, message = extract_text_from_document(file_path)
+    print(f"[DEBUG] 提取文本结果: 成功={success}, 消息={message}")
+    
+    if not success:
+        return {
+            'success': False,
+            'message': message
+        }
+    
+    # 根据文档类型和策略分块
+    print(f"[DEBUG] 开始分块处理，文本长度: {len(content)}")
+    chunks = chunk_document(content, doc_type, chunking_strategy, custom_chunk_size)
+    print(f"[DEBUG] 分块结果: 生成了 {len(chunks)} 个文本块")
+    
+    if not chunks:
+        print("[DEBUG] 文档分块失败，无有效内容")
+        return {
+            'success': False,
+            'message': "文档分块失败，无法提取有效内容"
+        }
+    
+    return {
+        'success': True,
+        'message': message,
+        'document_type': doc_type,
+        'chunks': chunks
+    }
+
+# 为文档块生成嵌入向量并构建入库记录
+def build_chunk_records(item_id: str, title: str, doc_type: str, chunks: List[str]) -> List[Dict[str, Any]]:
+    """批量生成文档块的嵌入向量，返回向量库记录；生成失败的文档块被跳过"""
+    print(f"[DEBUG] 为 {len(chunks)} 个文档块生成嵌入向量")
+    embeddings = generate_embeddings(chunks)
+    
+    records = []
+    for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
+        if embedding is None:
+            print(f"[DEBUG] 为文档块 {i+1}/{len(chunks)} 生成嵌入向量失败")
+            app_logger.error(f"为文档块 {i+1}/{len(chunks)} 生成嵌入向量失败")
+            continue
+        
+        records.append({
+            "id": str(uuid.uuid4()),
+            "content": chunk,
+            "item_id": item_id,
+            "title": title,
+            "source_type": doc_type,
+            "chunk_index": i,
+            "embedding": embedding
+        })
+    return records
+
+# 登记文件类型的知识项目
+def register_document_item(item_id: str, title: str, doc_type: str, file_path: str, chunks_count: int):
+    """文档块写入向量库后，将文件类型的知识项目写入元数据"""
+    get_metadata_store().add_item({
+        "id": item_id,
+        "title": title,
+        "source_type": doc_type,
+        "file_path": file_path,
+        "chunks_count": chunks_count,
+        "created_at": datetime.now().isoformat(),
+        "type": "file"
+    })
+
 # 处理文档并添加到知识库
-def process_document(file_path: str, chunking_strategy: str = 'auto', custom_chunk_size: Optional[int] = None) -> Dict[str, Any]:
+def process_document(file_path: str, chunking_strategy: str = 'auto', custom_chunk_size: Optional[int] = None,
+                     item_id: Optional[str] = None) -> Dict[str, Any]:
     """处理文档并添加到知识库"""
     try:
         print(f"[DEBUG] 开始处理文档: {file_path}, 分块策略: {chunking_strategy}")
         
-        # 确保文件存在
-        if not os.path.exists(file_path):
-            print(f"[DEBUG] 文件不存在: {file_path}")
-            return {
-                'success': False,
-                'message': f"文件不存在: {file_path}"
-            }
-        
-        # 确保Milvus集合存在
-        if not ensure_milvus_collection():
-            print("[DEBUG] 连接到Milvus失败")
+        # 确保向量库可用
+        vector_store = get_vector_store()
+        if not vector_store.ensure_ready():
+            print(f"[DEBUG] 向量库不可用: {vector_store.name}")
             return {
                 'success': False,
-                'message': "连接到Milvus失败，请检查Milvus服务是否运行"
+                'message': vector_store.unavailable_message
             }
         
         # 获取文件名
         filename = os.path.basename(file_path)
         print(f"[DEBUG] 处理文件名: {filename}")
         
-        # 检测文档类型
-        doc_type = detect_document_type(file_path)
-        print(f"[DEBUG] 检测到文档类型: {doc_type}")
-        
-        # 提取文本内容
-        print("[DEBUG] 开始提取文本内容")
-        success, content, message = extract_text_from_document(file_path)
-        print(f"[DEBUG] 提取文本结果: 成功={success}, 消息={message}")
-        
-        if not success:
-            return {
-                'success': False,
-                'message': message
-            }
-        
-        # 根据文档类型和策略分块
-        print(f"[DEBUG] 开始分块处理，文本长度: {len(content)}")
-        chunks = chunk_document(content, doc_type, chunking_strategy, custom_chunk_size)
-        print(f"[DEBUG] 分块结果: 生成了 {len(chunks)} 个文本块")
-        
-        if not chunks:
-            print("[DEBUG] 文档分块失败，无有效内容")
-            return {
-                'success': False,
-                'message': "文档分块失败，无法提取有效内容"
-            }
+        extracted = extract_and_chunk_document(file_path, chunking_strategy, custom_chunk_size)
+        if not extracted['success']:
+            return extracted
+        doc_type = extracted['document_type']
+        chunks = extracted['chunks']
         
         # 生成唯一ID作为知识项目ID
-        item_id = str(uuid.uuid4())
+        item_id = item_id or str(uuid.uuid4())
         print(f"[DEBUG] 生成知识项目ID: {item_id}")
         
-        # 连接到Milvus集合
-        print("[DEBUG] 连接到Milvus集合")
-        collection = Collection(MILVUS_COLLECTION)
-        
-        # 准备插入数据
-        insert_data = []
-        
-        for i, chunk in enumerate(chunks):
-            # 生成嵌入向量
-            print(f"[DEBUG] 为文档块 {i+1}/{len(chunks)} 生成嵌入向量")
-            embedding = generate_embedding(chunk)
-            
-            if embedding is None:
-                print(f"[DEBUG] 为文档块 {i+1}/{len(chunks)} 生成嵌入向量失败")
-                app_logger.error(f"为文档块 {i+1}/{len(chunks)} 生成嵌入向量失败")
-                continue
-            
-            # 准备数据记录
-            record = {
-                "id": str(uuid.uuid4()),
-                "content": chunk,
-                "item_id": item_id,
-                "title": filename,
-                "source_type": doc_type,
-                "chunk_index": i,
-                "embedding": embedding
-            }
-            
-            insert_data.append(record)
+        # 批量生成所有文档块的嵌入向量
+        insert_data = build_chunk_records(item_id, filename, doc_type, chunks)
         
         # 批量插入数据
         if insert_data:
-            print(f"[DEBUG] 准备将 {len(insert_data)} 个文档块添加到Milvus集合")
-            collection.insert(insert_data)
-            print(f"[DEBUG] 成功将 {len(insert_data)} 个文档块添加到Milvus集合")
-            app_logger.info(f"成功将 {len(insert_data)} 个文档块添加到Milvus集合")
+            print(f"[DEBUG] 准备将 {len(insert_data)} 个文档块添加到向量库: {vector_store.name}")
+            vector_store.insert(insert_data)
+            print(f"[DEBUG] 成功将 {len(insert_data)} 个文档块添加到向量库")
+            app_logger.info(f"成功将 {len(insert_data)} 个文档块添加到向量库: {vector_store.name}")
+            add_chunks_to_keyword_index(insert_data)
         else:
             print("[DEBUG] 没有生成任何有效的嵌入向量")
             return {
@@ -531,24 +401,7 @@ def process_document(file_path: str, chunking_strategy: str = 'auto', custom_chu
         
         # 更新元数据
         print("[DEBUG] 更新知识库元数据")
-        metadata = get_kb_metadata()
-        
-        # 添加知识项目信息
-        metadata["items"].append({
-            "id": item_id,
-            "title": filename,
-            "source_type": doc_type,
-            "file_path": file_path,
-            "chunks_count": len(insert_data),
-            "created_at": datetime.now().isoformat(),
-            "type": "file"
-        })
-        
-        # 更新总块数
-        metadata["total_chunks"] += len(insert_data)
-        
-        # 保存元数据
-        save_kb_metadata(metadata)
+        register_document_item(item_id, filename, doc_type, file_path, len(insert_data))
         print("[DEBUG] 元数据更新完成")
         
         print(f"[DEBUG] 文档处理完成: {filename}")
@@ -572,19 +425,17 @@ def process_document(file_path: str, chunking_strategy: str = 'auto', custom_chu
 def add_text_to_knowledge_base(title: str, content: str, tags: List[str] = []) -> Dict[str, Any]:
     """添加文本到知识库"""
     try:
-        # 确保Milvus集合存在
-        if not ensure_milvus_collection():
+        # 确保向量库可用
+        vector_store = get_vector_store()
+        if not vector_store.ensure_ready():
             return {
                 'success': False,
-                'message': "连接到Milvus失败，请检查Milvus服务是否运行"
+                'message': vector_store.unavailable_message
             }
         
         # 生成唯一ID作为知识项目ID
         item_id = str(uuid.uuid4())
         
-        # 连接到Milvus集合
-        collection = Collection(MILVUS_COLLECTION)
-        
         # 生成嵌入向量
         embedding = generate_embedding(content)
         
@@ -606,14 +457,12 @@ def add_text_to_knowledge_base(title: str, content: str, tags: List[str] = []) -
         }
         
         # 插入数据
-        collection.insert([record])
-        app_logger.info(f"成功将文本添加到Milvus集合")
+        vector_store.insert([record])
+        app_logger.info(f"成功将文本添加到向量库: {vector_store.name}")
+        add_chunks_to_keyword_index([record])
         
         # 更新元数据
-        metadata = get_kb_metadata()
-        
-        # 添加知识项目信息
-        metadata["items"].append({
+        get_metadata_store().add_item({
             "id": item_id,
             "title": title,
             "source_type": "manual",
@@ -623,12 +472,6 @@ def add_text_to_knowledge_base(title: str, content: str, tags: List[str] = []) -
             "type": "text"
         })
         
-        # 更新总块数
-        metadata["total_chunks"] += 1
-        
-        # 保存元数据
-        save_kb_metadata(metadata)
-        
         return {
             'success': True,
             'message': f"成功添加文本到知识库",
@@ -643,92 +486,107 @@ def add_text_to_knowledge_base(title: str, content: str, tags: List[str] = []) -
         }
 
 # 搜索知识库
-def search_knowledge_base(query: str, filter_type: str = 'all', limit: int = 10) -> List[Dict[str, Any]]:
-    """搜索知识库"""
+def search_knowledge_base(query: str, filter_type: str = 'all', limit: int = 10, search_type: str = 'semantic') -> List[Dict[str, Any]]:
+    """搜索知识库
+    
+    search_type:
+    - semantic: 向量检索
+    - keyword: BM25关键词检索
+    - hybrid: 两路各召回limit * HYBRID_CANDIDATE_FACTOR条，按倒数排名融合(RRF)后取前limit条
+    """
     try:
-        # 确保Milvus集合存在
-        if not ensure_milvus_collection():
-            app_logger.error("连接到Milvus失败，请检查Milvus服务是否运行")
+        if search_type not in SEARCH_TYPES:
+            app_logger.error(f"不支持的搜索类型: {search_type}")
             return []
         
+        candidate_limit = limit * HYBRID_CANDIDATE_FACTOR if search_type == 'hybrid' else limit
+        
+        keyword_results = []
+        if search_type in ('keyword', 'hybrid'):
+            keyword_results = get_keyword_index().search(query, candidate_limit, filter_type)
+            if search_type == 'keyword':
+                app_logger.info(f"知识库关键词搜索完成，找到 {len(keyword_results)} 个结果")
+                return keyword_results
+        
+        # 确保向量库可用
+        vector_store = get_vector_store()
+        if not vector_store.ensure_ready():
+            app_logger.error(vector_store.unavailable_message)
+            return keyword_results[:limit]
+        
         # 生成查询嵌入向量
         query_embedding = generate_embedding(query)
         
         if query_embedding is None:
             app_logger.error("为查询生成嵌入向量失败")
-            return []
-        
-        # 连接到Milvus集合
-        collection = Collection(MILVUS_COLLECTION)
+            return keyword_results[:limit]
         
-        # 准备搜索参数
-        search_params = {
-            "metric_type": "COSINE",
-            "params": {"ef": 64}
-        }
+        # 执行向量搜索
+        search_results = vector_store.search(query_embedding, candidate_limit, filter_type)
         
-        # 构建查询条件
-        expr = None
-        if filter_type != 'all':
-            expr = f'source_type == "{filter_type}"'
+        if search_type == 'hybrid':
+            search_results = fuse_search_results([search_results, keyword_results], limit)
         
-        # 执行向量搜索
-        results = collection.search(
-            data=[query_embedding],
-            anns_field="embedding",
-            param=search_params,
-            limit=limit,
-            expr=expr,
-            output_fields=["id", "content", "item_id", "title", "source_type", "chunk_index"]
-        )
-        
-        # 处理搜索结果
-        search_results = []
-        
-        for hits in results:
-            for hit in hits:
-                result = {
-                    "id": hit.id,
-                    "item_id": hit.entity.get("item_id"),
-                    "title": hit.entity.get("title"),
-                    "source_type": hit.entity.get("source_type"),
-                    "chunk_index": hit.entity.get("chunk_index"),
-                    "content": hit.entity.get("content"),
-                    "score": hit.score
-                }
-                search_results.append(result)
-        
-        app_logger.info(f"知识库搜索完成，找到 {len(search_results)} 个结果")
+        app_logger.info(f"知识库搜索完成，搜索类型: {search_type}，找到 {len(search_results)} 个结果")
         return search_results
     
     except Exception as e:
         app_logger.error(f"搜索知识库时发生错误: {str(e)}")
         return []
 
+# 融合多路检索结果
+def fuse_search_results(result_lists: List[List[Dict[str, Any]]], limit: int) -> List[Dict[str, Any]]:
+    """按倒数排名融合(RRF)合并多路检索结果
+    
+    每条结果的得分为其在各路结果中 1 / (HYBRID_RRF_K + 排名) 之和，各路原始得分保留在vector_score/keyword_score中
+    """
+    score_names = ['vector_score', 'keyword_score']
+    fused = {}
+    for list_index, results in enumerate(result_lists):
+        for rank, result in enumerate(results, start=1):
+            entry = fused.get(result['id'])
+            if entry is None:
+                entry = dict(result)
+                entry['score'] = 0.0
+                for name in score_names:
+                    entry[name] = None
+                fused[result['id']] = entry
+            entry['score'] += 1.0 / (HYBRID_RRF_K + rank)
+            if list_index < len(score_names):
+                entry[score_names[list_index]] = result.get('score')
+    
+    return sorted(fused.values(), key=lambda item: item['score'], reverse=True)[:limit]
+
+# 将文档块加入关键词索引
+def add_chunks_to_keyword_index(records: List[Dict[str, Any]]):
+    """将文档块加入关键词索引，失败时只记录日志，不影响向量入库结果"""
+    try:
+        get_keyword_index().add_chunks(records)
+    except Exception as e:
+        app_logger.error(f"更新关键词索引失败: {str(e)}")
+
+# 重建关键词索引
+def rebuild_keyword_index() -> int:
+    """从向量库读取全部文档块重建关键词索引，返回索引的文档块数量"""
+    vector_store = get_vector_store()
+    if not vector_store.ensure_ready():
+        raise RuntimeError(vector_store.unavailable_message)
+    
+    keyword_index = get_keyword_index()
+    keyword_index.clear()
+    total = 0
+    for records in vector_store.iter_records():
+        keyword_index.add_chunks(records)
+        total += len(records)
+    app_logger.info(f"关键词索引重建完成，文档块数: {total}")
+    return total
+
 # 获取知识库项目列表
 def get_knowledge_items(filter_type: str = 'all', page: int = 1, per_page: int = 10) -> Tuple[List[Dict[str, Any]], int]:
     """获取知识库项目列表"""
     try:
-        # 获取元数据
-        metadata = get_kb_metadata()
-        items = metadata.get("items", [])
-        
-        # 应用过滤
-        if filter_type != 'all':
-            items = [item for item in items if item.get("source_type") == filter_type]
-        
-        # 计算总数
-        total = len(items)
-        
-        # 应用分页
-        start = (page - 1) * per_page
-        end = start + per_page
-        
-        # 排序（按创建时间倒序）
-        items.sort(key=lambda x: x.get("created_at", ""), reverse=True)
-        
-        # 返回当前页的项目
-        return items[start:end], total
+        # 按创建时间倒序分页，只读取当前页
+        return get_metadata_store().list_items(filter_type, page, per_page)
     
     except Exception as e:
         app_logger.error(f"获取知识库项目列表时发生错误: {str(e)}")
@@ -738,14 +596,9 @@ def get_knowledge_items(filter_type: str = 'all', page: int = 1, per_page: int =
 def get_knowledge_item_by_id(item_id: str) -> Optional[Dict[str, Any]]:
     """获取单个知识库项目详情"""
     try:
-        # 获取元数据
-        metadata = get_kb_metadata()
-        items = metadata.get("items", [])
-        
-        # 查找指定ID的项目
-        for item in items:
-            if item.get("id") == item_id:
-                return item
+        item = get_metadata_store().get_item(item_id)
+        if item is not None:
+            return item
         
         app_logger.warning(f"未找到ID为{item_id}的知识库项目")
         return None
@@ -758,42 +611,33 @@ def get_knowledge_item_by_id(item_id: str) -> Optional[Dict[str, Any]]:
 def delete_knowledge_item(item_id: str) -> Dict[str, Any]:
     """删除知识库项目"""
     try:
-        # 确保Milvus集合存在
-        if not ensure_milvus_collection():
+        # 确保向量库可用
+        vector_store = get_vector_store()
+        if not vector_store.ensure_ready():
             return {
                 'success': False,
-                'message': "连接到Milvus失败，请检查Milvus服务是否运行"
+                'message': vector_store.unavailable_message
             }
         
-        # 获取元数据
-        metadata = get_kb_metadata()
-        items = metadata.get("items", [])
-        
-        # 查找并删除指定ID的项目
-        item_found = False
-        chunks_count = 0
-        file_path = None
-        
-        for i, item in enumerate(items):
-            if item.get("id") == item_id:
-                item_found = True
-                chunks_count = item.get("chunks_count", 0)
-                file_path = item.get("file_path")
-                del items[i]
-                break
+        # 查找指定ID的项目
+        metadata_store = get_metadata_store()
+        item = metadata_store.get_item(item_id)
         
-        if not item_found:
+        if item is None:
             return {
                 'success': False,
                 'message': f"未找到ID为{item_id}的知识库项目"
             }
         
-        # 从Milvus中删除相关记录
-        collection = Collection(MILVUS_COLLECTION)
-        expr = f'item_id == "{item_id}"'
-        collection.delete(expr)
+        # 从向量库和关键词索引中删除相关记录
+        vector_store.delete_item(item_id)
+        try:
+            get_keyword_index().delete_item(item_id)
+        except Exception as e:
+            app_logger.error(f"从关键词索引删除知识项目失败: {str(e)}")
         
         # 如果是文件类型，尝试删除文件
+        file_path = item.get("file_path")
         if file_path and os.path.exists(file_path):
             try:
                 os.remove(file_path)
@@ -802,11 +646,7 @@ def delete_knowledge_item(item_id: str) -> Dict[str, Any]:
                 app_logger.warning(f"删除文件失败: {file_path}, 错误: {str(e)}")
         
         # 更新元数据
-        metadata["items"] = items
-        metadata["total_chunks"] -= chunks_count
-        
-        # 保存元数据
-        save_kb_metadata(metadata)
+        metadata_store.delete_item(item_id)
         
         return {
             'success': True,
@@ -820,38 +660,61 @@ def delete_knowledge_item(item_id: str) -> Dict[str, Any]:
             'message': f"删除知识库项目失败: {str(e)}"
         }
 
-# 使用Ollama生成嵌入向量
+# 生成嵌入向量
 def generate_embedding(text: str) -> Optional[List[float]]:
-    """使用Ollama生成嵌入向量"""
+    """使用嵌入客户端生成单个文本的嵌入向量，失败时返回None"""
+    return generate_embeddings([text])[0]
+
+# 批量生成嵌入向量
+def generate_embeddings(texts: List[str]) -> List[Optional[List[float]]]:
+    """使用嵌入客户端批量生成嵌入向量
+    
+    先查询嵌入向量缓存，只有未命中的文本才发送到嵌入后端；文本按批发送，多个批次并发请求。
+    返回结果与输入顺序一致，失败的文本对应None
+    """
     try:
-        # 使用subprocess调用Ollama API
-        print(f"[DEBUG] 开始生成嵌入向量，文本长度: {len(text)}")
-        command = [
-            "curl", "-s", f"http://{OLLAMA_HOST}:{OLLAMA_PORT}/api/embeddings",
-            "-d", json.dumps({"model": OLLAMA_EMBED_MODEL, "prompt": text})
-        ]
-        
-        print(f"[DEBUG] 调用Ollama API: {OLLAMA_HOST}:{OLLAMA_PORT}")
-        result = subprocess.run(command, capture_output=True, text=True)
-        
-        if result.returncode != 0:
-            print(f"[DEBUG] Ollama API调用失败，返回码: {result.returncode}, 错误: {result.stderr}")
-            app_logger.error(f"Ollama API调用失败: {result.stderr}")
-            return None
-        
-        print("[DEBUG] Ollama API调用成功，解析响应")
-        response = json.loads(result.stdout)
-        
-        if "embedding" not in response:
-            print(f"[DEBUG] Ollama API返回异常，未包含embedding字段: {response}")
-            app_logger.error(f"Ollama API返回异常: {response}")
-            return None
-        
-        embedding_length = len(response["embedding"])
-        print(f"[DEBUG] 成功生成嵌入向量，维度: {embedding_length}")
-        return response["embedding"]
+        print(f"[DEBUG] 开始生成嵌入向量，文本数量: {len(texts)}")
+        embeddings = [None] * len(texts)
+        pending_indexes = list(range(len(texts)))
+        
+        if EMBEDDING_CACHE_ENABLED:
+            # 缓存键使用嵌入客户端实际请求的模型，配置中的模型变更后不会读到旧模型的向量
+            cache_model = f"{EMBEDDING_BACKEND}:{get_embedding_client().backend.model}"
+            hashes = [text_hash(text) for text in texts]
+            try:
+                cached = get_embedding_cache().get_many(cache_model, hashes)
+            except Exception as e:
+                app_logger.warning(f"读取嵌入向量缓存失败: {str(e)}")
+                cached = {}
+            pending_indexes = []
+            for index, hash_value in enumerate(hashes):
+                if hash_value in cached:
+                    embeddings[index] = cached[hash_value]
+                else:
+                    pending_indexes.append(index)
+            print(f"[DEBUG] 嵌入向量缓存命中 {len(texts) - len(pending_indexes)}/{len(texts)} 条")
+        
+        if pending_indexes:
+            # 相同文本只请求一次
+            pending_texts = list(dict.fromkeys(texts[index] for index in pending_indexes))
+            generated = dict(zip(pending_texts, get_embedding_client().embed_texts(pending_texts)))
+            for index in pending_indexes:
+                embeddings[index] = generated[texts[index]]
+            
+            if EMBEDDING_CACHE_ENABLED:
+                new_items = {hashes[index]: embeddings[index] for index in pending_indexes if embeddings[index] is not None}
+                try:
+                    get_embedding_cache().put_many(cache_model, new_items)
+                except Exception as e:
+                    app_logger.warning(f"写入嵌入向量缓存失败: {str(e)}")
+        
+        failed_count = sum(1 for embedding in embeddings if embedding is None)
+        if failed_count:
+            app_logger.error(f"生成嵌入向量失败 {failed_count}/{len(texts)} 条")
+        print(f"[DEBUG] 嵌入向量生成完成，成功 {len(texts) - failed_count}/{len(texts)} 条")
+        return embeddings
     
     except Exception as e:
         print(f"[DEBUG] 生成嵌入向量时发生错误: {str(e)}")
         app_logger.error(f"生成嵌入向量时发生错误: {str(e)}")
-        return None 
\ No newline at end of file
+        return [None] * len(texts)
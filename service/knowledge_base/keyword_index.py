@@ -0,0 +1,229 @@
+"""
+知识库关键词索引
+
+对文档块建立jieba分词的倒排索引并持久化到SQLite，按BM25打分，与向量检索结果融合实现混合检索。
+插入和删除文档块时增量更新索引，不需要重建。
+"""
+
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional
+from service.log.logger import app_logger
+from service.knowledge_base.kb_config import KEYWORD_INDEX_PATH, BM25_K1, BM25_B
+
+# 只保留包含文字或数字的词
+_WORD_PATTERN = re.compile(r'\w', re.UNICODE)
+# 法律条款编号（如“第584条”“第五百八十四条”）额外作为一个完整词索引，便于精确查找条款
+_ARTICLE_PATTERN = re.compile(r'第[0-9一二三四五六七八九十百千零〇]+条')
+# jieba不可用时的退化分词：连续的字母数字作为一个词，汉字逐字切分
+_FALLBACK_PATTERN = re.compile(r'[0-9a-z_]+|[一-鿿]', re.UNICODE)
+# 常见虚词，不参与索引
+_STOP_WORDS = {'的', '了', '是', '在', '和', '与', '及', '或', '等', '对', '将', '其', '之', '也', '而', '被', '由'}
+# SQLite单条语句的参数数量限制
+_SQL_BATCH_SIZE = 500
+
+_jieba = None
+_jieba_checked = False
+
+
+def tokenize(text: str) -> List[str]:
+    """分词，返回用于索引和查询的词列表（可重复）"""
+    global _jieba, _jieba_checked
+    if not text:
+        return []
+    text = text.lower()
+    if not _jieba_checked:
+        try:
+            import jieba
+            jieba.setLogLevel(60)
+            _jieba = jieba
+        except ImportError:
+            app_logger.warning("jieba未安装，关键词索引使用逐字分词")
+        _jieba_checked = True
+
+    if _jieba is not None:
+        words = _jieba.lcut_for_search(text, HMM=False)
+    else:
+        words = _FALLBACK_PATTERN.findall(text)
+    tokens = [word.strip() for word in words
+              if word.strip() and word not in _STOP_WORDS and _WORD_PATTERN.search(word)]
+    tokens.extend(_ARTICLE_PATTERN.findall(text))
+    return tokens
+
+
+class KeywordIndex:
+    """基于SQLite的BM25倒排索引"""
+
+    def __init__(self, db_path: str, k1: float = BM25_K1, b: float = BM25_B):
+        self.db_path = db_path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            "chunk_id TEXT PRIMARY KEY, item_id TEXT NOT NULL, title TEXT, source_type TEXT, "
+            "chunk_index INTEGER, content TEXT, length INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_docs_item_id ON docs (item_id)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "term TEXT NOT NULL, chunk_id TEXT NOT NULL, tf INTEGER NOT NULL, "
+            "PRIMARY KEY (term, chunk_id)) WITHOUT ROWID"
+        )
+        # 删除文档块时按chunk_id查找倒排记录
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_postings_chunk_id ON postings (chunk_id)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, df INTEGER NOT NULL) WITHOUT ROWID")
+        self._conn.commit()
+        self._doc_count, self._total_length = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs").fetchone()
+        app_logger.info(f"关键词索引已打开: {db_path}, 文档块数: {self._doc_count}")
+
+    @property
+    def doc_count(self) -> int:
+        return self._doc_count
+
+    def add_chunks(self, records: List[Dict[str, Any]]):
+        """将文档块加入索引，记录字段与向量库相同（embedding字段不使用）"""
+        if not records:
+            return
+        docs = []
+        postings = []
+        df_delta = Counter()
+        for record in records:
+            counts = Counter(tokenize(record.get("content", "")))
+            length = sum(counts.values())
+            docs.append((record["id"], record["item_id"], record.get("title"), record.get("source_type"),
+                         record.get("chunk_index"), record.get("content"), length))
+            postings.extend((term, record["id"], tf) for term, tf in counts.items())
+            df_delta.update(counts.keys())
+
+        with self._lock:
+            try:
+                self._conn.executemany(
+                    "INSERT INTO docs (chunk_id, item_id, title, source_type, chunk_index, content, length) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", docs)
+                self._conn.executemany("INSERT INTO postings (term, chunk_id, tf) VALUES (?, ?, ?)", postings)
+                self._conn.executemany(
+                    "INSERT INTO terms (term, df) VALUES (?, ?) ON CONFLICT(term) DO UPDATE SET df = df + excluded.df",
+                    df_delta.items())
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            self._doc_count += len(docs)
+            self._total_length += sum(doc[6] for doc in docs)
+
+    def delete_item(self, item_id: str) -> int:
+        """删除知识项目的所有文档块，返回删除数量
+
+        倒排记录按chunk_id删除，词的文档频率按实际删除的倒排记录扣减，不依赖重新分词的结果
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id, length FROM docs WHERE item_id = ?", (item_id,)).fetchall()
+            if not rows:
+                return 0
+            df_delta = self._conn.execute(
+                "SELECT p.term, COUNT(*) FROM docs d JOIN postings p ON p.chunk_id = d.chunk_id "
+                "WHERE d.item_id = ? GROUP BY p.term", (item_id,)).fetchall()
+            try:
+                self._conn.executemany("UPDATE terms SET df = df - ? WHERE term = ?",
+                                       [(count, term) for term, count in df_delta])
+                self._conn.executemany("DELETE FROM terms WHERE term = ? AND df <= 0",
+                                       [(term,) for term, _ in df_delta])
+                self._conn.execute(
+                    "DELETE FROM postings WHERE chunk_id IN (SELECT chunk_id FROM docs WHERE item_id = ?)", (item_id,))
+                self._conn.execute("DELETE FROM docs WHERE item_id = ?", (item_id,))
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            self._doc_count -= len(rows)
+            self._total_length -= sum(row[1] for row in rows)
+            return len(rows)
+
+    def clear(self):
+        """清空索引"""
+        with self._lock:
+            self._conn.execute("DELETE FROM postings")
+            self._conn.execute("DELETE FROM terms")
+            self._conn.execute("DELETE FROM docs")
+            self._conn.commit()
+            self._doc_count = 0
+            self._total_length = 0
+
+    def search(self, query: str, limit: int, filter_type: str = 'all') -> List[Dict[str, Any]]:
+        """按BM25得分搜索文档块
+
+        Returns:
+            list: 与向量检索结果字段相同的字典列表，score为BM25得分
+        """
+        query_terms = list(dict.fromkeys(tokenize(query)))
+        if not query_terms or limit <= 0:
+            return []
+
+        with self._lock:
+            if self._doc_count == 0:
+                return []
+            avg_length = max(self._total_length / self._doc_count, 1.0)
+            term_df = {}
+            for start in range(0, len(query_terms), _SQL_BATCH_SIZE):
+                batch = query_terms[start:start + _SQL_BATCH_SIZE]
+                term_df.update(self._conn.execute(
+                    f"SELECT term, df FROM terms WHERE term IN ({','.join('?' * len(batch))})", batch).fetchall())
+            if not term_df:
+                return []
+
+            # 每个查询词的idf作为常量表参与SQL计算，打分和排序都在SQLite内完成
+            weights = [(term, math.log(1 + (self._doc_count - df + 0.5) / (df + 0.5))) for term, df in term_df.items()]
+            values = ','.join('(?, ?)' for _ in weights)
+            params = [value for weight in weights for value in weight]
+            params.extend([self.k1 + 1, self.k1, 1 - self.b, self.b / avg_length])
+            type_condition = ""
+            if filter_type != 'all':
+                type_condition = "WHERE d.source_type = ?"
+                params.append(filter_type)
+            params.append(limit)
+            sql = (
+                f"WITH q(term, idf) AS (VALUES {values}) "
+                f"SELECT d.chunk_id, d.item_id, d.title, d.source_type, d.chunk_index, d.content, "
+                f"SUM(q.idf * p.tf * ? / (p.tf + ? * (? + ? * d.length))) AS score "
+                f"FROM q JOIN postings p ON p.term = q.term JOIN docs d ON d.chunk_id = p.chunk_id "
+                f"{type_condition} GROUP BY d.chunk_id ORDER BY score DESC LIMIT ?"
+            )
+            rows = self._conn.execute(sql, params).fetchall()
+
+        return [{
+            "id": chunk_id,
+            "item_id": item_id,
+            "title": title,
+            "source_type": source_type,
+            "chunk_index": chunk_index,
+            "content": content,
+            "score": score
+        } for chunk_id, item_id, title, source_type, chunk_index, content, score in rows]
+
+
+_index: Optional[KeywordIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_keyword_index() -> KeywordIndex:
+    """获取进程级关键词索引"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = KeywordIndex(KEYWORD_INDEX_PATH)
+    return _index
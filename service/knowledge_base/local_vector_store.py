@@ -0,0 +1,455 @@
+"""
+本地向量库
+
+不依赖外部服务的进程内向量库，接口与MilvusVectorStore相同，用于Milvus不可用或单机部署的场景。
+
+- 向量经L2归一化后以float32矩阵存放在内存映射文件vectors.f32中，内积即余弦相似度
+- id、content等标量字段存放在同目录的chunks.db（SQLite）中，以矩阵行号关联
+- 删除只释放行号，新插入的向量优先复用空闲行，不需要整理文件
+- 默认分块扫描做精确搜索；index_type为ivf且向量数达到ivf_min_rows后，
+  用球面k-means聚类建立IVF索引，搜索时只计算最近的ivf_nprobe个聚类中的向量
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+import numpy as np
+from service.log.logger import app_logger
+from service.knowledge_base.vector_store import VectorStore
+
+_VECTOR_FILE = "vectors.f32"
+_LIST_FILE = "ivf_lists.i32"
+_CENTROID_FILE = "ivf_centroids.npy"
+_DB_FILE = "chunks.db"
+
+# 向量文件初始行数，容量不足时翻倍扩展
+_INITIAL_CAPACITY = 1024
+# 精确搜索和批量分配聚类时每次计算的行数
+_BLOCK_ROWS = 65536
+# k-means迭代次数和每个聚类的训练样本数
+_KMEANS_ITERATIONS = 10
+_KMEANS_SAMPLES_PER_LIST = 40
+# 向量数增长到上次训练时的倍数后重新训练IVF
+_IVF_RETRAIN_FACTOR = 2
+# SQLite单条语句的参数数量限制
+_SQL_BATCH_SIZE = 500
+
+
+class LocalVectorStore(VectorStore):
+    """基于内存映射NumPy矩阵的本地向量库"""
+
+    name = "local"
+    unavailable_message = "本地向量库不可用，请检查向量库目录是否可写"
+
+    def __init__(self, directory: str, dim: int, index_type: str = "flat",
+                 ivf_nlist: int = 0, ivf_nprobe: int = 16, ivf_min_rows: int = 100000):
+        self.directory = directory
+        self.dim = dim
+        self.index_type = (index_type or "flat").lower()
+        self.ivf_nlist = ivf_nlist
+        self.ivf_nprobe = max(1, ivf_nprobe)
+        self.ivf_min_rows = ivf_min_rows
+        self._lock = threading.RLock()
+        self._opened = False
+
+        self._conn = None
+        self._vectors = None
+        self._capacity = 0
+        self._size = 0
+        self._alive = None
+        self._live_count = 0
+        self._types = None
+        self._type_codes: Dict[str, int] = {}
+
+        self._centroids = None
+        self._lists = None
+        self._ivf_trained_rows = 0
+        self._list_order = None
+        self._list_offsets = None
+
+    # ---------- 打开与存储 ----------
+
+    def ensure_ready(self) -> bool:
+        try:
+            with self._lock:
+                if not self._opened:
+                    self._open()
+            return True
+        except Exception as e:
+            app_logger.error(f"打开本地向量库失败: {self.directory}, 错误: {str(e)}")
+            return False
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(self.directory, _DB_FILE), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "row INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, item_id TEXT NOT NULL, "
+            "title TEXT, source_type TEXT, chunk_index INTEGER, content TEXT)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_item_id ON chunks (item_id)")
+        conn.execute("CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        conn.commit()
+        meta = dict(conn.execute("SELECT key, value FROM store_meta").fetchall())
+
+        stored_dim = int(meta.get("dim", self.dim))
+        if stored_dim != self.dim:
+            conn.close()
+            raise ValueError(f"本地向量库维度为{stored_dim}，与配置的{self.dim}不一致")
+        if "dim" not in meta:
+            conn.execute("INSERT INTO store_meta (key, value) VALUES ('dim', ?)", (str(self.dim),))
+            conn.commit()
+        self._conn = conn
+        self._size = int(meta.get("size", 0))
+
+        vector_path = os.path.join(self.directory, _VECTOR_FILE)
+        row_bytes = self.dim * 4
+        file_rows = os.path.getsize(vector_path) // row_bytes if os.path.exists(vector_path) else 0
+        self._capacity = max(file_rows, self._size, _INITIAL_CAPACITY)
+        self._resize_file(vector_path, self._capacity * row_bytes)
+        self._vectors = np.memmap(vector_path, dtype=np.float32, mode='r+', shape=(self._capacity, self.dim))
+
+        self._alive = np.zeros(self._capacity, dtype=bool)
+        self._types = np.full(self._capacity, -1, dtype=np.int32)
+        for row, source_type in conn.execute("SELECT row, source_type FROM chunks"):
+            self._alive[row] = True
+            self._types[row] = self._type_code(source_type)
+        self._live_count = int(self._alive.sum())
+
+        centroid_path = os.path.join(self.directory, _CENTROID_FILE)
+        list_path = os.path.join(self.directory, _LIST_FILE)
+        if self.index_type == "ivf" and os.path.exists(centroid_path) and os.path.exists(list_path):
+            self._centroids = np.load(centroid_path)
+            self._resize_file(list_path, self._capacity * 4)
+            self._lists = np.memmap(list_path, dtype=np.int32, mode='r+', shape=(self._capacity,))
+            self._ivf_trained_rows = int(meta.get("ivf_trained_rows", self._live_count))
+
+        self._opened = True
+        app_logger.info(f"本地向量库已打开: {self.directory}, 向量数: {self._live_count}, 索引: {self.index_type}")
+
+    @staticmethod
+    def _resize_file(path: str, size: int):
+        """将文件扩展到指定大小（只增不减）"""
+        with open(path, 'ab') as f:
+            if f.tell() < size:
+                f.truncate(size)
+
+    def _type_code(self, source_type: Optional[str]) -> int:
+        code = self._type_codes.get(source_type)
+        if code is None:
+            code = len(self._type_codes)
+            self._type_codes[source_type] = code
+        return code
+
+    def _ensure_capacity(self, required: int):
+        if required <= self._capacity:
+            return
+        new_capacity = max(required, self._capacity * 2)
+        self._vectors.flush()
+        self._vectors = None
+        vector_path = os.path.join(self.directory, _VECTOR_FILE)
+        self._resize_file(vector_path, new_capacity * self.dim * 4)
+        self._vectors = np.memmap(vector_path, dtype=np.float32, mode='r+', shape=(new_capacity, self.dim))
+        if self._lists is not None:
+            self._lists.flush()
+            self._lists = None
+            list_path = os.path.join(self.directory, _LIST_FILE)
+            self._resize_file(list_path, new_capacity * 4)
+            self._lists = np.memmap(list_path, dtype=np.int32, mode='r+', shape=(new_capacity,))
+
+        alive = np.zeros(new_capacity, dtype=bool)
+        alive[:self._capacity] = self._alive
+        types = np.full(new_capacity, -1, dtype=np.int32)
+        types[:self._capacity] = self._types
+        self._alive, self._types = alive, types
+        self._capacity = new_capacity
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return vectors / norms
+
+    # ---------- 写入与删除 ----------
+
+    def insert(self, records: List[Dict[str, Any]]) -> int:
+        if not records:
+            return 0
+        vectors = np.asarray([record["embedding"] for record in records], dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dim:
+            raise ValueError(f"向量维度应为{self.dim}，实际为{vectors.shape[-1] if vectors.ndim else 0}")
+        vectors = self._normalize(vectors)
+
+        with self._lock:
+            if not self._opened:
+                self._open()
+
+            # 优先复用已删除记录释放的行
+            free_rows = np.flatnonzero(~self._alive[:self._size])[:len(records)]
+            append_count = len(records) - len(free_rows)
+            new_size = self._size + append_count
+            self._ensure_capacity(new_size)
+            rows = np.concatenate([free_rows, np.arange(self._size, new_size)]).astype(np.int64)
+
+            # 先写向量文件，SQLite提交后记录才可见，中途失败不会产生无向量的记录
+            self._vectors[rows] = vectors
+            self._vectors.flush()
+            if self._centroids is not None:
+                self._lists[rows] = self._nearest_centroids(vectors)
+                self._lists.flush()
+
+            try:
+                self._conn.executemany(
+                    "INSERT INTO chunks (row, id, item_id, title, source_type, chunk_index, content) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(int(row), record["id"], record["item_id"], record.get("title"),
+                      record.get("source_type"), record.get("chunk_index"), record.get("content"))
+                     for row, record in zip(rows, records)]
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO store_meta (key, value) VALUES ('size', ?)", (str(new_size),))
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+
+            self._size = new_size
+            self._alive[rows] = True
+            self._types[rows] = [self._type_code(record.get("source_type")) for record in records]
+            self._live_count += len(records)
+            self._list_order = None
+        return len(records)
+
+    def delete_item(self, item_id: str) -> None:
+        with self._lock:
+            if not self._opened:
+                self._open()
+            rows = [row for row, in self._conn.execute("SELECT row FROM chunks WHERE item_id = ?", (item_id,))]
+            self._conn.execute("DELETE FROM chunks WHERE item_id = ?", (item_id,))
+            self._conn.commit()
+            if rows:
+                self._alive[rows] = False
+                self._live_count -= len(rows)
+
+    def iter_records(self, batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        last_row = -1
+        while True:
+            with self._lock:
+                if not self._opened:
+                    self._open()
+                rows = self._conn.execute(
+                    "SELECT row, id, content, item_id, title, source_type, chunk_index "
+                    "FROM chunks WHERE row > ? ORDER BY row LIMIT ?", (last_row, batch_size)).fetchall()
+            if not rows:
+                break
+            last_row = rows[-1][0]
+            yield [{
+                "id": chunk_id,
+                "content": content,
+                "item_id": item_id,
+                "title": title,
+                "source_type": source_type,
+                "chunk_index": chunk_index
+            } for _, chunk_id, content, item_id, title, source_type, chunk_index in rows]
+
+    # ---------- 搜索 ----------
+
+    def search(self, query_embedding: List[float], limit: int, filter_type: str = 'all') -> List[Dict[str, Any]]:
+        query = np.asarray(query_embedding, dtype=np.float32).reshape(1, -1)
+        if query.shape[1] != self.dim:
+            raise ValueError(f"查询向量维度应为{self.dim}，实际为{query.shape[1]}")
+        query = self._normalize(query)[0]
+
+        with self._lock:
+            if not self._opened:
+                self._open()
+            if limit <= 0 or self._live_count == 0:
+                return []
+
+            mask = self._alive[:self._size]
+            if filter_type != 'all':
+                code = self._type_codes.get(filter_type)
+                if code is None:
+                    return []
+                mask = mask & (self._types[:self._size] == code)
+
+            found = None
+            if self._ivf_enabled():
+                found = self._search_ivf(query, limit, mask)
+            if found is None:
+                found = self._search_exact(query, limit, mask)
+            rows, scores = found
+            records = self._fetch_records(rows)
+
+        results = []
+        for row, score in zip(rows, scores):
+            record = records.get(int(row))
+            if record is not None:
+                record["score"] = float(score)
+                results.append(record)
+        return results
+
+    def _search_exact(self, query: np.ndarray, limit: int, mask: np.ndarray):
+        candidates = np.flatnonzero(mask)
+        # 候选行较少时（例如按类型过滤）只取这些行计算，否则顺序扫描整个矩阵
+        if len(candidates) * 4 < len(mask):
+            return self._top_k(candidates, self._score_rows(candidates, query), limit)
+
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, len(mask), _BLOCK_ROWS):
+            end = min(start + _BLOCK_ROWS, len(mask))
+            block_mask = mask[start:end]
+            if not block_mask.any():
+                continue
+            scores = np.asarray(self._vectors[start:end]) @ query
+            block_rows = np.flatnonzero(block_mask)
+            rows, scores = self._top_k(block_rows + start, scores[block_rows], limit)
+            best_rows = np.concatenate([best_rows, rows])
+            best_scores = np.concatenate([best_scores, scores])
+        return self._top_k(best_rows, best_scores, limit)
+
+    def _score_rows(self, rows: np.ndarray, query: np.ndarray) -> np.ndarray:
+        scores = np.empty(len(rows), dtype=np.float32)
+        for start in range(0, len(rows), _BLOCK_ROWS):
+            block = rows[start:start + _BLOCK_ROWS]
+            scores[start:start + len(block)] = np.asarray(self._vectors[block]) @ query
+        return scores
+
+    @staticmethod
+    def _top_k(rows: np.ndarray, scores: np.ndarray, limit: int):
+        """返回得分最高的limit行，按得分降序"""
+        if len(rows) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            rows, scores = rows[top], scores[top]
+        order = np.argsort(-scores, kind='stable')
+        return rows[order], scores[order]
+
+    def _fetch_records(self, rows: np.ndarray) -> Dict[int, Dict[str, Any]]:
+        records = {}
+        row_list = [int(row) for row in rows]
+        for start in range(0, len(row_list), _SQL_BATCH_SIZE):
+            batch = row_list[start:start + _SQL_BATCH_SIZE]
+            placeholders = ','.join('?' * len(batch))
+            for row, chunk_id, content, item_id, title, source_type, chunk_index in self._conn.execute(
+                    f"SELECT row, id, content, item_id, title, source_type, chunk_index "
+                    f"FROM chunks WHERE row IN ({placeholders})", batch):
+                records[row] = {
+                    "id": chunk_id,
+                    "item_id": item_id,
+                    "title": title,
+                    "source_type": source_type,
+                    "chunk_index": chunk_index,
+                    "content": content
+                }
+        return records
+
+    # ---------- IVF索引 ----------
+
+    def _ivf_enabled(self) -> bool:
+        if self.index_type != "ivf" or self._live_count < self.ivf_min_rows:
+            return False
+        if self._centroids is None or self._live_count >= self._ivf_trained_rows * _IVF_RETRAIN_FACTOR:
+            self.build_index()
+        return True
+
+    def _search_ivf(self, query: np.ndarray, limit: int, mask: np.ndarray):
+        """在最近的若干聚类中搜索，候选不足limit条时返回None改用精确搜索"""
+        if self._list_order is None:
+            lists = np.asarray(self._lists[:self._size])
+            self._list_order = np.argsort(lists, kind='stable')
+            self._list_offsets = np.searchsorted(lists[self._list_order], np.arange(len(self._centroids) + 1))
+
+        nprobe = min(self.ivf_nprobe, len(self._centroids))
+        centroid_scores = self._centroids @ query
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        candidates = np.concatenate([
+            self._list_order[self._list_offsets[index]:self._list_offsets[index + 1]] for index in probe
+        ])
+        candidates = np.sort(candidates[mask[candidates]])
+        if len(candidates) < limit:
+            return None
+        return self._top_k(candidates, self._score_rows(candidates, query), limit)
+
+    def _nearest_centroids(self, vectors: np.ndarray, centroids: Optional[np.ndarray] = None) -> np.ndarray:
+        centroids = self._centroids if centroids is None else centroids
+        result = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), _BLOCK_ROWS):
+            block = np.asarray(vectors[start:start + _BLOCK_ROWS])
+            result[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        return result
+
+    def build_index(self):
+        """训练IVF聚类中心并为所有向量分配聚类
+
+        向量数达到ivf_min_rows后首次搜索时自动调用，向量数翻倍后重新训练；
+        也可在批量导入后手动调用，避免首次搜索等待。
+        """
+        with self._lock:
+            if not self._opened:
+                self._open()
+            live_rows = np.flatnonzero(self._alive[:self._size])
+            if len(live_rows) == 0:
+                return
+            started = time.time()
+            nlist = self.ivf_nlist or int(np.sqrt(len(live_rows)))
+            nlist = max(1, min(nlist, len(live_rows)))
+
+            rng = np.random.default_rng(0)
+            sample_size = min(len(live_rows), nlist * _KMEANS_SAMPLES_PER_LIST)
+            sample_rows = np.sort(rng.choice(live_rows, sample_size, replace=False))
+            sample = np.asarray(self._vectors[sample_rows])
+            centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+            # 球面k-means：按内积分配，聚类中心取均值后重新归一化
+            for _ in range(_KMEANS_ITERATIONS):
+                assignment = self._nearest_centroids(sample, centroids)
+                order = np.argsort(assignment, kind='stable')
+                counts = np.bincount(assignment, minlength=nlist)
+                non_empty = np.flatnonzero(counts)
+                starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[non_empty]
+                centroids[non_empty] = np.add.reduceat(sample[order], starts, axis=0)
+                empty = np.flatnonzero(counts == 0)
+                if len(empty):
+                    centroids[empty] = sample[rng.choice(sample_size, len(empty), replace=False)]
+                centroids = self._normalize(centroids).astype(np.float32)
+
+            list_path = os.path.join(self.directory, _LIST_FILE)
+            if self._lists is None:
+                self._resize_file(list_path, self._capacity * 4)
+                self._lists = np.memmap(list_path, dtype=np.int32, mode='r+', shape=(self._capacity,))
+            self._lists[:self._size] = self._nearest_centroids(self._vectors[:self._size], centroids)
+            self._lists.flush()
+
+            centroid_path = os.path.join(self.directory, _CENTROID_FILE)
+            with open(centroid_path + ".tmp", 'wb') as f:
+                np.save(f, centroids)
+            os.replace(centroid_path + ".tmp", centroid_path)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO store_meta (key, value) VALUES ('ivf_trained_rows', ?)", (str(len(live_rows)),))
+            self._conn.commit()
+
+            self._centroids = centroids
+            self._ivf_trained_rows = len(live_rows)
+            self._list_order = None
+            app_logger.info(f"本地向量库IVF索引构建完成: 聚类数 {nlist}, 向量数 {len(live_rows)}, "
+                            f"耗时 {time.time() - started:.1f}秒")
+
+    def close(self):
+        """刷新并关闭向量文件和SQLite连接"""
+        with self._lock:
+            if not self._opened:
+                return
+            self._vectors.flush()
+            if self._lists is not None:
+                self._lists.flush()
+            self._conn.close()
+            self._vectors = self._lists = self._conn = None
+            self._centroids = None
+            self._list_order = None
+            self._type_codes = {}
+            self._opened = False
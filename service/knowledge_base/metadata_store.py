@@ -0,0 +1,194 @@
+"""
+知识库元数据存储
+
+知识项目元数据存放在SQLite中（WAL模式），按id、source_type、created_at建索引，
+增删操作在事务内同时更新项目表和统计信息，多个上传请求并发写入时不会互相覆盖。
+首次打开时自动导入旧版kb_metadata.json中的项目。
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from service.log.logger import app_logger
+from service.knowledge_base.kb_config import KB_METADATA_DB_PATH, KB_METADATA_PATH
+
+# 有独立列的字段，其余字段以JSON存放在extra列
+_COLUMNS = ("id", "title", "source_type", "type", "file_path", "tags", "chunks_count", "created_at")
+
+
+class KBMetadataStore:
+    """基于SQLite的知识库元数据存储"""
+
+    def __init__(self, db_path: str, legacy_json_path: Optional[str] = None):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # timeout让多进程同时写入时等待锁而不是立即失败
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kb_items ("
+            "id TEXT PRIMARY KEY, title TEXT, source_type TEXT, type TEXT, file_path TEXT, tags TEXT, "
+            "chunks_count INTEGER NOT NULL DEFAULT 0, created_at TEXT NOT NULL, extra TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_kb_items_created_at ON kb_items (created_at)")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_kb_items_source_type ON kb_items (source_type, created_at)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS kb_stats (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.commit()
+
+        if legacy_json_path:
+            self._migrate_legacy_json(legacy_json_path)
+
+    def _migrate_legacy_json(self, json_path: str):
+        """导入旧版JSON元数据文件，只执行一次，原文件保留不动"""
+        with self._lock:
+            migrated = self._conn.execute(
+                "SELECT value FROM kb_stats WHERE key = 'legacy_json_migrated'").fetchone()
+            if migrated or not os.path.exists(json_path):
+                return
+            with open(json_path, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+            items = metadata.get("items", [])
+            try:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO kb_items (id, title, source_type, type, file_path, tags, chunks_count, "
+                    "created_at, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [self._to_row(item) for item in items]
+                )
+                self._set_stat("total_chunks", str(metadata.get("total_chunks", 0)))
+                self._set_stat("last_updated", metadata.get("last_updated") or datetime.now().isoformat())
+                self._set_stat("legacy_json_migrated", datetime.now().isoformat())
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            app_logger.info(f"已从{json_path}导入 {len(items)} 个知识库项目")
+
+    @staticmethod
+    def _to_row(item: Dict[str, Any]) -> Tuple:
+        extra = {key: value for key, value in item.items() if key not in _COLUMNS}
+        tags = item.get("tags")
+        return (
+            item["id"], item.get("title"), item.get("source_type"), item.get("type"), item.get("file_path"),
+            json.dumps(tags, ensure_ascii=False) if tags is not None else None,
+            item.get("chunks_count", 0), item.get("created_at") or datetime.now().isoformat(),
+            json.dumps(extra, ensure_ascii=False) if extra else None
+        )
+
+    @staticmethod
+    def _from_row(row: Tuple) -> Dict[str, Any]:
+        item_id, title, source_type, item_type, file_path, tags, chunks_count, created_at, extra = row
+        item = {
+            "id": item_id,
+            "title": title,
+            "source_type": source_type
+        }
+        # 与旧版JSON保持一致：文件项目才有file_path，文本项目才有tags
+        if file_path is not None:
+            item["file_path"] = file_path
+        if tags is not None:
+            item["tags"] = json.loads(tags)
+        item["chunks_count"] = chunks_count
+        item["created_at"] = created_at
+        item["type"] = item_type
+        if extra:
+            item.update(json.loads(extra))
+        return item
+
+    def _set_stat(self, key: str, value: str):
+        self._conn.execute("INSERT OR REPLACE INTO kb_stats (key, value) VALUES (?, ?)", (key, value))
+
+    def _add_total_chunks(self, delta: int):
+        self._conn.execute(
+            "INSERT INTO kb_stats (key, value) VALUES ('total_chunks', ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + ?", (str(delta), delta))
+        self._set_stat("last_updated", datetime.now().isoformat())
+
+    def add_item(self, item: Dict[str, Any]):
+        """添加知识项目，同时累加总块数"""
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT INTO kb_items (id, title, source_type, type, file_path, tags, chunks_count, "
+                    "created_at, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", self._to_row(item))
+                self._add_total_chunks(item.get("chunks_count", 0))
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+
+    def get_item(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """按ID获取知识项目，不存在时返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)}, extra FROM kb_items WHERE id = ?", (item_id,)).fetchone()
+        return self._from_row(row) if row else None
+
+    def list_items(self, filter_type: str = 'all', page: int = 1, per_page: int = 10) -> Tuple[List[Dict[str, Any]], int]:
+        """按创建时间倒序分页获取知识项目
+
+        Returns:
+            tuple: (当前页项目列表, 总数)
+        """
+        condition = ""
+        params: List[Any] = []
+        if filter_type != 'all':
+            condition = "WHERE source_type = ?"
+            params.append(filter_type)
+        offset = max(page - 1, 0) * per_page
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM kb_items {condition}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)}, extra FROM kb_items {condition} "
+                f"ORDER BY created_at DESC LIMIT ? OFFSET ?", params + [max(per_page, 0), offset]).fetchall()
+        return [self._from_row(row) for row in rows], total
+
+    def delete_item(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """删除知识项目并扣减总块数，返回被删除的项目，不存在时返回None"""
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    f"SELECT {', '.join(_COLUMNS)}, extra FROM kb_items WHERE id = ?", (item_id,)).fetchone()
+                if row is None:
+                    return None
+                item = self._from_row(row)
+                self._conn.execute("DELETE FROM kb_items WHERE id = ?", (item_id,))
+                self._add_total_chunks(-item.get("chunks_count", 0))
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return item
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取知识库统计信息"""
+        with self._lock:
+            stats = dict(self._conn.execute("SELECT key, value FROM kb_stats").fetchall())
+            total_items = self._conn.execute("SELECT COUNT(*) FROM kb_items").fetchone()[0]
+        return {
+            "total_items": total_items,
+            "total_chunks": int(stats.get("total_chunks", 0)),
+            "last_updated": stats.get("last_updated")
+        }
+
+
+_store: Optional[KBMetadataStore] = None
+_store_lock = threading.Lock()
+
+
+def get_metadata_store() -> KBMetadataStore:
+    """获取进程级知识库元数据存储"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = KBMetadataStore(KB_METADATA_DB_PATH, KB_METADATA_PATH)
+    return _store
@@ -0,0 +1,238 @@
+"""
+向量库接口
+
+知识库服务通过VectorStore读写向量，不直接依赖具体的向量数据库。
+目前提供Milvus和本地向量库（local_vector_store）两种实现，由kb_config.VECTOR_STORE_BACKEND选择。
+"""
+
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+from service.log.logger import app_logger
+from service.knowledge_base.kb_config import (
+    MILVUS_HOST, MILVUS_PORT, MILVUS_COLLECTION, VECTOR_DIMENSION,
+    VECTOR_STORE_BACKEND, LOCAL_VECTOR_STORE_DIR, LOCAL_VECTOR_INDEX,
+    LOCAL_IVF_NLIST, LOCAL_IVF_NPROBE, LOCAL_IVF_MIN_ROWS
+)
+
+# 搜索结果中返回的字段
+OUTPUT_FIELDS = ["id", "content", "item_id", "title", "source_type", "chunk_index"]
+
+
+class VectorStore:
+    """向量库接口
+
+    记录字段与Milvus集合一致：id, content, item_id, title, source_type, chunk_index, embedding。
+    相似度为余弦相似度，搜索结果按score从高到低排列。
+    """
+
+    name = "base"
+    unavailable_message = "向量库不可用"
+
+    def ensure_ready(self) -> bool:
+        """确保向量库可用，不可用时返回False"""
+        raise NotImplementedError
+
+    def insert(self, records: List[Dict[str, Any]]) -> int:
+        """插入记录，返回插入数量"""
+        raise NotImplementedError
+
+    def search(self, query_embedding: List[float], limit: int, filter_type: str = 'all') -> List[Dict[str, Any]]:
+        """搜索与查询向量最相似的记录
+
+        Args:
+            query_embedding: 查询向量
+            limit: 返回数量
+            filter_type: 按source_type过滤，'all'表示不过滤
+
+        Returns:
+            list: 包含OUTPUT_FIELDS和score的字典列表
+        """
+        raise NotImplementedError
+
+    def delete_item(self, item_id: str) -> None:
+        """删除知识项目的所有记录"""
+        raise NotImplementedError
+
+    def iter_records(self, batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """按批遍历所有记录（不含embedding），用于重建关键词索引"""
+        raise NotImplementedError
+
+
+class MilvusVectorStore(VectorStore):
+    """Milvus向量库"""
+
+    name = "milvus"
+    unavailable_message = "连接到Milvus失败，请检查Milvus服务是否运行"
+
+    def __init__(self, host: str = MILVUS_HOST, port: int = MILVUS_PORT,
+                 collection_name: str = MILVUS_COLLECTION, dim: int = VECTOR_DIMENSION):
+        self.host = host
+        self.port = port
+        self.collection_name = collection_name
+        self.dim = dim
+
+    def ensure_ready(self) -> bool:
+        """确保Milvus集合存在"""
+        try:
+            from pymilvus import connections, Collection, utility
+
+            # 连接到Milvus
+            connections.connect(
+                alias="default",
+                host=self.host,
+                port=self.port
+            )
+
+            # 检查集合是否存在
+            if not utility.has_collection(self.collection_name):
+                app_logger.info(f"创建Milvus集合: {self.collection_name}")
+
+                # 定义集合结构
+                from pymilvus import CollectionSchema, FieldSchema, DataType
+
+                fields = [
+                    FieldSchema(name="id", dtype=DataType.VARCHAR, is_primary=True, max_length=36),
+                    FieldSchema(name="content", dtype=DataType.VARCHAR, max_length=65535),
+                    FieldSchema(name="item_id", dtype=DataType.VARCHAR, max_length=36),
+                    FieldSchema(name="title", dtype=DataType.VARCHAR, max_length=255),
+                    FieldSchema(name="source_type", dtype=DataType.VARCHAR, max_length=20),
+                    FieldSchema(name="chunk_index", dtype=DataType.INT64),
+                    FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=self.dim)
+                ]
+
+                schema = CollectionSchema(fields=fields)
+                collection = Collection(name=self.collection_name, schema=schema)
+
+                # 创建索引
+                index_params = {
+                    "metric_type": "COSINE",
+                    "index_type": "HNSW",
+                    "params": {"M": 8, "efConstruction": 64}
+                }
+
+                collection.create_index(field_name="embedding", index_params=index_params)
+                collection.load()
+
+                app_logger.info(f"成功创建并索引Milvus集合: {self.collection_name}")
+            else:
+                app_logger.info(f"Milvus集合已存在: {self.collection_name}")
+
+                # 加载集合
+                collection = Collection(name=self.collection_name)
+                collection.load()
+
+            return True
+
+        except Exception as e:
+            app_logger.error(f"确保Milvus集合存在时发生错误: {str(e)}")
+            return False
+
+    def _collection(self):
+        from pymilvus import Collection
+        return Collection(self.collection_name)
+
+    def insert(self, records: List[Dict[str, Any]]) -> int:
+        if records:
+            self._collection().insert(records)
+        return len(records)
+
+    def search(self, query_embedding: List[float], limit: int, filter_type: str = 'all') -> List[Dict[str, Any]]:
+        # 准备搜索参数
+        search_params = {
+            "metric_type": "COSINE",
+            "params": {"ef": 64}
+        }
+
+        # 构建查询条件
+        expr = None
+        if filter_type != 'all':
+            expr = f'source_type == "{filter_type}"'
+
+        results = self._collection().search(
+            data=[query_embedding],
+            anns_field="embedding",
+            param=search_params,
+            limit=limit,
+            expr=expr,
+            output_fields=OUTPUT_FIELDS
+        )
+
+        search_results = []
+        for hits in results:
+            for hit in hits:
+                result = {
+                    "id": hit.id,
+                    "item_id": hit.entity.get("item_id"),
+                    "title": hit.entity.get("title"),
+                    "source_type": hit.entity.get("source_type"),
+                    "chunk_index": hit.entity.get("chunk_index"),
+                    "content": hit.entity.get("content"),
+                    "score": hit.score
+                }
+                search_results.append(result)
+        return search_results
+
+    def delete_item(self, item_id: str) -> None:
+        self._collection().delete(f'item_id == "{item_id}"')
+
+    def iter_records(self, batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        iterator = self._collection().query_iterator(
+            batch_size=batch_size, expr='chunk_index >= 0', output_fields=OUTPUT_FIELDS)
+        try:
+            while True:
+                batch = iterator.next()
+                if not batch:
+                    break
+                yield [{field: record.get(field) for field in OUTPUT_FIELDS} for record in batch]
+        finally:
+            iterator.close()
+
+
+def _create_local_store() -> VectorStore:
+    from service.knowledge_base.local_vector_store import LocalVectorStore
+    return LocalVectorStore(
+        LOCAL_VECTOR_STORE_DIR,
+        VECTOR_DIMENSION,
+        index_type=LOCAL_VECTOR_INDEX,
+        ivf_nlist=LOCAL_IVF_NLIST,
+        ivf_nprobe=LOCAL_IVF_NPROBE,
+        ivf_min_rows=LOCAL_IVF_MIN_ROWS
+    )
+
+
+_store: Optional[VectorStore] = None
+_store_lock = threading.Lock()
+
+
+def get_vector_store() -> VectorStore:
+    """获取全局向量库实例
+
+    auto模式下只在首次调用时探测Milvus，之后进程内始终使用选定的向量库，
+    避免Milvus时好时坏导致数据分散在两个库中。
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                backend = (VECTOR_STORE_BACKEND or "milvus").lower()
+                if backend == "local":
+                    store = _create_local_store()
+                elif backend == "milvus":
+                    store = MilvusVectorStore()
+                elif backend == "auto":
+                    store = MilvusVectorStore()
+                    if not store.ensure_ready():
+                        app_logger.warning("Milvus不可用，知识库改用本地向量库")
+                        store = _create_local_store()
+                else:
+                    raise ValueError(f"不支持的向量库类型: {VECTOR_STORE_BACKEND}")
+                app_logger.info(f"知识库向量库: {store.name}")
+                _store = store
+    return _store
+
+
+def set_vector_store(store: Optional[VectorStore]):
+    """替换全局向量库实例，传入None时下次使用按配置重新创建"""
+    global _store
+    with _store_lock:
+        _store = store
@@ -44,7 +44,7 @@ class CustomThreadPoolExecutor:
         # 线程状态
         self._workers = {}  # 用于跟踪活动工作线程的字典
         self._shutdown = False
-        self._shutdown_lock = threading.Lock()
+        self._shutdown_lock = threading.RLock()  # submit持锁时会调用_adjust_pool_size，需要可重入
         
         # 拒绝策略
         self._rejection_policy = self.global_config.get('rejection_policy', 'caller_runs')
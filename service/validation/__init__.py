@@ -0,0 +1,5 @@
+"""
+数据校验服务包
+
+提供不依赖大模型的规则校验：内置规则按数据库方言编译为SQL，每张表一次聚合扫描统计不合规行数
+"""
@@ -0,0 +1,276 @@
+"""
+数据校验规则引擎
+
+内置身份证号、日期、金额、手机号、固定电话等校验规则，每条规则按数据库方言（MySQL、SQL Server、Oracle）
+编译为返回1（不合规）或0（合规或为空）的CASE表达式。同一张表的所有校验规则合并到一条
+SELECT COUNT(*), SUM(CASE ...), SUM(CASE ...) ... 语句中，一次扫描得到每条规则的不合规行数。
+
+规则只对非空值校验，空值统计使用not_null规则。
+SQL Server（2022及以下）不支持正则表达式，格式检查编译为LIKE字符类模式。
+"""
+
+import re
+from service.exception import AppException
+
+SUPPORTED_DB_TYPES = ('mysql', 'sqlserver', 'oracle')
+
+# 身份证校验码：前17位按权重求和后对11取模，余数对应的校验字符
+_IDCARD_WEIGHTS = (7, 9, 10, 5, 8, 4, 2, 1, 6, 3, 7, 9, 10, 5, 8, 4, 2)
+_IDCARD_CHECK_CODES = '10X98765432'
+
+# 日期格式：格式模式（#为数字）、MySQL STR_TO_DATE格式、SQL Server CONVERT样式、Oracle日期格式
+DATE_FORMATS = {
+    'YYYY-MM-DD': ('####-##-##', '%Y-%m-%d', 23, 'FXYYYY-MM-DD'),
+    'YYYY/MM/DD': ('####/##/##', '%Y/%m/%d', 111, 'FXYYYY/MM/DD'),
+    'YYYYMMDD': ('########', '%Y%m%d', 112, 'FXYYYYMMDD'),
+    'YYYY-MM-DD HH:MI:SS': ('####-##-## ##:##:##', '%Y-%m-%d %H:%i:%s', 120, 'FXYYYY-MM-DD HH24:MI:SS')
+}
+
+# 固定电话格式：区号3-4位，号码7-8位，区号和号码之间可以有短横线
+_LANDLINE_PATTERNS = tuple(
+    '0' + '#' * (area - 1) + separator + '#' * number
+    for area in (3, 4) for separator in ('-', '') for number in (7, 8)
+)
+
+_SIMPLE_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+_PATTERN_TOKEN = re.compile(r'\[[^\]]+\]|.')
+
+
+def quote_identifier(db_type, name):
+    """按数据库方言引用表名或字段名
+
+    普通标识符（字母、数字、下划线）保持原样，按数据库默认的大小写规则匹配；
+    包含中文、空格等字符时加引号。
+    """
+    if _SIMPLE_IDENTIFIER.match(name):
+        return name
+    if db_type == 'mysql':
+        return '`' + name.replace('`', '``') + '`'
+    if db_type == 'sqlserver':
+        return '[' + name.replace(']', ']]') + ']'
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _check_db_type(db_type):
+    if db_type not in SUPPORTED_DB_TYPES:
+        raise AppException(f"不支持的数据库类型: {db_type}", 400)
+
+
+def _trim(db_type, expr):
+    return f"LTRIM(RTRIM({expr}))" if db_type == 'sqlserver' else f"TRIM({expr})"
+
+
+def _length(db_type, expr):
+    return f"LEN({expr})" if db_type == 'sqlserver' else f"LENGTH({expr})"
+
+
+def _substring(db_type, expr, start, length):
+    function = 'SUBSTR' if db_type == 'oracle' else 'SUBSTRING'
+    return f"{function}({expr}, {start}, {length})"
+
+
+def _mod(db_type, expr, divisor):
+    return f"(({expr}) % {divisor})" if db_type == 'sqlserver' else f"MOD({expr}, {divisor})"
+
+
+def _is_blank(db_type, value):
+    # Oracle中空字符串即NULL
+    return f"{value} IS NULL" if db_type == 'oracle' else f"({value} IS NULL OR {value} = '')"
+
+
+def _match_patterns(db_type, value, patterns):
+    """值完整匹配任一格式模式
+
+    模式中#表示一位数字，[..]表示字符类，其他字符按原样匹配。
+    MySQL和Oracle编译为正则表达式，SQL Server编译为LIKE模式。
+    """
+    compiled = []
+    for pattern in patterns:
+        tokens = ['[0-9]' if token == '#' else token for token in _PATTERN_TOKEN.findall(pattern)]
+        if db_type == 'sqlserver':
+            compiled.append(''.join(tokens))
+        else:
+            # 小数点放在字符类中匹配字面值，避免反斜杠转义在不同数据库字符串字面量中含义不同；连续相同的字符类合并为{n}
+            regex = []
+            for token in tokens:
+                token = '[.]' if token == '.' else token
+                if regex and regex[-1][0] == token:
+                    regex[-1][1] += 1
+                else:
+                    regex.append([token, 1])
+            compiled.append(''.join(token if count == 1 else f"{token}{{{count}}}" for token, count in regex))
+    if db_type == 'sqlserver':
+        return '(' + ' OR '.join(f"{value} LIKE '{pattern}'" for pattern in compiled) + ')'
+    regex = '^(' + '|'.join(compiled) + ')$'
+    if db_type == 'mysql':
+        return f"({value} REGEXP '{regex}')"
+    return f"REGEXP_LIKE({value}, '{regex}')"
+
+
+def _is_valid_date(db_type, expr, date_format):
+    """表达式是日历上存在的日期（格式形状已另行检查）"""
+    _, mysql_format, sqlserver_style, oracle_format = DATE_FORMATS[date_format]
+    if db_type == 'mysql':
+        return f"STR_TO_DATE({expr}, '{mysql_format}') IS NOT NULL"
+    if db_type == 'sqlserver':
+        return f"TRY_CONVERT(datetime2, {expr}, {sqlserver_style}) IS NOT NULL"
+    return f"VALIDATE_CONVERSION({expr} AS DATE, '{oracle_format}') = 1"
+
+
+def _case(conditions):
+    """依次判断(条件, 结果)，CASE按顺序求值，前面的格式检查保证后面的转换和计算不会出错"""
+    whens = ' '.join(f"WHEN {condition} THEN {result}" for condition, result in conditions)
+    return f"CASE {whens} ELSE 0 END"
+
+
+def _not_null_rule(db_type, column, value, params):
+    return _case([(_is_blank(db_type, value), 1)])
+
+
+def _idcard_rule(db_type, column, value, params):
+    """18位身份证：格式、出生日期和校验码；15位身份证：格式和出生日期"""
+    digit_sum = ' + '.join(
+        f"(ASCII({_substring(db_type, value, position, 1)}) - 48) * {weight}"
+        for position, weight in enumerate(_IDCARD_WEIGHTS, start=1)
+    )
+    check_code = _substring(db_type, f"'{_IDCARD_CHECK_CODES}'", _mod(db_type, digit_sum, 11) + ' + 1', 1)
+    last_char = f"UPPER({_substring(db_type, value, 18, 1)})"
+    birth_18 = _substring(db_type, value, 7, 8)
+    birth_15 = f"'19' {'+' if db_type == 'sqlserver' else '||'} {_substring(db_type, value, 7, 6)}"
+    if db_type == 'mysql':
+        birth_15 = f"CONCAT('19', {_substring(db_type, value, 7, 6)})"
+
+    idcard_18 = _case([
+        (f"NOT {_match_patterns(db_type, value, ['[1-9]################[0-9Xx]'])}", 1),
+        (f"NOT {_is_valid_date(db_type, birth_18, 'YYYYMMDD')}", 1),
+        (f"{check_code} <> {last_char}", 1)
+    ])
+    idcard_15 = _case([
+        (f"NOT {_match_patterns(db_type, value, ['[1-9]##############'])}", 1),
+        (f"NOT {_is_valid_date(db_type, birth_15, 'YYYYMMDD')}", 1)
+    ])
+    length = _length(db_type, value)
+    return _case([
+        (_is_blank(db_type, value), 0),
+        (f"{length} = 18", idcard_18),
+        (f"{length} = 15", idcard_15),
+        ('1 = 1', 1)
+    ])
+
+
+def _date_rule(db_type, column, value, params):
+    """值符合任一允许的日期格式，且日期真实存在（如不接受2月30日）"""
+    formats = params.get('formats') or ['YYYY-MM-DD', 'YYYY/MM/DD', 'YYYYMMDD']
+    unknown = [date_format for date_format in formats if date_format not in DATE_FORMATS]
+    if unknown:
+        raise AppException(f"不支持的日期格式: {', '.join(unknown)}", 400,
+                           details={"supported_formats": list(DATE_FORMATS)})
+    conditions = [(_is_blank(db_type, value), 0)]
+    for date_format in formats:
+        shape = DATE_FORMATS[date_format][0]
+        conditions.append((_match_patterns(db_type, value, [shape]),
+                           _case([(f"NOT {_is_valid_date(db_type, value, date_format)}", 1)])))
+    conditions.append(('1 = 1', 1))
+    return _case(conditions)
+
+
+def _amount_rule(db_type, column, value, params):
+    """可带负号的数字，小数位数不超过scale（默认2位）"""
+    scale = int(params.get('scale', 2))
+    if db_type == 'sqlserver':
+        # 只含数字、小数点和负号，负号只在开头，最多一个小数点且不在末尾，小数位数不超过scale
+        dot = f"CHARINDEX('.', {value})"
+        valid = (f"{value} NOT LIKE '%[^0-9.-]%' AND CHARINDEX('-', {value}, 2) = 0 "
+                 f"AND {value} NOT LIKE '%.%.%' AND {value} NOT IN ('-', '.', '-.') AND {value} NOT LIKE '%.' "
+                 f"AND ({dot} = 0 OR {_length(db_type, value)} - {dot} <= {scale})")
+    else:
+        fraction = f"([.][0-9]{{1,{scale}}})?" if scale > 0 else ''
+        leading = f"|[.][0-9]{{1,{scale}}}" if scale > 0 else ''
+        regex = f"^-?([0-9]+{fraction}{leading})$"
+        valid = f"{value} REGEXP '{regex}'" if db_type == 'mysql' else f"REGEXP_LIKE({value}, '{regex}')"
+    return _case([(_is_blank(db_type, value), 0), (f"NOT ({valid})", 1)])
+
+
+def _mobile_rule(db_type, column, value, params):
+    """中国大陆11位手机号"""
+    return _case([(_is_blank(db_type, value), 0),
+                  (f"NOT {_match_patterns(db_type, value, ['1[3-9]#########'])}", 1)])
+
+
+def _phone_rule(db_type, column, value, params):
+    """手机号或带区号的固定电话"""
+    return _case([(_is_blank(db_type, value), 0),
+                  (f"NOT {_match_patterns(db_type, value, ('1[3-9]#########',) + _LANDLINE_PATTERNS)}", 1)])
+
+
+# 规则ID -> (名称, 说明, 编译函数)
+VALIDATION_RULES = {
+    'not_null': ('非空', '值为NULL或空字符串', _not_null_rule),
+    'idcard': ('身份证号', '18位身份证格式、出生日期和校验码，15位身份证格式和出生日期', _idcard_rule),
+    'date': ('日期', '符合允许的日期格式且日期真实存在，参数formats默认YYYY-MM-DD、YYYY/MM/DD、YYYYMMDD', _date_rule),
+    'amount': ('金额', '可带负号的数字，小数位数不超过参数scale（默认2）', _amount_rule),
+    'mobile': ('手机号', '1开头、第二位3-9的11位手机号', _mobile_rule),
+    'phone': ('电话号码', '手机号，或3-4位区号加7-8位号码的固定电话', _phone_rule)
+}
+
+
+def list_rules():
+    """获取内置校验规则列表"""
+    return [{"id": rule_id, "name": name, "description": description}
+            for rule_id, (name, description, _) in VALIDATION_RULES.items()]
+
+
+def compile_rule(db_type, field_name, rule_id, params=None):
+    """将校验规则编译为CASE表达式，值不合规时为1，否则为0
+
+    Args:
+        db_type: 数据库类型
+        field_name: 字段名
+        rule_id: 规则ID
+        params: 规则参数
+
+    Returns:
+        str: SQL表达式
+    """
+    _check_db_type(db_type)
+    if rule_id not in VALIDATION_RULES:
+        raise AppException(f"不支持的校验规则: {rule_id}", 400, details={"supported_rules": list(VALIDATION_RULES)})
+    column = quote_identifier(db_type, field_name)
+    value = _trim(db_type, column)
+    return VALIDATION_RULES[rule_id][2](db_type, column, value, params or {})
+
+
+def build_table_scan_sql(db_type, table_name, checks):
+    """构建单表聚合校验SQL，一次扫描统计总行数和每条规则的不合规行数
+
+    Args:
+        db_type: 数据库类型
+        table_name: 表名
+        checks: 校验项列表，每项包含field、rule和可选的params
+
+    Returns:
+        str: SELECT COUNT(*) AS total_rows, SUM(...) AS c0, SUM(...) AS c1 ... FROM 表
+    """
+    columns = ['COUNT(*) AS total_rows']
+    for index, check in enumerate(checks):
+        columns.append(f"SUM({compile_rule(db_type, check['field'], check['rule'], check.get('params'))}) AS c{index}")
+    select_list = ',\n  '.join(columns)
+    return f"SELECT\n  {select_list}\nFROM {quote_identifier(db_type, table_name)}"
+
+
+def build_invalid_rows_sql(db_type, table_name, field_name, rule_id, params=None, limit=None):
+    """构建查询不合规记录的SQL
+
+    Args:
+        limit: 最多返回的行数，为空时不限制
+    """
+    condition = f"{compile_rule(db_type, field_name, rule_id, params)} = 1"
+    table = quote_identifier(db_type, table_name)
+    column = quote_identifier(db_type, field_name)
+    if limit is None:
+        return f"SELECT * FROM {table} WHERE {condition}"
+    if db_type == 'sqlserver':
+        return f"SELECT TOP {int(limit)} {column} FROM {table} WHERE {condition}"
+    if db_type == 'oracle':
+        return f"SELECT {column} FROM {table} WHERE {condition} FETCH FIRST {int(limit)} ROWS ONLY"
+    return f"SELECT {column} FROM {table} WHERE {condition} LIMIT {int(limit)}"
@@ -0,0 +1,83 @@
+"""
+规则校验执行服务
+
+按表执行规则校验：一条聚合SQL统计总行数和每条规则的不合规行数，
+再为有不合规数据的规则查询少量示例值。
+"""
+
+import time
+from sqlalchemy import text
+from service.database.database_service import DatabaseService
+from service.exception import AppException
+from service.log.logger import app_logger
+from service.validation.rule_engine import VALIDATION_RULES, build_table_scan_sql, build_invalid_rows_sql
+
+
+class RuleValidationService:
+    """规则校验服务"""
+
+    def __init__(self, db_service=None):
+        """初始化规则校验服务"""
+        self.db_service = db_service or DatabaseService()
+
+    def validate_table(self, db_type, db_config, table_name, checks, sample_size=5):
+        """对一张表执行多条校验规则
+
+        Args:
+            db_type: 数据库类型
+            db_config: 数据库配置
+            table_name: 表名
+            checks: 校验项列表，每项包含field、rule和可选的params
+            sample_size: 每条规则最多返回的不合规示例数，为0时不查询示例
+
+        Returns:
+            dict: 总行数、每条规则的不合规行数、不合规率和示例，以及执行的聚合SQL
+
+        Raises:
+            AppException: 参数错误或执行失败时抛出
+        """
+        if not table_name:
+            raise AppException("表名不能为空", 400)
+        if not checks:
+            raise AppException("校验规则不能为空", 400)
+        for check in checks:
+            if not check.get('field') or not check.get('rule'):
+                raise AppException("每条校验规则都需要指定字段和规则", 400, details={"check": check})
+
+        scan_sql = build_table_scan_sql(db_type, table_name, checks)
+        start_time = time.perf_counter()
+        row = self._fetch_rows(db_type, db_config, scan_sql)[0]
+        total_rows = int(row[0] or 0)
+
+        results = []
+        for index, check in enumerate(checks):
+            # 空表时SUM为NULL
+            invalid_count = int(row[index + 1] or 0)
+            examples = []
+            if invalid_count and sample_size:
+                sample_sql = build_invalid_rows_sql(db_type, table_name, check['field'], check['rule'],
+                                                    check.get('params'), limit=sample_size)
+                examples = [sample[0] for sample in self._fetch_rows(db_type, db_config, sample_sql)]
+            results.append({
+                "field": check['field'],
+                "rule": check['rule'],
+                "rule_name": VALIDATION_RULES[check['rule']][0],
+                "invalid_count": invalid_count,
+                "error_rate": f"{invalid_count / total_rows * 100:.2f}%" if total_rows else "0%",
+                "examples": [str(example) for example in examples]
+            })
+        elapsed_ms = round((time.perf_counter() - start_time) * 1000, 1)
+
+        app_logger.info(f"规则校验完成 - 表: {table_name}, 总行数: {total_rows}, 规则数: {len(checks)}, "
+                        f"耗时: {elapsed_ms}ms")
+        return {
+            "table_name": table_name,
+            "total_rows": total_rows,
+            "execution_time_ms": elapsed_ms,
+            "scan_sql": scan_sql,
+            "results": results
+        }
+
+    def _fetch_rows(self, db_type, db_config, sql):
+        result = self.db_service.execute_sql(db_type, db_config, text(sql))
+        return [tuple(row) for row in result['rows']]
@@ -0,0 +1,93 @@
+// Server-Sent Events读取模块
+// EventSource只支持GET请求，生成接口需要POST提交参数，因此用fetch读取响应的ReadableStream并按SSE格式拆分事件
+
+/**
+ * 以POST方式请求SSE接口，逐个事件回调
+ * @param {string} url - 接口地址
+ * @param {Object} body - 请求参数，以JSON提交
+ * @param {Object} handlers - 事件名称到回调函数的映射，回调参数为解析后的事件数据；
+ *                            接口未返回事件流（如参数错误返回JSON）或网络出错时调用handlers.error({message})
+ * @returns {Object} 包含promise（读取结束时完成）和abort()（中止读取）的对象
+ */
+function postEventStream(url, body, handlers) {
+    const controller = new AbortController();
+
+    function dispatch(event, data) {
+        if (handlers[event]) {
+            handlers[event](data);
+        }
+    }
+
+    // 解析一个事件块（以空行分隔），忽略注释行和未知字段
+    function parseEvent(block) {
+        let event = 'message';
+        const dataLines = [];
+        block.split('\n').forEach(function(line) {
+            if (line.startsWith('event:')) {
+                event = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+                dataLines.push(line.slice(5).replace(/^ /, ''));
+            }
+        });
+        if (dataLines.length === 0) {
+            return;
+        }
+        let data = dataLines.join('\n');
+        try {
+            data = JSON.parse(data);
+        } catch (e) {
+            // 非JSON数据按原文传给回调
+        }
+        dispatch(event, data);
+    }
+
+    const promise = fetch(url, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
+        body: JSON.stringify(body),
+        signal: controller.signal
+    }).then(async function(response) {
+        const contentType = response.headers.get('Content-Type') || '';
+        if (!contentType.includes('text/event-stream')) {
+            // 参数校验失败等情况接口直接返回JSON
+            let message = `请求失败 (HTTP ${response.status})`;
+            try {
+                const result = await response.json();
+                message = result.message || message;
+            } catch (e) {}
+            dispatch('error', { message: message });
+            return;
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder('utf-8');
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) {
+                break;
+            }
+            buffer += decoder.decode(value, { stream: true }).replace(/\r\n?/g, '\n');
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) >= 0) {
+                parseEvent(buffer.slice(0, boundary));
+                buffer = buffer.slice(boundary + 2);
+            }
+        }
+        buffer += decoder.decode();
+        if (buffer.trim()) {
+            parseEvent(buffer);
+        }
+    }).catch(function(error) {
+        if (error.name !== 'AbortError') {
+            dispatch('error', { message: '与服务器通信时发生错误: ' + error.message });
+        }
+    });
+
+    return {
+        promise: promise,
+        abort: function() {
+            controller.abort();
+        }
+    };
+}
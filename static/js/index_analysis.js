@@ -215,32 +215,49 @@ $(document).ready(function() {
             }
         }
         
-        // 显示中央加载动画
+        // 显示中央加载动画，收到第一段SQL后隐藏，之后的内容逐段追加到SQL区域
         $('#loadingOverlay').css('display', 'flex');
         
-        // 调用后端API生成SQL
-        $.ajax({
-            url: '/api/analysis/generate_sql',
-            type: 'POST',
-            contentType: 'application/json',
-            data: JSON.stringify(requestData),
-            success: function(response) {
-                if (response.success) {
-                    // 使用组件API设置SQL
-                    if (window.sqlExecuteArea) {
-                        window.sqlExecuteArea.setSQL(response.sql);
-                    } else {
-                        $('#sqlContent').val(response.sql);
-                    }
-                } else {
-                    alert(response.message || '生成SQL失败');
+        // 中止上一次尚未结束的生成
+        if (window.sqlGenerationStream) {
+            window.sqlGenerationStream.abort();
+        }
+        
+        let generatedSql = '';
+        function showSql(sql) {
+            if (window.sqlExecuteArea) {
+                window.sqlExecuteArea.setSQL(sql);
+            } else {
+                $('#sqlContent').val(sql);
+            }
+        }
+        showSql('');
+        
+        // 调用后端流式接口生成SQL
+        const stream = postEventStream('/api/analysis/generate_sql/stream', requestData, {
+            token: function(data) {
+                $('#loadingOverlay').hide();
+                generatedSql += data.content;
+                showSql(generatedSql);
+                const sqlContent = document.getElementById('sqlContent');
+                if (sqlContent) {
+                    sqlContent.scrollTop = sqlContent.scrollHeight;
                 }
             },
-            error: function(xhr) {
-                console.error('生成SQL请求失败:', xhr);
-                alert('生成SQL请求失败，请查看控制台日志');
+            done: function(data) {
+                if (!data.from_llm) {
+                    console.log('SQL由备用方式生成');
+                }
             },
-            complete: function() {
+            error: function(data) {
+                console.error('生成SQL请求失败:', data.message);
+                alert(data.message || '生成SQL失败');
+            }
+        });
+        window.sqlGenerationStream = stream;
+        stream.promise.finally(function() {
+            if (window.sqlGenerationStream === stream) {
+                window.sqlGenerationStream = null;
                 // 隐藏中央加载动画
                 $('#loadingOverlay').hide();
             }
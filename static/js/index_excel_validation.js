@@ -384,7 +384,8 @@ $(document).ready(function() {
             success: function(data) {
                 // 过滤Excel文件
                 const excelFiles = data.filter(file => 
-                    file.name.endsWith('.xlsx') || file.name.endsWith('.xls')
+                    file.name.endsWith('.xlsx') || file.name.endsWith('.xls') ||
+                    file.name.endsWith('.csv') || file.name.endsWith('.tsv')
                 ).sort((a, b) => new Date(b.date) - new Date(a.date)); // 按日期降序排序
                 
                 // 初始化文件下拉框
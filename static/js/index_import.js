@@ -105,6 +105,11 @@ $(document).ready(function() {
         showImportConfirmation();
     });
     
+    // 取消正在执行的导入任务
+    $('#cancel-import-job-btn').click(function() {
+        cancelImportJob();
+    });
+    
     // 确认导入按钮点击事件
     $('#confirm-import-btn').click(function() {
         addLog('用户点击: 确认导入');
@@ -217,7 +222,8 @@ $(document).ready(function() {
             success: function(data) {
                 // 过滤Excel文件
                 const excelFiles = data.filter(file => 
-                    file.name.endsWith('.xlsx') || file.name.endsWith('.xls')
+                    file.name.endsWith('.xlsx') || file.name.endsWith('.xls') ||
+                    file.name.endsWith('.csv') || file.name.endsWith('.tsv')
                 ).sort((a, b) => new Date(b.date) - new Date(a.date)); // 按日期降序排序
                 
                 // 使用SearchableDropdown组件初始化文件选择器
@@ -512,7 +518,7 @@ $(document).ready(function() {
                         // 如果有扩展名属性，显示格式类型
                         if (file.extension) {
                             var ext = file.extension.toLowerCase();
-                            var formatBadge = ext === '.xlsx' ? '[xlsx]' : '[xls]';
+                            var formatBadge = '[' + ext.substring(1) + ']';
                             fileLabel = fileLabel + ' ' + formatBadge;
                         }
                         
@@ -1120,8 +1126,9 @@ $(document).ready(function() {
         // 禁用导入按钮，防止重复点击
         $('#import-btn').prop('disabled', true).text('导入中...');
         
-        // 隐藏进度区域（我们不需要它了）
-        $('.import-status').hide();
+        // 显示进度区域，进度由后台导入任务上报
+        $('.import-status').show();
+        updateImportProgress(0, '正在提交导入任务...');
         
         // 添加开始导入的日志记录
         addLog('开始导入数据...', true);
@@ -1186,110 +1193,135 @@ $(document).ready(function() {
         $('#success-count').text('0');
         $('#failed-count').text('0');
         
-        // 生成一个任务ID (可以使用时间戳+随机数简单模拟)
-        var taskId = 'import_' + Date.now() + '_' + Math.floor(Math.random() * 1000);
-        
-        // 存储任务ID，用于后续轮询
-        window.currentImportTaskId = taskId;
-        
-        // 启动一个任务轮询器
-        startImportTaskPoller(taskId, requestData);
+        // 提交后台导入任务并轮询进度
+        submitImportJob(requestData);
     }
     
-    // 启动导入任务并开始轮询进度
-    function startImportTaskPoller(taskId, requestData) {
-        // 记录轮询开始时间
-        var startTime = new Date().getTime();
-        
-        // 发送导入请求
+    // 导入任务阶段的显示文本
+    var IMPORT_STAGE_TEXT = {
+        reading: '正在读取Excel数据',
+        importing: '正在写入数据库'
+    };
+    
+    // 更新进度条和状态文本
+    function updateImportProgress(percent, statusText) {
+        percent = Math.max(0, Math.min(100, percent || 0));
+        $('.import-status .progress-fill').css('width', percent + '%');
+        $('.import-status .progress-text').text(percent + '%');
+        $('.import-status .status-text').text(statusText);
+    }
+    
+    // 提交后台导入任务，成功后开始轮询任务进度
+    function submitImportJob(requestData) {
         $.ajax({
-            url: '/api/import/excel/import',
+            url: '/api/import/excel/import/jobs',
             method: 'POST',
             contentType: 'application/json',
             data: JSON.stringify(requestData),
             dataType: 'json',
-            timeout: 300000, // 5分钟超时
             success: function(response) {
-                if (response.success) {
-                    // 更新最终结果
-                    updateFinalImportResult(response);
-                } else {
-                    // 处理导入失败
+                if (!response.success) {
                     handleImportError(response);
+                    finishImportJob();
+                    return;
                 }
-                
-                // 停止轮询
-                clearInterval(window.importProgressPoller);
-                
-                // 启用导入按钮
-                $('#import-btn').prop('disabled', false).text('开始导入');
+                window.currentImportJobId = response.job_id;
+                $('#cancel-import-job-btn').prop('disabled', false).text('取消导入').show();
+                pollImportJob(response.job_id, 0);
             },
             error: function(xhr, status, error) {
-                // 处理AJAX错误
                 handleAjaxError(xhr, status, error);
-                
-                // 停止轮询
-                clearInterval(window.importProgressPoller);
-                
-                // 启用导入按钮
-                $('#import-btn').prop('disabled', false).text('开始导入');
+                finishImportJob();
             }
         });
-        
-        // 清除已有的轮询器
-        if (window.importProgressPoller) {
-            clearInterval(window.importProgressPoller);
-        }
-        
-        // 初始化进度轮询请求计数
-        window.pollCounter = 0;
-        
-        // 开始轮询，每1秒查询一次进度
-        window.importProgressPoller = setInterval(function() {
-            // 增加轮询计数
-            window.pollCounter++;
-            
-            // 模拟进度查询 (这里模拟了后端的进度回复)
-            simulateProgressCheck(startTime, window.pollCounter);
-            
-        }, 1000);
     }
     
-    // 模拟进度查询 (这里模拟了后端的进度回复)
-    function simulateProgressCheck(startTime, counter) {
-        // 实际项目中，这里应该发送AJAX请求到后端API获取真实进度
-        // 由于当前后端没有专门的进度查询API，暂时只能使用模拟方式
-        
-        // 计算模拟进度百分比（基于时间和计数器）
-        var elapsedTime = (new Date().getTime() - startTime) / 1000; // 经过的秒数
-        
-        // 计算模拟的行数和进度
-        var estimatedRowsPerSecond = 80; // 假设每秒处理80行
-        var processedRows = Math.floor(elapsedTime * estimatedRowsPerSecond);
-        var progressPercent = Math.min(99, Math.floor(counter * 5)); // 不超过99%
-        
-        if (counter % 5 === 0) { // 每5秒更新一次日志
-            // 模拟不同阶段的日志
-            if (counter <= 5) {
-                addLog('正在读取Excel数据...', false, 'info');
-            } else if (counter <= 10) {
-                addLog('正在验证数据格式...', false, 'info');
-            } else if (counter <= 15) {
-                addLog('正在初始化数据库连接...', false, 'info');
-            } else {
-                // 更新进度日志
-                addLog(`已处理约 ${processedRows} 行数据 (${progressPercent}%)`, false, 'info');
+    // 每秒查询一次任务进度，只取log_offset之后新增的日志
+    function pollImportJob(jobId, logOffset) {
+        $.ajax({
+            url: '/api/import/excel/import/jobs/' + encodeURIComponent(jobId),
+            method: 'GET',
+            data: { log_offset: logOffset },
+            dataType: 'json',
+            success: function(job) {
+                if (window.currentImportJobId !== jobId) {
+                    return;
+                }
+                (job.logs || []).forEach(function(log) {
+                    addLog(log.message, false, log.type || "info");
+                });
+                
+                var stageText = IMPORT_STAGE_TEXT[job.stage] || '准备导入';
+                if (job.stage === 'importing') {
+                    stageText += `：已写入 ${job.processed_rows} / 约 ${job.total_rows} 行，${job.rows_per_sec} 行/秒`;
+                    $('#records-count').text(job.processed_rows);
+                    $('#success-count').text(job.processed_rows);
+                }
+                if (job.cancel_requested && !job.result) {
+                    stageText += '（正在取消）';
+                }
+                updateImportProgress(job.progress, stageText);
+                
+                if (!job.result) {
+                    window.importProgressPoller = setTimeout(function() {
+                        pollImportJob(jobId, job.log_offset);
+                    }, 1000);
+                    return;
+                }
                 
-                // 更新结果计数
-                $('#records-count').text(processedRows);
-                $('#success-count').text(processedRows);
+                // 任务日志已在轮询中逐条显示，结束时不再重复显示结果中的日志
+                var result = $.extend({}, job.result, { logs: [] });
+                if (job.status === 'completed') {
+                    updateImportProgress(100, '导入完成');
+                    updateFinalImportResult(result);
+                } else if (job.status === 'cancelled') {
+                    updateImportProgress(job.progress, '导入已取消');
+                    $('#records-count').text(result.total_rows || 0);
+                    $('#success-count').text(result.success_count || 0);
+                    addLog(`导入已取消，已提交的 ${result.success_count || 0} 行数据保留在数据库中`, false, "warning");
+                } else {
+                    updateImportProgress(job.progress, '导入失败');
+                    handleImportError(result);
+                }
+                finishImportJob();
+            },
+            error: function(xhr, status, error) {
+                if (window.currentImportJobId !== jobId) {
+                    return;
+                }
+                handleAjaxError(xhr, status, error);
+                finishImportJob();
             }
+        });
+    }
+    
+    // 请求取消当前导入任务，正在写入的批次完成后停止
+    function cancelImportJob() {
+        var jobId = window.currentImportJobId;
+        if (!jobId) {
+            return;
         }
-        
-        // 超过30秒没有完成，显示提示
-        if (elapsedTime > 30 && counter % 10 === 0) {
-            addLog('导入正在进行中，请耐心等待...', false, 'info');
-        }
+        $('#cancel-import-job-btn').prop('disabled', true).text('正在取消...');
+        $.ajax({
+            url: '/api/import/excel/import/jobs/' + encodeURIComponent(jobId) + '/cancel',
+            method: 'POST',
+            dataType: 'json',
+            success: function(response) {
+                addLog(response.message || '已请求取消导入任务', false, "warning");
+            },
+            error: function(xhr, status, error) {
+                $('#cancel-import-job-btn').prop('disabled', false).text('取消导入');
+                handleAjaxError(xhr, status, error);
+            }
+        });
+    }
+    
+    // 导入任务结束：停止轮询并恢复按钮
+    function finishImportJob() {
+        clearTimeout(window.importProgressPoller);
+        window.currentImportJobId = null;
+        $('#cancel-import-job-btn').hide();
+        $('#import-btn').prop('disabled', false).text('开始导入');
     }
     
     // 更新最终导入结果
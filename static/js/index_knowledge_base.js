@@ -130,17 +130,17 @@ function initFileUploadArea() {
             processData: false,
             contentType: false,
             success: function(response) {
-                if (response.success) {
-                    alert(`上传成功：${response.message}`);
-                    
-                    // 清空文件列表
+                if (response.success && response.job_id) {
+                    // 文件已保存，后台任务处理完成前保持上传按钮禁用
                     filesList.empty();
                     fileInput.val('');
-                    
-                    // 切换到知识库列表标签页
-                    $('.tab[data-tab="knowledge-list"]').click();
+                    uploadBtn.text('处理中...');
+                    startUploadJobPolling(response.job_id, response.files || [], function() {
+                        uploadBtn.text('上传到知识库').prop('disabled', false);
+                    });
                 } else {
                     alert(`上传失败：${response.message}`);
+                    uploadBtn.text('上传到知识库').prop('disabled', false);
                 }
             },
             error: function(xhr, status, error) {
@@ -151,13 +151,147 @@ function initFileUploadArea() {
                     errorMessage = '上传文件时发生网络错误';
                 }
                 alert(errorMessage);
-            },
-            complete: function() {
                 // 恢复上传按钮状态
                 uploadBtn.text('上传到知识库').prop('disabled', false);
             }
         });
     });
+    
+    // 取消处理按钮点击事件
+    $('#cancel-upload-job').on('click', function() {
+        const jobId = $(this).data('job-id');
+        if (!jobId) {
+            return;
+        }
+        $(this).prop('disabled', true);
+        $.ajax({
+            url: `/api/knowledge_base/upload/jobs/${jobId}/cancel`,
+            type: 'POST',
+            error: function(xhr) {
+                const message = xhr.responseJSON && xhr.responseJSON.message ? xhr.responseJSON.message : '取消处理失败';
+                alert(message);
+                $('#cancel-upload-job').prop('disabled', false);
+            }
+        });
+    });
+}
+
+// 文档入库状态的显示文本
+const UPLOAD_FILE_STATUS_TEXT = {
+    queued: '排队中',
+    extracting: '提取文本中',
+    queued_for_embedding: '等待生成向量',
+    embedding: '生成向量中',
+    inserting: '写入知识库中',
+    completed: '已完成',
+    failed: '失败',
+    cancelled: '已取消'
+};
+
+// 查询入库任务进度的间隔（毫秒）
+const UPLOAD_JOB_POLL_INTERVAL = 1000;
+
+/**
+ * 显示入库任务的文件列表并轮询任务进度，直到任务结束
+ * @param {string} jobId - 入库任务ID
+ * @param {Array} files - 上传接口返回的文件列表
+ * @param {Function} onFinished - 任务结束后的回调
+ */
+function startUploadJobPolling(jobId, files, onFinished) {
+    const container = $('#upload-job-container');
+    const fileStatusList = $('#upload-job-files');
+    const summary = $('#upload-job-summary');
+    const cancelBtn = $('#cancel-upload-job');
+    
+    fileStatusList.empty();
+    files.forEach(function(file) {
+        const item = $('<li></li>');
+        item.append($('<span class="file-name"></span>').text(file.filename));
+        item.append($('<span class="job-file-status"></span>').text(UPLOAD_FILE_STATUS_TEXT[file.status] || file.status));
+        fileStatusList.append(item);
+    });
+    summary.text(`共${files.length}个文件，正在后台处理`);
+    cancelBtn.data('job-id', jobId).prop('disabled', false).show();
+    container.show();
+    
+    let logOffset = 0;
+    
+    function poll() {
+        $.ajax({
+            url: `/api/knowledge_base/upload/jobs/${jobId}`,
+            type: 'GET',
+            data: { log_offset: logOffset },
+            success: function(job) {
+                logOffset = job.log_offset;
+                updateUploadJobFiles(job.details || []);
+                
+                const details = job.details || [];
+                const finishedCount = details.filter(detail => ['completed', 'failed', 'cancelled'].includes(detail.status)).length;
+                summary.text(`已处理 ${finishedCount}/${details.length} 个文件`);
+                
+                if (['completed', 'failed', 'cancelled'].includes(job.status)) {
+                    finishUploadJob(job, details);
+                    onFinished();
+                    return;
+                }
+                setTimeout(poll, UPLOAD_JOB_POLL_INTERVAL);
+            },
+            error: function(xhr) {
+                const message = xhr.responseJSON && xhr.responseJSON.message ? xhr.responseJSON.message : '查询处理进度失败';
+                summary.text(message);
+                cancelBtn.hide();
+                onFinished();
+            }
+        });
+    }
+    
+    setTimeout(poll, UPLOAD_JOB_POLL_INTERVAL);
+}
+
+/**
+ * 按任务明细更新每个文件的处理状态
+ * @param {Array} details - 任务明细，顺序与上传的文件一致
+ */
+function updateUploadJobFiles(details) {
+    const items = $('#upload-job-files li');
+    details.forEach(function(detail, index) {
+        const statusText = UPLOAD_FILE_STATUS_TEXT[detail.status] || detail.status;
+        let text = statusText;
+        if (detail.status === 'completed' && detail.chunks_count !== undefined) {
+            text = `${statusText}（${detail.chunks_count}个文本块）`;
+        } else if (detail.status === 'failed' && detail.message) {
+            text = `${statusText}：${detail.message}`;
+        }
+        items.eq(index).find('.job-file-status')
+            .text(text)
+            .removeClass('completed failed cancelled')
+            .addClass(['completed', 'failed', 'cancelled'].includes(detail.status) ? detail.status : '');
+    });
+}
+
+/**
+ * 入库任务结束后显示汇总结果并刷新知识库列表
+ * @param {Object} job - 任务状态
+ * @param {Array} details - 任务明细
+ */
+function finishUploadJob(job, details) {
+    const completedCount = details.filter(detail => detail.status === 'completed').length;
+    const failedCount = details.filter(detail => detail.status === 'failed').length;
+    let message = `处理结束：成功${completedCount}个`;
+    if (failedCount > 0) {
+        message += `，失败${failedCount}个`;
+    }
+    if (job.status === 'cancelled') {
+        message += '，任务已取消';
+    } else if (job.status === 'failed' && job.result && job.result.message) {
+        message += `，${job.result.message}`;
+    }
+    $('#upload-job-summary').text(message);
+    $('#cancel-upload-job').hide();
+    
+    if (completedCount > 0) {
+        loadKnowledgeItems();
+    }
 }
 
 /**
@@ -956,58 +1090,65 @@ function initKnowledgeChatArea() {
         // 显示正在输入指示器
         const loadingMsgEl = appendLoadingMessage();
         
-        // 调用知识库聊天API
-        $.ajax({
-            url: '/api/knowledge_base/chat',
-            type: 'POST',
-            contentType: 'application/json',
-            data: JSON.stringify({
-                message: message,
-                history: chatHistory,
-                top_k: 5,
-                max_tokens: 1000
-            }),
-            success: function(response) {
-                // 移除加载指示器
-                loadingMsgEl.remove();
-                
-                if (response.success) {
-                    // 获取回复内容和相关来源
-                    const replyContent = response.data.reply;
-                    const sources = response.data.sources || [];
-                    
-                    // 添加系统回复到聊天界面
-                    const messageElement = createMessageElement('system', replyContent, sources);
-                    messagesContainer.append(messageElement);
-                    
-                    // 更新聊天历史
-                    chatHistory.push({
-                        role: 'assistant',
-                        content: replyContent
+        // 调用知识库流式聊天API，回复逐段显示
+        let replyContent = '';
+        let sources = [];
+        let replyElement = loadingMsgEl;
+        let renderPending = false;
+        let finished = false;
+        
+        // 用最新的回复内容重新渲染回复消息，每帧最多渲染一次
+        function renderReply(withSources) {
+            const messageElement = createMessageElement('system', replyContent, withSources ? sources : []);
+            replyElement.replaceWith(messageElement);
+            replyElement = messageElement;
+            scrollToBottom();
+        }
+        
+        function showError(errorMessage) {
+            if (replyContent) {
+                renderReply(true);
+            } else {
+                replyElement.remove();
+            }
+            messagesContainer.append(createMessageElement('system', `抱歉，出现了错误: ${errorMessage}`));
+            scrollToBottom();
+        }
+        
+        postEventStream('/api/knowledge_base/chat/stream', {
+            message: message,
+            history: chatHistory,
+            top_k: 5,
+            max_tokens: 1000
+        }, {
+            sources: function(data) {
+                sources = data || [];
+            },
+            token: function(data) {
+                replyContent += data.content;
+                if (!renderPending) {
+                    renderPending = true;
+                    requestAnimationFrame(function() {
+                        renderPending = false;
+                        if (!finished) {
+                            renderReply(false);
+                        }
                     });
-                    
-                    // 滚动到底部
-                    scrollToBottom();
-                } else {
-                    // 显示错误消息
-                    messagesContainer.append(createMessageElement('system', `抱歉，出现了错误: ${response.message}`));
-                    scrollToBottom();
                 }
             },
-            error: function(xhr, status, error) {
-                // 移除加载指示器
-                loadingMsgEl.remove();
-                
-                let errorMessage;
-                try {
-                    errorMessage = xhr.responseJSON.message || '处理请求时发生错误';
-                } catch (e) {
-                    errorMessage = '与服务器通信时发生错误';
-                }
+            done: function() {
+                finished = true;
+                renderReply(true);
                 
-                // 显示错误消息
-                messagesContainer.append(createMessageElement('system', `抱歉，出现了错误: ${errorMessage}`));
-                scrollToBottom();
+                // 更新聊天历史
+                chatHistory.push({
+                    role: 'assistant',
+                    content: replyContent
+                });
+            },
+            error: function(data) {
+                finished = true;
+                showError(data.message || '处理请求时发生错误');
             }
         });
     }
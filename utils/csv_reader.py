@@ -0,0 +1,167 @@
+"""
+CSV/TSV流式读取
+
+上游系统导出的CSV/TSV文件可能达到数GB且超过Excel的行数上限，按工作表只有一个的工作簿处理：
+- 编码检测：读取文件头部样本，依次识别UTF-8 BOM、UTF-16 BOM（Excel导出的"Unicode文本"）、
+  无BOM的UTF-8，都不符合时按GB18030（兼容GBK/GB2312）读取。样本只有ASCII字符时会识别为UTF-8，
+  读取到样本之后的GBK字符无法解码时改按GB18030从头读取，并记住该文件的编码
+- 分隔符识别：对样本使用csv.Sniffer在候选分隔符中识别，无法识别时.tsv使用制表符、.csv使用逗号
+- 读取：按块缓冲读取文件，csv模块逐行解析，内存占用与文件大小无关
+
+行数据为字符串列表，空字段转换为None，与Excel空单元格一致；行的规范化和start_row/ignore_empty_rows语义
+由ExcelUtil统一处理。
+"""
+
+import codecs
+import csv
+import itertools
+import os
+import threading
+from config.excel_config import CSV_READER_CONFIG
+from service.log.logger import app_logger
+
+CSV_EXTENSIONS = ('.csv', '.tsv')
+
+# 超长字段（如大段文本）超出csv模块默认的131072字符上限时会报错
+csv.field_size_limit(CSV_READER_CONFIG['max_field_size'])
+
+# 无BOM的UTF-8样本之后出现无法解码的字节时改用的编码
+FALLBACK_ENCODING = 'gb18030'
+
+# 行数缓存：文件路径 -> (文件大小, 修改时间, 是否忽略末尾空行, 行数)
+_row_count_cache = {}
+_row_count_lock = threading.Lock()
+# 读取过程中改用GB18030的文件：文件路径 -> (文件大小, 修改时间)
+_fallback_files = {}
+
+
+def detect_encoding(sample):
+    """根据文件头部样本识别编码
+
+    Args:
+        sample (bytes): 文件头部样本
+
+    Returns:
+        str: 用于open()的编码名称
+    """
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    try:
+        # 样本末尾可能截断了多字节字符，使用增量解码器且不要求结束
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'gb18030'
+
+
+def sniff_delimiter(text, ext):
+    """在候选分隔符中识别样本文本的分隔符，无法识别时按扩展名返回默认分隔符"""
+    default = '\t' if ext == '.tsv' else ','
+    # 只使用完整的行，最后一行可能被样本截断
+    lines = text.splitlines()[:CSV_READER_CONFIG['sniff_lines'] + 1]
+    if len(lines) > 1:
+        lines = lines[:-1]
+    try:
+        return csv.Sniffer().sniff('\n'.join(lines), delimiters=CSV_READER_CONFIG['delimiters']).delimiter
+    except csv.Error:
+        return default
+
+
+def detect_format(file_path):
+    """识别CSV/TSV文件的编码和分隔符
+
+    Returns:
+        tuple: (编码, 分隔符)
+    """
+    with open(file_path, 'rb') as f:
+        sample = f.read(CSV_READER_CONFIG['sample_bytes'])
+    encoding = detect_encoding(sample)
+    if encoding == 'utf-8' and _fallback_files.get(file_path) == _source_version(file_path):
+        encoding = FALLBACK_ENCODING
+    text = codecs.getincrementaldecoder(encoding)(errors='replace').decode(sample, final=False)
+    delimiter = sniff_delimiter(text, os.path.splitext(file_path)[1].lower())
+    app_logger.info(f"CSV格式识别: {file_path}, 编码: {encoding}, 分隔符: {delimiter!r}")
+    return encoding, delimiter
+
+
+def _source_version(file_path):
+    source_stat = os.stat(file_path)
+    return source_stat.st_size, source_stat.st_mtime_ns
+
+
+def _open_reader(file_path, encoding, delimiter):
+    source = open(file_path, 'r', encoding=encoding, newline='', buffering=CSV_READER_CONFIG['buffer_bytes'])
+    return source, csv.reader(source, delimiter=delimiter)
+
+
+def _fall_back(file_path, encoding, error, line_num):
+    """按UTF-8读取失败时决定是否改用GB18030，不能改用时抛出ValueError"""
+    if encoding != 'utf-8':
+        raise ValueError(f"CSV文件编码识别错误，第{line_num}行无法解码: {str(error)}")
+    app_logger.warning(f"CSV文件第{line_num}行无法按UTF-8解码，改按{FALLBACK_ENCODING}读取: {file_path}")
+    _fallback_files[file_path] = _source_version(file_path)
+    return FALLBACK_ENCODING
+
+
+def iter_csv_raw_rows(file_path, start_row=0):
+    """逐行读取CSV/TSV文件，生成(原始行, 列宽)元组，与ExcelUtil._iter_xlsx_raw_rows接口一致
+
+    start_row之前的行由csv模块解析后直接丢弃，不做逐值转换。CSV没有声明列数，列宽为已读取行的最大字段数，
+    与未声明尺寸的.xlsx工作表一致。按UTF-8读取到无法解码的字节时改按GB18030重新打开文件，
+    跳过已输出的行后继续读取。
+
+    Args:
+        file_path (str): 文件路径
+        start_row (int): 从第几行开始（从0开始）
+    """
+    encoding, delimiter = detect_format(file_path)
+    width = 0
+    # 下一个要输出的行号（从0开始）
+    next_row = start_row
+    while True:
+        source, reader = _open_reader(file_path, encoding, delimiter)
+        try:
+            for row in itertools.islice(reader, next_row, None):
+                width = max(width, len(row))
+                next_row += 1
+                yield [value if value != '' else None for value in row], width
+            return
+        except UnicodeDecodeError as e:
+            encoding = _fall_back(file_path, encoding, e, reader.line_num)
+        finally:
+            source.close()
+
+
+def count_rows(file_path, ignore_empty_rows=True):
+    """统计CSV/TSV文件的行数，ignore_empty_rows为True时不计末尾的全空行
+
+    结果按文件大小和修改时间缓存在进程内，大文件翻页预览时不会重复扫描。
+    """
+    source_stat = os.stat(file_path)
+    with _row_count_lock:
+        cached = _row_count_cache.get(file_path)
+    if cached is not None and cached[:3] == (source_stat.st_size, source_stat.st_mtime_ns, ignore_empty_rows):
+        return cached[3]
+
+    encoding, delimiter = detect_format(file_path)
+    while True:
+        source, reader = _open_reader(file_path, encoding, delimiter)
+        try:
+            if ignore_empty_rows:
+                total_rows = 0
+                for row_number, row in enumerate(reader, 1):
+                    if any(value.strip() for value in row):
+                        total_rows = row_number
+            else:
+                total_rows = sum(1 for _ in reader)
+            break
+        except UnicodeDecodeError as e:
+            encoding = _fall_back(file_path, encoding, e, reader.line_num)
+        finally:
+            source.close()
+
+    with _row_count_lock:
+        _row_count_cache[file_path] = (source_stat.st_size, source_stat.st_mtime_ns, ignore_empty_rows, total_rows)
+    return total_rows
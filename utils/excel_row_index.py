@@ -0,0 +1,244 @@
+"""
+xlsx工作表行偏移索引
+
+分页预览靠后的页面时，流式读取需要从工作表第一行开始解析。行偏移索引记录每隔固定行数的
+<row>元素在解压后工作表XML中的字节偏移，读取时先解析<sheetData>之前的头部，再跳到离起始行
+最近的检查点继续解析，检查点之前的内容只解压不解析，预览任意页面只需解析一页的行。
+
+建立索引只解压并扫描<row>起始标签，不解析单元格。索引保存在源文件的副本目录
+（见utils.excel_sidecar）中的row_index.json，按工作表XML路径区分工作表；源文件被修改后索引自动失效。
+已生成列式副本的工作表可以直接按行号读取，不需要行偏移索引。
+"""
+
+import bisect
+import json
+import os
+import re
+import threading
+import time
+import zipfile
+from config.excel_config import EXCEL_ROW_INDEX_CONFIG
+from service.log.logger import app_logger
+from utils import excel_sidecar
+from utils.xlsx_stream_reader import XlsxStreamReader
+
+ROW_INDEX_NAME = 'row_index.json'
+ROW_INDEX_VERSION = 1
+
+SCAN_CHUNK_SIZE = 1024 * 1024
+# 保留上一块的尾部，避免<row ...>起始标签被数据块边界截断
+SCAN_OVERLAP = 64 * 1024
+SHEET_DATA_PATTERN = re.compile(rb'<sheetData\b[^>]*>')
+ROW_START_PATTERN = re.compile(rb'<row\b([^>]*)>')
+ROW_NUMBER_PATTERN = re.compile(rb'\sr="(\d+)"')
+
+# 已读取的索引缓存：索引文件路径 -> (索引文件修改时间, 索引)
+_index_cache = {}
+_index_lock = threading.Lock()
+# 每个源文件一把建立索引的锁，避免同一文件被并发重复扫描
+_build_locks = {}
+
+
+def get_row_index_path(file_path):
+    """获取源文件对应的行偏移索引文件路径"""
+    return os.path.join(excel_sidecar.get_sidecar_dir(file_path), ROW_INDEX_NAME)
+
+
+def _source_info(file_path):
+    source_stat = os.stat(file_path)
+    return {'size': source_stat.st_size, 'mtime_ns': source_stat.st_mtime_ns}
+
+
+def load_index(file_path):
+    """读取源文件的行偏移索引，索引不存在、版本或间隔不符、源文件已修改时返回None"""
+    index_path = get_row_index_path(file_path)
+    try:
+        source = _source_info(file_path)
+        index_mtime = os.stat(index_path).st_mtime_ns
+    except OSError:
+        return None
+
+    with _index_lock:
+        cached = _index_cache.get(index_path)
+    if cached is not None and cached[0] == index_mtime:
+        index = cached[1]
+    else:
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError) as e:
+            app_logger.warning(f"读取行偏移索引失败: {index_path}, 错误: {str(e)}")
+            return None
+        with _index_lock:
+            _index_cache[index_path] = (index_mtime, index)
+
+    if (index.get('version') != ROW_INDEX_VERSION or index.get('interval') != EXCEL_ROW_INDEX_CONFIG['interval']
+            or index.get('source') != source):
+        return None
+    return index
+
+
+def _save_sheet_index(file_path, source, sheet_path, sheet_index):
+    """将工作表索引合并写入索引文件，先写临时文件再替换"""
+    index = load_index(file_path)
+    if index is None or index['source'] != source:
+        index = {
+            'version': ROW_INDEX_VERSION,
+            'interval': EXCEL_ROW_INDEX_CONFIG['interval'],
+            'source': source,
+            'sheets': {}
+        }
+    index['sheets'][sheet_path] = sheet_index
+
+    index_path = get_row_index_path(file_path)
+    temp_path = f"{index_path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    try:
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(temp_path, index_path)
+    except OSError as e:
+        # 索引只用于加速，写入失败（如副本目录正在被替换）时下次重新建立
+        app_logger.warning(f"保存行偏移索引失败: {index_path}, 错误: {str(e)}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def scan_sheet(archive, sheet_path, interval):
+    """扫描工作表XML，记录头部和每隔interval行的<row>元素偏移
+
+    Returns:
+        dict: header为<sheetData>起始标签及之前的XML，checkpoints为[行号, 字节偏移]列表；
+            工作表没有行数据或结构不符合预期（如<row>缺少r属性、标签带命名空间前缀）时checkpoints为空
+    """
+    with archive.open(sheet_path) as sheet_file:
+        buffer = sheet_file.read(SCAN_CHUNK_SIZE)
+        header_match = SHEET_DATA_PATTERN.search(buffer)
+        if not header_match or buffer[header_match.end() - 2:header_match.end()] == b'/>':
+            return {'header': '', 'checkpoints': []}
+
+        try:
+            header = buffer[:header_match.end()].decode('utf-8')
+        except UnicodeDecodeError:
+            return {'header': '', 'checkpoints': []}
+        checkpoints = []
+        next_checkpoint = 0
+        # buffer[0]在解压后XML中的偏移
+        buffer_offset = 0
+        scan_start = header_match.end()
+        while True:
+            chunk = sheet_file.read(SCAN_CHUNK_SIZE)
+            if chunk:
+                buffer += chunk
+            scan_end = len(buffer) if not chunk else len(buffer) - SCAN_OVERLAP
+            for match in ROW_START_PATTERN.finditer(buffer, scan_start):
+                if match.start() >= scan_end:
+                    break
+                number_match = ROW_NUMBER_PATTERN.search(match.group(1))
+                if not number_match:
+                    return {'header': header, 'checkpoints': []}
+                row_number = int(number_match.group(1))
+                if row_number - 1 >= next_checkpoint:
+                    checkpoints.append([row_number, buffer_offset + match.start()])
+                    next_checkpoint = ((row_number - 1) // interval + 1) * interval
+            if not chunk:
+                break
+            buffer = buffer[scan_end:]
+            buffer_offset += scan_end
+            scan_start = 0
+
+    return {'header': header, 'checkpoints': checkpoints}
+
+
+def get_sheet_index(file_path, sheet_path, build=True):
+    """获取工作表的行偏移索引，不存在且build为True时扫描工作表建立并保存
+
+    Returns:
+        dict: 工作表索引，不存在且未建立时返回None
+    """
+    index = load_index(file_path)
+    if index is not None and sheet_path in index['sheets']:
+        return index['sheets'][sheet_path]
+    if not build:
+        return None
+
+    with _index_lock:
+        build_lock = _build_locks.setdefault(file_path, threading.Lock())
+    with build_lock:
+        # 等待锁期间其他线程可能已经建立了索引
+        index = load_index(file_path)
+        if index is not None and sheet_path in index['sheets']:
+            return index['sheets'][sheet_path]
+
+        start_time = time.perf_counter()
+        source = _source_info(file_path)
+        with zipfile.ZipFile(file_path) as archive:
+            sheet_index = scan_sheet(archive, sheet_path, EXCEL_ROW_INDEX_CONFIG['interval'])
+        _save_sheet_index(file_path, source, sheet_path, sheet_index)
+        app_logger.info(f"行偏移索引已建立: {file_path}, 工作表: {sheet_path}, "
+                        f"检查点数: {len(sheet_index['checkpoints'])}, 耗时: {time.perf_counter() - start_time:.2f}秒")
+        return sheet_index
+
+
+def find_checkpoint(sheet_index, start_row):
+    """找到起始行（从0开始）之前最近的检查点，返回[行号, 字节偏移]，没有可用检查点时返回None"""
+    checkpoints = sheet_index['checkpoints']
+    position = bisect.bisect_right(checkpoints, start_row + 1, key=lambda checkpoint: checkpoint[0])
+    return checkpoints[position - 1] if position else None
+
+
+def open_indexed_rows(file_path, sheet_name, sheet_index, start_row):
+    """从离起始行最近的检查点读取.xlsx工作表，生成(原始行, 列宽)元组
+
+    起始行超过一个检查点间隔且没有索引时同步建立索引；起始行在第一个检查点之内时只使用已有的索引。
+    索引未启用、不存在或工作表无法建立索引时返回None，由调用方从第一行开始读取。
+    """
+    if not EXCEL_ROW_INDEX_CONFIG['enabled']:
+        return None
+
+    reader = XlsxStreamReader(file_path)
+    try:
+        sheet_path = reader.resolve_sheet(sheet_name, sheet_index)
+        sheet_entry = get_sheet_index(file_path, sheet_path, build=start_row >= EXCEL_ROW_INDEX_CONFIG['interval'])
+    except Exception:
+        reader.close()
+        raise
+    checkpoint = find_checkpoint(sheet_entry, start_row) if sheet_entry is not None else None
+    if checkpoint is None:
+        reader.close()
+        return None
+
+    resume = (sheet_entry['header'].encode('utf-8'), checkpoint[0], checkpoint[1])
+    app_logger.info(f"按行偏移索引读取: {file_path}, 起始行: {start_row}, 检查点行号: {checkpoint[0]}")
+
+    def iter_rows():
+        with reader:
+            yield from reader.iter_rows(sheet_name, sheet_index, start_row, resume=resume)
+    return iter_rows()
+
+
+def _build_in_background(file_path, sheet_path):
+    try:
+        get_sheet_index(file_path, sheet_path)
+    except Exception as e:
+        app_logger.error(f"建立行偏移索引失败: {file_path}, 错误: {str(e)}", exc_info=True)
+
+
+def schedule_build(file_path, sheet_name=None, sheet_index=0):
+    """首次打开工作表时提交后台任务建立索引，之后翻到靠后的页面时无需等待扫描
+
+    Returns:
+        bool: 是否已提交任务（未启用、非.xlsx文件、已有列式副本或索引时不提交）
+    """
+    if not EXCEL_ROW_INDEX_CONFIG['enabled'] or os.path.splitext(file_path)[1].lower() != '.xlsx':
+        return False
+    if excel_sidecar.load_manifest(file_path) is not None:
+        return False
+    with XlsxStreamReader(file_path) as reader:
+        sheet_path = reader.resolve_sheet(sheet_name, sheet_index)
+    if get_sheet_index(file_path, sheet_path, build=False) is not None:
+        return False
+
+    from service.thread.thread_pool import get_normal_business_pool
+    get_normal_business_pool().submit(_build_in_background, file_path, sheet_path)
+    return True
@@ -0,0 +1,449 @@
+"""
+Excel列式副本
+
+上传的工作簿在后台转换为列式副本，存放在源文件旁的"<文件名>.sidecar"目录中：
+- manifest.json：源文件大小和修改时间、每个工作表的名称、行数、列数和表头行
+- s<工作表序号>_c<列序号>_*.npy：每列的数据文件，可以内存映射
+- row_index.json：尚未生成副本时按需建立的.xlsx行偏移索引（见utils.excel_row_index），生成副本时随旧目录一起替换
+
+副本保存的是与ExcelUtil流式读取一致的规范化结果（从第一行开始、不忽略空行、已去除末尾全空行）。
+全为整数或全为浮点数的列保存为int64/float64数组；其余列按Arrow的方式拆分为类型标记数组、
+整数数组、浮点数组，以及UTF-8字节数组加偏移量数组表示的字符串。
+源文件被修改后副本自动失效，ExcelUtil回退到解析源文件。
+转换时逐行读取工作表，每列按块编码后追加写入临时文件，内存占用与工作表行数无关。
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+import numpy as np
+from config.excel_config import EXCEL_SIDECAR_CONFIG
+from service.log.logger import app_logger
+
+SIDECAR_SUFFIX = '.sidecar'
+# 2: 末尾只含空白字符串的行与pandas一致保留
+SIDECAR_VERSION = 2
+MANIFEST_NAME = 'manifest.json'
+SIDECAR_EXTENSIONS = ('.xlsx', '.xls')
+
+# 混合类型列的类型标记
+TAG_NONE = 0
+TAG_STR = 1
+TAG_INT = 2
+TAG_FLOAT = 3
+TAG_BOOL = 4
+TAG_BIG_INT = 5   # 超出int64范围的整数，按字符串保存
+
+# 转换时每列累积多少行后编码写入临时文件
+CONVERT_CHUNK_ROWS = 2048
+
+# 已读取的清单缓存：副本目录 -> (清单文件修改时间, 清单)
+_manifest_cache = {}
+_manifest_lock = threading.Lock()
+
+
+def get_sidecar_dir(file_path):
+    """获取源文件对应的副本目录"""
+    return file_path + SIDECAR_SUFFIX
+
+
+class SidecarSheet:
+    """内存映射的工作表副本，行读取接口与CachedSheet一致"""
+
+    def __init__(self, sidecar_dir, sheet_info):
+        self.name = sheet_info['name']
+        self.row_count = sheet_info['row_count']
+        self.width = sheet_info['width']
+        self.non_empty = np.load(os.path.join(sidecar_dir, sheet_info['non_empty']), mmap_mode='r')
+        self.columns = []
+        for column_info in sheet_info['columns']:
+            arrays = {key: np.load(os.path.join(sidecar_dir, file_name), mmap_mode='r')
+                      for key, file_name in column_info['files'].items()}
+            self.columns.append((column_info['kind'], arrays))
+
+    def _decode_column(self, kind, arrays, start, end):
+        """解码一段行的列数据为Python原生值列表"""
+        if kind != 'mixed':
+            return arrays['values'][start:end].tolist()
+
+        tags = np.asarray(arrays['tags'][start:end])
+        values = np.empty(end - start, dtype=object)
+        for tag, key in ((TAG_INT, 'ints'), (TAG_FLOAT, 'floats'), (TAG_BOOL, 'ints')):
+            positions = np.flatnonzero(tags == tag)
+            if len(positions):
+                decoded = arrays[key][start + positions].tolist()
+                if tag == TAG_BOOL:
+                    decoded = [bool(value) for value in decoded]
+                values[positions] = decoded
+        text_positions = np.flatnonzero((tags == TAG_STR) | (tags == TAG_BIG_INT))
+        if len(text_positions):
+            offsets = arrays['offsets']
+            blob = arrays['blob']
+            for position in text_positions:
+                row_index = start + position
+                text = bytes(blob[offsets[row_index]:offsets[row_index + 1]]).decode('utf-8')
+                values[position] = int(text) if tags[position] == TAG_BIG_INT else text
+        return values.tolist()
+
+    def iter_rows(self, start_row=0, row_limit=None, ignore_empty_rows=False):
+        """按iter_excel_data的参数语义生成行数据"""
+        end_row = self.row_count if not row_limit else min(self.row_count, start_row + row_limit)
+        if start_row >= end_row:
+            return
+
+        batch_size = 1000
+        for batch_start in range(start_row, end_row, batch_size):
+            batch_end = min(batch_start + batch_size, end_row)
+            batch_columns = [self._decode_column(kind, arrays, batch_start, batch_end)
+                             for kind, arrays in self.columns]
+            mask = self.non_empty[batch_start:batch_end]
+            for offset, row in enumerate(zip(*batch_columns)):
+                if ignore_empty_rows and not mask[offset]:
+                    continue
+                yield list(row)
+
+
+def load_manifest(file_path):
+    """读取源文件的副本清单，副本不存在、版本不符或源文件已修改时返回None"""
+    if not EXCEL_SIDECAR_CONFIG['enabled']:
+        return None
+    sidecar_dir = get_sidecar_dir(file_path)
+    manifest_path = os.path.join(sidecar_dir, MANIFEST_NAME)
+    try:
+        source_stat = os.stat(file_path)
+        manifest_mtime = os.stat(manifest_path).st_mtime_ns
+    except OSError:
+        return None
+
+    with _manifest_lock:
+        cached = _manifest_cache.get(sidecar_dir)
+    if cached is not None and cached[0] == manifest_mtime:
+        manifest = cached[1]
+    else:
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            app_logger.warning(f"读取Excel副本清单失败: {manifest_path}, 错误: {str(e)}")
+            return None
+        with _manifest_lock:
+            _manifest_cache[sidecar_dir] = (manifest_mtime, manifest)
+
+    source = manifest.get('source', {})
+    if (manifest.get('version') != SIDECAR_VERSION or source.get('size') != source_stat.st_size
+            or source.get('mtime_ns') != source_stat.st_mtime_ns):
+        return None
+    return manifest
+
+
+def find_manifest_sheet(manifest, sheet_name=None, sheet_index=0):
+    """按与流式读取一致的规则定位工作表：指定名称时按名称（不存在时报错），否则按索引（超出时取最后一个）"""
+    sheets = manifest['sheets']
+    if not sheets:
+        return None
+    if sheet_name:
+        for sheet_info in sheets:
+            if sheet_info['name'] == sheet_name:
+                return sheet_info
+        raise ValueError(f"工作表不存在: {sheet_name}")
+    return sheets[min(sheet_index, len(sheets) - 1)]
+
+
+def load_sheet(file_path, sheet_name=None, sheet_index=0):
+    """加载工作表副本，副本不可用时返回None"""
+    manifest = load_manifest(file_path)
+    if manifest is None:
+        return None
+    sheet_info = find_manifest_sheet(manifest, sheet_name, sheet_index)
+    if sheet_info is None:
+        return None
+    try:
+        return SidecarSheet(get_sidecar_dir(file_path), sheet_info)
+    except (OSError, ValueError) as e:
+        app_logger.warning(f"加载Excel副本失败: {file_path}, 错误: {str(e)}")
+        return None
+
+
+def _encode_values(values):
+    """将一段值编码为类型标记、整数、浮点和字符串数组，offsets从0开始、比值多一项"""
+    row_count = len(values)
+    tags = np.zeros(row_count, dtype=np.uint8)
+    ints = np.zeros(row_count, dtype=np.int64)
+    floats = np.zeros(row_count, dtype=np.float64)
+    offsets = np.zeros(row_count + 1, dtype=np.int64)
+    pieces = []
+    position = 0
+    for row_index, value in enumerate(values):
+        text = None
+        if value is None:
+            pass
+        elif isinstance(value, bool):
+            tags[row_index] = TAG_BOOL
+            ints[row_index] = int(value)
+        elif isinstance(value, int):
+            if -2 ** 63 <= value < 2 ** 63:
+                tags[row_index] = TAG_INT
+                ints[row_index] = value
+            else:
+                tags[row_index] = TAG_BIG_INT
+                text = str(value)
+        elif isinstance(value, float):
+            tags[row_index] = TAG_FLOAT
+            floats[row_index] = value
+        else:
+            # 规范化后的值只有字符串，其他类型按字符串保存
+            tags[row_index] = TAG_STR
+            text = value if isinstance(value, str) else str(value)
+        if text is not None:
+            encoded = text.encode('utf-8')
+            pieces.append(encoded)
+            position += len(encoded)
+        offsets[row_index + 1] = position
+    return tags, ints, floats, offsets, b''.join(pieces)
+
+
+class _ArrayFileWriter:
+    """向临时文件追加一维数组的原始数据，结束时加上.npy头部生成数组文件"""
+
+    def __init__(self, raw_path, dtype):
+        self.raw_path = raw_path
+        self.dtype = np.dtype(dtype)
+        self.count = 0
+        self.file = open(raw_path, 'wb')
+
+    def write(self, array):
+        np.ascontiguousarray(array, dtype=self.dtype).tofile(self.file)
+        self.count += len(array)
+
+    def finish(self, npy_path):
+        """生成与np.save格式相同的数组文件并删除临时文件"""
+        self.file.close()
+        with open(npy_path, 'wb') as out:
+            np.lib.format.write_array_header_1_0(out, {
+                'descr': np.lib.format.dtype_to_descr(self.dtype),
+                'fortran_order': False,
+                'shape': (self.count,)
+            })
+            with open(self.raw_path, 'rb') as raw:
+                shutil.copyfileobj(raw, out, 1024 * 1024)
+        os.remove(self.raw_path)
+
+    def discard(self):
+        self.file.close()
+        os.remove(self.raw_path)
+
+
+class _ColumnWriter:
+    """逐块写入一列的数据，结束时按CachedSheet的规则确定列类型：
+    全为整数（不超出int64）或全为浮点数的列只保留values数组，其余列保存为混合类型数组"""
+
+    def __init__(self, temp_dir, prefix):
+        self.prefix = prefix
+        self.temp_dir = temp_dir
+        self.writers = {key: _ArrayFileWriter(os.path.join(temp_dir, f"{prefix}_{key}.raw"), dtype)
+                        for key, dtype in (('tags', np.uint8), ('ints', np.int64), ('floats', np.float64),
+                                           ('offsets', np.int64), ('blob', np.uint8))}
+        self.writers['offsets'].write(np.zeros(1, dtype=np.int64))
+        self.position = 0
+        self.all_int = True
+        self.all_float = True
+
+    def write(self, values):
+        tags, ints, floats, offsets, blob = _encode_values(values)
+        self.all_int = self.all_int and all(type(value) is int for value in values) and not (tags == TAG_BIG_INT).any()
+        self.all_float = self.all_float and all(type(value) is float for value in values)
+        self.writers['tags'].write(tags)
+        self.writers['ints'].write(ints)
+        self.writers['floats'].write(floats)
+        self.writers['offsets'].write(offsets[1:] + self.position)
+        self.writers['blob'].write(np.frombuffer(blob, dtype=np.uint8))
+        self.position += len(blob)
+
+    def finish(self):
+        """生成列的数组文件，返回(列类型, {数组名: 文件名})"""
+        row_count = self.writers['tags'].count
+        tags_path = self.writers['tags'].raw_path
+        if row_count and self.all_int:
+            kind, keep = 'int64', {'values': 'ints'}
+        elif row_count and self.all_float:
+            kind, keep = 'float64', {'values': 'floats'}
+        else:
+            kind, keep = 'mixed', {'tags': 'tags', 'offsets': 'offsets', 'blob': 'blob'}
+            self.writers['tags'].file.flush()
+            tags = np.fromfile(tags_path, dtype=np.uint8)
+            if ((tags == TAG_INT) | (tags == TAG_BOOL)).any():
+                keep['ints'] = 'ints'
+            if (tags == TAG_FLOAT).any():
+                keep['floats'] = 'floats'
+            del tags
+
+        files = {}
+        kept = set(keep.values())
+        for key, source in keep.items():
+            file_name = f"{self.prefix}_{key}.npy"
+            self.writers[source].finish(os.path.join(self.temp_dir, file_name))
+            files[key] = file_name
+        for key, writer in self.writers.items():
+            if key not in kept:
+                writer.discard()
+        return kind, files
+
+    def discard(self):
+        for writer in self.writers.values():
+            if not writer.file.closed:
+                writer.discard()
+
+
+def _convert_sheet(file_path, ext, sheet, temp_dir):
+    """逐行读取工作表，按块写入每列的数组文件，返回清单中的工作表信息"""
+    from utils.excel_util import ExcelUtil
+
+    prefix = f"s{sheet['index']}"
+    columns = []
+    # 当前块中每列的值，新出现的列在之前的行补None
+    chunk_columns = []
+    chunk_non_empty = []
+    non_empty_writer = _ArrayFileWriter(os.path.join(temp_dir, f"{prefix}_non_empty.raw"), np.bool_)
+    header = None
+    row_count = 0
+    non_empty_row_count = 0
+
+    def flush():
+        for column, values in zip(columns, chunk_columns):
+            column.write(values)
+            values.clear()
+        non_empty_writer.write(chunk_non_empty)
+        chunk_non_empty.clear()
+
+    try:
+        for row in ExcelUtil._iter_normalized_rows(file_path, ext, sheet['name'], sheet['index'], 0, None, False):
+            while len(columns) < len(row):
+                column = _ColumnWriter(temp_dir, f"{prefix}_c{len(columns)}")
+                flushed_rows = row_count - len(chunk_non_empty)
+                for start in range(0, flushed_rows, CONVERT_CHUNK_ROWS):
+                    column.write([None] * min(CONVERT_CHUNK_ROWS, flushed_rows - start))
+                columns.append(column)
+                chunk_columns.append([None] * len(chunk_non_empty))
+            for col_index, values in enumerate(chunk_columns):
+                values.append(row[col_index] if col_index < len(row) else None)
+
+            is_non_empty = not ExcelUtil._is_empty_row(row)
+            chunk_non_empty.append(is_non_empty)
+            if is_non_empty:
+                non_empty_row_count += 1
+                if header is None:
+                    header = [None if value is None else str(value) for value in row]
+            row_count += 1
+            if len(chunk_non_empty) >= CONVERT_CHUNK_ROWS:
+                flush()
+        flush()
+
+        column_infos = []
+        for column in columns:
+            kind, files = column.finish()
+            column_infos.append({'kind': kind, 'files': files})
+        non_empty_file = f"{prefix}_non_empty.npy"
+        non_empty_writer.finish(os.path.join(temp_dir, non_empty_file))
+    except Exception:
+        for column in columns:
+            column.discard()
+        if not non_empty_writer.file.closed:
+            non_empty_writer.discard()
+        raise
+
+    return {
+        'name': sheet['name'],
+        'index': sheet['index'],
+        'row_count': row_count,
+        'non_empty_row_count': non_empty_row_count,
+        'width': len(columns),
+        'header': header or [],
+        'non_empty': non_empty_file,
+        'columns': column_infos
+    }
+
+
+def convert_workbook(file_path):
+    """将工作簿的所有工作表转换为列式副本
+
+    先写入临时目录，全部完成后替换旧副本，读取方不会看到不完整的副本。
+
+    Args:
+        file_path (str): 源文件路径
+
+    Returns:
+        dict: 副本清单
+    """
+    from utils.excel_util import ExcelUtil
+
+    ext = os.path.splitext(file_path)[1].lower()
+    start_time = time.perf_counter()
+    source_stat = os.stat(file_path)
+    sidecar_dir = get_sidecar_dir(file_path)
+    temp_dir = f"{sidecar_dir}.tmp-{os.getpid()}-{threading.get_ident()}"
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    os.makedirs(temp_dir)
+
+    try:
+        sheets = []
+        for sheet in ExcelUtil.get_sheets_info(file_path):
+            sheets.append(_convert_sheet(file_path, ext, sheet, temp_dir))
+
+        manifest = {
+            'version': SIDECAR_VERSION,
+            'source': {
+                'name': os.path.basename(file_path),
+                'size': source_stat.st_size,
+                'mtime_ns': source_stat.st_mtime_ns
+            },
+            'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'sheets': sheets
+        }
+        with open(os.path.join(temp_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+
+        shutil.rmtree(sidecar_dir, ignore_errors=True)
+        os.replace(temp_dir, sidecar_dir)
+    except Exception:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+    app_logger.info(f"Excel列式副本已生成: {file_path}, 工作表数: {len(sheets)}, "
+                    f"耗时: {time.perf_counter() - start_time:.2f}秒")
+    return manifest
+
+
+def _convert_in_background(file_path):
+    try:
+        convert_workbook(file_path)
+    except Exception as e:
+        app_logger.error(f"生成Excel列式副本失败: {file_path}, 错误: {str(e)}", exc_info=True)
+
+
+def schedule_conversion(file_path):
+    """为上传的Excel文件提交后台转换任务
+
+    Returns:
+        bool: 是否已提交任务（未启用、非Excel文件或文件过大时不转换）
+    """
+    if not EXCEL_SIDECAR_CONFIG['enabled'] or not EXCEL_SIDECAR_CONFIG['convert_on_upload']:
+        return False
+    if os.path.splitext(file_path)[1].lower() not in SIDECAR_EXTENSIONS:
+        return False
+    if os.path.getsize(file_path) > EXCEL_SIDECAR_CONFIG['max_file_mb'] * 1024 * 1024:
+        app_logger.info(f"文件超过列式副本大小上限，不转换: {file_path}")
+        return False
+
+    from service.thread.thread_pool import get_normal_business_pool
+    get_normal_business_pool().submit(_convert_in_background, file_path)
+    return True
+
+
+def remove_sidecar(file_path):
+    """删除源文件对应的副本"""
+    sidecar_dir = get_sidecar_dir(file_path)
+    with _manifest_lock:
+        _manifest_cache.pop(sidecar_dir, None)
+    shutil.rmtree(sidecar_dir, ignore_errors=True)
@@ -6,11 +6,22 @@ Excel工具类
 
 import os
 import sys
+import math
+import datetime
+import html
+import re
+import threading
+import zipfile
 import subprocess
 import platform
+from xml.etree import ElementTree
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
 from openpyxl import load_workbook
+from config.excel_config import EXCEL_CACHE_CONFIG, EXCEL_READER_CONFIG, EXCEL_ROW_INDEX_CONFIG
 from service.log.logger import app_logger
+from utils import csv_reader, excel_sidecar, excel_row_index, xlsx_stream_reader
 
 # 尝试导入xlrd库，用于处理.xls文件
 try:
@@ -20,13 +31,165 @@ except ImportError:
     HAS_XLRD = False
     app_logger.warning("未安装xlrd库，可能无法正确处理.xls格式的Excel文件")
 
+# xlsx工作表XML扫描相关常量
+XLSX_MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+XLSX_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+XLSX_DIMENSION_PATTERN = re.compile(rb'<(?:\w+:)?dimension\s+ref="[A-Z]*\d*:?[A-Z]*(\d+)"')
+XLSX_ROW_NUMBER_PATTERN = re.compile(rb'<row\b[^>]*?\sr="(\d+)"')
+XLSX_CELL_TYPE_PATTERN = re.compile(rb'\st="(\w+)"')
+XLSX_CELL_VALUE_PATTERN = re.compile(rb'<v>([^<]*)</v>')
+XLSX_CELL_TEXT_PATTERN = re.compile(rb'<t(?:\s[^>]*)?>([^<]*)</t>')
+XLSX_SCAN_CHUNK_SIZE = 1024 * 1024
+XLSX_SCAN_OVERLAP = 64 * 1024
+
+# 可选的.xlsx流式读取引擎
+XLSX_ENGINES = ('openpyxl', 'iterparse')
+
+# 支持的文件格式，CSV/TSV按只有一个工作表的工作簿处理
+SUPPORTED_EXTENSIONS = ('.xlsx', '.xls') + csv_reader.CSV_EXTENSIONS
+
+class CachedSheet:
+    """缓存的工作表数据，按列存储
+    
+    数据为从第一行开始、不忽略空行、已去除末尾全空行的规范化结果。
+    全为整数或全为浮点数的列使用int64/float64数组，其余列使用object数组。
+    """
+    
+    def __init__(self, rows, width):
+        self.row_count = len(rows)
+        self.width = width
+        self.columns = []
+        for col_index in range(width):
+            values = [row[col_index] if col_index < len(row) else None for row in rows]
+            self.columns.append(CachedSheet._to_array(values))
+        # 非空行标记，用于忽略空行时快速过滤
+        self.non_empty = np.array([not ExcelUtil._is_empty_row(row) for row in rows], dtype=bool)
+        self.nbytes = self.non_empty.nbytes + sum(CachedSheet._array_nbytes(column) for column in self.columns)
+    
+    @staticmethod
+    def _to_array(values):
+        """将一列值转换为紧凑的NumPy数组"""
+        if values and all(type(value) is int for value in values):
+            try:
+                return np.array(values, dtype=np.int64)
+            except OverflowError:
+                pass
+        elif values and all(type(value) is float for value in values):
+            return np.array(values, dtype=np.float64)
+        column = np.empty(len(values), dtype=object)
+        column[:] = values
+        return column
+    
+    @staticmethod
+    def _array_nbytes(column):
+        """估算数组占用的内存，object数组包含元素对象本身的大小"""
+        if column.dtype != object:
+            return column.nbytes
+        return column.nbytes + sum(sys.getsizeof(value) for value in column if value is not None)
+    
+    def iter_rows(self, start_row=0, row_limit=None, ignore_empty_rows=False):
+        """按iter_excel_data的参数语义生成行数据"""
+        end_row = self.row_count if not row_limit else min(self.row_count, start_row + row_limit)
+        if start_row >= end_row:
+            return
+        
+        batch_size = 1000
+        for batch_start in range(start_row, end_row, batch_size):
+            batch_end = min(batch_start + batch_size, end_row)
+            # tolist将NumPy标量转换为Python原生类型
+            batch_columns = [column[batch_start:batch_end].tolist() for column in self.columns]
+            mask = self.non_empty[batch_start:batch_end]
+            for offset, row in enumerate(zip(*batch_columns)):
+                if ignore_empty_rows and not mask[offset]:
+                    continue
+                yield list(row)
+
+
+class ExcelSheetCache:
+    """进程内的工作表解析结果LRU缓存
+    
+    以(文件绝对路径, 文件大小, 修改时间, 工作表)为键，文件被修改后键随之变化，旧缓存自然淘汰。
+    按估算内存占用和条目数限制容量，超出时淘汰最近最少使用的工作表。
+    """
+    
+    def __init__(self, max_memory_bytes, max_entries):
+        self.max_memory_bytes = max_memory_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def make_key(file_path, sheet_name, sheet_index):
+        """生成缓存键，文件不存在时返回None"""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns, sheet_name or None, sheet_index)
+    
+    def get(self, key):
+        """获取缓存的工作表，命中时移到最近使用位置"""
+        if key is None:
+            return None
+        with self._lock:
+            sheet = self._entries.get(key)
+            if sheet is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return sheet
+    
+    def put(self, key, sheet):
+        """放入缓存，必要时淘汰最近最少使用的工作表"""
+        if key is None or sheet.nbytes > self.max_memory_bytes:
+            return
+        with self._lock:
+            old_sheet = self._entries.pop(key, None)
+            if old_sheet is not None:
+                self._memory_bytes -= old_sheet.nbytes
+            self._entries[key] = sheet
+            self._memory_bytes += sheet.nbytes
+            while self._entries and (self._memory_bytes > self.max_memory_bytes or len(self._entries) > self.max_entries):
+                evicted_key, evicted_sheet = self._entries.popitem(last=False)
+                self._memory_bytes -= evicted_sheet.nbytes
+                app_logger.debug(f"淘汰Excel缓存: {evicted_key[0]}, 工作表: {evicted_key[3] or evicted_key[4]}")
+    
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._memory_bytes = 0
+    
+    def stats(self):
+        """获取缓存统计信息"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'memory_bytes': self._memory_bytes,
+                'max_memory_bytes': self.max_memory_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+# 进程级工作表缓存
+_sheet_cache = ExcelSheetCache(
+    max_memory_bytes=EXCEL_CACHE_CONFIG['max_memory_mb'] * 1024 * 1024,
+    max_entries=EXCEL_CACHE_CONFIG['max_entries']
+)
+
+
 class ExcelUtil:
     """Excel工具类，提供Excel文件操作的静态方法"""
     
     @staticmethod
     def validate_excel_path(file_path):
         """
-        验证Excel文件路径是否有效
+        验证Excel文件路径是否有效（.xlsx/.xls，以及按单工作表工作簿处理的.csv/.tsv）
         
         Args:
             file_path (str): Excel文件路径
@@ -46,8 +209,8 @@ class ExcelUtil:
         
         # 检查扩展名
         ext = os.path.splitext(file_path)[1].lower()
-        if ext not in ['.xlsx', '.xls']:
-            app_logger.warning(f"文件格式不是Excel: {file_path}, 扩展名: {ext}")
+        if ext not in SUPPORTED_EXTENSIONS:
+            app_logger.warning(f"文件格式不是Excel或CSV: {file_path}, 扩展名: {ext}")
             return False
             
         # 如果是.xls文件，检查是否有xlrd库
@@ -80,6 +243,17 @@ class ExcelUtil:
             ext = os.path.splitext(file_path)[1].lower()
             sheets = []
             
+            # CSV/TSV文件只有一个工作表，以文件名命名
+            if ext in csv_reader.CSV_EXTENSIONS:
+                name = os.path.splitext(os.path.basename(file_path))[0]
+                return [{'name': name, 'index': 0, 'id': f"{name}_0"}]
+            
+            # 列式副本可用时直接使用副本清单中的工作表信息
+            manifest = excel_sidecar.load_manifest(file_path)
+            if manifest is not None:
+                return [{'name': sheet['name'], 'index': sheet['index'], 'id': f"{sheet['name']}_{sheet['index']}"}
+                        for sheet in manifest['sheets']]
+            
             app_logger.info(f"尝试读取Excel文件: {file_path}, 格式: {ext}")
             
             if ext == '.xlsx':
@@ -117,7 +291,8 @@ class ExcelUtil:
             raise Exception(f"无法读取Excel文件工作表: {str(e)}")
     
     @staticmethod
-    def read_excel_data(file_path, sheet_name=None, sheet_index=0, start_row=0, row_limit=None, ignore_empty_rows=False):
+    def read_excel_data(file_path, sheet_name=None, sheet_index=0, start_row=0, row_limit=None, ignore_empty_rows=False,
+                        engine=None):
         """
         读取Excel文件数据，返回列表格式的数据
         
@@ -128,6 +303,7 @@ class ExcelUtil:
             start_row (int, optional): 开始行，默认为0(第一行)
             row_limit (int, optional): 读取行数限制，默认为None表示读取所有行
             ignore_empty_rows (bool, optional): 是否忽略全空行，默认为False
+            engine (str, optional): .xlsx读取引擎，openpyxl或iterparse，默认使用EXCEL_READER_CONFIG中的配置
             
         Returns:
             list: 包含所有行数据的列表，每行是一个列表
@@ -144,59 +320,16 @@ class ExcelUtil:
             ext = os.path.splitext(file_path)[1].lower()
             app_logger.info(f"尝试读取Excel数据: {file_path}, 格式: {ext}, 开始行: {start_row}, 忽略空行: {ignore_empty_rows}")
             
-            # 使用适当的引擎读取Excel数据
-            engine = 'openpyxl' if ext == '.xlsx' else 'xlrd'
-            
-            # 读取Excel数据
-            try:
-                if sheet_name:
-                    # 如果提供了sheet_name，则使用sheet_name
-                    df = pd.read_excel(file_path, sheet_name=sheet_name, header=None, engine=engine)
-                else:
-                    # 否则使用sheet_index
-                    df = pd.read_excel(file_path, sheet_name=sheet_index, header=None, engine=engine)
-            except Exception as e:
-                app_logger.error(f"使用{engine}引擎读取失败，尝试其他引擎: {str(e)}")
-                # 尝试不指定引擎
-                if sheet_name:
-                    df = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
-                else:
-                    df = pd.read_excel(file_path, sheet_name=sheet_index, header=None)
-            
-            # 获取数据，从指定行开始
-            data = df.iloc[start_row:]
+            # 与iter_excel_data共用缓存、列式副本和逐行规范化，无论数据来自哪里规范化结果都相同
+            rows = list(ExcelUtil.iter_excel_data(file_path, sheet_name, sheet_index, start_row, row_limit,
+                                                  ignore_empty_rows, engine=engine))
+            # 未声明尺寸的工作表和CSV流式读取时列宽随读取的行增长，与缓存和列式副本一致补齐到相同列数
+            width = max((len(row) for row in rows), default=0)
+            for row in rows:
+                if len(row) < width:
+                    row.extend([None] * (width - len(row)))
             
-            # 如果指定了行数限制，只取指定的行数
-            if row_limit:
-                data = data.iloc[:row_limit]
-            
-            # 将DataFrame转换为列表
-            rows = []
-            
-            # 处理数据，确保没有NaN值
-            for _, row in data.iterrows():
-                # 将每个单元格数据转换为Python原生类型，并处理NaN值
-                processed_row = []
-                for value in row:
-                    if pd.isna(value) or pd.isnull(value):
-                        processed_row.append(None)  # 将NaN值转换为None
-                    elif isinstance(value, (pd.Timestamp, pd.Period)):
-                        # 处理日期时间类型
-                        processed_row.append(str(value))
-                    else:
-                        processed_row.append(value)
-                
-                # 如果需要忽略空行，检查行是否为空
-                if ignore_empty_rows:
-                    # 行为空的条件：所有值都是None或空字符串
-                    is_empty = all((val is None or (isinstance(val, str) and val.strip() == '')) for val in processed_row)
-                    if not is_empty:
-                        rows.append(processed_row)
-                else:
-                    # 不忽略空行，添加所有行
-                    rows.append(processed_row)
-            
-            log_msg = f"成功读取Excel数据，原始行数: {len(data)}, 处理后行数: {len(rows)}"
+            log_msg = f"成功读取Excel数据，处理后行数: {len(rows)}"
             if ignore_empty_rows:
                 log_msg += f"（已忽略空行）"
             if row_limit:
@@ -208,12 +341,256 @@ class ExcelUtil:
         except Exception as e:
             app_logger.error(f"读取Excel数据失败: {str(e)}", exc_info=True)
             raise Exception(f"无法读取Excel数据: {str(e)}")
+
+    @staticmethod
+    def iter_excel_data(file_path, sheet_name=None, sheet_index=0, start_row=0, row_limit=None, ignore_empty_rows=False,
+                        engine=None):
+        """
+        流式读取Excel文件数据，逐行生成规范化后的行列表
+
+        .xlsx文件使用openpyxl只读模式或iterparse引擎（见utils.xlsx_stream_reader），.xls文件使用xlrd按需加载模式，
+        .csv/.tsv文件使用csv模块按块读取（见utils.csv_reader），不会一次性将整个工作表加载到内存中。行数据的规范化规则与read_excel_data一致：
+        空值转换为None，日期时间转换为字符串，末尾的全空行会被丢弃。
+        完整读取（未指定row_limit）的工作表会写入进程级缓存，文件未修改时再次读取直接使用缓存；
+        已生成列式副本（见utils.excel_sidecar）时读取内存映射的副本。
+
+        Args:
+            file_path (str): Excel文件路径
+            sheet_name (str, optional): 工作表名称，如果提供则优先使用
+            sheet_index (int, optional): 工作表索引，当sheet_name未提供时使用
+            start_row (int, optional): 开始行，默认为0(第一行)
+            row_limit (int, optional): 读取行数限制，默认为None表示读取所有行
+            ignore_empty_rows (bool, optional): 是否忽略全空行，默认为False
+            engine (str, optional): .xlsx读取引擎，openpyxl或iterparse，默认使用EXCEL_READER_CONFIG中的配置
+
+        Yields:
+            list: 每行数据的列表
+
+        Raises:
+            Exception: 当文件无法打开或解析时抛出异常
+        """
+        # 首先验证文件路径
+        if not ExcelUtil.validate_excel_path(file_path):
+            raise ValueError(f"无效的Excel文件路径: {file_path}")
+
+        if engine and engine not in XLSX_ENGINES:
+            raise ValueError(f"不支持的Excel读取引擎: {engine}")
+
+        ext = os.path.splitext(file_path)[1].lower()
+        app_logger.info(f"流式读取Excel数据: {file_path}, 格式: {ext}, 开始行: {start_row}, 忽略空行: {ignore_empty_rows}")
+
+        # CSV/TSV解析开销小且文件可能很大，不写入进程级缓存，保证内存占用与文件大小无关
+        cacheable = EXCEL_CACHE_CONFIG['enabled'] and ext not in csv_reader.CSV_EXTENSIONS
+        cache_key = ExcelSheetCache.make_key(file_path, sheet_name, sheet_index) if cacheable else None
+        cached_sheet = _sheet_cache.get(cache_key)
+        if cached_sheet is not None:
+            app_logger.info(f"命中Excel缓存: {file_path}, 共{cached_sheet.row_count}行")
+            yield from cached_sheet.iter_rows(start_row, row_limit, ignore_empty_rows)
+            return
+
+        sidecar_sheet = excel_sidecar.load_sheet(file_path, sheet_name, sheet_index)
+        if sidecar_sheet is not None:
+            app_logger.info(f"读取Excel列式副本: {file_path}, 共{sidecar_sheet.row_count}行")
+            yield from sidecar_sheet.iter_rows(start_row, row_limit, ignore_empty_rows)
+            return
+
+        if cache_key is None or row_limit:
+            # 预览等只读取部分行的场景直接流式读取，不解析整个工作表
+            yield from ExcelUtil._iter_normalized_rows(file_path, ext, sheet_name, sheet_index, start_row, row_limit,
+                                                       ignore_empty_rows, engine)
+            return
+
+        # 完整读取时从第一行开始解析，边输出边写入缓存；估算内存超出缓存上限时放弃缓存
+        cached_rows = []
+        estimated_bytes = 0
+        width = 0
+        for row_index, row in enumerate(ExcelUtil._iter_normalized_rows(file_path, ext, sheet_name, sheet_index, 0, None, False, engine)):
+            if cached_rows is not None:
+                cached_rows.append(row)
+                width = max(width, len(row))
+                estimated_bytes += 8 * len(row) + sum(sys.getsizeof(value) for value in row if value is not None)
+                if estimated_bytes > _sheet_cache.max_memory_bytes:
+                    app_logger.info(f"工作表数据超出缓存上限，不缓存: {file_path}")
+                    cached_rows = None
+            if row_index < start_row:
+                continue
+            if ignore_empty_rows and ExcelUtil._is_empty_row(row):
+                continue
+            yield row
+
+        if cached_rows is not None:
+            _sheet_cache.put(cache_key, CachedSheet(cached_rows, width))
+
+    @staticmethod
+    def _iter_normalized_rows(file_path, ext, sheet_name, sheet_index, start_row, row_limit, ignore_empty_rows, engine=None):
+        """从文件逐行读取并规范化行数据，参数语义与iter_excel_data一致"""
+        if ext == '.xlsx':
+            if (engine or EXCEL_READER_CONFIG['xlsx_engine']) == 'iterparse':
+                # 预览等部分读取和从靠后的行开始读取时，按行偏移索引跳到最近的检查点，不解析之前的行；
+                # 索引续读使用iterparse引擎，指定openpyxl引擎时不使用索引
+                raw_rows = None
+                if row_limit or start_row >= EXCEL_ROW_INDEX_CONFIG['interval']:
+                    raw_rows = excel_row_index.open_indexed_rows(file_path, sheet_name, sheet_index, start_row)
+                if raw_rows is None:
+                    raw_rows = xlsx_stream_reader.iter_xlsx_raw_rows(file_path, sheet_name, sheet_index, start_row)
+            else:
+                raw_rows = ExcelUtil._iter_xlsx_raw_rows(file_path, sheet_name, sheet_index, start_row)
+        elif ext in csv_reader.CSV_EXTENSIONS:
+            raw_rows = csv_reader.iter_csv_raw_rows(file_path, start_row)
+        elif HAS_XLRD:
+            raw_rows = ExcelUtil._iter_xls_raw_rows(file_path, sheet_name, sheet_index, start_row)
+        else:
+            raise Exception("读取.xls文件需要安装xlrd库")
+
+        # row_limit与read_excel_data一致，按读取的原始行数计算（包括被忽略的空行）
+        consumed_count = 0
+        yielded_count = 0
+        # 连续的全None行先暂存，遇到后续数据行时再输出，从而与pandas一致丢弃工作表末尾的全空行；
+        # 只含空白字符串的行在不忽略空行时与pandas一致作为数据行保留原值
+        pending_empty_rows = []
+        width = 0
+
+        try:
+            for raw_row, row_width in raw_rows:
+                limit_reached = bool(row_limit) and consumed_count >= row_limit
+                if limit_reached and not pending_empty_rows:
+                    break
+
+                processed_row = [ExcelUtil._normalize_cell_value(value) for value in raw_row]
+                # 未声明尺寸的工作表按已读取行的最大列数补齐
+                width = max(width, row_width, len(processed_row))
+                if len(processed_row) < width:
+                    processed_row.extend([None] * (width - len(processed_row)))
+
+                if ignore_empty_rows and ExcelUtil._is_empty_row(processed_row):
+                    consumed_count += 1
+                    continue
+                if all(value is None for value in processed_row):
+                    if not limit_reached:
+                        pending_empty_rows.append(processed_row)
+                    consumed_count += 1
+                    continue
+
+                # 暂存的空行后面还有数据，说明它们不是末尾空行，需要输出
+                for empty_row in pending_empty_rows:
+                    if len(empty_row) < width:
+                        empty_row.extend([None] * (width - len(empty_row)))
+                    yielded_count += 1
+                    yield empty_row
+                pending_empty_rows.clear()
+
+                if limit_reached:
+                    break
+                consumed_count += 1
+                yielded_count += 1
+                yield processed_row
+        finally:
+            raw_rows.close()
+            app_logger.info(f"流式读取Excel数据结束，共输出{yielded_count}行")
+
+    @staticmethod
+    def _iter_xlsx_raw_rows(file_path, sheet_name, sheet_index, start_row):
+        """使用openpyxl只读模式逐行读取.xlsx工作表，生成(原始行, 列宽)元组"""
+        wb = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            # 指定了名称时必须存在，与pd.read_excel一致，避免读取到其他工作表
+            if sheet_name:
+                if sheet_name not in wb.sheetnames:
+                    raise ValueError(f"工作表不存在: {sheet_name}")
+                ws = wb[sheet_name]
+            else:
+                ws = wb.worksheets[min(sheet_index, len(wb.worksheets) - 1)]
+
+            # 工作表声明了尺寸时，openpyxl会按该列宽补齐每一行
+            row_width = ws.max_column or 0
+            for row in ws.iter_rows(min_row=start_row + 1, values_only=True):
+                yield row, row_width
+        finally:
+            wb.close()
+
+    @staticmethod
+    def _iter_xls_raw_rows(file_path, sheet_name, sheet_index, start_row):
+        """使用xlrd按需加载模式逐行读取.xls工作表，生成(原始行, 列宽)元组"""
+        workbook = xlrd.open_workbook(file_path, on_demand=True)
+        try:
+            sheet_names = workbook.sheet_names()
+            if sheet_name:
+                if sheet_name not in sheet_names:
+                    raise ValueError(f"工作表不存在: {sheet_name}")
+                sheet = workbook.sheet_by_name(sheet_name)
+            else:
+                sheet = workbook.sheet_by_index(min(sheet_index, len(sheet_names) - 1))
+
+            for row_idx in range(start_row, sheet.nrows):
+                row = []
+                for cell in sheet.row(row_idx):
+                    if cell.ctype == xlrd.XL_CELL_DATE:
+                        try:
+                            row.append(xlrd.xldate.xldate_as_datetime(cell.value, workbook.datemode))
+                        except Exception:
+                            row.append(cell.value)
+                    elif cell.ctype == xlrd.XL_CELL_BOOLEAN:
+                        row.append(bool(cell.value))
+                    elif cell.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK, xlrd.XL_CELL_ERROR):
+                        row.append(None)
+                    else:
+                        row.append(cell.value)
+                yield row, sheet.ncols
+        finally:
+            workbook.release_resources()
+
+    @staticmethod
+    def _normalize_cell_value(value):
+        """
+        将单元格原始值转换为与read_excel_data一致的Python原生值
+
+        Args:
+            value: 单元格原始值
+
+        Returns:
+            规范化后的值：空值返回None，日期时间和时长返回字符串，整数值的浮点数返回int
+        """
+        if value is None:
+            return None
+        if isinstance(value, float):
+            if math.isnan(value):
+                return None
+            if value.is_integer():
+                return int(value)
+            return value
+        if isinstance(value, (datetime.datetime, datetime.date, datetime.time, datetime.timedelta)):
+            return str(value)
+        return value
+
+    @staticmethod
+    def _last_non_empty_row(non_empty):
+        """根据非空行标记数组返回最后一个非空行的行号（从1开始），没有非空行时返回0"""
+        positions = np.flatnonzero(non_empty)
+        return int(positions[-1]) + 1 if len(positions) else 0
     
+    @staticmethod
+    def _is_empty_row(row):
+        """判断行是否为空：所有值都是None或空字符串"""
+        return all((val is None or (isinstance(val, str) and val.strip() == '')) for val in row)
+
+    @staticmethod
+    def get_cache_stats():
+        """获取工作表缓存统计信息"""
+        return _sheet_cache.stats()
+
+    @staticmethod
+    def clear_cache():
+        """清空工作表缓存"""
+        _sheet_cache.clear()
+
     @staticmethod
     def get_sheet_data_preview(file_path, sheet_name=None, sheet_index=0, start_row=0, row_count=10):
         """
         获取Excel工作表数据预览
         
+        已生成列式副本时直接按行号读取；.xlsx工作表首次打开时在后台建立行偏移索引（见utils.excel_row_index），
+        预览使用iterparse引擎读取，靠后的页面从最近的检查点开始解析。
+        
         Args:
             file_path (str): Excel文件路径
             sheet_name (str, optional): 工作表名称，如果提供则优先使用
@@ -228,16 +605,24 @@ class ExcelUtil:
             Exception: 当文件无法打开或解析时抛出异常
         """
         try:
-            # 调用统一的read_excel_data方法获取数据
+            # 首次打开.xlsx工作表时在后台建立行偏移索引，之后翻到靠后的页面只需解析一页的行
+            if start_row < EXCEL_ROW_INDEX_CONFIG['interval']:
+                try:
+                    excel_row_index.schedule_build(file_path, sheet_name, sheet_index)
+                except Exception as e:
+                    app_logger.warning(f"提交行偏移索引任务失败: {str(e)}")
+
+            # 使用流式读取，只解析预览所需的行；行偏移索引只能用于iterparse引擎
             # 预览数据时不忽略空行，以便用户看到实际情况
-            rows = ExcelUtil.read_excel_data(
+            rows = list(ExcelUtil.iter_excel_data(
                 file_path=file_path,
                 sheet_name=sheet_name,
                 sheet_index=sheet_index,
                 start_row=start_row,
                 row_limit=row_count,
-                ignore_empty_rows=False  # 预览时不忽略空行
-            )
+                ignore_empty_rows=False,  # 预览时不忽略空行
+                engine='iterparse'
+            ))
             
             # 构建返回结果
             return rows, rows
@@ -383,6 +768,9 @@ class ExcelUtil:
         """
         获取Excel工作表的有效总行数，即使中间有空行区域也能正确计算最后一行有效数据
         
+        不解析单元格数据：.xlsx读取工作表XML的dimension并从尾部扫描最后一个有值的行，
+        .xls使用xlrd的nrows并从后向前跳过全空行，.csv/.tsv逐行扫描。工作表已缓存或已生成列式副本时直接使用其行数。
+        
         Args:
             file_path (str): Excel文件路径
             sheet_name (str, optional): 工作表名称，如果提供则优先使用
@@ -404,74 +792,175 @@ class ExcelUtil:
             ext = os.path.splitext(file_path)[1].lower()
             app_logger.info(f"获取工作表有效总行数: {file_path}, 格式: {ext}, 忽略空行: {ignore_empty_rows}")
             
-            # 如果不需要忽略空行，使用原来的方法快速计算
-            if not ignore_empty_rows:
-                if ext == '.xlsx':
-                    wb = load_workbook(file_path, read_only=True)
-                    if sheet_name and sheet_name in wb.sheetnames:
-                        ws = wb[sheet_name]
-                    else:
-                        ws = wb.worksheets[min(sheet_index, len(wb.worksheets)-1)]
-                    max_row = ws.max_row
-                    wb.close()
-                    return max_row
+            total_rows = None
+            if ignore_empty_rows and EXCEL_CACHE_CONFIG['enabled']:
+                cached_sheet = _sheet_cache.get(ExcelSheetCache.make_key(file_path, sheet_name, sheet_index))
+                if cached_sheet is not None:
+                    # 缓存数据末尾可能保留只含空白字符串的行，按非空行标记取最后一个有效行
+                    total_rows = ExcelUtil._last_non_empty_row(cached_sheet.non_empty)
+            
+            if total_rows is None and ignore_empty_rows:
+                # 列式副本的非空行标记同样是内存映射的数组
+                sidecar_sheet = excel_sidecar.load_sheet(file_path, sheet_name, sheet_index)
+                if sidecar_sheet is not None:
+                    total_rows = ExcelUtil._last_non_empty_row(sidecar_sheet.non_empty)
+            
+            if total_rows is None:
+                if ext in csv_reader.CSV_EXTENSIONS:
+                    total_rows = csv_reader.count_rows(file_path, ignore_empty_rows)
+                elif ext == '.xlsx':
+                    total_rows = ExcelUtil._count_xlsx_rows(file_path, sheet_name, sheet_index, ignore_empty_rows)
+                elif HAS_XLRD:
+                    total_rows = ExcelUtil._count_xls_rows(file_path, sheet_name, sheet_index, ignore_empty_rows)
+            
+            if total_rows is None:
+                # 无法直接计数时逐行读取，流式读取会丢弃末尾全空行
+                app_logger.info("无法快速获取行数，使用逐行读取计数")
+                if ignore_empty_rows:
+                    total_rows = sum(1 for _ in ExcelUtil.iter_excel_data(file_path, sheet_name, sheet_index))
                 else:
                     if sheet_name:
                         df = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
                     else:
                         df = pd.read_excel(file_path, sheet_name=sheet_index, header=None)
-                    return len(df)
+                    total_rows = len(df)
             
-            # 需要忽略空行，使用pandas高效处理
-            try:
-                if sheet_name:
-                    df = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
-                else:
-                    df = pd.read_excel(file_path, sheet_name=sheet_index, header=None)
-                
-                # 创建一个布尔掩码，标记非空行
-                # 行为非空的条件：至少有一个单元格非空且非空字符串
-                non_empty_mask = df.apply(
-                    lambda row: row.notna().any() and not all(
-                        (pd.isna(val) or (isinstance(val, str) and val.strip() == ''))
-                        for val in row
-                    ),
-                    axis=1
-                )
-                
-                if not non_empty_mask.any():
-                    # 所有行都是空的
-                    return 0
-                
-                # 找到最后一个非空行的索引
-                last_non_empty_rows = non_empty_mask[non_empty_mask].index
-                if len(last_non_empty_rows) == 0:
-                    return 0
-                    
-                # 返回最后一个非空行的索引 + 1（因为索引从0开始）
-                return last_non_empty_rows[-1] + 1
-                
-            except Exception as e:
-                app_logger.error(f"使用pandas获取行数失败，尝试备用方法: {str(e)}")
-                
-                # 备用方法：读取所有数据并检查
-                all_data = ExcelUtil.read_excel_data(file_path, sheet_name, sheet_index)
-                
-                # 如果没有数据，直接返回0
-                if not all_data:
-                    return 0
-                
-                # 从后向前查找最后一个非空行
-                for i in range(len(all_data) - 1, -1, -1):
-                    row = all_data[i]
-                    # 检查行是否为空（所有单元格都是None或空字符串）
-                    if any(cell is not None and (not isinstance(cell, str) or cell.strip() != '') for cell in row):
-                        # 找到第一个非空行，返回其索引+1作为总行数
-                        return i + 1
-                
-                # 如果所有行都是空的，返回0
-                return 0
+            app_logger.info(f"工作表有效总行数: {total_rows}")
+            return int(total_rows)
             
         except Exception as e:
             app_logger.error(f"获取工作表有效总行数失败: {str(e)}", exc_info=True)
-            raise Exception(f"无法获取工作表有效总行数: {str(e)}") 
\ No newline at end of file
+            raise Exception(f"无法获取工作表有效总行数: {str(e)}")
+    
+    @staticmethod
+    def _resolve_xlsx_sheet_path(archive, sheet_name, sheet_index):
+        """根据workbook.xml和关系文件找到工作表XML在压缩包中的路径"""
+        workbook = ElementTree.fromstring(archive.read('xl/workbook.xml'))
+        sheets = workbook.findall(f'{{{XLSX_MAIN_NS}}}sheets/{{{XLSX_MAIN_NS}}}sheet')
+        if not sheets:
+            return None
+        names = [sheet.get('name') for sheet in sheets]
+        if sheet_name:
+            if sheet_name not in names:
+                raise ValueError(f"工作表不存在: {sheet_name}")
+            sheet = sheets[names.index(sheet_name)]
+        else:
+            sheet = sheets[min(sheet_index, len(sheets) - 1)]
+        relation_id = sheet.get(f'{{{XLSX_REL_NS}}}id')
+        
+        relations = ElementTree.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+        for relation in relations:
+            if relation.get('Id') == relation_id:
+                target = relation.get('Target', '')
+                if target.startswith('/'):
+                    return target.lstrip('/')
+                return os.path.normpath(os.path.join('xl', target)).replace('\\', '/')
+        return None
+    
+    @staticmethod
+    def _count_xlsx_rows(file_path, sheet_name, sheet_index, ignore_empty_rows):
+        """
+        不解析单元格，直接扫描工作表XML获取行数
+        
+        dimension记录了工作表使用区域，但带格式的空行也会计入其中，因此忽略空行时
+        顺序解压工作表XML，在每个数据块中从后向前查找最后一个非空白的值(</v>或内联字符串</t>)
+        所在的<row>元素，最后一个数据块中找到的行号即为最后一个有值的行。只含空白字符的字符串
+        （包括共享字符串）与_is_empty_row一致视为空值。
+        
+        Returns:
+            int: 行数；XML结构不符合预期（如行元素缺少r属性）时返回None
+        """
+        with zipfile.ZipFile(file_path) as archive:
+            sheet_path = ExcelUtil._resolve_xlsx_sheet_path(archive, sheet_name, sheet_index)
+            if not sheet_path or sheet_path not in archive.namelist():
+                return None
+            
+            with archive.open(sheet_path) as sheet_file:
+                head = sheet_file.read(XLSX_SCAN_CHUNK_SIZE)
+                dimension_match = XLSX_DIMENSION_PATTERN.search(head)
+                dimension_rows = int(dimension_match.group(1)) if dimension_match else None
+                if not ignore_empty_rows:
+                    return dimension_rows
+                
+                last_value_row = 0
+                # 只含空白字符的共享字符串序号，遇到共享字符串单元格时才读取
+                blank_strings = None
+                # 保留上一块的尾部，避免<row ...>与其中的值被数据块边界截断
+                carry = b''
+                chunk = head
+                while chunk:
+                    buffer = carry + chunk
+                    # 上一块已检查过尾部中完整的值，只检查结束标签落在新数据中的值
+                    scan_from = len(carry) - 3
+                    search_end = len(buffer)
+                    while True:
+                        value_end = max(buffer.rfind(b'</v>', 0, search_end), buffer.rfind(b'</t>', 0, search_end))
+                        if value_end < scan_from or value_end < 0:
+                            break
+                        cell_start = buffer.rfind(b'<c ', 0, value_end)
+                        if cell_start < 0:
+                            return None
+                        cell = buffer[cell_start:value_end + 4]
+                        if b't="s"' in cell and blank_strings is None:
+                            blank_strings = {index for index, text in
+                                             enumerate(xlsx_stream_reader.iter_shared_strings(archive))
+                                             if not text.strip()}
+                        if not ExcelUtil._is_blank_xlsx_cell(cell, blank_strings):
+                            row_start = buffer.rfind(b'<row', 0, value_end)
+                            if row_start < 0:
+                                return None
+                            row_match = XLSX_ROW_NUMBER_PATTERN.match(buffer, row_start)
+                            if not row_match:
+                                return None
+                            last_value_row = int(row_match.group(1))
+                            break
+                        search_end = cell_start
+                    carry = buffer[-XLSX_SCAN_OVERLAP:]
+                    chunk = sheet_file.read(XLSX_SCAN_CHUNK_SIZE)
+                
+                app_logger.debug(f"xlsx行数扫描: dimension={dimension_rows}, 最后有值行={last_value_row}")
+                return last_value_row
+    
+    @staticmethod
+    def _is_blank_xlsx_cell(cell, blank_strings):
+        """判断单元格XML（<c ...>到最后一个值的结束标签）的值是否为空或只含空白字符"""
+        type_match = XLSX_CELL_TYPE_PATTERN.search(cell, 0, cell.find(b'>'))
+        cell_type = type_match.group(1) if type_match else b'n'
+        if cell_type == b's':
+            value_match = XLSX_CELL_VALUE_PATTERN.search(cell)
+            return value_match is None or int(value_match.group(1)) in blank_strings
+        if cell_type == b'inlineStr':
+            text = b''.join(XLSX_CELL_TEXT_PATTERN.findall(cell))
+        else:
+            value_match = XLSX_CELL_VALUE_PATTERN.search(cell)
+            text = value_match.group(1) if value_match else b''
+        return not html.unescape(text.decode('utf-8')).strip()
+    
+    @staticmethod
+    def _count_xls_rows(file_path, sheet_name, sheet_index, ignore_empty_rows):
+        """使用xlrd的nrows获取行数，忽略空行时从后向前跳过全空行"""
+        workbook = xlrd.open_workbook(file_path, on_demand=True)
+        try:
+            sheet_names = workbook.sheet_names()
+            if sheet_name:
+                if sheet_name not in sheet_names:
+                    raise ValueError(f"工作表不存在: {sheet_name}")
+                sheet = workbook.sheet_by_name(sheet_name)
+            else:
+                sheet = workbook.sheet_by_index(min(sheet_index, len(sheet_names) - 1))
+            
+            total_rows = sheet.nrows
+            if not ignore_empty_rows:
+                return total_rows
+            
+            while total_rows > 0:
+                row_values = [
+                    None if cell.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK, xlrd.XL_CELL_ERROR) else cell.value
+                    for cell in sheet.row(total_rows - 1)
+                ]
+                if not ExcelUtil._is_empty_row(row_values):
+                    break
+                total_rows -= 1
+            return total_rows
+        finally:
+            workbook.release_resources()
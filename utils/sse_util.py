@@ -0,0 +1,42 @@
+"""
+Server-Sent Events工具模块
+
+将生成器包装为text/event-stream响应，逐个事件写给浏览器
+"""
+
+import json
+from flask import Response, stream_with_context
+
+
+def sse_event(event, data):
+    """格式化一个SSE事件
+
+    Args:
+        event: 事件名称
+        data: 事件数据，序列化为JSON
+
+    Returns:
+        str: 符合SSE格式的事件文本
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def sse_response(events):
+    """将事件生成器包装为SSE响应
+
+    生成器在请求上下文中执行；关闭代理缓冲，每个事件产生后立即发送给客户端。
+
+    Args:
+        events: 产生sse_event格式文本的生成器
+
+    Returns:
+        Response: Flask流式响应
+    """
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
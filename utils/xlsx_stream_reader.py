@@ -0,0 +1,300 @@
+"""
+xlsx流式读取引擎
+
+直接解析xlsx压缩包中的XML，不创建openpyxl的Cell对象：
+- xl/sharedStrings.xml读取为字符串列表
+- xl/styles.xml中数字格式为日期/时长的样式序号集合，用于将日期序列号转换为datetime
+- xl/worksheets/sheetN.xml用XMLPullParser（iterparse的增量解析接口）逐行解析，处理完一行即清除已解析的元素，内存占用与行数无关
+
+单元格值的解码规则与openpyxl只读模式（data_only=True）一致：共享字符串、内联字符串、数字、布尔、
+错误值、公式缓存值和日期序列号。行号不连续时补齐中间的空行，每行补齐到dimension声明的列数。
+与openpyxl不同的是，单元格超出dimension声明的列范围时不会被截断。
+"""
+
+import os
+import re
+import zipfile
+from xml.etree.ElementTree import XMLPullParser, iterparse, fromstring
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+from openpyxl.utils.datetime import from_excel, from_ISO8601, CALENDAR_WINDOWS_1900, CALENDAR_MAC_1904
+
+MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+PACKAGE_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+_ROW_TAG = MAIN_NS + 'row'
+_CELL_TAG = MAIN_NS + 'c'
+_VALUE_TAG = MAIN_NS + 'v'
+_TEXT_TAG = MAIN_NS + 't'
+_RUN_TAG = MAIN_NS + 'r'
+_INLINE_STRING_TAG = MAIN_NS + 'is'
+_SHARED_STRING_TAG = MAIN_NS + 'si'
+_SHEET_DATA_TAG = MAIN_NS + 'sheetData'
+_DIMENSION_TAG = MAIN_NS + 'dimension'
+
+_CELL_REF_PATTERN = re.compile(r'([A-Z]+)(\d+)')
+
+# 每次喂给解析器的解压后字节数
+PARSE_CHUNK_SIZE = 16 * 1024
+
+
+def _column_number(letters):
+    """列字母转换为从1开始的列号"""
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - 64
+    return number
+
+
+def _string_item_text(item):
+    """共享字符串或内联字符串的文本：直接的<t>或富文本各段<r><t>拼接，忽略注音<rPh>"""
+    parts = []
+    for child in item:
+        if child.tag == _TEXT_TAG:
+            parts.append(child.text or '')
+        elif child.tag == _RUN_TAG:
+            text = child.find(_TEXT_TAG)
+            if text is not None:
+                parts.append(text.text or '')
+    return ''.join(parts)
+
+
+def iter_shared_strings(archive):
+    """逐个生成xl/sharedStrings.xml中的共享字符串，处理完一项即清除已解析的元素"""
+    if 'xl/sharedStrings.xml' not in archive.namelist():
+        return
+    with archive.open('xl/sharedStrings.xml') as source:
+        root = None
+        for event, element in iterparse(source, events=('start', 'end')):
+            if root is None:
+                root = element
+            elif event == 'end' and element.tag == _SHARED_STRING_TAG:
+                yield _string_item_text(element)
+                root.clear()
+
+
+class XlsxStreamReader:
+    """基于iterparse的xlsx只读解析器"""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.archive = zipfile.ZipFile(file_path)
+        try:
+            self._load_workbook()
+            self._load_styles()
+        except Exception:
+            self.archive.close()
+            raise
+        self._shared_strings = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """关闭压缩包"""
+        self.archive.close()
+
+    def _load_workbook(self):
+        """读取工作表名称、工作表XML路径和日期系统"""
+        workbook = fromstring(self.archive.read('xl/workbook.xml'))
+        properties = workbook.find(MAIN_NS + 'workbookPr')
+        date1904 = properties is not None and properties.get('date1904') in ('1', 'true')
+        self.epoch = CALENDAR_MAC_1904 if date1904 else CALENDAR_WINDOWS_1900
+
+        targets = {}
+        relations = fromstring(self.archive.read('xl/_rels/workbook.xml.rels'))
+        for relation in relations.iter(PACKAGE_REL_NS + 'Relationship'):
+            target = relation.get('Target', '')
+            if target.startswith('/'):
+                target = target.lstrip('/')
+            else:
+                target = os.path.normpath(os.path.join('xl', target)).replace('\\', '/')
+            targets[relation.get('Id')] = target
+
+        self.sheet_names = []
+        self.sheet_paths = []
+        for sheet in workbook.iter(MAIN_NS + 'sheet'):
+            self.sheet_names.append(sheet.get('name'))
+            self.sheet_paths.append(targets.get(sheet.get(REL_NS + 'id')))
+
+    def _load_styles(self):
+        """找出数字格式为日期或时长的单元格样式序号"""
+        self.date_styles = set()
+        self.timedelta_styles = set()
+        if 'xl/styles.xml' not in self.archive.namelist():
+            return
+        styles = fromstring(self.archive.read('xl/styles.xml'))
+        custom_formats = {}
+        number_formats = styles.find(MAIN_NS + 'numFmts')
+        if number_formats is not None:
+            for number_format in number_formats:
+                custom_formats[int(number_format.get('numFmtId'))] = number_format.get('formatCode', '')
+        cell_formats = styles.find(MAIN_NS + 'cellXfs')
+        if cell_formats is None:
+            return
+        for style_id, cell_format in enumerate(cell_formats):
+            format_id = int(cell_format.get('numFmtId', 0))
+            format_code = custom_formats.get(format_id, BUILTIN_FORMATS.get(format_id))
+            if format_code and is_date_format(format_code):
+                # 单元格的s属性为字符串，按字符串保存以免逐个转换
+                self.date_styles.add(str(style_id))
+                if is_timedelta_format(format_code):
+                    self.timedelta_styles.add(str(style_id))
+
+    @property
+    def shared_strings(self):
+        """共享字符串表，首次使用时读取"""
+        if self._shared_strings is None:
+            self._shared_strings = list(iter_shared_strings(self.archive))
+        return self._shared_strings
+
+    def resolve_sheet(self, sheet_name=None, sheet_index=0):
+        """按名称或索引（超出时取最后一个）定位工作表，返回XML路径；指定的名称不存在时报错"""
+        if not self.sheet_names:
+            raise ValueError("工作簿中没有工作表")
+        if sheet_name:
+            if sheet_name not in self.sheet_names:
+                raise ValueError(f"工作表不存在: {sheet_name}")
+            position = self.sheet_names.index(sheet_name)
+        else:
+            position = min(sheet_index, len(self.sheet_names) - 1)
+        return self.sheet_paths[position]
+
+    def _decode_number(self, text, style):
+        """数字单元格：样式为日期/时长格式时转换为datetime/timedelta"""
+        if '.' in text or 'E' in text or 'e' in text:
+            value = float(text)
+        else:
+            value = int(text)
+        if style and style in self.date_styles:
+            try:
+                return from_excel(value, self.epoch, timedelta=style in self.timedelta_styles)
+            except (OverflowError, ValueError):
+                return '#VALUE!'
+        return value
+
+    def _decode_cell(self, cell):
+        """将<c>元素解码为Python值"""
+        data_type = cell.get('t', 'n')
+        if data_type == 'inlineStr':
+            inline = cell.find(_INLINE_STRING_TAG)
+            return _string_item_text(inline) if inline is not None else None
+
+        text = cell.findtext(_VALUE_TAG)
+        if not text:
+            return None
+        if data_type == 'n':
+            return self._decode_number(text, cell.get('s'))
+        if data_type == 's':
+            return self.shared_strings[int(text)]
+        if data_type == 'b':
+            return bool(int(text))
+        if data_type == 'd':
+            return from_ISO8601(text)
+        # str（公式的字符串结果）和e（错误值）
+        return text
+
+    def iter_rows(self, sheet_name=None, sheet_index=0, start_row=0, resume=None):
+        """逐行生成(行值元组, 列宽)，start_row之前的行只计数不解码
+
+        Args:
+            sheet_name: 工作表名称，指定时优先使用
+            sheet_index: 工作表索引
+            start_row: 从第几行开始（从0开始）
+            resume: 可选的续读位置(头部XML, 行号, 字节偏移)，见utils.excel_row_index。
+                先解析工作表XML中<sheetData>及之前的头部，再跳到该行<row>元素在解压后XML中的偏移继续解析，
+                偏移之前的行不经过XML解析
+        """
+        sheet_path = self.resolve_sheet(sheet_name, sheet_index)
+        if not sheet_path or sheet_path not in self.archive.namelist():
+            raise ValueError(f"找不到工作表数据: {sheet_path}")
+
+        column_numbers = {}
+        width = 0
+        next_row = 1
+        sheet_data = None
+        shared_strings = self.shared_strings
+        # 直接使用XMLPullParser分块喂入数据并读取事件，比iterparse少一层生成器包装
+        parser = XMLPullParser(events=('start', 'end'))
+        with self.archive.open(sheet_path) as source:
+            if resume is not None:
+                header, next_row, offset = resume
+                parser.feed(header)
+                source.seek(offset)
+            while True:
+                chunk = source.read(PARSE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                parser.feed(chunk)
+                for event, element in parser.read_events():
+                    tag = element.tag
+                    if event == 'start':
+                        if tag == _SHEET_DATA_TAG:
+                            sheet_data = element
+                        continue
+                    if tag == _DIMENSION_TAG:
+                        # 与openpyxl一致，按dimension声明的列数补齐每一行
+                        match = _CELL_REF_PATTERN.match(element.get('ref', '').split(':')[-1])
+                        if match:
+                            width = _column_number(match.group(1))
+                        continue
+                    if tag != _ROW_TAG:
+                        continue
+
+                    row_number = element.get('r')
+                    row_number = int(row_number) if row_number else next_row
+                    # 补齐缺失的行
+                    while next_row < row_number:
+                        if next_row > start_row:
+                            yield (None,) * width, width
+                        next_row += 1
+                    next_row = row_number + 1
+
+                    if row_number > start_row:
+                        values = [None] * width
+                        column = 0
+                        for cell in element:
+                            if cell.tag != _CELL_TAG:
+                                continue
+                            reference = cell.get('r')
+                            if reference:
+                                letters = reference.rstrip('0123456789')
+                                column = column_numbers.get(letters)
+                                if column is None:
+                                    column = column_numbers[letters] = _column_number(letters)
+                            else:
+                                column += 1
+                            data_type = cell.get('t')
+                            if data_type is None or data_type == 's':
+                                # 数字和共享字符串最常见，直接在循环内解码
+                                text = cell.findtext(_VALUE_TAG)
+                                if not text:
+                                    continue
+                                if data_type == 's':
+                                    value = shared_strings[int(text)]
+                                else:
+                                    value = self._decode_number(text, cell.get('s'))
+                            else:
+                                value = self._decode_cell(cell)
+                                if value is None:
+                                    continue
+                            if column > len(values):
+                                values.extend([None] * (column - len(values)))
+                            values[column - 1] = value
+                        yield tuple(values), width
+
+                    # 清除已处理的行，避免解析树随行数增长
+                    if sheet_data is not None:
+                        sheet_data.clear()
+                    else:
+                        element.clear()
+        parser.close()
+
+
+def iter_xlsx_raw_rows(file_path, sheet_name, sheet_index, start_row):
+    """与ExcelUtil._iter_xlsx_raw_rows接口一致的生成器，生成(原始行, 列宽)元组"""
+    with XlsxStreamReader(file_path) as reader:
+        yield from reader.iter_rows(sheet_name, sheet_index, start_row)